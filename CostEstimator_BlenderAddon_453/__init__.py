@@ -31,6 +31,14 @@ import time
 import urllib.request
 import webbrowser
 import queue  # Add standard queue module for thread-safe communication
+import hashlib
+import struct
+# ▼▼▼ [추가] MessagePack 바이너리 전송 (lib 폴더에 msgpack이 없으면 기존 JSON 전송) ▼▼▼
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+# ▲▲▲ [추가] 여기까지 ▲▲▲
 
 
 bl_info = {
@@ -45,6 +53,23 @@ websocket_client = None
 event_queue = queue.Queue()  # Use standard queue for thread-safe communication
 status_message = "연결 대기 중..."
 websocket_thread_loop = None
+websocket_binary_mode = False  # 서버와 MessagePack subprotocol 협상 성공 여부
+
+# 서버 connections/ws_codec.py와 동일한 규약
+BINARY_SUBPROTOCOL = "costestimator.msgpack.v1"
+TYPED_ARRAY_EXT = 1
+TYPED_ARRAY_DTYPE_CODES = {"<f4": 1, "<f8": 2, "<u4": 3, "<i4": 4}
+
+# ▼▼▼ [추가] 청크 전송 흐름 제어: 서버의 chunk_ack를 받기 전에 보낼 수 있는 청크 수 (서버 INGEST_CREDIT_WINDOW와 동일) ▼▼▼
+INGEST_CREDIT_WINDOW = 4
+CHUNK_ACK_TIMEOUT = 30.0  # ack가 오지 않으면 (구버전 서버 등) 이 시간 후 그냥 다음 청크 전송
+ingest_credits = threading.Semaphore(INGEST_CREDIT_WINDOW)
+# ▲▲▲ [추가] 여기까지 ▲▲▲
+
+# ▼▼▼ [추가] 재개 가능한 전송 세션: 연결이 끊기면 재접속 후 마지막 ack 다음 청크부터 이어서 전송 ▼▼▼
+ingest_session_id = None      # 서버가 fetch_progress_start 후 발급한 세션 ID
+ingest_resume_state = None    # {"project_id", "needed_uids", "unchanged_count"} - 전송 중일 때만 유지
+# ▲▲▲ [추가] 여기까지 ▲▲▲
 
 server_process = None
 server_status = "서버 꺼짐" # "서버 꺼짐", "시작 중...", "실행 중", "오류"
@@ -96,421 +121,562 @@ def get_quantity_value(quantity):
     if quantity.is_a("IfcQuantityWeight"): return quantity.WeightValue
     return None
 
-def serialize_ifc_elements_to_string_list(ifc_file):
-    import ifcopenshell.geom  # Import geometry module
-    import ifcopenshell.util.shape # Import shape utility module
-    elements_data = []
-    products = ifc_file.by_type("IfcProduct")
-    print(f"🔍 [Blender] {len(products)}개의 IFC 객체 데이터 직렬화를 시작합니다.") # 디버깅 추가
+# ▼▼▼ [추가] delta 동기화용 content hash ▼▼▼
+# 직렬화 형식이 바뀌면 이 값을 올려서 모든 객체가 한 번 다시 전송되도록 합니다.
+CONTENT_HASH_VERSION = "2"
+MANIFEST_CHUNK_SIZE = 5000
+# 모든 객체가 공유하는 이력 정보는 편집할 때마다 바뀌므로 hash 계산에서 제외
+HASH_EXCLUDED_CLASSES = ("IfcOwnerHistory", "IfcPersonAndOrganization", "IfcPerson", "IfcOrganization", "IfcApplication")
+
+# 관계(IfcRel*)에서는 객체가 참조하는 쪽(Relating*)만 hash에 넣습니다.
+# 관계 엔티티 자체나 Related* 목록을 넣으면 같은 속성 세트/층/타입을 공유하는 다른 객체가 바뀔 때마다 hash가 함께 바뀝니다.
+# 내용까지 hash: 관계 클래스 → 참조 대상 속성
+HASH_RELATING_CONTENT = {
+    "IfcRelDefinesByProperties": "RelatingPropertyDefinition",
+    "IfcRelDefinesByType": "RelatingType",
+    "IfcRelAssociatesMaterial": "RelatingMaterial",
+    "IfcRelAssociatesClassification": "RelatingClassification",
+}
+# GlobalId만 hash: 역참조 속성 → 참조 대상 속성 (공간/상위 객체 자체의 변경은 그 객체의 hash에 반영됨)
+HASH_RELATING_IDENTITY = {
+    "ContainedInStructure": "RelatingStructure",
+    "Decomposes": "RelatingObject",
+    "Nests": "RelatingObject",
+}
 
-    # Geometry settings
-    settings = ifcopenshell.geom.settings()
-    
-    for element in products:
-        if not element.GlobalId: continue
-        element_dict = {
-            "Name": element.Name or "이름 없음",
-            "IfcClass": element.is_a(),
-            "ElementId": element.id(),
-            "UniqueId": element.GlobalId,
-            "Tag": getattr(element, 'Tag', None) or "",  # ▼▼▼ [추가] Tag 속성 추출 (2025-11-05) ▼▼▼
-            "PredefinedType": getattr(element, 'PredefinedType', None) or "",  # ▼▼▼ [추가] PredefinedType 속성 추출 (2025-11-05) ▼▼▼
-            "Attributes": {},           # IFC 기본 속성들
-            "PropertySet": {},          # Property Sets (Pset_*)
-            "QuantitySet": {},          # Quantity Sets (Qto_*)
-            "Spatial_Container": {},    # 공간 컨테이너 정보
-            "Aggregates_Whole": {},     # 집합 관계 - 전체 객체 정보
-            "Aggregates_Parts": {},     # 집합 관계 - 부분 객체들 정보
-            "Nest_Host": {},            # Nest 관계 - 호스트 정보
-            "Nest_Components": {},      # Nest 관계 - 구성요소들 정보
-            "Type": {},                 # 타입 정보
-            "System": {},               # 시스템 정보 (웹에서 추가)
-        }
-
-        # ▼▼▼ IFC 요소의 모든 Attributes 동적 추출 ▼▼▼
-        # element.get_info()는 모든 IFC 속성을 딕셔너리로 반환
-        # GlobalId, Name, Description, ObjectType, Tag, PredefinedType 등 포함
-        info = element.get_info()
-
-        for attr_name, attr_value in info.items():
-            # 내부 속성만 제외 (type, id는 내부용, GlobalId는 UniqueId로 이미 저장)
-            if attr_name in ['type', 'id', 'GlobalId']:
-                continue
+def _entity_graph_text(ifc_file, root):
+    """root와 root가 정방향 속성으로 참조하는 엔티티들을 문자열로 이어 붙입니다. (이력 정보 제외)"""
+    return "".join(
+        str(entity) for entity in ifc_file.traverse(root)
+        if entity.is_a() not in HASH_EXCLUDED_CLASSES
+    )
 
-            # 관계형 속성은 제외 (별도 섹션에서 처리)
-            # 리스트/튜플이면서 대문자로 시작하는 것들 (IsDefinedBy, ContainsElements 등)
-            if isinstance(attr_value, (list, tuple)) and attr_name[0].isupper():
+def compute_element_content_hash(ifc_file, element):
+    """
+    형상 생성(create_shape) 없이 IFC 엔티티 그래프만으로 객체의 content hash를 계산합니다.
+    - 객체 자신과 정방향으로 참조하는 엔티티(배치, 형상 표현 등)
+    - 속성/수량 세트, 타입, 재질, 분류의 내용
+    - 소속 공간, 상위 집합/Nest 객체의 GlobalId
+    중 하나라도 바뀌면 hash가 바뀝니다. 관계의 Related* 목록(같은 관계를 공유하는 다른 객체)은 넣지 않습니다.
+    """
+    hasher = hashlib.sha256(CONTENT_HASH_VERSION.encode("utf-8"))
+    hasher.update(_entity_graph_text(ifc_file, element).encode("utf-8"))
+
+    # IFC2x3에서는 타입도 IsDefinedBy(IfcRelDefinesByType)로 연결됨
+    parts = []
+    for inverse_name in ("IsDefinedBy", "IsTypedBy", "HasAssociations"):
+        for rel in getattr(element, inverse_name, None) or ():
+            attribute = HASH_RELATING_CONTENT.get(rel.is_a())
+            if attribute is None:
                 continue
+            targets = getattr(rel, attribute, None)
+            # IFC4의 IfcPropertySetDefinitionSet처럼 참조 대상이 목록일 수 있음
+            for target in targets if isinstance(targets, (list, tuple)) else (targets,):
+                if target is not None:
+                    parts.append(f"{attribute}:{_entity_graph_text(ifc_file, target)}")
+    for inverse_name, attribute in HASH_RELATING_IDENTITY.items():
+        for rel in getattr(element, inverse_name, None) or ():
+            target = getattr(rel, attribute, None)
+            if target is not None:
+                parts.append(f"{inverse_name}:{target.GlobalId}")
+    # 역참조 목록의 순서는 관계가 추가된 순서에 따르므로 정렬하여 순서와 무관하게 만듦
+    for part in sorted(parts):
+        hasher.update(part.encode("utf-8"))
+    return hasher.hexdigest()
+
+def build_sync_manifest(ifc_file):
+    """[(GlobalId, content_hash), ...] manifest와 {GlobalId: element} 매핑을 반환합니다."""
+    manifest = []
+    elements_by_guid = {}
+    for element in ifc_file.by_type("IfcProduct"):
+        if not element.GlobalId: continue
+        manifest.append([element.GlobalId, compute_element_content_hash(ifc_file, element)])
+        elements_by_guid[element.GlobalId] = element
+    return manifest, elements_by_guid
+# ▲▲▲ [추가] 여기까지 ▲▲▲
+
+# ▼▼▼ [추가] 병렬 geometry tessellation ▼▼▼
+GEOMETRY_ITERATOR_THREADS = max(1, os.cpu_count() or 1)
+EXPORT_WINDOW_SIZE = 500      # 한 번에 tessellation/직렬화하여 메모리에 유지하는 객체 수 (패널에서 변경 가능)
+DEBUG_SERIALIZATION = False   # True면 객체별 [DEBUG] 로그 출력 (패널의 "상세 로그" 옵션)
+
+def debug_log(*args):
+    if DEBUG_SERIALIZATION:
+        print(*args)
+
+def tessellate_products_parallel(ifc_file, products, settings):
+    """
+    ifcopenshell geom iterator로 모든 코어에서 동시에 tessellation하여 {entity id: shape}를 반환합니다.
+    iterator가 처리하지 못한 객체(기본 제외 클래스 등)는 결과에 없으므로 호출 측에서 create_shape로 개별 처리합니다.
+    """
+    import ifcopenshell.geom
+    shapes_by_id = {}
+    if not products:
+        return shapes_by_id
+    started = time.time()
+    try:
+        iterator = ifcopenshell.geom.iterator(settings, ifc_file, GEOMETRY_ITERATOR_THREADS, include=list(products))
+        if iterator.initialize():
+            while True:
+                shape = iterator.get()
+                shapes_by_id[shape.id] = shape
+                if not iterator.next():
+                    break
+    except Exception as e:
+        print(f"[WARN] 병렬 geometry iterator 실패. 객체별 create_shape로 처리합니다: {e}")
+    print(f"⚙️ [Blender] {GEOMETRY_ITERATOR_THREADS}개 스레드로 {len(shapes_by_id)}개 객체 tessellation 완료 ({time.time() - started:.1f}s)")
+    return shapes_by_id
 
-            # 모든 Attributes를 추가 (None 값도 포함 - 속성이 있다는 것 자체가 의미)
-            if hasattr(attr_value, 'is_a'):
-                # IFC 엔티티 참조인 경우
-                element_dict["Attributes"][attr_name] = f"{attr_value.is_a()}: {getattr(attr_value, 'Name', str(attr_value))}"
-            elif attr_value is not None:
-                # 일반 값
-                element_dict["Attributes"][attr_name] = attr_value
-            else:
-                # None 값도 저장 (속성이 정의되어 있다는 정보)
-                element_dict["Attributes"][attr_name] = None
-
-        print(f"[DEBUG] Element {element.id()} Attributes extracted: {list(element_dict['Attributes'].keys())}")
-        # ▲▲▲ Attributes 추출 끝 ▲▲▲
-        
-        # Add Geometry Data
-        try:
-            shape = ifcopenshell.geom.create_shape(settings, element)
-
-            # Use ifcopenshell.util.shape to get verts and faces reliably
-            verts = ifcopenshell.util.shape.get_vertices(shape.geometry)
-            faces = ifcopenshell.util.shape.get_faces(shape.geometry)
+def extract_shape_matrix(element, shape):
+    """shape.transformation에서 4x4 변환 행렬(16개 값 리스트)을 추출합니다. 실패하면 None."""
+    matrix = None
+    try:
+        trans = shape.transformation
+        if trans:
+            trans_type = str(type(trans))
+            debug_log(f"[DEBUG] Element {element.id()} trans type: {trans_type}")
 
-            # Extract transformation matrix
-            matrix = None
+            # Try to get attributes safely
             try:
-                trans = shape.transformation
-                if trans:
-                    trans_type = str(type(trans))
-                    print(f"[DEBUG] Element {element.id()} trans type: {trans_type}")
+                attrs = [x for x in dir(trans) if not x.startswith('_')]
+                debug_log(f"[DEBUG] Element {element.id()} attrs: {attrs}")
+            except:
+                debug_log(f"[DEBUG] Element {element.id()} could not get attributes")
 
-                    # Try to get attributes safely
+            # Method 1: Try trans.matrix
+            if hasattr(trans, 'matrix'):
+                try:
+                    trans_matrix = trans.matrix
+                    debug_log(f"[DEBUG] Element {element.id()} trans.matrix type: {type(trans_matrix)}")
+
+                    # Try 2D array access (4x4)
+                    matrix = []
+                    for i in range(4):
+                        for j in range(4):
+                            matrix.append(float(trans_matrix[i][j]))
+                    debug_log(f"[DEBUG] Element {element.id()} extracted via [i][j], length: {len(matrix)}")
+                except Exception as e1:
+                    debug_log(f"[DEBUG] Element {element.id()} [i][j] failed: {e1}")
+                    # Try flat access (16 elements)
                     try:
-                        attrs = [x for x in dir(trans) if not x.startswith('_')]
-                        print(f"[DEBUG] Element {element.id()} attrs: {attrs}")
-                    except:
-                        print(f"[DEBUG] Element {element.id()} could not get attributes")
-
-                    # Method 1: Try trans.matrix
-                    if hasattr(trans, 'matrix'):
-                        try:
-                            trans_matrix = trans.matrix
-                            print(f"[DEBUG] Element {element.id()} trans.matrix type: {type(trans_matrix)}")
-
-                            # Try 2D array access (4x4)
-                            matrix = []
-                            for i in range(4):
-                                for j in range(4):
-                                    matrix.append(float(trans_matrix[i][j]))
-                            print(f"[DEBUG] Element {element.id()} extracted via [i][j], length: {len(matrix)}")
-                        except Exception as e1:
-                            print(f"[DEBUG] Element {element.id()} [i][j] failed: {e1}")
-                            # Try flat access (16 elements)
-                            try:
-                                matrix = [float(trans_matrix[i]) for i in range(16)]
-                                print(f"[DEBUG] Element {element.id()} extracted via [i], length: {len(matrix)}")
-                            except Exception as e2:
-                                print(f"[DEBUG] Element {element.id()} [i] failed: {e2}")
-                                matrix = None
-
-                    # Method 2: Try trans.data
-                    if not matrix and hasattr(trans, 'data'):
-                        try:
-                            matrix = list(trans.data)
-                            print(f"[DEBUG] Element {element.id()} extracted via .data, length: {len(matrix)}")
-                        except Exception as e:
-                            print(f"[DEBUG] Element {element.id()} .data failed: {e}")
-
-                    if matrix and len(matrix) == 12:
-                        # 3x4 matrix, convert to 4x4
-                        matrix = [
-                            matrix[0], matrix[1], matrix[2], 0,
-                            matrix[3], matrix[4], matrix[5], 0,
-                            matrix[6], matrix[7], matrix[8], 0,
-                            matrix[9], matrix[10], matrix[11], 1
-                        ]
-                        print(f"[DEBUG] Element {element.id()} converted 3x4 to 4x4")
-
-                    if matrix and len(matrix) == 16:
-                        print(f"[DEBUG] Element {element.id()} SUCCESS - matrix ready, length: {len(matrix)}")
-                    else:
-                        print(f"[WARN] Element {element.id()} - no valid matrix extracted")
+                        matrix = [float(trans_matrix[i]) for i in range(16)]
+                        debug_log(f"[DEBUG] Element {element.id()} extracted via [i], length: {len(matrix)}")
+                    except Exception as e2:
+                        debug_log(f"[DEBUG] Element {element.id()} [i] failed: {e2}")
                         matrix = None
-            except Exception as matrix_error:
-                print(f"[ERROR] Matrix extraction failed for element {element.id()}: {str(matrix_error)}")
+
+            # Method 2: Try trans.data
+            if not matrix and hasattr(trans, 'data'):
+                try:
+                    matrix = list(trans.data)
+                    debug_log(f"[DEBUG] Element {element.id()} extracted via .data, length: {len(matrix)}")
+                except Exception as e:
+                    debug_log(f"[DEBUG] Element {element.id()} .data failed: {e}")
+
+            if matrix and len(matrix) == 12:
+                # 3x4 matrix, convert to 4x4
+                matrix = [
+                    matrix[0], matrix[1], matrix[2], 0,
+                    matrix[3], matrix[4], matrix[5], 0,
+                    matrix[6], matrix[7], matrix[8], 0,
+                    matrix[9], matrix[10], matrix[11], 1
+                ]
+                debug_log(f"[DEBUG] Element {element.id()} converted 3x4 to 4x4")
+
+            if matrix and len(matrix) == 16:
+                debug_log(f"[DEBUG] Element {element.id()} SUCCESS - matrix ready, length: {len(matrix)}")
+            else:
+                print(f"[WARN] Element {element.id()} - no valid matrix extracted")
                 matrix = None
+    except Exception as matrix_error:
+        print(f"[ERROR] Matrix extraction failed for element {element.id()}: {str(matrix_error)}")
+        matrix = None
+    return matrix
 
-            # ▼▼▼ 색상 및 재질 정보 추출 ▼▼▼
-            colors = None
-            materials = {}
 
-            try:
-                # IFC 스타일 색상 정보 추출
-                if hasattr(shape, 'styles') and shape.styles:
-                    # shape.styles는 (style_id, surface_style) 튜플 리스트
-                    for style_id, surface_style in shape.styles:
-                        if surface_style and hasattr(surface_style, 'Styles'):
-                            for style in surface_style.Styles:
-                                # IfcSurfaceStyleShading 또는 IfcSurfaceStyleRendering (Rendering은 Shading의 하위 클래스)
-                                if style.is_a('IfcSurfaceStyleShading') or style.is_a('IfcSurfaceStyleRendering'):
-                                    # Diffuse 색상 추출
-                                    if hasattr(style, 'SurfaceColour') and style.SurfaceColour:
-                                        color = style.SurfaceColour
-                                        materials['diffuse_color'] = [
-                                            float(getattr(color, 'Red', 0.8)),
-                                            float(getattr(color, 'Green', 0.8)),
-                                            float(getattr(color, 'Blue', 0.8))
-                                        ]
-
-                                    # Transparency 정보
-                                    if hasattr(style, 'Transparency') and style.Transparency is not None:
-                                        materials['transparency'] = float(style.Transparency)
-
-                                    # Reflectance method (IfcSurfaceStyleRendering에만 있음)
-                                    if hasattr(style, 'ReflectanceMethod'):
-                                        materials['reflectance_method'] = str(style.ReflectanceMethod)
-
-                                    # Specular color (IfcSurfaceStyleRendering에만 있음)
-                                    if hasattr(style, 'SpecularColour') and style.SpecularColour:
-                                        spec_color = style.SpecularColour
-                                        materials['specular_color'] = [
-                                            float(getattr(spec_color, 'Red', 0.0)),
-                                            float(getattr(spec_color, 'Green', 0.0)),
-                                            float(getattr(spec_color, 'Blue', 0.0))
-                                        ]
-
-                                    # Style name 추출
-                                    if hasattr(surface_style, 'Name') and surface_style.Name:
-                                        materials['style_name'] = surface_style.Name
-
-                # Material name 추출 (IfcMaterial 관계에서)
-                # 그리고 Material → MaterialDefinitionRepresentation → StyledItem → SurfaceStyle 경로 탐색
-                if hasattr(element, 'HasAssociations'):
-                    for association in element.HasAssociations:
-                        if association.is_a('IfcRelAssociatesMaterial'):
-                            material = association.RelatingMaterial
-                            if material:
-                                # Material 객체 저장 (나중에 스타일 추출에 사용)
-                                actual_material = None
-
-                                if material.is_a('IfcMaterial'):
-                                    materials['name'] = material.Name or 'Unknown'
-                                    actual_material = material
-                                elif material.is_a('IfcMaterialLayerSetUsage'):
-                                    if hasattr(material, 'ForLayerSet') and material.ForLayerSet:
-                                        layer_set = material.ForLayerSet
-                                        if hasattr(layer_set, 'MaterialLayers') and layer_set.MaterialLayers:
-                                            # 첫 번째 레이어의 재질 이름
-                                            first_layer = layer_set.MaterialLayers[0]
-                                            if hasattr(first_layer, 'Material') and first_layer.Material:
-                                                materials['name'] = first_layer.Material.Name or 'Unknown'
-                                                actual_material = first_layer.Material
-
-                                # ▼▼▼ Material에서 Style 정보 추출 (Material → MaterialDefinitionRepresentation 경로) ▼▼▼
-                                if actual_material and hasattr(actual_material, 'HasRepresentation'):
-                                    for mat_rep in actual_material.HasRepresentation:
-                                        if mat_rep.is_a('IfcMaterialDefinitionRepresentation'):
-                                            for representation in mat_rep.Representations:
-                                                if representation.is_a('IfcStyledRepresentation'):
-                                                    for item in representation.Items:
-                                                        if item.is_a('IfcStyledItem'):
-                                                            # StyledItem에서 Styles 추출
-                                                            if hasattr(item, 'Styles') and item.Styles:
-                                                                for style_select in item.Styles:
-                                                                    if style_select.is_a('IfcSurfaceStyle'):
-                                                                        # Surface Style 이름 추출
-                                                                        if hasattr(style_select, 'Name') and style_select.Name:
-                                                                            materials['style_name'] = style_select.Name
-
-                                                                        # Surface Style의 Styles 리스트에서 색상/투명도 추출
-                                                                        if hasattr(style_select, 'Styles') and style_select.Styles:
-                                                                            for surface_style_element in style_select.Styles:
-                                                                                # IfcSurfaceStyleShading 또는 IfcSurfaceStyleRendering
-                                                                                if surface_style_element.is_a('IfcSurfaceStyleShading') or surface_style_element.is_a('IfcSurfaceStyleRendering'):
-                                                                                    # Diffuse 색상 추출
-                                                                                    if hasattr(surface_style_element, 'SurfaceColour') and surface_style_element.SurfaceColour:
-                                                                                        color = surface_style_element.SurfaceColour
-                                                                                        materials['diffuse_color'] = [
-                                                                                            float(getattr(color, 'Red', 0.8)),
-                                                                                            float(getattr(color, 'Green', 0.8)),
-                                                                                            float(getattr(color, 'Blue', 0.8))
-                                                                                        ]
-                                                                                        print(f"[DEBUG] Extracted style color from Material->StyledRepresentation: RGB({materials['diffuse_color']})")
-
-                                                                                    # Transparency 정보
-                                                                                    if hasattr(surface_style_element, 'Transparency') and surface_style_element.Transparency is not None:
-                                                                                        materials['transparency'] = float(surface_style_element.Transparency)
-                                                                                        print(f"[DEBUG] Extracted transparency from Material->StyledRepresentation: {materials['transparency']}")
-
-                                                                                    # Reflectance method (IfcSurfaceStyleRendering에만 있음)
-                                                                                    if hasattr(surface_style_element, 'ReflectanceMethod'):
-                                                                                        materials['reflectance_method'] = str(surface_style_element.ReflectanceMethod)
-
-                                                                                    # Specular color (IfcSurfaceStyleRendering에만 있음)
-                                                                                    if hasattr(surface_style_element, 'SpecularColour') and surface_style_element.SpecularColour:
-                                                                                        spec_color = surface_style_element.SpecularColour
-                                                                                        materials['specular_color'] = [
-                                                                                            float(getattr(spec_color, 'Red', 0.0)),
-                                                                                            float(getattr(spec_color, 'Green', 0.0)),
-                                                                                            float(getattr(spec_color, 'Blue', 0.0))
-                                                                                        ]
-                                # ▲▲▲ Material에서 Style 정보 추출 끝 ▲▲▲
-
-                # 기본 색상이 없으면 회색 설정
-                if 'diffuse_color' not in materials:
-                    materials['diffuse_color'] = [0.8, 0.8, 0.8]
-
-            except Exception as color_error:
-                print(f"[WARN] Color/Material extraction failed for element {element.id()}: {str(color_error)}")
-                materials['diffuse_color'] = [0.8, 0.8, 0.8]  # 기본 회색
-            # ▲▲▲ 색상 및 재질 정보 추출 끝 ▲▲▲
-
-            element_dict["System"]["Geometry"] = {
-                "verts": verts.tolist(), # Use .tolist() for robust conversion
-                "faces": faces.tolist(),  # Use .tolist() for robust conversion
-                "matrix": matrix,  # Add transformation matrix
-                "materials": materials  # ▼▼▼ [추가] 재질 및 색상 정보 ▼▼▼
+def extract_shape_materials(element, shape):
+    """shape 스타일과 IfcRelAssociatesMaterial 관계에서 재질/색상 정보를 추출합니다."""
+    # ▼▼▼ 색상 및 재질 정보 추출 ▼▼▼
+    colors = None
+    materials = {}
+
+    try:
+        # IFC 스타일 색상 정보 추출
+        if hasattr(shape, 'styles') and shape.styles:
+            # shape.styles는 (style_id, surface_style) 튜플 리스트
+            for style_id, surface_style in shape.styles:
+                if surface_style and hasattr(surface_style, 'Styles'):
+                    for style in surface_style.Styles:
+                        # IfcSurfaceStyleShading 또는 IfcSurfaceStyleRendering (Rendering은 Shading의 하위 클래스)
+                        if style.is_a('IfcSurfaceStyleShading') or style.is_a('IfcSurfaceStyleRendering'):
+                            # Diffuse 색상 추출
+                            if hasattr(style, 'SurfaceColour') and style.SurfaceColour:
+                                color = style.SurfaceColour
+                                materials['diffuse_color'] = [
+                                    float(getattr(color, 'Red', 0.8)),
+                                    float(getattr(color, 'Green', 0.8)),
+                                    float(getattr(color, 'Blue', 0.8))
+                                ]
+
+                            # Transparency 정보
+                            if hasattr(style, 'Transparency') and style.Transparency is not None:
+                                materials['transparency'] = float(style.Transparency)
+
+                            # Reflectance method (IfcSurfaceStyleRendering에만 있음)
+                            if hasattr(style, 'ReflectanceMethod'):
+                                materials['reflectance_method'] = str(style.ReflectanceMethod)
+
+                            # Specular color (IfcSurfaceStyleRendering에만 있음)
+                            if hasattr(style, 'SpecularColour') and style.SpecularColour:
+                                spec_color = style.SpecularColour
+                                materials['specular_color'] = [
+                                    float(getattr(spec_color, 'Red', 0.0)),
+                                    float(getattr(spec_color, 'Green', 0.0)),
+                                    float(getattr(spec_color, 'Blue', 0.0))
+                                ]
+
+                            # Style name 추출
+                            if hasattr(surface_style, 'Name') and surface_style.Name:
+                                materials['style_name'] = surface_style.Name
+
+        # Material name 추출 (IfcMaterial 관계에서)
+        # 그리고 Material → MaterialDefinitionRepresentation → StyledItem → SurfaceStyle 경로 탐색
+        if hasattr(element, 'HasAssociations'):
+            for association in element.HasAssociations:
+                if association.is_a('IfcRelAssociatesMaterial'):
+                    material = association.RelatingMaterial
+                    if material:
+                        # Material 객체 저장 (나중에 스타일 추출에 사용)
+                        actual_material = None
+
+                        if material.is_a('IfcMaterial'):
+                            materials['name'] = material.Name or 'Unknown'
+                            actual_material = material
+                        elif material.is_a('IfcMaterialLayerSetUsage'):
+                            if hasattr(material, 'ForLayerSet') and material.ForLayerSet:
+                                layer_set = material.ForLayerSet
+                                if hasattr(layer_set, 'MaterialLayers') and layer_set.MaterialLayers:
+                                    # 첫 번째 레이어의 재질 이름
+                                    first_layer = layer_set.MaterialLayers[0]
+                                    if hasattr(first_layer, 'Material') and first_layer.Material:
+                                        materials['name'] = first_layer.Material.Name or 'Unknown'
+                                        actual_material = first_layer.Material
+
+                        # ▼▼▼ Material에서 Style 정보 추출 (Material → MaterialDefinitionRepresentation 경로) ▼▼▼
+                        if actual_material and hasattr(actual_material, 'HasRepresentation'):
+                            for mat_rep in actual_material.HasRepresentation:
+                                if mat_rep.is_a('IfcMaterialDefinitionRepresentation'):
+                                    for representation in mat_rep.Representations:
+                                        if representation.is_a('IfcStyledRepresentation'):
+                                            for item in representation.Items:
+                                                if item.is_a('IfcStyledItem'):
+                                                    # StyledItem에서 Styles 추출
+                                                    if hasattr(item, 'Styles') and item.Styles:
+                                                        for style_select in item.Styles:
+                                                            if style_select.is_a('IfcSurfaceStyle'):
+                                                                # Surface Style 이름 추출
+                                                                if hasattr(style_select, 'Name') and style_select.Name:
+                                                                    materials['style_name'] = style_select.Name
+
+                                                                # Surface Style의 Styles 리스트에서 색상/투명도 추출
+                                                                if hasattr(style_select, 'Styles') and style_select.Styles:
+                                                                    for surface_style_element in style_select.Styles:
+                                                                        # IfcSurfaceStyleShading 또는 IfcSurfaceStyleRendering
+                                                                        if surface_style_element.is_a('IfcSurfaceStyleShading') or surface_style_element.is_a('IfcSurfaceStyleRendering'):
+                                                                            # Diffuse 색상 추출
+                                                                            if hasattr(surface_style_element, 'SurfaceColour') and surface_style_element.SurfaceColour:
+                                                                                color = surface_style_element.SurfaceColour
+                                                                                materials['diffuse_color'] = [
+                                                                                    float(getattr(color, 'Red', 0.8)),
+                                                                                    float(getattr(color, 'Green', 0.8)),
+                                                                                    float(getattr(color, 'Blue', 0.8))
+                                                                                ]
+                                                                                debug_log(f"[DEBUG] Extracted style color from Material->StyledRepresentation: RGB({materials['diffuse_color']})")
+
+                                                                            # Transparency 정보
+                                                                            if hasattr(surface_style_element, 'Transparency') and surface_style_element.Transparency is not None:
+                                                                                materials['transparency'] = float(surface_style_element.Transparency)
+                                                                                debug_log(f"[DEBUG] Extracted transparency from Material->StyledRepresentation: {materials['transparency']}")
+
+                                                                            # Reflectance method (IfcSurfaceStyleRendering에만 있음)
+                                                                            if hasattr(surface_style_element, 'ReflectanceMethod'):
+                                                                                materials['reflectance_method'] = str(surface_style_element.ReflectanceMethod)
+
+                                                                            # Specular color (IfcSurfaceStyleRendering에만 있음)
+                                                                            if hasattr(surface_style_element, 'SpecularColour') and surface_style_element.SpecularColour:
+                                                                                spec_color = surface_style_element.SpecularColour
+                                                                                materials['specular_color'] = [
+                                                                                    float(getattr(spec_color, 'Red', 0.0)),
+                                                                                    float(getattr(spec_color, 'Green', 0.0)),
+                                                                                    float(getattr(spec_color, 'Blue', 0.0))
+                                                                                ]
+                        # ▲▲▲ Material에서 Style 정보 추출 끝 ▲▲▲
+
+        # 기본 색상이 없으면 회색 설정
+        if 'diffuse_color' not in materials:
+            materials['diffuse_color'] = [0.8, 0.8, 0.8]
+
+    except Exception as color_error:
+        print(f"[WARN] Color/Material extraction failed for element {element.id()}: {str(color_error)}")
+        materials['diffuse_color'] = [0.8, 0.8, 0.8]  # 기본 회색
+    # ▲▲▲ 색상 및 재질 정보 추출 끝 ▲▲▲
+    return materials
+
+# ▲▲▲ [추가] 여기까지 ▲▲▲
+
+
+def iter_serialized_ifc_elements(ifc_file, products=None, as_dicts=False, window_size=None):
+    """
+    IFC 객체를 하나씩 직렬화하여 생성(yield)하는 generator입니다.
+    window_size개씩 tessellation하고 바로 내보내므로, 메모리에는 최대 window_size개의 shape만 유지됩니다.
+
+    as_dicts=True면 (바이너리 전송용) JSON 문자열 대신 딕셔너리를 반환하고,
+    verts/faces는 NumPy 배열 그대로 두어 typed array로 전송합니다.
+    """
+    import ifcopenshell.geom  # Import geometry module
+    import ifcopenshell.util.shape # Import shape utility module
+    if products is None:
+        products = ifc_file.by_type("IfcProduct")
+    window_size = max(1, window_size or EXPORT_WINDOW_SIZE)
+    print(f"🔍 [Blender] {len(products)}개의 IFC 객체 데이터 직렬화를 시작합니다. (window: {window_size})") # 디버깅 추가
+
+    # Geometry settings
+    settings = ifcopenshell.geom.settings()
+    
+    for window_start in range(0, len(products), window_size):
+        window = products[window_start:window_start + window_size]
+        # ▼▼▼ [수정] window 단위로 병렬 tessellation (속성 추출은 아래에서 entity id로 병합) ▼▼▼
+        shapes_by_id = tessellate_products_parallel(ifc_file, window, settings)
+        # ▲▲▲ [수정] 여기까지 ▲▲▲
+        for element in window:
+            if not element.GlobalId: continue
+            element_dict = {
+                "Name": element.Name or "이름 없음",
+                "IfcClass": element.is_a(),
+                "ElementId": element.id(),
+                "UniqueId": element.GlobalId,
+                "Tag": getattr(element, 'Tag', None) or "",  # ▼▼▼ [추가] Tag 속성 추출 (2025-11-05) ▼▼▼
+                "PredefinedType": getattr(element, 'PredefinedType', None) or "",  # ▼▼▼ [추가] PredefinedType 속성 추출 (2025-11-05) ▼▼▼
+                "Attributes": {},           # IFC 기본 속성들
+                "PropertySet": {},          # Property Sets (Pset_*)
+                "QuantitySet": {},          # Quantity Sets (Qto_*)
+                "Spatial_Container": {},    # 공간 컨테이너 정보
+                "Aggregates_Whole": {},     # 집합 관계 - 전체 객체 정보
+                "Aggregates_Parts": {},     # 집합 관계 - 부분 객체들 정보
+                "Nest_Host": {},            # Nest 관계 - 호스트 정보
+                "Nest_Components": {},      # Nest 관계 - 구성요소들 정보
+                "Type": {},                 # 타입 정보
+                "System": {},               # 시스템 정보 (웹에서 추가)
             }
-        except Exception as e:
-            print(f"Could not get geometry for element {element.id()}: {e}")
-            element_dict["System"]["Geometry"] = None
 
-        is_spatial_element = element.is_a("IfcSpatialStructureElement")
-        try:
-            # ▼▼▼ PropertySet 추출 ▼▼▼
-            if hasattr(element, 'IsDefinedBy') and element.IsDefinedBy:
-                for definition in element.IsDefinedBy:
-                    if definition.is_a("IfcRelDefinesByProperties"):
-                        prop_set = definition.RelatingPropertyDefinition
-                        if prop_set and prop_set.is_a("IfcPropertySet"):
-                            if hasattr(prop_set, 'HasProperties') and prop_set.HasProperties:
-                                for prop in prop_set.HasProperties:
-                                    if prop.is_a("IfcPropertySingleValue"):
-                                        prop_key = f"{prop_set.Name}__{prop.Name}"
-                                        element_dict["PropertySet"][prop_key] = prop.NominalValue.wrappedValue if prop.NominalValue else None
-
-            # ▼▼▼ QuantitySet 추출 ▼▼▼
-            if not is_spatial_element:
+            # ▼▼▼ IFC 요소의 모든 Attributes 동적 추출 ▼▼▼
+            # element.get_info()는 모든 IFC 속성을 딕셔너리로 반환
+            # GlobalId, Name, Description, ObjectType, Tag, PredefinedType 등 포함
+            info = element.get_info()
+
+            for attr_name, attr_value in info.items():
+                # 내부 속성만 제외 (type, id는 내부용, GlobalId는 UniqueId로 이미 저장)
+                if attr_name in ['type', 'id', 'GlobalId']:
+                    continue
+
+                # 관계형 속성은 제외 (별도 섹션에서 처리)
+                # 리스트/튜플이면서 대문자로 시작하는 것들 (IsDefinedBy, ContainsElements 등)
+                if isinstance(attr_value, (list, tuple)) and attr_name[0].isupper():
+                    continue
+
+                # 모든 Attributes를 추가 (None 값도 포함 - 속성이 있다는 것 자체가 의미)
+                if hasattr(attr_value, 'is_a'):
+                    # IFC 엔티티 참조인 경우
+                    element_dict["Attributes"][attr_name] = f"{attr_value.is_a()}: {getattr(attr_value, 'Name', str(attr_value))}"
+                elif attr_value is not None:
+                    # 일반 값
+                    element_dict["Attributes"][attr_name] = attr_value
+                else:
+                    # None 값도 저장 (속성이 정의되어 있다는 정보)
+                    element_dict["Attributes"][attr_name] = None
+
+            debug_log(f"[DEBUG] Element {element.id()} Attributes extracted: {list(element_dict['Attributes'].keys())}")
+            # ▲▲▲ Attributes 추출 끝 ▲▲▲
+        
+            # Add Geometry Data
+            try:
+                # ▼▼▼ [수정] 병렬 iterator 결과를 entity id로 병합 (iterator가 처리하지 못한 객체만 개별 create_shape) ▼▼▼
+                shape = shapes_by_id.pop(element.id(), None)
+                if shape is None:
+                    shape = ifcopenshell.geom.create_shape(settings, element)
+                # ▲▲▲ [수정] 여기까지 ▲▲▲
+
+                # Use ifcopenshell.util.shape to get verts and faces reliably
+                verts = ifcopenshell.util.shape.get_vertices(shape.geometry)
+                faces = ifcopenshell.util.shape.get_faces(shape.geometry)
+
+                # Extract transformation matrix
+                matrix = extract_shape_matrix(element, shape)
+
+                # 색상 및 재질 정보 추출
+                materials = extract_shape_materials(element, shape)
+
+                element_dict["System"]["Geometry"] = {
+                    "verts": verts if as_dicts else verts.tolist(), # Use .tolist() for robust conversion
+                    "faces": faces.astype("uint32") if as_dicts else faces.tolist(),  # Use .tolist() for robust conversion
+                    "matrix": matrix,  # Add transformation matrix
+                    "materials": materials  # ▼▼▼ [추가] 재질 및 색상 정보 ▼▼▼
+                }
+            except Exception as e:
+                print(f"Could not get geometry for element {element.id()}: {e}")
+                element_dict["System"]["Geometry"] = None
+
+            is_spatial_element = element.is_a("IfcSpatialStructureElement")
+            try:
+                # ▼▼▼ PropertySet 추출 ▼▼▼
                 if hasattr(element, 'IsDefinedBy') and element.IsDefinedBy:
                     for definition in element.IsDefinedBy:
                         if definition.is_a("IfcRelDefinesByProperties"):
                             prop_set = definition.RelatingPropertyDefinition
-                            if prop_set and prop_set.is_a("IfcElementQuantity"):
-                                if hasattr(prop_set, 'Quantities') and prop_set.Quantities:
-                                    for quantity in prop_set.Quantities:
-                                        prop_value = get_quantity_value(quantity)
-                                        if prop_value is not None:
-                                            prop_key = f"{prop_set.Name}__{quantity.Name}"
-                                            element_dict["QuantitySet"][prop_key] = prop_value
-
-            # ▼▼▼ Type 정보 추출 (확장: Attributes 포함) ▼▼▼
-            if hasattr(element, 'IsTypedBy') and element.IsTypedBy:
-                type_definition = element.IsTypedBy[0]
-                if type_definition and type_definition.is_a("IfcRelDefinesByType"):
-                    relating_type = type_definition.RelatingType
-                    if relating_type:
-                        # 기본 Type 정보
-                        element_dict["Type"]["Name"] = relating_type.Name
-                        element_dict["Type"]["IfcClass"] = relating_type.is_a()
-
-                        # ▼▼▼ [NEW] Type Attributes 추출 ▼▼▼
-                        element_dict["Type"]["Attributes"] = {}
-                        type_info = relating_type.get_info()
-
-                        # ▼▼▼ [DEBUG] Type 원본 데이터 확인 ▼▼▼
-                        print(f"[DEBUG] Type {relating_type.id()} raw attributes: {list(type_info.keys())}")
-                        # ▲▲▲ [DEBUG] 여기까지 ▲▲▲
-
-                        for attr_name, attr_value in type_info.items():
-                            # 내부 속성만 제외 (최소한의 필터링)
-                            if attr_name in ['type', 'id', 'GlobalId', 'WrappedValue']:
-                                print(f"[DEBUG] Skipping internal attribute: {attr_name}")
-                                continue
-
-                            # 관계형 속성 제외 (리스트/튜플이면서 대문자 시작)
-                            # Description 같은 단순 값은 통과
-                            if isinstance(attr_value, (list, tuple)) and attr_name[0].isupper():
-                                print(f"[DEBUG] Skipping relational attribute: {attr_name} (type: {type(attr_value)})")
-                                continue
-
-                            # Attributes 추가 (None 값도 포함)
-                            if hasattr(attr_value, 'is_a'):
-                                # IFC 엔티티 참조
-                                element_dict["Type"]["Attributes"][attr_name] = f"{attr_value.is_a()}: {getattr(attr_value, 'Name', str(attr_value))}"
-                            else:
-                                # None 포함 모든 값 저장
-                                element_dict["Type"]["Attributes"][attr_name] = attr_value
-
-                            # ▼▼▼ [DEBUG] 각 속성 처리 확인 ▼▼▼
-                            if attr_name == 'Description':
-                                print(f"[DEBUG] ✅ Description found: {attr_value}")
+                            if prop_set and prop_set.is_a("IfcPropertySet"):
+                                if hasattr(prop_set, 'HasProperties') and prop_set.HasProperties:
+                                    for prop in prop_set.HasProperties:
+                                        if prop.is_a("IfcPropertySingleValue"):
+                                            prop_key = f"{prop_set.Name}__{prop.Name}"
+                                            element_dict["PropertySet"][prop_key] = prop.NominalValue.wrappedValue if prop.NominalValue else None
+
+                # ▼▼▼ QuantitySet 추출 ▼▼▼
+                if not is_spatial_element:
+                    if hasattr(element, 'IsDefinedBy') and element.IsDefinedBy:
+                        for definition in element.IsDefinedBy:
+                            if definition.is_a("IfcRelDefinesByProperties"):
+                                prop_set = definition.RelatingPropertyDefinition
+                                if prop_set and prop_set.is_a("IfcElementQuantity"):
+                                    if hasattr(prop_set, 'Quantities') and prop_set.Quantities:
+                                        for quantity in prop_set.Quantities:
+                                            prop_value = get_quantity_value(quantity)
+                                            if prop_value is not None:
+                                                prop_key = f"{prop_set.Name}__{quantity.Name}"
+                                                element_dict["QuantitySet"][prop_key] = prop_value
+
+                # ▼▼▼ Type 정보 추출 (확장: Attributes 포함) ▼▼▼
+                if hasattr(element, 'IsTypedBy') and element.IsTypedBy:
+                    type_definition = element.IsTypedBy[0]
+                    if type_definition and type_definition.is_a("IfcRelDefinesByType"):
+                        relating_type = type_definition.RelatingType
+                        if relating_type:
+                            # 기본 Type 정보
+                            element_dict["Type"]["Name"] = relating_type.Name
+                            element_dict["Type"]["IfcClass"] = relating_type.is_a()
+
+                            # ▼▼▼ [NEW] Type Attributes 추출 ▼▼▼
+                            element_dict["Type"]["Attributes"] = {}
+                            type_info = relating_type.get_info()
+
+                            # ▼▼▼ [DEBUG] Type 원본 데이터 확인 ▼▼▼
+                            debug_log(f"[DEBUG] Type {relating_type.id()} raw attributes: {list(type_info.keys())}")
                             # ▲▲▲ [DEBUG] 여기까지 ▲▲▲
 
-                        print(f"[DEBUG] Type {relating_type.id()} Attributes extracted: {list(element_dict['Type']['Attributes'].keys())}")
-                        print(f"[DEBUG] Description in final dict: {'Description' in element_dict['Type']['Attributes']}")
-                        # ▲▲▲ [NEW] Type Attributes 추출 끝 ▲▲▲
-
-                        # Type의 PropertySets 추출
-                        element_dict["Type"]["PropertySet"] = {}
-                        if hasattr(relating_type, 'HasPropertySets') and relating_type.HasPropertySets:
-                            for prop_set in relating_type.HasPropertySets:
-                                if prop_set and prop_set.is_a("IfcPropertySet"):
-                                    if hasattr(prop_set, 'HasProperties') and prop_set.HasProperties:
-                                        for prop in prop_set.HasProperties:
-                                            if prop.is_a("IfcPropertySingleValue"):
-                                                prop_key = f"{prop_set.Name}__{prop.Name}"
-                                                element_dict["Type"]["PropertySet"][prop_key] = prop.NominalValue.wrappedValue if prop.NominalValue else None
-
-            # ▼▼▼ Spatial Container 정보 추출 ▼▼▼
-            if hasattr(element, 'ContainedInStructure') and element.ContainedInStructure:
-                relating_structure = element.ContainedInStructure[0].RelatingStructure
-                element_dict["Spatial_Container"]["IfcClass"] = relating_structure.is_a()
-                element_dict["Spatial_Container"]["Name"] = relating_structure.Name
-                element_dict["Spatial_Container"]["GlobalId"] = relating_structure.GlobalId
-
-            # ▼▼▼ Aggregates (Decomposes) 정보 추출 ▼▼▼
-            if hasattr(element, 'Decomposes') and element.Decomposes:
-                relating_object = element.Decomposes[0].RelatingObject
-                element_dict["Aggregates_Whole"]["IfcClass"] = relating_object.is_a()
-                element_dict["Aggregates_Whole"]["Name"] = relating_object.Name
-                element_dict["Aggregates_Whole"]["GlobalId"] = relating_object.GlobalId
-
-            # ▼▼▼ Aggregates Parts (IsDecomposedBy) 정보 추출 ▼▼▼
-            if hasattr(element, 'IsDecomposedBy') and element.IsDecomposedBy:
-                parts = []
-                for decomposition in element.IsDecomposedBy:
-                    if hasattr(decomposition, 'RelatedObjects'):
-                        for part in decomposition.RelatedObjects:
-                            parts.append({
-                                "IfcClass": part.is_a(),
-                                "Name": part.Name,
-                                "GlobalId": part.GlobalId
-                            })
-                if parts:
-                    element_dict["Aggregates_Parts"]["Parts"] = parts
-
-            # ▼▼▼ Nest Host 정보 추출 ▼▼▼
-            if hasattr(element, 'Nests') and element.Nests:
-                relating_object = element.Nests[0].RelatingObject
-                element_dict["Nest_Host"]["IfcClass"] = relating_object.is_a()
-                element_dict["Nest_Host"]["Name"] = relating_object.Name
-                element_dict["Nest_Host"]["GlobalId"] = relating_object.GlobalId
-
-            # ▼▼▼ Nest Components (IsNestedBy) 정보 추출 ▼▼▼
-            if hasattr(element, 'IsNestedBy') and element.IsNestedBy:
-                components = []
-                for nesting in element.IsNestedBy:
-                    if hasattr(nesting, 'RelatedObjects'):
-                        for component in nesting.RelatedObjects:
-                            components.append({
-                                "IfcClass": component.is_a(),
-                                "Name": component.Name,
-                                "GlobalId": component.GlobalId
-                            })
-                if components:
-                    element_dict["Nest_Components"]["Components"] = components
-
-        except (AttributeError, IndexError, TypeError) as e:
-            print(f"[WARN] Error extracting properties for element {element.id()}: {e}")
-
-        # ▼▼▼ [DEBUG] System.Geometry.materials 확인 ▼▼▼
-        geometry = element_dict.get("System", {}).get("Geometry")
-        if geometry and isinstance(geometry, dict) and geometry.get("materials"):
-            mat = geometry["materials"]
-            print(f"[DEBUG] Element {element.id()} serializing with materials: color={mat.get('diffuse_color')}, transparency={mat.get('transparency')}, style={mat.get('style_name')}, name={mat.get('name')}")
-        # ▲▲▲ [DEBUG] 끝 ▲▲▲
-
-        elements_data.append(json.dumps(element_dict))
+                            for attr_name, attr_value in type_info.items():
+                                # 내부 속성만 제외 (최소한의 필터링)
+                                if attr_name in ['type', 'id', 'GlobalId', 'WrappedValue']:
+                                    debug_log(f"[DEBUG] Skipping internal attribute: {attr_name}")
+                                    continue
+
+                                # 관계형 속성 제외 (리스트/튜플이면서 대문자 시작)
+                                # Description 같은 단순 값은 통과
+                                if isinstance(attr_value, (list, tuple)) and attr_name[0].isupper():
+                                    debug_log(f"[DEBUG] Skipping relational attribute: {attr_name} (type: {type(attr_value)})")
+                                    continue
+
+                                # Attributes 추가 (None 값도 포함)
+                                if hasattr(attr_value, 'is_a'):
+                                    # IFC 엔티티 참조
+                                    element_dict["Type"]["Attributes"][attr_name] = f"{attr_value.is_a()}: {getattr(attr_value, 'Name', str(attr_value))}"
+                                else:
+                                    # None 포함 모든 값 저장
+                                    element_dict["Type"]["Attributes"][attr_name] = attr_value
+
+                                # ▼▼▼ [DEBUG] 각 속성 처리 확인 ▼▼▼
+                                if attr_name == 'Description':
+                                    debug_log(f"[DEBUG] ✅ Description found: {attr_value}")
+                                # ▲▲▲ [DEBUG] 여기까지 ▲▲▲
+
+                            debug_log(f"[DEBUG] Type {relating_type.id()} Attributes extracted: {list(element_dict['Type']['Attributes'].keys())}")
+                            debug_log(f"[DEBUG] Description in final dict: {'Description' in element_dict['Type']['Attributes']}")
+                            # ▲▲▲ [NEW] Type Attributes 추출 끝 ▲▲▲
+
+                            # Type의 PropertySets 추출
+                            element_dict["Type"]["PropertySet"] = {}
+                            if hasattr(relating_type, 'HasPropertySets') and relating_type.HasPropertySets:
+                                for prop_set in relating_type.HasPropertySets:
+                                    if prop_set and prop_set.is_a("IfcPropertySet"):
+                                        if hasattr(prop_set, 'HasProperties') and prop_set.HasProperties:
+                                            for prop in prop_set.HasProperties:
+                                                if prop.is_a("IfcPropertySingleValue"):
+                                                    prop_key = f"{prop_set.Name}__{prop.Name}"
+                                                    element_dict["Type"]["PropertySet"][prop_key] = prop.NominalValue.wrappedValue if prop.NominalValue else None
+
+                # ▼▼▼ Spatial Container 정보 추출 ▼▼▼
+                if hasattr(element, 'ContainedInStructure') and element.ContainedInStructure:
+                    relating_structure = element.ContainedInStructure[0].RelatingStructure
+                    element_dict["Spatial_Container"]["IfcClass"] = relating_structure.is_a()
+                    element_dict["Spatial_Container"]["Name"] = relating_structure.Name
+                    element_dict["Spatial_Container"]["GlobalId"] = relating_structure.GlobalId
+
+                # ▼▼▼ Aggregates (Decomposes) 정보 추출 ▼▼▼
+                if hasattr(element, 'Decomposes') and element.Decomposes:
+                    relating_object = element.Decomposes[0].RelatingObject
+                    element_dict["Aggregates_Whole"]["IfcClass"] = relating_object.is_a()
+                    element_dict["Aggregates_Whole"]["Name"] = relating_object.Name
+                    element_dict["Aggregates_Whole"]["GlobalId"] = relating_object.GlobalId
+
+                # ▼▼▼ Aggregates Parts (IsDecomposedBy) 정보 추출 ▼▼▼
+                if hasattr(element, 'IsDecomposedBy') and element.IsDecomposedBy:
+                    parts = []
+                    for decomposition in element.IsDecomposedBy:
+                        if hasattr(decomposition, 'RelatedObjects'):
+                            for part in decomposition.RelatedObjects:
+                                parts.append({
+                                    "IfcClass": part.is_a(),
+                                    "Name": part.Name,
+                                    "GlobalId": part.GlobalId
+                                })
+                    if parts:
+                        element_dict["Aggregates_Parts"]["Parts"] = parts
+
+                # ▼▼▼ Nest Host 정보 추출 ▼▼▼
+                if hasattr(element, 'Nests') and element.Nests:
+                    relating_object = element.Nests[0].RelatingObject
+                    element_dict["Nest_Host"]["IfcClass"] = relating_object.is_a()
+                    element_dict["Nest_Host"]["Name"] = relating_object.Name
+                    element_dict["Nest_Host"]["GlobalId"] = relating_object.GlobalId
+
+                # ▼▼▼ Nest Components (IsNestedBy) 정보 추출 ▼▼▼
+                if hasattr(element, 'IsNestedBy') and element.IsNestedBy:
+                    components = []
+                    for nesting in element.IsNestedBy:
+                        if hasattr(nesting, 'RelatedObjects'):
+                            for component in nesting.RelatedObjects:
+                                components.append({
+                                    "IfcClass": component.is_a(),
+                                    "Name": component.Name,
+                                    "GlobalId": component.GlobalId
+                                })
+                    if components:
+                        element_dict["Nest_Components"]["Components"] = components
+
+            except (AttributeError, IndexError, TypeError) as e:
+                print(f"[WARN] Error extracting properties for element {element.id()}: {e}")
+
+            # ▼▼▼ [DEBUG] System.Geometry.materials 확인 ▼▼▼
+            geometry = element_dict.get("System", {}).get("Geometry")
+            if geometry and isinstance(geometry, dict) and geometry.get("materials"):
+                mat = geometry["materials"]
+                debug_log(f"[DEBUG] Element {element.id()} serializing with materials: color={mat.get('diffuse_color')}, transparency={mat.get('transparency')}, style={mat.get('style_name')}, name={mat.get('name')}")
+            # ▲▲▲ [DEBUG] 끝 ▲▲▲
+
+            yield element_dict if as_dicts else json.dumps(element_dict)
     print(f"✅ [Blender] 객체 데이터 직렬화 완료.") # 디버깅 추가
-    return elements_data
+
+def serialize_ifc_elements_to_string_list(ifc_file, products=None, as_dicts=False):
+    """전체 객체를 한 번에 직렬화한 목록을 반환합니다. (전송에는 iter_serialized_ifc_elements 사용)"""
+    return list(iter_serialized_ifc_elements(ifc_file, products, as_dicts))
 def get_selected_element_guids():
     guids = []
     ifc_file, error = get_ifc_file()
@@ -546,21 +712,62 @@ def select_elements_by_guids(guids):
                 with bpy.context.temp_override(**override): bpy.ops.view3d.view_selected(use_all_regions=False)
                 break
 
+def _msgpack_default(obj):
+    """NumPy 배열을 typed array ext로 변환합니다. ([dtype u8][ndim u8][예약 2바이트][shape u32...][원본 바이트])"""
+    import numpy as np
+    if isinstance(obj, np.ndarray):
+        if obj.dtype.kind == "f":
+            array = np.ascontiguousarray(obj, dtype="<f4" if obj.dtype.itemsize == 4 else "<f8")
+        elif obj.dtype.kind in "ub":
+            array = np.ascontiguousarray(obj, dtype="<u4")
+        else:
+            array = np.ascontiguousarray(obj, dtype="<i4")
+        header = struct.pack("<BBxx", TYPED_ARRAY_DTYPE_CODES[array.dtype.str], array.ndim)
+        header += struct.pack(f"<{array.ndim}I", *array.shape)
+        return msgpack.ExtType(TYPED_ARRAY_EXT, header + array.tobytes())
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, (set, tuple)):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not MessagePack serializable")
+
 def send_message_to_server(message_dict):
-    if websocket_client and websocket_thread_loop: asyncio.run_coroutine_threadsafe(websocket_client.send(json.dumps(message_dict)), websocket_thread_loop)
+    if websocket_client and websocket_thread_loop:
+        if websocket_binary_mode:
+            data = msgpack.packb(message_dict, default=_msgpack_default, use_bin_type=True)
+        else:
+            data = json.dumps(message_dict)
+        asyncio.run_coroutine_threadsafe(websocket_client.send(data), websocket_thread_loop)
 
 async def websocket_handler(uri):
-    global websocket_client, status_message
+    global websocket_client, websocket_binary_mode, status_message, ingest_session_id
     try:
         print(f"[DEBUG] Attempting to connect to {uri}")
-        async with websockets.connect(uri) as websocket:
+        subprotocols = [BINARY_SUBPROTOCOL] if msgpack else None
+        async with websockets.connect(uri, subprotocols=subprotocols) as websocket:
             websocket_client = websocket
+            websocket_binary_mode = websocket.subprotocol == BINARY_SUBPROTOCOL
             status_message = "서버에 연결되었습니다."
-            print("[DEBUG] WebSocket connected successfully")
+            print(f"[DEBUG] WebSocket connected successfully (format: {'MessagePack' if websocket_binary_mode else 'JSON'})")
+            if ingest_session_id and ingest_resume_state:
+                # 이전 연결에서 중단된 전송이 있으면 이어받기 요청
+                print(f"[DEBUG] Requesting resume of ingest session {ingest_session_id}")
+                status_message = "중단된 전송을 이어받는 중..."
+                send_message_to_server({"type": "resume_ingest", "payload": {"session_id": ingest_session_id}})
             while True:
                 try:
                     message_str = await asyncio.wait_for(websocket.recv(), timeout=1.0)
-                    message_data = json.loads(message_str)
+                    if isinstance(message_str, bytes):
+                        message_data = msgpack.unpackb(message_str, raw=False)
+                    else:
+                        message_data = json.loads(message_str)
+                    if message_data.get('command') == 'chunk_ack':
+                        # 메인 스레드가 전송 루프에서 대기 중이므로 이벤트 큐를 거치지 않고 바로 credit 반환
+                        ingest_credits.release()
+                        continue
+                    if message_data.get('command') == 'ingest_session_started':
+                        ingest_session_id = message_data.get('session_id')
+                        continue
                     print(f"[DEBUG] Received message: {message_data.get('command', 'unknown')}")
                     event_queue.put(message_data)  # Use standard queue.put() instead of await
                     print(f"[DEBUG] Message added to queue")
@@ -575,6 +782,7 @@ async def websocket_handler(uri):
     finally:
         status_message = "연결이 끊어졌습니다."
         websocket_client = None
+        websocket_binary_mode = False
         print("[DEBUG] WebSocket handler finished")
 
 def run_websocket_in_thread(uri):
@@ -645,6 +853,12 @@ def process_event_queue_timer():
                 if command == "fetch_all_elements_chunked":
                     print("[DEBUG] Scheduling handle_fetch_all_elements")
                     schedule_blender_task(handle_fetch_all_elements, command_data)
+                elif command == "sync_manifest_response":
+                    print("[DEBUG] Scheduling handle_sync_manifest_response")
+                    schedule_blender_task(handle_sync_manifest_response, command_data)
+                elif command == "ingest_resume_response":
+                    print("[DEBUG] Scheduling handle_ingest_resume_response")
+                    schedule_blender_task(handle_ingest_resume_response, command_data)
                 elif command == "get_selection":
                     print("[DEBUG] Scheduling handle_get_selection")
                     schedule_blender_task(handle_get_selection)
@@ -681,17 +895,128 @@ def handle_fetch_all_elements(command_data):
         print(f"[ERROR] {error}")
         return
 
-    elements_data = serialize_ifc_elements_to_string_list(ifc_file)
-    total_elements = len(elements_data)
-    send_message_to_server({"type": "fetch_progress_start", "payload": {"total_elements": total_elements, "project_id": project_id}})
-    status_message = f"{total_elements}개 객체 전송 중..."
+    # ▼▼▼ [수정] delta 동기화 1단계: 전체 직렬화 대신 (GlobalId, content_hash) manifest만 먼저 전송 ▼▼▼
+    status_message = "변경 사항 확인 중..."
+    manifest, _ = build_sync_manifest(ifc_file)
+    print(f"[DEBUG] Sending sync manifest with {len(manifest)} entries")
+    chunk_count = max(1, (len(manifest) + MANIFEST_CHUNK_SIZE - 1) // MANIFEST_CHUNK_SIZE)
+    for chunk_index in range(chunk_count):
+        entries = manifest[chunk_index * MANIFEST_CHUNK_SIZE:(chunk_index + 1) * MANIFEST_CHUNK_SIZE]
+        send_message_to_server({"type": "sync_manifest", "payload": {
+            "project_id": project_id,
+            "chunk_index": chunk_index,
+            "is_last": chunk_index == chunk_count - 1,
+            "full_sync": bool(command_data.get("full_sync")),
+            "entries": entries,
+        }})
+    # 2단계는 서버의 sync_manifest_response를 받은 뒤 handle_sync_manifest_response에서 진행
+    # ▲▲▲ [수정] 여기까지 ▲▲▲
+
+def handle_sync_manifest_response(command_data):
+    """
+    delta 동기화 2단계: 서버가 요청한(새로 추가되었거나 변경된) 객체만 직렬화하여 전송합니다.
+    """
+    print("[DEBUG] handle_sync_manifest_response called")
+    if not websocket_client:
+        print("[ERROR] websocket_client is None")
+        return
+    needed_uids = command_data.get("needed_uids", [])
+    print(f"[DEBUG] Server requested {len(needed_uids)} elements (unchanged: {command_data.get('unchanged_count')}, to delete: {command_data.get('delete_count')})")
+    stream_elements_to_server(command_data.get("project_id"), needed_uids, command_data.get("unchanged_count", 0))
+
+def handle_ingest_resume_response(command_data):
+    """재접속 후 서버가 알려준 청크 번호부터 중단된 전송을 이어갑니다."""
+    global status_message, ingest_session_id, ingest_resume_state
+    if not command_data.get("resumable") or not ingest_resume_state:
+        print(f"[WARN] Ingest session cannot be resumed: {command_data.get('reason')}")
+        ingest_session_id = None
+        ingest_resume_state = None
+        status_message = "이전 전송을 이어받을 수 없습니다. 데이터를 다시 가져와 주세요."
+        return
+    next_chunk_index = command_data.get("next_chunk_index", 0)
+    print(f"[DEBUG] Resuming ingest session {command_data.get('session_id')} from chunk {next_chunk_index}")
+    stream_elements_to_server(
+        ingest_resume_state["project_id"], ingest_resume_state["needed_uids"],
+        ingest_resume_state["unchanged_count"], start_chunk_index=next_chunk_index
+    )
+
+def stream_elements_to_server(project_id, needed_uids, unchanged_count=0, start_chunk_index=0):
+    """
+    needed_uids 객체를 직렬화하여 청크 단위로 전송합니다.
+    직렬화와 전송을 스트리밍으로 처리하여 청크가 찰 때마다 바로 보냅니다.
+
+    청크 k는 항상 products[k * chunk_size:(k + 1) * chunk_size]이므로,
+    start_chunk_index를 주면 앞 청크는 직렬화하지 않고 건너뜁니다. (세션 재개)
+    """
+    global status_message, ingest_credits, DEBUG_SERIALIZATION, ingest_session_id, ingest_resume_state
+    ifc_file, error = get_ifc_file()
+    if error:
+        status_message = error
+        send_message_to_server({
+            "type": "fetch_progress_complete",
+            "payload": {"total_sent": 0, "error": error}
+        })
+        print(f"[ERROR] {error}")
+        return
+
+    products = []
+    for guid in needed_uids:
+        try:
+            element = ifc_file.by_guid(guid)
+        except RuntimeError:
+            element = None
+        if element is not None:
+            products.append(element)
+
+    scene = bpy.context.scene
+    window_size = getattr(scene, "costestimator_export_window", EXPORT_WINDOW_SIZE)
+    DEBUG_SERIALIZATION = getattr(scene, "costestimator_debug_logging", False)
+
+    total_elements = len(products)
     chunk_size = 100
-    for i in range(0, total_elements, chunk_size):
-        chunk = elements_data[i:i+chunk_size]
-        processed_count = i + len(chunk)
-        send_message_to_server({"type": "fetch_progress_update", "payload": {"project_id": project_id, "processed_count": processed_count, "elements": chunk}})
-    send_message_to_server({"type": "fetch_progress_complete", "payload": {"total_sent": total_elements}})
-    status_message = "데이터 전송 완료."
+    if start_chunk_index == 0:
+        # 연결이 끊겨도 같은 목록/청크 순서로 이어서 보낼 수 있도록 전송 대상 보관
+        ingest_session_id = None
+        ingest_resume_state = {"project_id": project_id, "needed_uids": needed_uids, "unchanged_count": unchanged_count}
+        send_message_to_server({"type": "fetch_progress_start", "payload": {"total_elements": total_elements, "project_id": project_id}})
+    status_message = f"{total_elements}개 객체 전송 중..."
+    ingest_credits = threading.Semaphore(INGEST_CREDIT_WINDOW)
+    chunk = []
+    chunk_index = start_chunk_index
+    processed_count = min(start_chunk_index * chunk_size, total_elements)
+
+    def send_chunk():
+        nonlocal chunk, chunk_index
+        if not websocket_client:
+            # 세션 정보는 남겨두고 중단 -> 재접속 시 resume_ingest로 이어서 전송
+            return False
+        # 서버가 저장을 마친 청크만큼만 추가 전송 (최대 INGEST_CREDIT_WINDOW개 in-flight)
+        if not ingest_credits.acquire(timeout=CHUNK_ACK_TIMEOUT):
+            print(f"[WARN] chunk_ack 대기 시간 초과 ({CHUNK_ACK_TIMEOUT}s). 청크 {chunk_index}를 계속 전송합니다.")
+        send_message_to_server({"type": "fetch_progress_update", "payload": {"project_id": project_id, "chunk_index": chunk_index, "processed_count": processed_count, "total_elements": total_elements, "elements": chunk}})
+        chunk = []
+        chunk_index += 1
+        return True
+
+    # ▼▼▼ [수정] 직렬화되는 대로 청크를 채워 바로 전송 (전체 목록을 메모리에 만들지 않음) ▼▼▼
+    remaining_products = products[start_chunk_index * chunk_size:]
+    for element_data in iter_serialized_ifc_elements(ifc_file, remaining_products, as_dicts=websocket_binary_mode, window_size=window_size):
+        chunk.append(element_data)
+        processed_count += 1
+        if len(chunk) >= chunk_size:
+            if not send_chunk():
+                break
+            status_message = f"{processed_count}/{total_elements}개 객체 전송 중..."
+    if chunk and websocket_client:
+        send_chunk()
+    # ▲▲▲ [수정] 여기까지 ▲▲▲
+    if not websocket_client:
+        print(f"[WARN] Connection lost at chunk {chunk_index}. Reconnect to resume the transfer.")
+        status_message = f"연결이 끊어져 청크 {chunk_index}에서 전송이 중단되었습니다. 다시 연결하면 이어서 전송합니다."
+        return
+    send_message_to_server({"type": "fetch_progress_complete", "payload": {"total_sent": processed_count}})
+    ingest_resume_state = None
+    status_message = f"데이터 전송 완료. (변경 {processed_count}개, 변경 없음 {unchanged_count}개)"
 
 def handle_get_selection():
     selected_guids = get_selected_element_guids()
@@ -921,6 +1246,13 @@ class COSTESTIMATOR_PT_Panel(bpy.types.Panel):
 
         box.label(text=f"웹소켓 상태: {status_message}")
 
+        # ▼▼▼ [추가] 데이터 전송 옵션 ▼▼▼
+        box = layout.box()
+        box.label(text="데이터 전송")
+        box.prop(scene, "costestimator_export_window")
+        box.prop(scene, "costestimator_debug_logging")
+        # ▲▲▲ [추가] 여기까지 ▲▲▲
+
 
 classes = (
     COSTESTIMATOR_OT_StartServer,
@@ -943,6 +1275,21 @@ def register():
         max=65535
     )
 
+    # ▼▼▼ [추가] 데이터 전송 옵션 ▼▼▼
+    bpy.types.Scene.costestimator_export_window = bpy.props.IntProperty(
+        name="직렬화 창 크기",
+        description="한 번에 tessellation하여 메모리에 유지하는 객체 수 (작을수록 메모리 사용량 감소)",
+        default=EXPORT_WINDOW_SIZE,
+        min=50,
+        max=20000
+    )
+    bpy.types.Scene.costestimator_debug_logging = bpy.props.BoolProperty(
+        name="상세 로그",
+        description="객체별 [DEBUG] 로그를 콘솔에 출력합니다 (느려질 수 있음)",
+        default=False
+    )
+    # ▲▲▲ [추가] 여기까지 ▲▲▲
+
     # 타이머는 애드온 설치 시가 아닌, Connect 버튼 클릭 시 시작됩니다.
 
 def unregister():
@@ -965,6 +1312,8 @@ def unregister():
     for cls in reversed(classes):
         bpy.utils.unregister_class(cls)
     del bpy.types.Scene.costestimator_server_port
+    del bpy.types.Scene.costestimator_export_window
+    del bpy.types.Scene.costestimator_debug_logging
 
 if __name__ == "__main__":
     register()
\ No newline at end of file
@@ -110,6 +110,8 @@ namespace RevitDjangoConnector
                     UpdateStatus("Connected to server. Opening browser...");
                     ConnectButton.IsEnabled = false;
                     DisconnectButton.IsEnabled = true;
+                    // 이전 연결에서 중단된 데이터 전송이 있으면 이어받기 요청
+                    _apiHandler.TryResumeIngest();
 
                     try
                     {
@@ -214,7 +216,7 @@ namespace RevitDjangoConnector
 
         private void HandleServerMessage(string message)
         {
-            Dispatcher.Invoke(() => { try { var jsonMessage = JObject.Parse(message); if (jsonMessage.Value<string>("command") == "disconnected_by_server") { UpdateStatus("Disconnected by server. Please reconnect."); ConnectButton.IsEnabled = true; DisconnectButton.IsEnabled = false; return; } UpdateStatus($"Command received: {jsonMessage.Value<string>("command")}"); _apiHandler.LastCommandData = jsonMessage; _externalEvent.Raise(); } catch (Exception ex) { UpdateStatus($"Error processing message: {ex.Message}"); } });
+            Dispatcher.Invoke(() => { try { var jsonMessage = JObject.Parse(message); if (jsonMessage.Value<string>("command") == "disconnected_by_server") { UpdateStatus("Disconnected by server. Please reconnect."); ConnectButton.IsEnabled = true; DisconnectButton.IsEnabled = false; return; } if (jsonMessage.Value<string>("command") == "chunk_ack") { _apiHandler.HandleChunkAck(jsonMessage); return; } if (jsonMessage.Value<string>("command") == "ingest_session_started") { _apiHandler.HandleIngestSessionStarted(jsonMessage); return; } UpdateStatus($"Command received: {jsonMessage.Value<string>("command")}"); _apiHandler.LastCommandData = jsonMessage; _externalEvent.Raise(); } catch (Exception ex) { UpdateStatus($"Error processing message: {ex.Message}"); } });
         }
 
         private void UpdateStatus(string message)
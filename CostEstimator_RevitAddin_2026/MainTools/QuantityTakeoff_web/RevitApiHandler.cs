@@ -6,6 +6,7 @@ using Newtonsoft.Json.Linq;
 using System;
 using System.Collections.Generic;
 using System.Linq;
+using System.Threading;
 using System.Windows;
 using MessageBox = System.Windows.MessageBox;
 using System.Threading.Tasks; // <-- 이 using 문을 추가하면 좋습니다.
@@ -42,8 +43,36 @@ namespace RevitDjangoConnector
                 {
                     case "fetch_all_elements_chunked":
                         var projectId = LastCommandData.Value<string>("project_id");
+                        // ▼▼▼ [수정] delta 동기화 1단계: 전체 데이터 대신 (UniqueId, content hash) manifest만 먼저 전송 ▼▼▼
+                        bool fullSync = LastCommandData.Value<bool?>("full_sync") ?? false;
+                        SendSyncManifest(app.ActiveUIDocument.Document, projectId, fullSync);
+                        // ▲▲▲ [수정] 여기까지 ▲▲▲
+                        break;
+
+                    case "sync_manifest_response":
+                        // delta 동기화 2단계: 서버가 요청한 객체만 전송
+                        var responseProjectId = LastCommandData.Value<string>("project_id");
+                        var neededUids = LastCommandData.Value<JArray>("needed_uids")?.ToObject<List<string>>() ?? new List<string>();
                         // UI 멈춤을 방지하기 위해 Task를 사용하여 백그라운드에서 실행
-                        Task.Run(() => FetchAllElementsInChunks(app, projectId));
+                        Task.Run(() => FetchAllElementsInChunks(app, responseProjectId, neededUids));
+                        break;
+
+                    case "ingest_resume_response":
+                        // 재접속 후 서버가 알려준 청크부터 이어서 전송
+                        bool resumable = LastCommandData.Value<bool?>("resumable") ?? false;
+                        if (resumable && _resumeNeededUids != null)
+                        {
+                            int nextChunkIndex = LastCommandData.Value<int?>("next_chunk_index") ?? 0;
+                            var resumeProjectId = _resumeProjectId;
+                            var resumeUids = _resumeNeededUids;
+                            _updateStatusAction?.Invoke($"Resuming transfer from chunk {nextChunkIndex}...");
+                            Task.Run(() => FetchAllElementsInChunks(app, resumeProjectId, resumeUids, nextChunkIndex));
+                        }
+                        else
+                        {
+                            ClearIngestResumeState();
+                            _updateStatusAction?.Invoke($"Previous transfer cannot be resumed ({LastCommandData.Value<string>("reason")}). Please fetch again.");
+                        }
                         break;
 
                     case "get_selection":
@@ -66,28 +95,125 @@ namespace RevitDjangoConnector
                 MessageBox.Show($"An error occurred in RevitApiHandler: {ex.Message}");
             }
         }
-        private async Task FetchAllElementsInChunks(UIApplication app, string projectId)
+        // ▼▼▼ [추가] delta 동기화: manifest 전송 ▼▼▼
+        private const int ManifestChunkSize = 5000;
+
+        private void SendSyncManifest(Document doc, string projectId, bool fullSync)
+        {
+            var manifest = RevitDataCollector.BuildSyncManifest(doc);
+            int chunkCount = Math.Max(1, (manifest.Count + ManifestChunkSize - 1) / ManifestChunkSize);
+            for (int chunkIndex = 0; chunkIndex < chunkCount; chunkIndex++)
+            {
+                var entries = manifest.Skip(chunkIndex * ManifestChunkSize).Take(ManifestChunkSize)
+                    .Select(entry => new[] { entry.Key, entry.Value }).ToList();
+                var manifestMessage = new
+                {
+                    type = "sync_manifest",
+                    payload = new
+                    {
+                        project_id = projectId,
+                        chunk_index = chunkIndex,
+                        is_last = chunkIndex == chunkCount - 1,
+                        full_sync = fullSync,
+                        entries = entries
+                    }
+                };
+                _webSocketService.Send(JsonConvert.SerializeObject(manifestMessage));
+            }
+            _updateStatusAction?.Invoke($"Sync manifest sent ({manifest.Count} elements). Waiting for server...");
+        }
+        // ▲▲▲ [추가] 여기까지 ▲▲▲
+
+        // ▼▼▼ [추가] 청크 전송 흐름 제어: 서버의 chunk_ack를 받기 전에 보낼 수 있는 청크 수 (서버 INGEST_CREDIT_WINDOW와 동일) ▼▼▼
+        private const int IngestCreditWindow = 4;
+        private static readonly TimeSpan ChunkAckTimeout = TimeSpan.FromSeconds(30);
+        private SemaphoreSlim _ingestCredits = new SemaphoreSlim(IngestCreditWindow);
+
+        // 서버가 청크 저장을 마치면 호출됨 (ConnectorWindow에서 ExternalEvent를 거치지 않고 바로 호출)
+        public void HandleChunkAck(JObject ackData)
+        {
+            _ingestCredits.Release();
+        }
+        // ▲▲▲ [추가] 여기까지 ▲▲▲
+
+        // ▼▼▼ [추가] 재개 가능한 전송 세션: 연결이 끊기면 재접속 후 마지막 ack 다음 청크부터 이어서 전송 ▼▼▼
+        private string _ingestSessionId;
+        private string _resumeProjectId;
+        private List<string> _resumeNeededUids;
+
+        // 서버가 fetch_progress_start를 받고 발급한 세션 ID 저장
+        public void HandleIngestSessionStarted(JObject sessionData)
+        {
+            _ingestSessionId = sessionData.Value<string>("session_id");
+        }
+
+        // 재접속 직후 ConnectorWindow에서 호출: 중단된 전송이 있으면 서버에 이어받기 요청
+        public void TryResumeIngest()
+        {
+            if (string.IsNullOrEmpty(_ingestSessionId) || _resumeNeededUids == null || _webSocketService == null) return;
+            var resumeMessage = new { type = "resume_ingest", payload = new { session_id = _ingestSessionId } };
+            _webSocketService.Send(JsonConvert.SerializeObject(resumeMessage));
+            _updateStatusAction?.Invoke("Interrupted transfer found. Asking server to resume...");
+        }
+
+        private void ClearIngestResumeState()
+        {
+            _ingestSessionId = null;
+            _resumeProjectId = null;
+            _resumeNeededUids = null;
+        }
+        // ▲▲▲ [추가] 여기까지 ▲▲▲
+
+        private async Task FetchAllElementsInChunks(UIApplication app, string projectId, List<string> neededUids, int startChunkIndex = 0)
         {
             try
             {
                 var doc = app.ActiveUIDocument.Document;
-                var collector = new FilteredElementCollector(doc)
-                    .WhereElementIsNotElementType()
-                    .WhereElementIsViewIndependent();
-
-                var allElementIds = collector.ToElementIds().ToList();
+                // 재접속하면 새 WebSocketService가 설정되므로, 이 전송은 시작할 때의 연결만 사용
+                var webSocketService = _webSocketService;
+                // ▼▼▼ [수정] 서버가 요청한(새로 추가되었거나 변경된) 객체만 전송 ▼▼▼
+                var allElementIds = neededUids
+                    .Select(uid => doc.GetElement(uid))
+                    .Where(element => element != null)
+                    .Select(element => element.Id)
+                    .ToList();
+                // ▲▲▲ [수정] 여기까지 ▲▲▲
                 int totalElements = allElementIds.Count;
                 const int chunkSize = 100; // 한 번에 보낼 객체 수 (조정 가능)
 
-                // 1. 총 객체 수를 웹에 먼저 알림
-                var startMessage = new { type = "fetch_progress_start", payload = new { total_elements = totalElements } };
-                _webSocketService.Send(JsonConvert.SerializeObject(startMessage));
-                _updateStatusAction?.Invoke($"Starting to fetch {totalElements} elements...");
-                _resetProgressAction?.Invoke("Fetching...");
+                if (startChunkIndex == 0)
+                {
+                    // 연결이 끊겨도 같은 목록/청크 순서로 이어서 보낼 수 있도록 전송 대상 보관
+                    _ingestSessionId = null;
+                    _resumeProjectId = projectId;
+                    _resumeNeededUids = neededUids;
+
+                    // 1. 총 객체 수를 웹에 먼저 알림
+                    var startMessage = new { type = "fetch_progress_start", payload = new { total_elements = totalElements } };
+                    webSocketService.Send(JsonConvert.SerializeObject(startMessage));
+                    _updateStatusAction?.Invoke($"Starting to fetch {totalElements} elements...");
+                    _resetProgressAction?.Invoke("Fetching...");
+                }
 
-                int processedCount = 0;
-                for (int i = 0; i < totalElements; i += chunkSize)
+                int processedCount = Math.Min(startChunkIndex * chunkSize, totalElements);
+                int chunkIndex = startChunkIndex;
+                _ingestCredits = new SemaphoreSlim(IngestCreditWindow);
+                for (int i = startChunkIndex * chunkSize; i < totalElements; i += chunkSize, chunkIndex++)
                 {
+                    if (!webSocketService.IsConnected)
+                    {
+                        // 세션 정보는 남겨두고 종료 -> 재접속 시 TryResumeIngest로 이어서 전송
+                        _updateStatusAction?.Invoke($"Connection lost at chunk {chunkIndex}. Reconnect to resume the transfer.");
+                        _resetProgressAction?.Invoke("Interrupted");
+                        return;
+                    }
+
+                    // 서버가 저장을 마친 청크만큼만 추가 전송 (최대 IngestCreditWindow개 in-flight)
+                    if (!await _ingestCredits.WaitAsync(ChunkAckTimeout))
+                    {
+                        _updateStatusAction?.Invoke($"Waiting for server ack timed out. Sending chunk {chunkIndex} anyway...");
+                    }
+
                     var chunkIds = allElementIds.Skip(i).Take(chunkSize);
                     var chunkElements = chunkIds.Select(id => doc.GetElement(id)).ToList();
 
@@ -102,21 +228,27 @@ namespace RevitDjangoConnector
                         payload = new
                         {
                             project_id = projectId,
+                            chunk_index = chunkIndex,
                             processed_count = processedCount,
                             elements = elementsData
                         }
                     };
-                    _webSocketService.Send(JsonConvert.SerializeObject(updateMessage));
+                    webSocketService.Send(JsonConvert.SerializeObject(updateMessage));
 
                     // Revit 애드인 UI 업데이트
                     _updateProgressAction?.Invoke(processedCount, totalElements);
-
-                    await Task.Delay(50); // 시스템에 약간의 여유를 줌
                 }
 
                 // 3. 전송 완료 메시지 전송
+                if (!webSocketService.IsConnected)
+                {
+                    _updateStatusAction?.Invoke("Connection lost before completion. Reconnect to resume the transfer.");
+                    _resetProgressAction?.Invoke("Interrupted");
+                    return;
+                }
                 var completeMessage = new { type = "fetch_progress_complete", payload = new { total_sent = totalElements } };
-                _webSocketService.Send(JsonConvert.SerializeObject(completeMessage));
+                webSocketService.Send(JsonConvert.SerializeObject(completeMessage));
+                ClearIngestResumeState();
                 _updateStatusAction?.Invoke("All elements data sent successfully.");
                 _resetProgressAction?.Invoke("Completed");
             }
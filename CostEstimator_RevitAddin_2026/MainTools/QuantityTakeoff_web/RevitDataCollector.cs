@@ -4,11 +4,46 @@ using Newtonsoft.Json;
 using System;
 using System.Collections.Generic;
 using System.Linq;
+using System.Security.Cryptography;
+using System.Text;
 
 namespace RevitDjangoConnector
 {
     public static class RevitDataCollector
     {
+        // ▼▼▼ [추가] delta 동기화용 content hash ▼▼▼
+        // 직렬화 형식이 바뀌면 이 값을 올려서 모든 객체가 한 번 다시 전송되도록 합니다.
+        private const string ContentHashVersion = "1";
+
+        /// <summary>
+        /// 동기화 대상 객체의 (UniqueId, content hash) 목록을 만듭니다.
+        /// 형상/파라미터를 직렬화하지 않고, 객체와 타입의 VersionGuid(변경될 때마다 바뀜)로 hash를 계산합니다.
+        /// </summary>
+        public static List<KeyValuePair<string, string>> BuildSyncManifest(Document doc)
+        {
+            var manifest = new List<KeyValuePair<string, string>>();
+            var collector = new FilteredElementCollector(doc)
+                .WhereElementIsNotElementType()
+                .WhereElementIsViewIndependent();
+
+            using (var sha = SHA256.Create())
+            {
+                foreach (Element element in collector)
+                {
+                    // SerializeElementsToStringList와 동일한 필터 (Category 없는 객체는 전송하지 않음)
+                    if (element == null || element.Category == null) continue;
+
+                    Element elementType = doc.GetElement(element.GetTypeId());
+                    string source = $"{ContentHashVersion}|{element.VersionGuid}|{elementType?.VersionGuid}";
+                    byte[] hashBytes = sha.ComputeHash(Encoding.UTF8.GetBytes(source));
+                    string contentHash = BitConverter.ToString(hashBytes).Replace("-", "").ToLowerInvariant();
+                    manifest.Add(new KeyValuePair<string, string>(element.UniqueId, contentHash));
+                }
+            }
+            return manifest;
+        }
+        // ▲▲▲ [추가] 여기까지 ▲▲▲
+
         public static List<string> SerializeElementsToStringList(List<Element> elements, Document doc)
         {
             var elementDataList = new List<string>();
@@ -123,4 +123,8 @@ CHANNEL_LAYERS = {
 	"default": {
 		"BACKEND": "channels.layers.InMemoryChannelLayer"
 	}
-}
\ No newline at end of file
+}
+
+# 뷰어 데이터 스냅샷 캐시 (connections/viewer_snapshot.py)
+VIEWER_SNAPSHOT_DIR = BASE_DIR / 'viewer_snapshots'
+VIEWER_SNAPSHOT_MAX_BYTES = 512 * 1024 * 1024
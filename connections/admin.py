@@ -157,11 +157,10 @@ class SplitElementAdmin(admin.ModelAdmin):
 
     def invalidate_selected_splits(self, request, queryset):
         """선택된 분할 객체들을 무효화"""
-        count = 0
-        for split_element in queryset:
-            if split_element.is_active:
-                split_element.invalidate_on_bim_change()
-                count += 1
+        active_ids = list(queryset.filter(is_active=True).values_list('id', flat=True))
+        count = len(active_ids)
+        if active_ids:
+            SplitElement.invalidate_subtrees(active_ids)
         self.message_user(request, f"{count}개의 분할 객체가 무효화되었습니다.")
     invalidate_selected_splits.short_description = "선택된 분할 객체 무효화"
 # ▲▲▲ [추가] 여기까지 ▲▲▲
\ No newline at end of file
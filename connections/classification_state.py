@@ -0,0 +1,212 @@
+"""
+분류 룰셋 증분 적용 상태
+
+룰셋 일괄적용은 매번 모든 룰을 모든 RawElement에 다시 평가했습니다.
+여기서는 요소마다 마지막으로 분류된 룰셋 버전과 그 시점의 raw_data digest를 기록해 두고,
+다음 적용 때 다시 평가해야 하는 요소만 골라냅니다.
+
+- Project.classification_rule_digests: 마지막 적용 시점의 룰별 {rule_id: [조건 digest, target_tag_id]}
+- Project.classification_ruleset_version: 룰이 추가/수정/삭제된 뒤 적용할 때마다 1 증가
+- RawElement.classified_ruleset_version / classified_data_digest: 요소가 마지막으로 분류된 룰셋 버전과 raw_data digest
+
+다시 평가하는 요소
+- 한 번도 분류되지 않았거나(버전 0) 이전 룰셋 버전으로 분류되지 않은 요소
+- raw_data_digest가 분류 시점과 달라진 요소
+- 추가/수정된 룰의 (새) 조건에 맞는 요소
+- 수정/삭제된 룰의 (이전) 대상 태그가 룰셋으로 할당되어 있는 요소 - 더 이상 조건에 맞지 않으면 할당 제거
+"""
+
+from django.db import transaction
+from django.db.models import F
+
+from .models import Project, RawElement, ElementClassificationAssignment
+from .rule_engine import compiled_rule_conditions
+from .sync_utils import compute_raw_data_digest
+
+STAMP_BATCH_SIZE = 2000
+ASSIGNMENT_BATCH_SIZE = 2000
+
+
+def rule_state(rule):
+    """룰의 매칭 결과에 영향을 주는 상태 [조건 digest, target_tag_id]"""
+    return [compute_raw_data_digest(rule.conditions), str(rule.target_tag_id)]
+
+
+def diff_rule_states(previous, current):
+    """
+    이전/현재 룰 상태를 비교합니다.
+
+    Returns:
+        (changed_rule_ids, removed_rule_ids, stale_tag_ids)
+        - changed_rule_ids: 추가되거나 조건/대상 태그가 바뀐 룰 id
+        - removed_rule_ids: 삭제된 룰 id
+        - stale_tag_ids: 수정/삭제된 룰의 이전 대상 태그 id
+    """
+    changed_rule_ids = {rule_id for rule_id, state in current.items() if previous.get(rule_id) != state}
+    removed_rule_ids = set(previous) - set(current)
+    stale_tag_ids = {
+        previous[rule_id][1] for rule_id in changed_rule_ids | removed_rule_ids if rule_id in previous
+    }
+    return changed_rule_ids, removed_rule_ids, stale_tag_ids
+
+
+def mark_elements_unclassified(element_ids):
+    """룰셋 할당이 적용 과정 밖에서 바뀐 요소를 다음 일괄적용 때 다시 평가하도록 표시합니다."""
+    element_ids = list(element_ids)
+    for i in range(0, len(element_ids), STAMP_BATCH_SIZE):
+        RawElement.objects.filter(id__in=element_ids[i:i + STAMP_BATCH_SIZE]).update(classified_ruleset_version=0)
+
+
+def sync_ruleset_assignments(project, element_matches):
+    """
+    평가 결과를 룰셋 기반 할당(ElementClassificationAssignment, assignment_type='ruleset')에 반영합니다.
+
+    요소별 결과를 (element_id, tag_id, rule_id) 목표 상태로 모은 뒤, 프로젝트의 현재 할당을 한 번 조회하여
+    추가분은 bulk_create, 제거분은 id 배치 delete로 한 트랜잭션 안에서 적용합니다.
+    - 평가하지 않은 요소의 할당은 건드리지 않습니다.
+    - 수동 할당은 유지하며, 수동으로 할당된 태그에는 룰셋 할당을 추가하지 않습니다.
+    - 이미 룰셋으로 할당된 태그는 할당한 룰이 달라도 그대로 둡니다.
+
+    Args:
+        element_matches: (element_id, {tag_id: rule}) 반복자 - 평가한 요소마다 하나
+
+    Returns:
+        (added_count, removed_count, changed_element_ids)
+    """
+    evaluated_ids = set()
+    desired = {}   # (element_id, tag_id) -> rule_id
+    for element_id, tags_matching_rules in element_matches:
+        evaluated_ids.add(element_id)
+        for tag_id, rule in tags_matching_rules.items():
+            desired[(element_id, tag_id)] = rule.id
+
+    ruleset_assignments = {}   # (element_id, tag_id) -> assignment id
+    manual_keys = set()
+    current_rows = ElementClassificationAssignment.objects.filter(
+        raw_element__project=project
+    ).order_by().values_list('id', 'raw_element_id', 'classification_tag_id', 'assignment_type')
+    for assignment_id, element_id, tag_id, assignment_type in current_rows.iterator(chunk_size=ASSIGNMENT_BATCH_SIZE):
+        if element_id not in evaluated_ids:
+            continue
+        if assignment_type == 'ruleset':
+            ruleset_assignments[(element_id, tag_id)] = assignment_id
+        else:
+            manual_keys.add((element_id, tag_id))
+
+    removed = [assignment_id for key, assignment_id in ruleset_assignments.items() if key not in desired]
+    added = [
+        ElementClassificationAssignment(
+            raw_element_id=element_id,
+            classification_tag_id=tag_id,
+            assignment_type='ruleset',
+            assigned_by_rule_id=rule_id,
+        )
+        for (element_id, tag_id), rule_id in desired.items()
+        if (element_id, tag_id) not in ruleset_assignments and (element_id, tag_id) not in manual_keys
+    ]
+    changed_element_ids = {key[0] for key, assignment_id in ruleset_assignments.items() if key not in desired}
+    changed_element_ids.update(assignment.raw_element_id for assignment in added)
+
+    with transaction.atomic():
+        for i in range(0, len(removed), ASSIGNMENT_BATCH_SIZE):
+            ElementClassificationAssignment.objects.filter(id__in=removed[i:i + ASSIGNMENT_BATCH_SIZE]).delete()
+        ElementClassificationAssignment.objects.bulk_create(added, batch_size=ASSIGNMENT_BATCH_SIZE)
+    return len(added), len(removed), list(changed_element_ids)
+
+
+class ClassificationPlan:
+    """
+    룰셋 일괄적용 한 번의 증분 계획
+
+    plan = ClassificationPlan(project, rules, full_rebuild)
+    for element_id, raw_data in plan.iter_dirty_elements(elements_qs): ...   # 다시 평가할 요소만
+    plan.commit(elements_qs)   # 평가한 요소와 프로젝트에 새 룰셋 버전 기록
+    """
+
+    def __init__(self, project, rules, full_rebuild=False):
+        self.project = project
+        self.rules = list(rules)
+        self.full_rebuild = full_rebuild
+        self.rule_states = {str(rule.id): rule_state(rule) for rule in self.rules}
+        previous_states = project.classification_rule_digests or {}
+        changed_rule_ids, removed_rule_ids, self.stale_tag_ids = diff_rule_states(previous_states, self.rule_states)
+        self.changed_rules = [rule for rule in self.rules if str(rule.id) in changed_rule_ids]
+        self.ruleset_changed = bool(changed_rule_ids or removed_rule_ids)
+        self.previous_version = project.classification_ruleset_version
+        self.version = self.previous_version + 1 if self.ruleset_changed else self.previous_version
+        self.evaluated = []   # [(element_id, 평가 시점의 raw_data_digest)]
+        self.data_changed_ids = []   # 평가한 요소 중 처음 분류되거나 raw_data가 바뀐 요소 (하위 단계 재계산 대상)
+        self.element_count = 0
+
+    @property
+    def skipped_count(self):
+        return self.element_count - len(self.evaluated)
+
+    def iter_dirty_elements(self, elements_qs, chunk_size=2000):
+        """다시 평가해야 하는 요소의 (element_id, raw_data)를 반환합니다."""
+        self.element_count = elements_qs.count()
+        rows = elements_qs.values_list(
+            'id', 'raw_data', 'raw_data_digest', 'classified_ruleset_version', 'classified_data_digest'
+        )
+        if not self.full_rebuild and not self.ruleset_changed:
+            # 룰셋이 그대로면 데이터가 바뀌었거나 이전 버전으로 분류되지 않은 요소만 DB에서 조회
+            rows = rows.exclude(
+                classified_ruleset_version=self.previous_version,
+                classified_data_digest=F('raw_data_digest'),
+            )
+            for element_id, raw_data, digest, version, classified_digest in rows.iterator(chunk_size=chunk_size):
+                self.evaluated.append((element_id, digest))
+                if version == 0 or classified_digest != digest:
+                    self.data_changed_ids.append(element_id)
+                yield element_id, raw_data
+            return
+
+        stale_element_ids = set()
+        if self.stale_tag_ids and not self.full_rebuild:
+            stale_element_ids = set(ElementClassificationAssignment.objects.filter(
+                raw_element__project=self.project,
+                assignment_type='ruleset',
+                classification_tag_id__in=self.stale_tag_ids,
+            ).values_list('raw_element_id', flat=True))
+        changed_predicates = [compiled_rule_conditions(rule) for rule in self.changed_rules]
+
+        for element_id, raw_data, digest, version, classified_digest in rows.iterator(chunk_size=chunk_size):
+            dirty = (
+                self.full_rebuild
+                or version == 0
+                or version != self.previous_version
+                or classified_digest != digest
+                or element_id in stale_element_ids
+                or any(predicate(raw_data) for predicate in changed_predicates)
+            )
+            if dirty:
+                self.evaluated.append((element_id, digest))
+                if version == 0 or classified_digest != digest:
+                    self.data_changed_ids.append(element_id)
+                yield element_id, raw_data
+
+    def commit(self, elements_qs):
+        """평가한 요소에 새 룰셋 버전과 digest를 기록하고, 프로젝트의 룰 상태를 갱신합니다."""
+        for i in range(0, len(self.evaluated), STAMP_BATCH_SIZE):
+            evaluated_digests = dict(self.evaluated[i:i + STAMP_BATCH_SIZE])
+            # 평가 이후 raw_data가 다시 바뀐 요소는 기록하지 않음 (다음 적용 때 다시 평가)
+            unchanged_ids = [
+                element_id for element_id, digest in RawElement.objects.filter(
+                    id__in=list(evaluated_digests)
+                ).values_list('id', 'raw_data_digest')
+                if evaluated_digests[element_id] == digest
+            ]
+            RawElement.objects.filter(id__in=unchanged_ids).update(
+                classified_ruleset_version=self.version,
+                classified_data_digest=F('raw_data_digest'),
+            )
+        if self.version != self.previous_version:
+            # 평가하지 않은(룰 변경의 영향이 없는) 요소는 새 룰셋에서도 결과가 같으므로 버전만 올림
+            elements_qs.filter(
+                classified_ruleset_version=self.previous_version,
+                classified_data_digest=F('raw_data_digest'),
+            ).exclude(classified_ruleset_version=0).update(classified_ruleset_version=self.version)
+        Project.objects.filter(id=self.project.id).update(
+            classification_ruleset_version=self.version,
+            classification_rule_digests=self.rule_states,
+        )
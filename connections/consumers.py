@@ -2,14 +2,25 @@
 import json
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
+from django.db import transaction
 from django.db.models import F
+from django.core.exceptions import ValidationError
+from django.utils import timezone
+from datetime import timedelta
 # ▼▼▼ [추가] Count 임포트 ▼▼▼
 from django.db.models import Count
 # ▲▲▲ [추가] 여기까지 ▲▲▲
 # ▼▼▼ [수정] AIModel, SplitElement, CostItem 임포트 추가 ▼▼▼
-from .models import Project, RawElement, QuantityClassificationTag, QuantityMember, AIModel, SplitElement, CostItem
+from .models import Project, RawElement, QuantityClassificationTag, QuantityMember, AIModel, SplitElement, CostItem, GeometryBlob, IngestSession, ProjectChange, invalidate_splits_for_volume_changes
 # ▲▲▲ [수정] 여기까지 ▲▲▲
+from .sync_utils import compute_raw_data_digest, diff_sync_manifest
+from .geometry_store import externalize_geometry, externalize_geometry_dict, collect_geometry_digests, listify_geometry_arrays, rehydrate_geometry, rehydrate_geometry_dict, strip_geometry_meshes
+from .ws_codec import MessageCodecMixin, encode_payload
+from .viewer_snapshot import open_snapshot, iter_snapshot_payloads, write_snapshot
+from .classification_state import mark_elements_unclassified
 import asyncio
+import time
+import uuid
 
 # --- 데이터 평탄화 헬퍼 함수 ---
 def flatten_bim_data(element_data):
@@ -58,6 +69,76 @@ def flatten_bim_data(element_data):
 
     return flattened
 
+# --- Geometry 체적 일괄 계산 헬퍼 ---
+def apply_geometry_volumes(elements, meshes_by_digest=None):
+    """
+    청크 단위로 Geometry 체적을 일괄 계산하여 각 RawElement의 geometry_volume에 반영하고,
+    체적이 계산된 객체 목록을 반환합니다. 잘못된 face가 있는 객체는 요약 로그를 남깁니다.
+    meshes_by_digest: 이미 메모리에 있는 GeometryBlob 메쉬 {digest: (vertices, faces)} (DB 재조회 생략)
+    """
+    with_volume = []
+    anomalies = []
+    for elem, report in RawElement.batch_calculate_geometry_volumes(elements, meshes_by_digest):
+        if report['volume'] is None:
+            continue
+        elem.geometry_volume = report['volume']
+        with_volume.append(elem)
+        if report['non_triangle_faces'] or report['out_of_range_faces'] or report['degenerate_faces']:
+            anomalies.append((elem.element_unique_id, report))
+
+    if anomalies:
+        print(f"    - [Geometry] {len(anomalies)}개 객체에서 비정상 face 발견 (최대 5개 표시)")
+        for uid, report in anomalies[:5]:
+            print(f"      · {uid}: 비삼각형={report['non_triangle_faces']}, 범위초과={report['out_of_range_faces']}, 면적0={report['degenerate_faces']}")
+    return with_volume
+
+# --- GeometryBlob 복원 헬퍼 ---
+def rehydrate_element_geometries(raw_data_list, as_arrays=False):
+    """
+    3D 뷰어 전송용: raw_data의 GeometryBlob 참조를 실제 verts/faces 목록으로 복원합니다. (한 번의 쿼리)
+    프론트엔드는 기존과 동일하게 Parameters.Geometry.{verts, faces, matrix}를 읽습니다.
+    as_arrays=True면 바이너리 WebSocket 전송용으로 NumPy 배열을 그대로 둡니다. (typed array로 전송)
+    """
+    digests = set()
+    for raw_data in raw_data_list:
+        digests |= collect_geometry_digests(raw_data)
+    if not digests:
+        return
+    meshes = GeometryBlob.load_meshes(digests)
+    for raw_data in raw_data_list:
+        rehydrate_geometry(raw_data, meshes, as_arrays)
+
+def strip_element_geometries(raw_data_list):
+    """3D 뷰어 1단계 전송용: GeometryBlob 참조를 메쉬 대신 bounding box가 담긴 stub으로 바꿉니다. (메쉬 버퍼는 읽지 않음)"""
+    digests = set()
+    for raw_data in raw_data_list:
+        digests |= collect_geometry_digests(raw_data)
+    bboxes = GeometryBlob.load_bboxes(digests)
+    for raw_data in raw_data_list:
+        strip_geometry_meshes(raw_data, bboxes)
+
+def load_element_meshes(project_id, element_ids, as_arrays=False):
+    """
+    3D 뷰어 2단계 전송용: 요청한 객체들의 메쉬를 반환합니다.
+    같은 메쉬를 공유하는 객체가 많으므로 메쉬는 digest당 한 번만 담습니다.
+
+    Returns: ({element_id: digest}, {digest: {'verts', 'faces'}}, 메쉬가 없는 element_id 목록)
+    """
+    rows = list(
+        RawElement.objects.filter(project_id=project_id, id__in=element_ids)
+        .values_list('id', 'geometry_blob_id')
+    )
+    digest_by_element = {str(element_id): digest for element_id, digest in rows if digest}
+    meshes = {}
+    for digest, (vertices, faces) in GeometryBlob.load_meshes(digest_by_element.values()).items():
+        if as_arrays:
+            meshes[digest] = {'verts': vertices, 'faces': faces}
+        else:
+            meshes[digest] = {'verts': vertices.tolist(), 'faces': faces.tolist()}
+    found = {element_id for element_id, digest in digest_by_element.items() if digest in meshes}
+    missing = [str(element_id) for element_id in element_ids if str(element_id) not in found]
+    return {k: v for k, v in digest_by_element.items() if k in found}, meshes, missing
+
 # --- 데이터 직렬화 헬퍼 함수들 ---
 def serialize_tags(tags):
     # 디버깅: 태그 직렬화 확인
@@ -82,28 +163,41 @@ def get_total_element_count(project_id):
         print(f"[ERROR][DB Async][get_total_element_count] Exception: {e}")
         return 0
 
-@database_sync_to_async
-def get_serialized_element_chunk(project_id, offset, limit):
+def serialize_element_chunk(project_id, after_id=None, limit=1000, as_arrays=False, lazy_geometry=False):
+    """
+    id 순서로 after_id 다음부터 limit개의 객체를 직렬화합니다. (keyset pagination)
+    OFFSET 방식과 달리 앞 청크를 다시 훑지 않으므로 청크 번호와 관계없이 조회 비용이 일정합니다.
+    lazy_geometry=True면 메쉬 좌표 대신 blob digest와 bounding box만 담습니다. (메쉬는 get_element_geometry로 요청)
+
+    Returns: (직렬화된 객체 목록, 다음 호출에 넘길 마지막 id) - 더 이상 객체가 없으면 ([], None)
+    """
     # 디버깅: 청크 조회 시작
-    # print(f"[DEBUG][DB Async][get_serialized_element_chunk] Querying chunk for project {project_id}, offset={offset}, limit={limit}") # 너무 빈번하여 주석 처리
+    # print(f"[DEBUG][DB Async][get_serialized_element_chunk] Querying chunk for project {project_id}, after_id={after_id}, limit={limit}") # 너무 빈번하여 주석 처리
     try:
+        element_qs = RawElement.objects.filter(project_id=project_id)
+        if after_id is not None:
+            element_qs = element_qs.filter(id__gt=after_id)
         element_chunk_values = list(
-            RawElement.objects.filter(project_id=project_id)
-            .order_by('id')
-            .values('id', 'project_id', 'element_unique_id', 'geometry_volume', 'updated_at', 'raw_data')[offset:offset + limit]
+            element_qs.order_by('id')
+            .values('id', 'project_id', 'element_unique_id', 'geometry_volume', 'updated_at', 'raw_data')[:limit]
         )
         if not element_chunk_values:
              # 디버깅: 빈 청크
              # print(f"[DEBUG][DB Async][get_serialized_element_chunk] Empty chunk returned.") # 너무 빈번하여 주석 처리
-             return []
-        element_ids_in_chunk = [el['id'] for el in element_chunk_values]
+             return [], None
+        last_id = element_chunk_values[-1]['id']
         # ElementClassificationAssignment 모델 import
         from connections.models import ElementClassificationAssignment
 
         # 태그 할당 정보 조회 (assignment_type 포함)
+        # 객체 ID 목록(IN) 대신 같은 cursor 범위 (after_id, last_id]로 조회
+        tags_qs = ElementClassificationAssignment.objects.filter(
+            raw_element__project_id=project_id, raw_element_id__lte=last_id
+        )
+        if after_id is not None:
+            tags_qs = tags_qs.filter(raw_element_id__gt=after_id)
         tags_qs = (
-            ElementClassificationAssignment.objects
-            .filter(raw_element_id__in=element_ids_in_chunk)
+            tags_qs
             .select_related('classification_tag')
             .values('raw_element_id', 'classification_tag__name', 'assignment_type')
         )
@@ -123,6 +217,11 @@ def get_serialized_element_chunk(project_id, offset, limit):
                 'assignment_type': assignment_type
             })
 
+        if lazy_geometry:
+            strip_element_geometries([el['raw_data'] for el in element_chunk_values])
+        else:
+            rehydrate_element_geometries([el['raw_data'] for el in element_chunk_values], as_arrays)
+
         for element_data in element_chunk_values:
             element_id = element_data['id']
             element_data['classification_tags'] = tags_by_element_id.get(element_id, [])
@@ -135,20 +234,26 @@ def get_serialized_element_chunk(project_id, offset, limit):
             element_data['updated_at'] = element_data['updated_at'].isoformat()
         # 디버깅: 청크 직렬화 완료
         # print(f"[DEBUG][DB Async][get_serialized_element_chunk] Serialized {len(element_chunk_values)} elements in chunk.") # 너무 빈번하여 주석 처리
-        return element_chunk_values
+        return element_chunk_values, last_id
     except Exception as e:
         # 디버깅: 오류 발생
+        # 빈 청크는 '스트림 끝'을 뜻하므로, 오류를 삼키면 잘린 데이터가 스냅샷으로 캐시됨 → 호출 측으로 전달
         print(f"[ERROR][DB Async][get_serialized_element_chunk] Exception: {e}")
-        return []
+        raise
 
-@database_sync_to_async
-def serialize_specific_elements(element_ids):
+get_serialized_element_chunk = database_sync_to_async(serialize_element_chunk)
+
+def serialize_elements_by_id(element_ids, as_arrays=False, lazy_geometry=False):
+    """
+    지정한 객체들을 직렬화합니다. (태그 변경 브로드캐스트, since_seq 변경분 전송)
+    lazy_geometry=True면 serialize_element_chunk와 같이 메쉬 좌표 대신 blob digest와 bounding box만 담습니다.
+    """
     # 디버깅: 특정 객체 직렬화 시작
     print(f"[DEBUG][DB Async][serialize_specific_elements] Serializing {len(element_ids)} specific elements.")
     try:
         elements_values = list(
             RawElement.objects.filter(id__in=element_ids)
-            .values('id', 'project_id', 'element_unique_id', 'updated_at', 'raw_data')
+            .values('id', 'project_id', 'element_unique_id', 'geometry_volume', 'updated_at', 'raw_data')
         )
         if not elements_values:
             # 디버깅: 대상 객체 없음
@@ -180,12 +285,19 @@ def serialize_specific_elements(element_ids):
                 'assignment_type': assignment_type
             })
 
+        if lazy_geometry:
+            strip_element_geometries([el['raw_data'] for el in elements_values])
+        else:
+            rehydrate_element_geometries([el['raw_data'] for el in elements_values], as_arrays)
+
         for element_data in elements_values:
             element_id = element_data['id']
             element_data['classification_tags'] = tags_by_element_id.get(element_id, [])
             element_data['classification_tags_details'] = tag_details_by_element_id.get(element_id, [])
             element_data['id'] = str(element_id)
             element_data['project_id'] = str(element_data['project_id'])
+            if element_data.get('geometry_volume') is not None:
+                element_data['geometry_volume'] = float(element_data['geometry_volume'])
             element_data['updated_at'] = element_data['updated_at'].isoformat()
         # 디버깅: 직렬화 완료
         print(f"[DEBUG][DB Async][serialize_specific_elements] Successfully serialized {len(elements_values)} elements.")
@@ -195,8 +307,26 @@ def serialize_specific_elements(element_ids):
         print(f"[ERROR][DB Async][serialize_specific_elements] Exception: {e}")
         return []
 
-@database_sync_to_async
-def get_split_elements_for_project(project_id):
+serialize_specific_elements = database_sync_to_async(serialize_elements_by_id)
+
+def element_tag_ids(element_ids):
+    """
+    {객체 id: [할당된 태그 id]} - 태그 할당/제거 후 raw_data 전체 대신 보내는 변경분 (element_tags_updated)
+    할당이 하나도 없는 객체는 빈 목록입니다.
+    """
+    from connections.models import ElementClassificationAssignment
+    element_ids = [str(element_id) for element_id in element_ids]
+    tag_ids_by_element = {element_id: [] for element_id in element_ids}
+    for i in range(0, len(element_ids), TAG_ASSIGNMENT_BATCH_SIZE):
+        for element_id, tag_id in ElementClassificationAssignment.objects.filter(
+            raw_element_id__in=element_ids[i:i + TAG_ASSIGNMENT_BATCH_SIZE]
+        ).values_list('raw_element_id', 'classification_tag_id'):
+            tag_ids_by_element[str(element_id)].append(str(tag_id))
+    return tag_ids_by_element
+
+get_element_tag_ids = database_sync_to_async(element_tag_ids)
+
+def serialize_split_elements_for_project(project_id):
     """
     프로젝트의 모든 활성 분할 객체를 가져옵니다.
 
@@ -232,6 +362,14 @@ def get_split_elements_for_project(project_id):
 
         split_elements_list = list(split_elements)
 
+        # GeometryBlob에 저장된 분할 메쉬를 geometry_data로 복원
+        split_meshes = GeometryBlob.load_meshes(
+            s['geometry_data'].get('blob') for s in split_elements_list if isinstance(s.get('geometry_data'), dict)
+        )
+        if split_meshes:
+            for split_data in split_elements_list:
+                split_data['geometry_data'] = rehydrate_geometry_dict(split_data['geometry_data'], split_meshes)
+
         # 분할이 있는 RawElement ID들을 수집
         raw_element_ids_with_splits = set()
 
@@ -270,12 +408,172 @@ def get_split_elements_for_project(project_id):
         print(f"[ERROR][DB Async][get_split_elements_for_project] Exception: {e}")
         import traceback
         traceback.print_exc()
-        return [], set()
+        # 빈 목록을 반환하면 '분할 없음'으로 스냅샷/변경분에 반영되므로 호출 측으로 전달
+        raise
 
-class RevitConsumer(AsyncWebsocketConsumer):
+get_split_elements_for_project = database_sync_to_async(serialize_split_elements_for_project)
+get_element_meshes = database_sync_to_async(load_element_meshes)
+
+# ▼▼▼ [추가] 수신/DB 저장 분리 (backpressure) 설정 ▼▼▼
+INGEST_QUEUE_MAXSIZE = 4    # 세션당 저장 대기 가능한 청크 수. 가득 차면 수신 측이 대기하여 소켓 단에서 속도가 조절됨
+INGEST_CREDIT_WINDOW = 4    # 커넥터가 chunk_ack 없이 동시에 보낼 수 있는 청크 수 (Blender/Revit 커넥터와 동일하게 유지)
+INGEST_SESSION_TTL = timedelta(hours=24)  # 마지막 checkpoint 이후 이 시간이 지난 세션은 이어받을 수 없음
+# ▲▲▲ [추가] 여기까지 ▲▲▲
+VIEWER_STREAM_CHUNK_SIZE = 1000   # 프론트엔드로 객체 데이터를 보낼 때 한 청크의 객체 수
+VIEWER_STREAM_WINDOW = 3          # 프론트엔드 ack 없이 보낼 수 있는 청크 수 (수신 측이 밀리면 자동으로 전송 속도가 느려짐)
+VIEWER_ACK_TIMEOUT = 10.0         # 이 시간 동안 ack가 없으면 ack를 보내지 않는 클라이언트로 보고 흐름 제어 없이 전송
+VIEWER_GEOMETRY_REQUEST_LIMIT = 2000  # get_element_geometry 한 번에 요청할 수 있는 객체 수
+
+STALE_DELETE_BATCH_SIZE = 500   # 동기화 후 오래된 객체를 한 번에 삭제하는 최대 개수
+TAG_ASSIGNMENT_BATCH_SIZE = 5000  # 태그 일괄 할당/제거 시 한 번의 쿼리(IN 조건)로 처리하는 객체 수
+SYNC_STAMP_BATCH_SIZE = 1000    # delta 동기화에서 변경 없는 객체에 generation을 기록하는 배치 크기
+
+# ▼▼▼ [추가] 뷰어 데이터 스냅샷 (project.viewer_revision 단위 캐시) ▼▼▼
+def iter_encoded_viewer_payloads(project_id, binary, lazy_geometry=False):
+    """revit_data_start payload와 revit_data_chunk payload들을 순서대로 인코딩하여 반환합니다."""
+    total_elements = RawElement.objects.filter(project_id=project_id).count()
+    split_elements, raw_element_ids_with_splits = serialize_split_elements_for_project(project_id)
+    yield encode_payload({
+        'total': total_elements,
+        'split_elements': split_elements,
+        'raw_element_ids_with_splits': list(raw_element_ids_with_splits),
+    }, binary)
+    after_id = None
+    while True:
+        chunk, after_id = serialize_element_chunk(project_id, after_id, VIEWER_STREAM_CHUNK_SIZE, as_arrays=binary, lazy_geometry=lazy_geometry)
+        if not chunk:
+            break
+        yield encode_payload(chunk, binary)
+        if len(chunk) < VIEWER_STREAM_CHUNK_SIZE:
+            break
+
+
+@database_sync_to_async
+def ensure_viewer_snapshot(project_id, binary, lazy_geometry=False):
+    """
+    현재 viewer_revision의 스냅샷 경로를 반환합니다. 없으면 DB에서 직렬화하여 새로 만듭니다.
+    revision은 데이터 조회 전에 읽으므로, 조회 중 변경이 생겨도 다음 요청에서 새 revision으로 다시 만들어집니다.
+    디스크에 쓸 수 없거나 작성 중 더 새로운 revision이 캐시되었으면 None을 반환하고 호출 측은 DB에서 직접 전송합니다.
+    직렬화 중 오류는 스냅샷을 남기지 않고 그대로 전달됩니다.
+    """
+    revision = Project.objects.filter(id=project_id).values_list('viewer_revision', flat=True).first()
+    if revision is None:
+        return None
+    try:
+        path = open_snapshot(project_id, revision, binary, lazy_geometry)
+        if path:
+            print(f"[DEBUG][DB Async][ensure_viewer_snapshot] Snapshot hit: project {project_id}, revision {revision}")
+            return path
+        started = time.perf_counter()
+        path, written = write_snapshot(
+            project_id, revision, binary, iter_encoded_viewer_payloads(project_id, binary, lazy_geometry), lazy_geometry
+        )
+        if path is None:
+            print(f"[DEBUG][DB Async][ensure_viewer_snapshot] Snapshot discarded (newer revision cached): project {project_id}, revision {revision}")
+            return None
+        print(f"[DEBUG][DB Async][ensure_viewer_snapshot] Snapshot built: project {project_id}, revision {revision}, {written} bytes, {time.perf_counter() - started:.2f}s")
+        return path
+    except OSError as e:
+        print(f"[WARN][DB Async][ensure_viewer_snapshot] Snapshot unavailable, streaming from DB: {e}")
+        return None
+# ▲▲▲ [추가] 여기까지 ▲▲▲
+
+# ▼▼▼ [추가] 변경 journal 기반 증분 새로고침 (get_all_elements의 since_seq) ▼▼▼
+CHANGE_REPLAY_MAX_ELEMENTS = 5000   # 변경된 객체가 이보다 많으면 변경분 대신 전체 데이터를 보냄
+
+@database_sync_to_async
+def get_project_change_seq(project_id):
+    return Project.objects.filter(id=project_id).values_list('change_seq', flat=True).first()
+
+def build_change_replay(project_id, since_seq, as_arrays=False, lazy_geometry=False):
+    """
+    since_seq 이후의 변경 journal을 모아 changes_since payload를 만듭니다.
+    같은 객체가 여러 번 바뀌어도 현재 DB 상태를 한 번만 직렬화하며, journal에 있지만 DB에 없는 객체는 삭제로 보냅니다.
+
+    다음 경우에는 None을 반환하고 호출 측은 전체 데이터를 다시 보냅니다.
+    - since_seq 다음 항목부터 연속되지 않음 (journal이 정리되었거나 since_seq가 다른 DB의 값)
+    - 전체 변경(reset)이나 ID 목록 없이 기록된 객체 변경이 있음
+    - 변경된 객체가 CHANGE_REPLAY_MAX_ELEMENTS개를 넘음
+    """
+    to_seq = Project.objects.filter(id=project_id).values_list('change_seq', flat=True).first()
+    if to_seq is None or since_seq > to_seq:
+        return None
+    entries = list(
+        ProjectChange.objects.filter(project_id=project_id, seq__gt=since_seq, seq__lte=to_seq)
+        .order_by('seq').values_list('seq', 'kind', 'object_ids')
+    )
+    if [seq for seq, _, _ in entries] != list(range(since_seq + 1, to_seq + 1)):
+        return None
+
+    kinds = set()
+    touched_ids = set()
+    for _, kind, object_ids in entries:
+        if kind == ProjectChange.KIND_RESET:
+            return None
+        if kind in (ProjectChange.KIND_ELEMENTS, ProjectChange.KIND_ELEMENTS_DELETED):
+            if object_ids is None:
+                return None
+            touched_ids.update(object_ids)
+        kinds.add(kind)
+    if len(touched_ids) > CHANGE_REPLAY_MAX_ELEMENTS:
+        return None
+
+    elements = serialize_elements_by_id(list(touched_ids), as_arrays, lazy_geometry) if touched_ids else []
+    existing_ids = {element['id'] for element in elements}
+    replay = {
+        'project_id': str(project_id),
+        'from_seq': since_seq,
+        'to_seq': to_seq,
+        'elements': elements,
+        'deleted_element_ids': sorted(touched_ids - existing_ids),
+        'tags': None,
+        'split_elements': None,
+        'raw_element_ids_with_splits': None,
+        'quantity_members_changed': ProjectChange.KIND_QUANTITY_MEMBERS in kinds,
+        'cost_items_changed': ProjectChange.KIND_COST_ITEMS in kinds,
+    }
+    if ProjectChange.KIND_TAGS in kinds:
+        replay['tags'] = serialize_tags(QuantityClassificationTag.objects.filter(project_id=project_id))
+    if ProjectChange.KIND_SPLITS in kinds:
+        split_elements, raw_element_ids_with_splits = serialize_split_elements_for_project(project_id)
+        replay['split_elements'] = split_elements
+        replay['raw_element_ids_with_splits'] = list(raw_element_ids_with_splits)
+    print(f"[DEBUG][DB Async][build_change_replay] project {project_id}: seq {since_seq} -> {to_seq}, {len(entries)} changes, {len(elements)} elements, {len(replay['deleted_element_ids'])} deleted")
+    return replay
+
+get_change_replay = database_sync_to_async(build_change_replay)
+# ▲▲▲ [추가] 여기까지 ▲▲▲
+
+# ▼▼▼ [추가] 프로젝트별 프론트엔드 그룹 ▼▼▼
+FRONTEND_TOPICS = ('progress', 'elements', 'tags', 'training')   # 브라우저가 구독할 수 있는 broadcast 종류
+
+def frontend_project_group(project_id, topic):
+    """프로젝트 + broadcast 종류별 그룹 이름. 그 프로젝트를 열고 해당 종류를 구독한 브라우저만 참여합니다."""
+    return f'frontend_{project_id}_{topic}'
+
+async def send_to_frontend(channel_layer, project_id, topic, event):
+    """
+    project_id 프로젝트를 연 브라우저 중 topic을 구독한 연결에만 broadcast 합니다.
+    프로젝트를 알 수 없으면(커넥터가 project_id 없이 보낸 진행률 등) 기존처럼 전체 브라우저 그룹으로 보냅니다.
+    """
+    group = frontend_project_group(project_id, topic) if project_id else FrontendConsumer.frontend_group_name
+    await channel_layer.group_send(group, event)
+# ▲▲▲ [추가] 여기까지 ▲▲▲
+
+class RevitConsumer(MessageCodecMixin, AsyncWebsocketConsumer):
     async def connect(self):
-        self.all_incoming_uids = set()
+        self.incoming_count = 0
         self.project_id_for_fetch = None
+        self.sync_generation = None   # 현재 동기화 세션의 generation (세션 시작 시 발급)
+        # ▼▼▼ [추가] 청크 저장 큐와 DB writer task (세션마다 새로 생성) ▼▼▼
+        self.ingest_queue = None
+        self.ingest_writer_task = None
+        self.ingest_stats = None
+        self.ingest_session_id = None   # 재개 가능한 전송 세션 (IngestSession) ID
+        # ▲▲▲ [추가] 여기까지 ▲▲▲
+        # ▼▼▼ [추가] hash 기반 delta 동기화 상태 ▼▼▼
+        self.sync_manifest = None         # {UniqueId: content_hash} - 커넥터가 보낸 manifest
+        # ▲▲▲ [추가] 여기까지 ▲▲▲
         path = self.scope['path']
         if 'revit-connector' in path:
             self.group_name = 'revit_broadcast_group'
@@ -290,15 +588,24 @@ class RevitConsumer(AsyncWebsocketConsumer):
         if self.group_name:
             # print(f"✅ [{self.__class__.__name__}] 클라이언트가 '{self.group_name}' 그룹에 참여합니다.") # 위에서 이미 출력
             await self.channel_layer.group_add(self.group_name, self.channel_name)
-        await self.accept()
+        # ▼▼▼ [추가] subprotocol 협상: 커넥터가 지원하면 MessagePack 바이너리 프레임 사용 ▼▼▼
+        subprotocol = self.negotiate_binary_mode()
+        print(f"  - 메시지 형식: {'MessagePack (binary)' if self.binary_mode else 'JSON (text)'}")
+        await self.accept(subprotocol=subprotocol)
+        # ▲▲▲ [추가] 여기까지 ▲▲▲
 
     async def disconnect(self, close_code):
+        # 연결이 끊기면 ack를 보낼 수 없으므로 대기 중인 청크 저장은 중단
+        await self.stop_ingest_writer(drain=False)
+        if getattr(self, 'ingest_session_id', None):
+            # 세션은 active로 남겨두어 재접속 후 resume_ingest로 이어받을 수 있게 함
+            print(f"  - 전송 세션 {self.ingest_session_id}이(가) 중단되었습니다. 재접속하면 마지막 checkpoint부터 이어서 받습니다.")
         if hasattr(self, 'group_name') and self.group_name:
             print(f"❌ [{self.__class__.__name__}] 클라이언트가 '{self.group_name}' 그룹에서 나갑니다 (Code: {close_code}).") # 디버깅 추가
             await self.channel_layer.group_discard(self.group_name, self.channel_name)
 
-    async def receive(self, text_data):
-        data = json.loads(text_data)
+    async def receive(self, text_data=None, bytes_data=None):
+        data = self.decode_incoming(text_data, bytes_data)
         msg_type = data.get('type')
         payload = data.get('payload', {})
         print(f"\n✉️  [{self.__class__.__name__}] 클라이언트로부터 메시지 수신: type='{msg_type}'") # 기존 print 유지
@@ -310,9 +617,59 @@ class RevitConsumer(AsyncWebsocketConsumer):
                 FrontendConsumer.frontend_group_name,
                 {'type': 'broadcast_selection', 'unique_ids': payload}
             )
+        # ▼▼▼ [추가] delta 동기화 1단계: (UniqueId, content_hash) manifest 수신 ▼▼▼
+        elif msg_type == 'sync_manifest':
+            if payload.get('chunk_index', 0) == 0 or self.sync_manifest is None:
+                self.sync_manifest = {}
+                self.sync_generation = None
+            for entry in payload.get('entries', []):
+                if entry and len(entry) >= 2:
+                    self.sync_manifest[entry[0]] = entry[1] or ''
+            print(f"  - manifest 청크 {payload.get('chunk_index', 0)} 수신. 현재까지 {len(self.sync_manifest)}개 항목.")
+
+            if payload.get('is_last'):
+                project_id = self.project_id_for_fetch
+                if not project_id:
+                    print("[CRITICAL ERROR] manifest 수신 시점에 프로젝트 ID가 설정되지 않았습니다! 전체 객체를 요청합니다.")
+                    needed_uids, deleted_uids, unchanged_count = list(self.sync_manifest), None, 0
+                else:
+                    # 변경 없는 객체는 다시 전송되지 않으므로 manifest 비교 시점에 이번 generation을 기록
+                    self.sync_generation = await begin_sync_generation(project_id)
+                    needed_uids, deleted_uids, unchanged_count = await get_sync_manifest_diff(
+                        project_id, self.sync_manifest, payload.get('full_sync', False), self.sync_generation
+                    )
+                    # 이후 청크 저장에는 전송될 객체의 hash만 필요 (전송 세션에도 이 값만 기록)
+                    self.sync_manifest = {uid: self.sync_manifest.get(uid, '') for uid in needed_uids}
+                print(f"  - manifest 비교 완료: 요청 {len(needed_uids)}개, 변경 없음 {unchanged_count}개, 삭제 예정 {len(deleted_uids or ())}개")
+                await self.send_message({
+                    'command': 'sync_manifest_response',
+                    'project_id': project_id,
+                    'needed_uids': needed_uids,
+                    'unchanged_count': unchanged_count,
+                    'delete_count': len(deleted_uids or ()),
+                })
+        # ▲▲▲ [추가] 여기까지 ▲▲▲
         elif msg_type == 'fetch_progress_start':
             print("[DEBUG] 'fetch_progress_start' 수신. 동기화 세션을 시작합니다.") # 기존 print 유지
-            self.all_incoming_uids.clear()
+            self.incoming_count = 0
+            await self.start_ingest_writer()
+            # manifest 없이 시작한 전체 전송이면 여기서 새 generation 발급
+            if self.project_id_for_fetch and (self.sync_manifest is None or self.sync_generation is None):
+                self.sync_generation = await begin_sync_generation(self.project_id_for_fetch)
+            print(f"  - 동기화 generation: {self.sync_generation}")
+            # ▼▼▼ [추가] 재개 가능한 전송 세션 발급 (청크 checkpoint는 writer task가 기록) ▼▼▼
+            self.ingest_session_id = None
+            if self.project_id_for_fetch:
+                self.ingest_session_id = await create_ingest_session(
+                    self.project_id_for_fetch, self.connector_source, self.sync_generation,
+                    payload.get('total_elements') or 0, self.sync_manifest
+                )
+                await self.send_message({
+                    'command': 'ingest_session_started',
+                    'session_id': self.ingest_session_id,
+                    'next_chunk_index': 0,
+                })
+            # ▲▲▲ [추가] 여기까지 ▲▲▲
 
             # ▼▼▼ [수정] payload에서 project_id를 가져오는 대신, 이미 저장된 값을 확인합니다. ▼▼▼
             print(f"  - 현재 세션의 프로젝트 ID: {self.project_id_for_fetch}") # 기존 print 유지
@@ -323,8 +680,8 @@ class RevitConsumer(AsyncWebsocketConsumer):
             print(f"  - 전체 객체 수: {payload.get('total_elements')}") # 기존 print 유지
             # 디버깅: 진행 시작 브로드캐스트
             print(f"  ➡️ [{self.__class__.__name__}] 데이터 가져오기 시작 정보를 프론트엔드로 전달합니다.")
-            await self.channel_layer.group_send(
-                FrontendConsumer.frontend_group_name,
+            await send_to_frontend(
+                self.channel_layer, self.project_id_for_fetch, 'progress',
                 {"type": "broadcast_progress", "data": data}
             )
         elif msg_type == 'fetch_progress_update':
@@ -334,7 +691,8 @@ class RevitConsumer(AsyncWebsocketConsumer):
             project_id = self.project_id_for_fetch
             # ▲▲▲ [수정] 여기까지 입니다. ▲▲▲
 
-            elements_data = [json.loads(s) for s in payload.get('elements', [])]
+            # JSON 모드: 객체마다 JSON 문자열 / 바이너리 모드: 딕셔너리 (verts/faces는 NumPy 배열)
+            elements_data = [json.loads(s) if isinstance(s, str) else s for s in payload.get('elements', [])]
 
             # ▼▼▼ [DEBUG] System.Geometry.materials 확인 ▼▼▼
             for elem in elements_data:
@@ -347,39 +705,186 @@ class RevitConsumer(AsyncWebsocketConsumer):
                             break  # 하나만 출력
             # ▲▲▲ [DEBUG] 끝 ▲▲▲
 
-            chunk_uids = {item['UniqueId'] for item in elements_data if item and 'UniqueId' in item}
-            self.all_incoming_uids.update(chunk_uids)
-            print(f"  - 이번 청크의 UniqueId {len(chunk_uids)}개 추가. 현재까지 총 {len(self.all_incoming_uids)}개 수신.") # 기존 print 유지
+            chunk_count = sum(1 for item in elements_data if item and 'UniqueId' in item)
+            self.incoming_count += chunk_count
+            print(f"  - 이번 청크의 UniqueId {chunk_count}개 추가. 현재까지 총 {self.incoming_count}개 수신.") # 기존 print 유지
 
-            # 디버깅: 진행 업데이트 브로드캐스트
-            print(f"  ➡️ [{self.__class__.__name__}] 데이터 진행률 업데이트 정보를 프론트엔드로 전달합니다.")
-            await self.channel_layer.group_send(
-                FrontendConsumer.frontend_group_name,
-                {"type": "broadcast_progress", "data": data}
-            )
+            # 프론트엔드는 진행률만 사용하므로 객체 데이터(elements)는 빼고 전달
+            progress_payload = {k: v for k, v in payload.items() if k != 'elements'}
             if project_id and elements_data:
-                # 디버깅: DB 동기화 시작
-                print(f"  🔄 [{self.__class__.__name__}] 수신한 {len(elements_data)}개 객체에 대한 DB 동기화를 시작합니다 (Project: {project_id}).")
-                await asyncio.shield(self.sync_chunk_of_elements(project_id, elements_data))
+                # ▼▼▼ [수정] DB 저장은 writer task가 처리: 큐가 가득 차면 여기서 대기 (backpressure) ▼▼▼
+                if self.ingest_queue is None:
+                    await self.start_ingest_writer()
+                if self.sync_generation is None:
+                    self.sync_generation = await begin_sync_generation(project_id)
+                print(f"  🔄 [{self.__class__.__name__}] 수신한 {len(elements_data)}개 객체를 저장 큐에 추가합니다 (대기 중인 청크: {self.ingest_queue.qsize()}).")
+                await self.ingest_queue.put((project_id, elements_data, progress_payload, self.sync_generation, self.ingest_session_id))
+                # 진행률 브로드캐스트와 chunk_ack는 writer task가 저장을 마친 뒤 전송
+                # ▲▲▲ [수정] 여기까지 ▲▲▲
+            else:
+                await self.send_chunk_ack(progress_payload)
+                print(f"  ➡️ [{self.__class__.__name__}] 데이터 진행률 업데이트 정보를 프론트엔드로 전달합니다.")
+                await send_to_frontend(
+                    self.channel_layer, project_id, 'progress',
+                    {"type": "broadcast_progress", "data": {**data, 'payload': progress_payload}}
+                )
 
         elif msg_type == 'fetch_progress_complete':
             print("[DEBUG] 'fetch_progress_complete' 수신. 동기화를 마무리하고 삭제 작업을 시작합니다.") # 기존 print 유지
-            if self.project_id_for_fetch:
+            # 저장 큐에 남은 청크를 모두 기록한 뒤에 삭제 작업 진행
+            await self.stop_ingest_writer(drain=True)
+            failed_chunks = (self.ingest_stats or {}).get('failed_chunks', 0)
+            if self.ingest_session_id:
+                # 재개된 세션이면 이전 연결에서 실패한 청크까지 포함하여 판단
+                session_failed = await complete_ingest_session(self.ingest_session_id, failed=bool(payload.get('error') or failed_chunks))
+                failed_chunks = max(failed_chunks, len(session_failed))
+                self.ingest_session_id = None
+            if payload.get('error'):
+                print(f"[WARNING] 커넥터 오류로 전송이 중단되어 삭제 작업을 건너뜁니다: {payload.get('error')}")
+            elif failed_chunks:
+                # 저장에 실패한 청크의 객체는 generation이 기록되지 않았으므로 삭제하면 안 됨
+                print(f"[WARNING] 저장에 실패한 청크 {failed_chunks}개가 있어 삭제 작업을 건너뜁니다. 다시 동기화하면 정리됩니다.")
+            elif self.project_id_for_fetch and self.sync_generation is not None:
                 # 디버깅: 삭제 작업 시작
-                print(f"  🗑️ [{self.__class__.__name__}] 오래된 객체 삭제 작업을 시작합니다 (Project: {self.project_id_for_fetch}).")
-                await cleanup_old_elements(self.project_id_for_fetch, self.all_incoming_uids)
+                print(f"  🗑️ [{self.__class__.__name__}] generation {self.sync_generation} 이전의 오래된 객체 삭제 작업을 시작합니다 (Project: {self.project_id_for_fetch}).")
+                await cleanup_stale_elements(self.project_id_for_fetch, self.sync_generation)
             else:
                 print("[WARNING] 'project_id_for_fetch'가 설정되지 않아 삭제 작업을 건너뜁니다.") # 기존 print 유지
+            self.sync_manifest = None
+            self.sync_generation = None
 
             # 디버깅: 완료 브로드캐스트
             print(f"  ➡️ [{self.__class__.__name__}] 데이터 가져오기 완료 정보를 프론트엔드로 전달합니다.")
-            await self.channel_layer.group_send(
-                FrontendConsumer.frontend_group_name,
+            await send_to_frontend(
+                self.channel_layer, self.project_id_for_fetch, 'progress',
                 {"type": "broadcast_progress", "data": data}
             )
+        # ▼▼▼ [추가] 연결이 끊겼던 전송 세션 이어받기 ▼▼▼
+        elif msg_type == 'resume_ingest':
+            await self.resume_ingest_session(payload.get('session_id'))
+        # ▲▲▲ [추가] 여기까지 ▲▲▲
         else:
             print(f"[WARNING] 처리되지 않은 메시지 유형입니다: {msg_type}") # 기존 print 유지
 
+    @property
+    def connector_source(self):
+        return 'blender' if getattr(self, 'group_name', None) == 'blender_broadcast_group' else 'revit'
+
+    # ▼▼▼ [추가] 전송 세션 재개 ▼▼▼
+    async def resume_ingest_session(self, session_id):
+        """
+        커넥터가 재접속 후 보낸 세션 ID로 동기화 상태(프로젝트, generation, manifest hash)를 복원하고,
+        마지막으로 저장이 끝난 청크 다음 번호를 알려줍니다. 재개할 수 없으면 resumable=False로 응답합니다.
+        """
+        print(f"[DEBUG] 'resume_ingest' 수신. 세션 {session_id} 재개를 시도합니다.")
+        session, reason = await load_resumable_ingest_session(session_id)
+        if session is None:
+            print(f"  - 세션을 이어받을 수 없습니다: {reason}")
+            await self.send_message({'command': 'ingest_resume_response', 'session_id': session_id, 'resumable': False, 'reason': reason})
+            return
+
+        self.ingest_session_id = str(session.id)
+        self.project_id_for_fetch = str(session.project_id)
+        self.sync_generation = session.sync_generation
+        self.sync_manifest = session.source_hashes or None
+        self.incoming_count = session.acked_element_count
+        await self.start_ingest_writer()
+        print(f"  - 세션 재개: 프로젝트 {self.project_id_for_fetch}, generation {self.sync_generation}, 청크 {session.next_chunk_index}부터 수신 (저장 완료 {session.acked_element_count}/{session.total_elements}개)")
+
+        await self.send_message({
+            'command': 'ingest_resume_response',
+            'session_id': self.ingest_session_id,
+            'resumable': True,
+            'project_id': self.project_id_for_fetch,
+            'next_chunk_index': session.next_chunk_index,
+            'acked_element_count': session.acked_element_count,
+            'total_elements': session.total_elements,
+        })
+        await send_to_frontend(
+            self.channel_layer, self.project_id_for_fetch, 'progress',
+            {"type": "broadcast_progress", "data": {'type': 'fetch_progress_update', 'payload': {
+                'processed_count': session.acked_element_count,
+                'total_elements': session.total_elements,
+                'resumed': True,
+            }}}
+        )
+    # ▲▲▲ [추가] 여기까지 ▲▲▲
+
+    # ▼▼▼ [추가] 청크 저장 큐 / DB writer task ▼▼▼
+    async def start_ingest_writer(self):
+        await self.stop_ingest_writer(drain=True)
+        self.ingest_queue = asyncio.Queue(maxsize=INGEST_QUEUE_MAXSIZE)
+        self.ingest_stats = {'chunks': 0, 'failed_chunks': 0, 'total_write_ms': 0.0}
+        self.ingest_writer_task = asyncio.create_task(self.ingest_writer_loop(self.ingest_queue))
+
+    async def stop_ingest_writer(self, drain=True):
+        queue, task = getattr(self, 'ingest_queue', None), getattr(self, 'ingest_writer_task', None)
+        self.ingest_queue = None
+        self.ingest_writer_task = None
+        if queue is None or task is None:
+            return
+        if drain:
+            await queue.put(None)
+            await task
+        else:
+            task.cancel()
+
+    async def ingest_writer_loop(self, queue):
+        """큐에서 청크를 꺼내 순서대로 DB에 저장하고, 청크마다 커넥터에 ack(credit)를 보냅니다."""
+        while True:
+            item = await queue.get()
+            if item is None:
+                break
+            project_id, elements_data, progress_payload, sync_generation, session_id = item
+            started = time.perf_counter()
+            error = None
+            try:
+                await asyncio.shield(self.sync_chunk_of_elements(project_id, elements_data, self.sync_manifest, sync_generation))
+            except Exception as e:
+                error = str(e)
+                self.ingest_stats['failed_chunks'] += 1
+                print(f"[ERROR][{self.__class__.__name__}] 청크 저장 실패: {e}")
+            if session_id:
+                # ack 전에 checkpoint를 기록해야 커넥터가 ack를 받은 청크는 재개 시 다시 보내지 않음
+                try:
+                    await checkpoint_ingest_chunk(session_id, progress_payload.get('chunk_index'), progress_payload.get('processed_count'), error is None)
+                except Exception as e:
+                    print(f"[ERROR][{self.__class__.__name__}] 청크 checkpoint 기록 실패: {e}")
+            write_ms = round((time.perf_counter() - started) * 1000, 1)
+            self.ingest_stats['chunks'] += 1
+            self.ingest_stats['total_write_ms'] += write_ms
+
+            ingest_info = {
+                'queue_depth': queue.qsize(),
+                'queue_capacity': queue.maxsize,
+                'write_latency_ms': write_ms,
+                'avg_write_latency_ms': round(self.ingest_stats['total_write_ms'] / self.ingest_stats['chunks'], 1),
+            }
+            print(f"  💾 [{self.__class__.__name__}] 청크 저장 완료: {len(elements_data)}개, {write_ms}ms (대기 중인 청크: {ingest_info['queue_depth']})")
+            try:
+                await self.send_chunk_ack(progress_payload, ingest_info, error)
+                await send_to_frontend(
+                    self.channel_layer, project_id, 'progress',
+                    {"type": "broadcast_progress", "data": {'type': 'fetch_progress_update', 'payload': {**progress_payload, **ingest_info}}}
+                )
+            except Exception as e:
+                print(f"[ERROR][{self.__class__.__name__}] chunk_ack 전송 실패: {e}")
+
+    async def send_chunk_ack(self, progress_payload, ingest_info=None, error=None):
+        """청크 처리 완료를 알려 커넥터가 다음 청크를 보낼 수 있게 합니다. (credit 1개 반환)"""
+        ack = {
+            'command': 'chunk_ack',
+            'chunk_index': progress_payload.get('chunk_index'),
+            'processed_count': progress_payload.get('processed_count'),
+            'credit': 1,
+            'window': INGEST_CREDIT_WINDOW,
+        }
+        ack.update(ingest_info or {})
+        if error:
+            ack['error'] = error
+        await self.send_message(ack)
+    # ▲▲▲ [추가] 여기까지 ▲▲▲
+
     async def send_command(self, event):
         command_data = event['command_data']
 
@@ -392,21 +897,37 @@ class RevitConsumer(AsyncWebsocketConsumer):
 
         print(f"➡️  [{self.__class__.__name__}] '{self.group_name}' 그룹의 클라이언트로 명령을 보냅니다: {command_data.get('command')}") # 기존 print 유지
         try: # 디버깅: send 실패 시 로그 추가
-            await self.send(text_data=json.dumps(command_data))
+            await self.send_message(command_data)
         except Exception as e:
             print(f"[ERROR][{self.__class__.__name__}] Failed to send command to client: {e}")
 
 
     @database_sync_to_async
-    def sync_chunk_of_elements(self, project_id, parsed_data):
+    def sync_chunk_of_elements(self, project_id, parsed_data, source_hashes=None, sync_generation=0):
+        """
+        source_hashes: delta 동기화 manifest {UniqueId: content_hash}. 저장해 두었다가 다음 manifest 비교에 사용합니다.
+        sync_generation: 이 청크의 객체(생성/수정/변경 없음 모두)에 기록할 동기화 generation.
+        저장에 실패하면 예외를 그대로 올려 writer task가 세션의 삭제 작업을 건너뛰도록 합니다.
+        """
         print(f"  [DB Sync] 청크 동기화 시작: {len(parsed_data)}개 객체") # 기존 print 유지
+        source_hashes = source_hashes or {}
         try:
             project = Project.objects.get(id=project_id)
             uids_in_chunk = [item['UniqueId'] for item in parsed_data if item and 'UniqueId' in item]
-            existing_elements_map = {el.element_unique_id: el for el in project.raw_elements.filter(element_unique_id__in=uids_in_chunk)}
-            print(f"    - DB에서 기존 객체 {len(existing_elements_map)}개 찾음.") # 디버깅 추가
-
-            to_update, to_create = [], []
+            # ▼▼▼ [수정] raw_data 전체 대신 (UniqueId, id, digest)만 조회하여 변경 여부를 해시로 비교 ▼▼▼
+            existing_digest_map = {
+                uid: (pk, digest, source_hash)
+                for uid, pk, digest, source_hash in project.raw_elements.filter(element_unique_id__in=uids_in_chunk)
+                .values_list('element_unique_id', 'id', 'raw_data_digest', 'source_hash')
+            }
+            print(f"    - DB에서 기존 객체 {len(existing_digest_map)}개 찾음.") # 디버깅 추가
+            # ▲▲▲ [수정] 여기까지 ▲▲▲
+
+            to_update, to_create, created_objs = [], [], []
+            hash_only_updates = []  # 내용은 같고 커넥터 content hash만 바뀐 객체
+            unchanged_ids = []      # 내용이 같은 객체 (generation만 기록)
+            unchanged_count = 0
+            chunk_meshes = {}  # {digest: pack_mesh 결과} - 이번 청크에서 분리한 메쉬
             for item in parsed_data:
                 if not item or 'UniqueId' not in item: continue
                 uid = item['UniqueId']
@@ -440,33 +961,64 @@ class RevitConsumer(AsyncWebsocketConsumer):
                 # ▲▲▲ [추가] 여기까지 ▲▲▲
                 # ▲▲▲ [추가] 여기까지 ▲▲▲
 
-                if uid in existing_elements_map:
-                    elem = existing_elements_map[uid]
-                    # [개선] raw_data가 실제로 변경되었는지 확인 후 업데이트 목록에 추가 (선택 사항)
-                    if elem.raw_data != processed_item:
-                        elem.raw_data = processed_item
-                        to_update.append(elem)
+                # ▼▼▼ [추가] 메쉬(verts/faces)는 GeometryBlob으로 분리하고 raw_data에는 참조(stub)만 남김 ▼▼▼
+                blob_digest, packed_meshes = externalize_geometry(processed_item)
+                listify_geometry_arrays(processed_item)
+                # ▲▲▲ [추가] 여기까지 ▲▲▲
+
+                digest = compute_raw_data_digest(processed_item)
+                source_hash = source_hashes.get(uid, '')
+                if uid in existing_digest_map:
+                    pk, stored_digest, stored_source_hash = existing_digest_map[uid]
+                    # digest가 같으면 변경 없음: 역직렬화, bulk_update, 체적 재계산 모두 생략
+                    if stored_digest == digest:
+                        unchanged_count += 1
+                        unchanged_ids.append(pk)
+                        if source_hash and source_hash != stored_source_hash:
+                            hash_only_updates.append(RawElement(id=pk, source_hash=source_hash))
+                        continue
+                    to_update.append(RawElement(id=pk, project=project, element_unique_id=uid, raw_data=processed_item, raw_data_digest=digest, source_hash=source_hash, geometry_blob_id=blob_digest, sync_generation=sync_generation))
                 else:
-                    to_create.append(RawElement(project=project, element_unique_id=uid, raw_data=processed_item))
+                    to_create.append(RawElement(project=project, element_unique_id=uid, raw_data=processed_item, raw_data_digest=digest, source_hash=source_hash, geometry_blob_id=blob_digest, sync_generation=sync_generation))
+                chunk_meshes.update(packed_meshes)
+
+            if unchanged_count:
+                print(f"    - {unchanged_count}개 객체는 변경 없음 (digest 일치). 건너뜁니다.")
+            if hash_only_updates:
+                RawElement.objects.bulk_update(hash_only_updates, ['source_hash'])
+            if unchanged_ids:
+                RawElement.objects.filter(id__in=unchanged_ids).update(sync_generation=sync_generation)
+
+            # 체적은 float32로 저장되기 전의 원본 정밀도 메쉬로 계산
+            volume_meshes = {d: (p['vertex_array'], p['face_array']) for d, p in chunk_meshes.items()}
+            if chunk_meshes:
+                stored_count = GeometryBlob.store_packed(chunk_meshes)
+                print(f"    - GeometryBlob: 메쉬 {len(chunk_meshes)}종 중 {stored_count}종 새로 저장 (나머지는 기존 blob 재사용)")
 
             if to_update:
                 updated_ids = [el.id for el in to_update] # 디버깅용
-                RawElement.objects.bulk_update(to_update, ['raw_data'])
+                RawElement.objects.bulk_update(to_update, ['raw_data', 'raw_data_digest', 'source_hash', 'geometry_blob', 'sync_generation'])
                 print(f"    - {len(to_update)}개 객체 정보 업데이트 완료. (IDs: {updated_ids[:5]}...)") # 기존 print 유지 (ID 추가)
 
-                # Geometry volume 계산 및 업데이트
-                updated_with_volume = []
-                for elem in to_update:
-                    volume = elem.calculate_geometry_volume()
-                    if volume is not None:
-                        elem.geometry_volume = volume
-                        updated_with_volume.append(elem)
+                # Geometry volume 일괄 계산 및 업데이트
+                updated_with_volume = apply_geometry_volumes(to_update, volume_meshes)
                 if updated_with_volume:
+                    # bulk_update는 pre_save 시그널을 거치지 않으므로 체적이 바뀐 객체의 분할을 먼저 일괄 무효화
+                    changed_count, split_count = invalidate_splits_for_volume_changes(
+                        {el.id: el.geometry_volume for el in updated_with_volume}
+                    )
+                    if split_count:
+                        print(f"    - 체적이 바뀐 객체 {changed_count}개의 분할 객체 {split_count}개를 무효화했습니다.")
                     RawElement.objects.bulk_update(updated_with_volume, ['geometry_volume'])
                     print(f"    - {len(updated_with_volume)}개 객체의 Geometry volume 계산 완료.")
 
             if to_create:
-                created_objs = RawElement.objects.bulk_create(to_create, ignore_conflicts=True)
+                RawElement.objects.bulk_create(to_create, ignore_conflicts=True)
+                # ignore_conflicts로 건너뛴 행(같은 element_unique_id가 이미 있음)은 bulk_create 결과에도 남으므로 실제 저장된 행만 다시 조회
+                persisted_ids = set(RawElement.objects.filter(id__in=[el.id for el in to_create]).values_list('id', flat=True))
+                created_objs = [el for el in to_create if el.id in persisted_ids]
+                if len(created_objs) != len(to_create):
+                    print(f"    - {len(to_create) - len(created_objs)}개 객체는 이미 존재하는 element_unique_id와 충돌하여 생성되지 않았습니다.")
                 print(f"    - {len(created_objs)}개 객체 새로 생성 완료.") # 기존 print 유지 (실제 생성된 수 사용)
 
                 # ▼▼▼ [DEBUG] 생성된 객체의 materials 확인 ▼▼▼
@@ -477,85 +1029,231 @@ class RevitConsumer(AsyncWebsocketConsumer):
                             print(f"[DEBUG] DB saved element {elem.element_unique_id} with materials: color={mat.get('diffuse_color')}, transparency={mat.get('transparency')}, style={mat.get('style_name')}, name={mat.get('name')}")
                 # ▲▲▲ [DEBUG] 끝 ▲▲▲
 
-                # Geometry volume 계산 및 업데이트
-                created_with_volume = []
-                for elem in created_objs:
-                    volume = elem.calculate_geometry_volume()
-                    if volume is not None:
-                        elem.geometry_volume = volume
-                        created_with_volume.append(elem)
+                # Geometry volume 일괄 계산 및 업데이트
+                created_with_volume = apply_geometry_volumes(created_objs, volume_meshes)
                 if created_with_volume:
                     RawElement.objects.bulk_update(created_with_volume, ['geometry_volume'])
                     print(f"    - {len(created_with_volume)}개 객체의 Geometry volume 계산 완료.")
 
+            if to_update or created_objs:
+                # 변경 journal 기록 (뷰어 스냅샷 무효화 포함) - 실제로 저장된 객체만
+                ProjectChange.record(project_id, ProjectChange.KIND_ELEMENTS, [el.id for el in to_update] + [el.id for el in created_objs])
+
         except Exception as e:
             print(f"[ERROR] sync_chunk_of_elements DB 작업 중 오류 발생: {e}") # 기존 print 유지
+            raise
 
 @database_sync_to_async
-def cleanup_old_elements(project_id, incoming_uids):
-    print(f"  [DB Cleanup] 삭제 작업 시작 (Project ID: {project_id})") # 기존 print 유지
-    try:
-        project = Project.objects.get(id=project_id)
-
-        # [개선] QuerySet 사용 최적화 (values_list 대신 set 직접 사용)
-        db_uids = set(project.raw_elements.values_list('element_unique_id', flat=True))
-        print(f"    - 현재 DB에 존재하는 UniqueId 수: {len(db_uids)}") # 기존 print 유지
-
-        incoming_uids_set = set(incoming_uids)
-        print(f"    - 이번 동기화에서 받은 UniqueId 수: {len(incoming_uids_set)}") # 기존 print 유지
-
-        to_delete_uids = db_uids - incoming_uids_set
-        print(f"    - 삭제 대상 UniqueId 수: {len(to_delete_uids)}") # 기존 print 유지
-
-        if to_delete_uids:
-            print(f"    - 삭제 대상 ID (최대 10개 표시): {list(to_delete_uids)[:10]}") # 기존 print 유지
+def begin_sync_generation(project_id):
+    """동기화 세션을 시작하며 프로젝트의 새 generation 번호를 발급합니다. (단조 증가)"""
+    with transaction.atomic():
+        Project.objects.filter(id=project_id).update(sync_generation_seq=F('sync_generation_seq') + 1)
+        generation = Project.objects.filter(id=project_id).values_list('sync_generation_seq', flat=True).first()
+    print(f"  [DB Sync] 동기화 generation {generation} 시작 (Project: {project_id})")
+    return generation
+
+# ▼▼▼ [추가] 재개 가능한 전송 세션 (IngestSession) ▼▼▼
+@database_sync_to_async
+def create_ingest_session(project_id, source, sync_generation, total_elements, source_hashes=None):
+    """
+    새 전송 세션을 만들고 ID를 반환합니다.
+    generation은 프로젝트 단위이므로 같은 프로젝트의 이전 active 세션은 모두 abandoned로 바꿉니다.
+    """
+    IngestSession.objects.filter(project_id=project_id, status='active').update(status='abandoned', updated_at=timezone.now())
+    session = IngestSession.objects.create(
+        project_id=project_id,
+        source=source,
+        sync_generation=sync_generation or 0,
+        total_elements=total_elements,
+        source_hashes=source_hashes or {},
+    )
+    print(f"  [DB Sync] 전송 세션 {session.id} 시작 ({source}, generation {session.sync_generation}, {total_elements}개)")
+    return str(session.id)
 
-            # ▼▼▼ [추가] RawElement를 삭제하기 전에, 연관된 데이터 확인 및 정리 ▼▼▼
+@database_sync_to_async
+def checkpoint_ingest_chunk(session_id, chunk_index, processed_count, succeeded):
+    """
+    청크 저장 결과를 세션에 기록합니다.
+    last_acked_chunk는 0번부터 연속으로 저장된 청크까지만 전진하므로, 실패한 청크가 있으면 재개 시 그 청크부터 다시 받습니다.
+    """
+    if chunk_index is None:
+        return None
+    with transaction.atomic():
+        session = IngestSession.objects.select_for_update().filter(id=session_id).first()
+        if session is None:
+            return None
+        failed_chunks = [index for index in session.failed_chunks if index != chunk_index]
+        if not succeeded:
+            failed_chunks.append(chunk_index)
+        elif chunk_index == session.last_acked_chunk + 1:
+            session.last_acked_chunk = chunk_index
+            session.acked_element_count = processed_count or session.acked_element_count
+        session.failed_chunks = failed_chunks
+        session.save(update_fields=['last_acked_chunk', 'acked_element_count', 'failed_chunks', 'updated_at'])
+    return session.last_acked_chunk
 
-            # 1. 연관된 SplitElement 확인 (CASCADE로 자동 삭제됨)
-            split_elements_count = SplitElement.objects.filter(
-                project=project,
-                raw_element__element_unique_id__in=to_delete_uids
-            ).count()
-            print(f"    - [SplitElement Cleanup] {split_elements_count}개의 분할 객체가 CASCADE로 자동 삭제될 예정입니다.") # 기존 print 유지
+@database_sync_to_async
+def complete_ingest_session(session_id, failed=False):
+    """세션을 종료 상태로 바꾸고, 저장에 실패한 청크 번호 목록을 반환합니다. (failed: 이번 연결에서 오류/실패가 있었는지)"""
+    with transaction.atomic():
+        session = IngestSession.objects.select_for_update().filter(id=session_id).first()
+        if session is None:
+            return []
+        session.status = 'failed' if (failed or session.failed_chunks) else 'completed'
+        session.save(update_fields=['status', 'updated_at'])
+    print(f"  [DB Sync] 전송 세션 {session_id} 종료 ({session.status}, 마지막 청크 {session.last_acked_chunk})")
+    return list(session.failed_chunks)
 
-            # 2. 연관된 QuantityMember 확인 및 삭제 (SET_NULL이므로 명시적 삭제)
-            print(f"    - [QuantityMember Cleanup] 삭제될 RawElement와 연관된 수량산출부재를 먼저 삭제합니다.") # 기존 print 유지
+@database_sync_to_async
+def load_resumable_ingest_session(session_id):
+    """이어받을 수 있는 세션이면 (session, None), 아니면 (None, 이유)를 반환합니다."""
+    if not session_id:
+        return None, 'session_id가 없습니다.'
+    try:
+        session = IngestSession.objects.select_related('project').filter(id=session_id).first()
+    except (ValueError, ValidationError):
+        session = None
+    if session is None:
+        return None, '세션을 찾을 수 없습니다.'
+    if session.status != 'active':
+        return None, f'이미 종료된 세션입니다 ({session.status}).'
+    if session.updated_at < timezone.now() - INGEST_SESSION_TTL:
+        return None, '세션이 만료되었습니다.'
+    if session.project.sync_generation_seq != session.sync_generation:
+        # 이후 다른 동기화가 시작되었으므로 이 세션의 generation으로 이어서 기록하면 안 됨
+        return None, '이후에 새 동기화가 시작되었습니다.'
+    return session, None
+# ▲▲▲ [추가] 여기까지 ▲▲▲
 
-            # raw_element 필드가 null이 아닌(즉, BIM 객체와 연계된) 수량산출부재 중에서
-            # 삭제될 RawElement의 unique_id를 가진 부재들을 찾아 삭제합니다.
-            deletable_members = QuantityMember.objects.filter(
-                project=project,
-                raw_element__element_unique_id__in=to_delete_uids
-            )
+@database_sync_to_async
+def get_sync_manifest_diff(project_id, manifest, full_sync=False, sync_generation=None):
+    """
+    delta 동기화: manifest {UniqueId: content_hash}를 DB의 source_hash와 비교합니다.
+    sync_generation이 주어지면 다시 전송되지 않을(변경 없는) 객체에 generation을 배치로 기록합니다.
+    Returns: (needed_uids, deleted_uids, unchanged_count) - connections.sync_utils.diff_sync_manifest 참고
+    """
+    stored_hashes = dict(
+        RawElement.objects.filter(project_id=project_id).values_list('element_unique_id', 'source_hash')
+    )
+    print(f"  [DB Manifest] DB 객체 {len(stored_hashes)}개와 manifest {len(manifest)}개 비교")
+    needed_uids, deleted_uids, unchanged_count = diff_sync_manifest(manifest, stored_hashes, full_sync)
+
+    if sync_generation is not None and unchanged_count:
+        needed_set = set(needed_uids)
+        unchanged_uids = [uid for uid in manifest if uid in stored_hashes and uid not in needed_set]
+        for i in range(0, len(unchanged_uids), SYNC_STAMP_BATCH_SIZE):
+            RawElement.objects.filter(
+                project_id=project_id, element_unique_id__in=unchanged_uids[i:i + SYNC_STAMP_BATCH_SIZE]
+            ).update(sync_generation=sync_generation)
+    return needed_uids, deleted_uids, unchanged_count
 
-            member_deleted_count, deleted_details = deletable_members.delete() # 상세 정보 받을 수 있음
-            print(f"    - [QuantityMember Cleanup] {member_deleted_count}개의 연관된 수량산출부재를 삭제했습니다. Details: {deleted_details}") # 기존 print 유지 (상세 정보 추가)
-            # ▲▲▲ [추가] 여기까지 입니다. ▲▲▲
+@database_sync_to_async
+def cleanup_stale_elements(project_id, sync_generation):
+    """
+    이번 동기화 세션(sync_generation)에서 확인되지 않은 RawElement를 배치 단위로 삭제합니다.
 
-            deleted_count, deleted_raw_details = project.raw_elements.filter(element_unique_id__in=to_delete_uids).delete()
-            print(f"    - DB에서 {deleted_count}개의 오래된 RawElement 객체를 성공적으로 삭제했습니다. Details: {deleted_raw_details}") # 기존 print 유지 (상세 정보 추가)
-            print(f"    - ✅ CASCADE 효과로 인해 관련된 SplitElement, QuantityMember(분할), CostItem(분할)도 함께 삭제되었습니다.")
+    - UniqueId 목록을 메모리에 올리지 않고 sync_generation < 현재 generation 조건으로 STALE_DELETE_BATCH_SIZE개씩 삭제
+    - 배치마다 연관 QuantityMember(SET_NULL이므로 명시적 삭제)와 SplitElement(+ 분할 부재/산출항목 CASCADE)를 함께 정리
+    - 세션이 중간에 끊기면 이 단계가 실행되지 않으므로 기존 객체는 그대로 남아있습니다. (다음 동기화에서 정리)
+    """
+    print(f"  [DB Cleanup] 삭제 작업 시작 (Project ID: {project_id}, generation < {sync_generation})") # 기존 print 유지
+    try:
+        stale_qs = RawElement.objects.filter(project_id=project_id, sync_generation__lt=sync_generation)
+        deleted_total = member_total = split_total = 0
+        while True:
+            batch_ids = list(stale_qs.values_list('id', flat=True)[:STALE_DELETE_BATCH_SIZE])
+            if not batch_ids:
+                break
+            with transaction.atomic():
+                member_deleted, _ = QuantityMember.objects.filter(project_id=project_id, raw_element_id__in=batch_ids).delete()
+                split_deleted, _ = SplitElement.objects.filter(project_id=project_id, raw_element_id__in=batch_ids).delete()
+                deleted_count, _ = RawElement.objects.filter(id__in=batch_ids).delete()
+            ProjectChange.record(project_id, ProjectChange.KIND_ELEMENTS_DELETED, batch_ids)
+            if member_deleted:
+                ProjectChange.record(project_id, ProjectChange.KIND_QUANTITY_MEMBERS)
+                ProjectChange.record(project_id, ProjectChange.KIND_COST_ITEMS)
+            if split_deleted:
+                ProjectChange.record(project_id, ProjectChange.KIND_SPLITS)
+            member_total += member_deleted
+            split_total += split_deleted
+            deleted_total += deleted_count
+            print(f"    - 배치 삭제: RawElement {len(batch_ids)}개 (누적 {deleted_total}개)")
+
+        if deleted_total:
+            print(f"    - [QuantityMember Cleanup] 연관된 수량산출부재 등 {member_total}개 행을 삭제했습니다.")
+            print(f"    - [SplitElement Cleanup] 분할 객체 및 CASCADE 대상 {split_total}개 행을 삭제했습니다.")
+            print(f"    - DB에서 오래된 객체 관련 {deleted_total}개 행을 성공적으로 삭제했습니다.")
         else:
             print("    - 삭제할 객체가 없습니다. 모든 데이터가 최신 상태입니다.") # 기존 print 유지
 
+        # 정리까지 끝난 generation 기록
+        Project.objects.filter(id=project_id, committed_sync_generation__lt=sync_generation).update(
+            committed_sync_generation=sync_generation
+        )
+
+        # 더 이상 참조되지 않는 GeometryBlob 정리
+        orphan_count = GeometryBlob.purge_orphans()
+        if orphan_count:
+            print(f"    - [GeometryBlob Cleanup] 참조되지 않는 메쉬 blob {orphan_count}개를 삭제했습니다.")
+
     except Exception as e:
-        print(f"[ERROR] cleanup_old_elements DB 작업 중 오류 발생: {e}") # 기존 print 유지
+        print(f"[ERROR] cleanup_stale_elements DB 작업 중 오류 발생: {e}") # 기존 print 유지
 
-class FrontendConsumer(AsyncWebsocketConsumer):
+class FrontendConsumer(MessageCodecMixin, AsyncWebsocketConsumer):
     frontend_group_name = 'frontend_group'
     async def connect(self):
         # 디버깅: 프론트엔드 연결
         print(f"✅ [{self.__class__.__name__}] 웹 브라우저 클라이언트가 '{self.frontend_group_name}' 그룹에 참여합니다.")
-        await self.channel_layer.group_add(self.frontend_group_name, self.channel_name); await self.accept()
+        await self.channel_layer.group_add(self.frontend_group_name, self.channel_name)
+        # 프로젝트별 그룹 구독 상태 (get_tags/get_all_elements 요청이나 subscribe_project 메시지로 설정)
+        self.subscribed_project_id = None
+        self.subscribed_groups = set()
+        self.interests = set(FRONTEND_TOPICS)
+        self.viewer_stream_task = None
+        self.viewer_stream_id = 0
+        self.viewer_stream_credits = None
+        # ▼▼▼ [추가] subprotocol 협상: 브라우저가 지원하면 MessagePack 바이너리 프레임 사용 ▼▼▼
+        await self.accept(subprotocol=self.negotiate_binary_mode())
+        # ▲▲▲ [추가] 여기까지 ▲▲▲
     async def disconnect(self, close_code):
         # 디버깅: 프론트엔드 연결 해제
         print(f"❌ [{self.__class__.__name__}] 웹 브라우저 클라이언트가 '{self.frontend_group_name}' 그룹에서 나갑니다 (Code: {close_code}).")
         await self.channel_layer.group_discard(self.frontend_group_name, self.channel_name)
+        for group in getattr(self, 'subscribed_groups', ()):
+            await self.channel_layer.group_discard(group, self.channel_name)
+        self.cancel_viewer_stream()
+
+    # ▼▼▼ [추가] 프로젝트별 그룹 구독 ▼▼▼
+    async def subscribe_project(self, project_id, interests=None):
+        """
+        project_id 프로젝트의 broadcast 그룹으로 구독을 옮깁니다. (이전 프로젝트 그룹에서는 나감)
+        interests를 주면 해당 종류(FRONTEND_TOPICS)의 broadcast만 받습니다.
+        """
+        try:
+            project_id = str(uuid.UUID(str(project_id)))
+        except ValueError:
+            print(f"[WARN][{self.__class__.__name__}] 구독할 프로젝트 ID가 올바르지 않습니다: {project_id}")
+            return
+        if interests is not None:
+            self.interests = {topic for topic in interests if topic in FRONTEND_TOPICS}
+        groups = {frontend_project_group(project_id, topic) for topic in self.interests}
+        for group in self.subscribed_groups - groups:
+            await self.channel_layer.group_discard(group, self.channel_name)
+        for group in groups - self.subscribed_groups:
+            await self.channel_layer.group_add(group, self.channel_name)
+        self.subscribed_project_id = project_id
+        self.subscribed_groups = groups
+        print(f"[DEBUG][{self.__class__.__name__}] 프로젝트 {project_id} 구독 (종류: {sorted(self.interests)})")
+
+    async def ensure_project_subscription(self, project_id):
+        """프로젝트 데이터를 요청한 연결은 그 프로젝트의 broadcast를 받도록 자동 구독합니다."""
+        if project_id and str(project_id) != self.subscribed_project_id:
+            await self.subscribe_project(project_id)
+    # ▲▲▲ [추가] 여기까지 ▲▲▲
 
 
-    async def receive(self, text_data):
-        data = json.loads(text_data)
+    async def receive(self, text_data=None, bytes_data=None):
+        data = self.decode_incoming(text_data, bytes_data)
         msg_type = data.get('type')
         payload = data.get('payload', {})
         print(f"✉️ [{self.__class__.__name__}] 웹 브라우저로부터 메시지 수신: type='{msg_type}'") # 기존 print 유지
@@ -565,42 +1263,64 @@ class FrontendConsumer(AsyncWebsocketConsumer):
             print(f"   ➡️  '{target_group}' 그룹으로 명령을 전달합니다: {payload}") # 기존 print 유지
             await self.channel_layer.group_send(target_group, {'type': 'send.command', 'command_data': payload})
 
+        elif msg_type == 'subscribe_project':
+            # interests: FRONTEND_TOPICS 중 받을 broadcast 종류 (생략하면 현재 설정 유지)
+            await self.subscribe_project(payload.get('project_id'), payload.get('interests'))
+
         # ▼▼▼ [수정] get_all_elements 메시지 처리 부분에 print문 추가 ▼▼▼
         elif msg_type == 'get_all_elements':
             project_id = payload.get('project_id')
             if project_id:
                 print(f"\n[DEBUG] 프론트엔드로부터 '{project_id}' 프로젝트의 모든 객체 데이터 요청을 받았습니다.") # 기존 print 유지
-                total_elements = await get_total_element_count(project_id)
-                print(f"[DEBUG] 총 {total_elements}개의 객체를 전송 시작합니다.") # 기존 print 유지
+                await self.ensure_project_subscription(project_id)
+                # ▼▼▼ [수정] 전송은 별도 task에서 진행 (전송 중에도 viewer_chunk_ack를 받아야 하므로) ▼▼▼
+                self.cancel_viewer_stream()
+                self.viewer_stream_id = getattr(self, 'viewer_stream_id', 0) + 1
+                self.viewer_stream_credits = asyncio.Semaphore(VIEWER_STREAM_WINDOW)
+                # geometry='lazy': 메쉬 없이 속성/bounding box만 먼저 보내고, 메쉬는 뷰어가 get_element_geometry로 요청
+                lazy_geometry = payload.get('geometry') == 'lazy'
+                # since_seq: 이미 데이터를 가진 클라이언트가 마지막으로 받은 변경 번호 -> 가능하면 변경분만 전송
+                since_seq = payload.get('since_seq')
+                if isinstance(since_seq, int) and not isinstance(since_seq, bool) and since_seq >= 0:
+                    try:
+                        replay = await get_change_replay(project_id, since_seq, self.binary_mode, lazy_geometry)
+                    except (ValidationError, ValueError) as e:
+                        print(f"[ERROR][{self.__class__.__name__}] 변경분 조회 실패: {e}")
+                        replay = None
+                    if replay is not None:
+                        await self.send_message({'type': 'changes_since', 'payload': replay})
+                        return
+                    print(f"[DEBUG] since_seq={since_seq} 이후 변경분을 만들 수 없어 전체 데이터를 전송합니다.")
+                self.viewer_stream_task = asyncio.create_task(
+                    self.stream_all_elements(project_id, self.viewer_stream_id, self.viewer_stream_credits, lazy_geometry)
+                )
+                # ▲▲▲ [수정] 여기까지 ▲▲▲
 
-                # ▼▼▼ [추가] 분할 객체 데이터 조회 ▼▼▼
-                split_elements, raw_element_ids_with_splits = await get_split_elements_for_project(project_id)
-                print(f"[DEBUG] {len(split_elements)}개의 활성 분할 객체를 찾았습니다.")
-                print(f"[DEBUG] {len(raw_element_ids_with_splits)}개의 BIM 원본 객체가 분할되었습니다.")
-                # ▲▲▲ [추가] 여기까지 ▲▲▲
+        elif msg_type == 'get_element_geometry':
+            project_id = payload.get('project_id')
+            element_ids = payload.get('element_ids') or []
+            if not project_id:
+                return
+            if len(element_ids) > VIEWER_GEOMETRY_REQUEST_LIMIT:
+                print(f"[WARN] get_element_geometry 요청 {len(element_ids)}개 중 {VIEWER_GEOMETRY_REQUEST_LIMIT}개만 처리합니다.")
+                element_ids = element_ids[:VIEWER_GEOMETRY_REQUEST_LIMIT]
+            try:
+                elements, meshes, missing = await get_element_meshes(project_id, element_ids, as_arrays=self.binary_mode)
+            except (ValidationError, ValueError) as e:
+                print(f"[ERROR][{self.__class__.__name__}] get_element_geometry 요청의 객체 ID가 올바르지 않습니다: {e}")
+                elements, meshes, missing = {}, {}, [str(element_id) for element_id in element_ids]
+            await self.send_message({
+                'type': 'element_geometry',
+                'request_id': payload.get('request_id'),
+                'elements': elements,
+                'meshes': meshes,
+                'missing': missing,
+            })
 
-                await self.send(text_data=json.dumps({
-                    'type': 'revit_data_start',
-                    'payload': {
-                        'total': total_elements,
-                        'split_elements': split_elements,  # ▼▼▼ [추가] 분할 객체 데이터 전송 ▼▼▼
-                        'raw_element_ids_with_splits': list(raw_element_ids_with_splits)  # ▼▼▼ [추가] 분할된 BIM 원본 ID 목록 ▼▼▼
-                    }
-                }))
-
-                CHUNK_SIZE = 1000 # 성능 테스트 후 조절 가능
-                sent_count = 0
-                for offset in range(0, total_elements, CHUNK_SIZE):
-                    chunk = await get_serialized_element_chunk(project_id, offset, CHUNK_SIZE)
-                    if chunk:
-                        await self.send(text_data=json.dumps({'type': 'revit_data_chunk', 'payload': chunk}))
-                        sent_count += len(chunk)
-                        # 디버깅: 청크 전송 로그 (너무 빈번할 수 있으므로 주석 처리 또는 조건부 출력 고려)
-                        # print(f"    [WebSocket Send] Sent chunk: {offset+1}-{sent_count}/{total_elements}")
-                    await asyncio.sleep(0.01) # 부하 분산을 위한 약간의 지연
-
-                print(f"[DEBUG] {sent_count}개 객체 전송을 완료했습니다 (총 {total_elements}개 대상).") # 기존 print 유지 (실제 전송된 수 포함)
-                await self.send(text_data=json.dumps({'type': 'revit_data_complete'}))
+        elif msg_type == 'viewer_chunk_ack':
+            # 프론트엔드가 청크 처리를 마침 -> 다음 청크 전송 허용
+            if payload.get('stream_id') == getattr(self, 'viewer_stream_id', None) and self.viewer_stream_credits:
+                self.viewer_stream_credits.release()
         # ▲▲▲ [수정] 여기까지 입니다. ▲▲▲
 
         elif msg_type == 'get_tags':
@@ -608,6 +1328,7 @@ class FrontendConsumer(AsyncWebsocketConsumer):
             if project_id:
                 # 디버깅: 태그 요청
                 print(f"[DEBUG] '{project_id}' 프로젝트의 태그 목록 요청 수신.")
+                await self.ensure_project_subscription(project_id)
                 tags = await self.db_get_tags(project_id)
                 await self.send_tags_update(tags)
         
@@ -627,7 +1348,7 @@ class FrontendConsumer(AsyncWebsocketConsumer):
             tags = await self.db_get_tags(project_id)
             # 디버깅: 태그 목록 브로드캐스트
             print(f"  ➡️ [{self.__class__.__name__}] 업데이트된 태그 목록을 모든 클라이언트로 브로드캐스트합니다.")
-            await self.channel_layer.group_send(self.frontend_group_name, {'type': 'broadcast_tags', 'tags': tags})
+            await send_to_frontend(self.channel_layer, project_id, 'tags', {'type': 'broadcast_tags', 'tags': tags})
 
         elif msg_type == 'delete_tag':
             project_id = payload.get('project_id')
@@ -644,38 +1365,38 @@ class FrontendConsumer(AsyncWebsocketConsumer):
             # 2. 변경된 전체 태그 목록을 모든 클라이언트에 브로드캐스트합니다.
             tags = await self.db_get_tags(project_id)
             print(f"  ➡️ [{self.__class__.__name__}] 업데이트된 태그 목록을 브로드캐스트합니다.")
-            await self.channel_layer.group_send(self.frontend_group_name, {'type': 'broadcast_tags', 'tags': tags})
+            await send_to_frontend(self.channel_layer, project_id, 'tags', {'type': 'broadcast_tags', 'tags': tags})
 
-            # 3. 만약 영향을 받은 element가 있었다면, 해당 element들의 최신 정보를 브로드캐스트합니다.
+            # 3. 만약 영향을 받은 element가 있었다면, 해당 element들의 태그 변경분을 브로드캐스트합니다.
             if affected_ids:
-                elements = await serialize_specific_elements(affected_ids)
-                print(f"  ➡️ [{self.__class__.__name__}] 영향 받은 {len(elements)}개 객체의 업데이트 정보를 브로드캐스트합니다.")
-                await self.channel_layer.group_send(self.frontend_group_name, {'type': 'broadcast_elements', 'elements': elements})
+                tags_by_element = await get_element_tag_ids(affected_ids)
+                print(f"  ➡️ [{self.__class__.__name__}] 영향 받은 {len(tags_by_element)}개 객체의 태그 변경분을 브로드캐스트합니다.")
+                await send_to_frontend(self.channel_layer, project_id, 'elements', {'type': 'broadcast_element_tags', 'tags_by_element': tags_by_element})
         elif msg_type in ['assign_tags', 'clear_tags']:
-            element_ids = payload.get('element_ids')
+            element_ids = payload.get('element_ids') or []
             if msg_type == 'assign_tags':
                 # 디버깅: 태그 할당 요청
                 print(f"[DEBUG] 태그 할당 요청: tag_id='{payload.get('tag_id')}', elements={len(element_ids)}개")
-                await self.db_assign_tags(payload.get('tag_id'), element_ids)
+                changes_by_project = await self.db_assign_tags(payload.get('tag_id'), element_ids)
             elif msg_type == 'clear_tags':
                 # 디버깅: 태그 제거 요청
                 print(f"[DEBUG] 태그 제거 요청: elements={len(element_ids)}개")
-                await self.db_clear_tags(element_ids)
-            elements = await serialize_specific_elements(element_ids)
-            # 디버깅: 객체 업데이트 브로드캐스트
-            print(f"  ➡️ [{self.__class__.__name__}] 업데이트된 {len(elements)}개 객체 정보를 브로드캐스트합니다.")
-            await self.channel_layer.group_send(self.frontend_group_name, {'type': 'broadcast_elements', 'elements': elements})
+                changes_by_project = await self.db_clear_tags(element_ids)
+            # 객체 전체(raw_data) 대신 실제로 바뀐 객체의 {객체 id: [태그 id]}만 브로드캐스트
+            for project_id, tags_by_element in changes_by_project.items():
+                print(f"  ➡️ [{self.__class__.__name__}] 태그가 바뀐 {len(tags_by_element)}개 객체의 변경분을 브로드캐스트합니다.")
+                await send_to_frontend(self.channel_layer, project_id, 'elements', {'type': 'broadcast_element_tags', 'tags_by_element': tags_by_element})
         # ▼▼▼ [추가] AI 학습 상태 폴링 요청 처리 ▼▼▼
         elif msg_type == 'get_training_status':
              task_id = payload.get('task_id')
              if task_id and task_id in training_progress:
                  print(f"[DEBUG] AI 학습 상태 요청 수신 (Task ID: {task_id}). 현재 상태 전송.")
-                 await self.send(text_data=json.dumps({
+                 await self.send_message({
                      'type': 'training_progress_update',
                      'project_id': payload.get('project_id'), # 원본 요청의 project_id 전달
                      'task_id': task_id,
                      'progress': training_progress[task_id]
-                 }))
+                 })
              else:
                  print(f"[WARN] 유효하지 않거나 완료된 Task ID({task_id})에 대한 상태 요청 수신.")
         # ▲▲▲ [추가] 여기까지 ▲▲▲
@@ -688,7 +1409,7 @@ class FrontendConsumer(AsyncWebsocketConsumer):
                 split_id = result['split_id']
                 print(f"[DEBUG] 분할 객체 저장 성공: {split_id}")
                 print(f"[DEBUG] 생성된 QuantityMembers: {result['created_qm_count']}, CostItems: {result['created_ci_count']}")
-                await self.send(text_data=json.dumps({
+                await self.send_message({
                     'type': 'split_saved',
                     'split_id': str(split_id),
                     'raw_element_id': str(payload.get('raw_element_id')),
@@ -696,16 +1417,16 @@ class FrontendConsumer(AsyncWebsocketConsumer):
                     'created_qm_count': result['created_qm_count'],
                     'created_ci_count': result['created_ci_count'],
                     'success': True
-                }))
+                })
             except Exception as e:
                 print(f"[ERROR] 분할 객체 저장 실패: {str(e)}")
                 import traceback
                 traceback.print_exc()
-                await self.send(text_data=json.dumps({
+                await self.send_message({
                     'type': 'split_save_error',
                     'error': str(e),
                     'success': False
-                }))
+                })
         # ▲▲▲ [추가] 여기까지 ▲▲▲
 
         else:
@@ -716,36 +1437,118 @@ class FrontendConsumer(AsyncWebsocketConsumer):
     async def broadcast_progress(self, event):
         # 디버깅: 진행률 브로드캐스트
         print(f"  ➡️ [{self.__class__.__name__}] 데이터 가져오기 진행률 브로드캐스트: type='{event['data'].get('type')}'")
-        await self.send(text_data=json.dumps(event['data']))
+        await self.send_message(event['data'])
     async def broadcast_tags(self, event):
         # 디버깅: 태그 목록 브로드캐스트
         print(f"  ➡️ [{self.__class__.__name__}] 태그 목록 업데이트 브로드캐스트 ({len(event['tags'])}개).")
-        await self.send(text_data=json.dumps({'type': 'tags_updated', 'tags': event['tags']}))
+        await self.send_message({'type': 'tags_updated', 'tags': event['tags']})
+    async def broadcast_element_tags(self, event):
+        print(f"  ➡️ [{self.__class__.__name__}] 객체 태그 변경분 브로드캐스트 ({len(event['tags_by_element'])}개).")
+        await self.send_message({'type': 'element_tags_updated', 'tags_by_element': event['tags_by_element']})
     async def broadcast_elements(self, event):
         # 디버깅: 객체 정보 브로드캐스트
         print(f"  ➡️ [{self.__class__.__name__}] 객체 정보 업데이트 브로드캐스트 ({len(event['elements'])}개).")
-        await self.send(text_data=json.dumps({'type': 'elements_updated', 'elements': event['elements']}))
+        await self.send_message({'type': 'elements_updated', 'elements': event['elements']})
     async def broadcast_selection(self, event):
         # 디버깅: 선택 정보 브로드캐스트
         print(f"  ➡️ [{self.__class__.__name__}] Revit/Blender 선택 정보 업데이트 브로드캐스트 ({len(event['unique_ids'])}개).")
-        await self.send(text_data=json.dumps({'type': 'revit_selection_update', 'unique_ids': event['unique_ids']}))
+        await self.send_message({'type': 'revit_selection_update', 'unique_ids': event['unique_ids']})
 
     # ▼▼▼ [추가] AI 학습 진행률 브로드캐스트 핸들러 ▼▼▼
     async def broadcast_training_progress(self, event):
         """views.py에서 호출되어 AI 학습 진행률을 특정 클라이언트 그룹에게 전송"""
         print(f"  ➡️ [{self.__class__.__name__}] AI 학습 진행률 브로드캐스트 (Task ID: {event['task_id']}, Status: {event['progress']['status']}).")
-        await self.send(text_data=json.dumps({
+        await self.send_message({
             'type': 'training_progress_update', # 프론트엔드에서 받을 메시지 타입
             'project_id': event['project_id'],
             'task_id': event['task_id'],
             'progress': event['progress'],
-        }))
+        })
+    # ▲▲▲ [추가] 여기까지 ▲▲▲
+
+    # ▼▼▼ [추가] 산출 파이프라인 진행 상태 ▼▼▼
+    async def broadcast_pipeline_progress(self, event):
+        """views.py에서 호출되어 산출 파이프라인 진행 상태(단계별 모드/소요 시간)를 전송"""
+        await self.send_message({
+            'type': 'takeoff_pipeline_progress',
+            'project_id': event['project_id'],
+            'job_id': event['job_id'],
+            'progress': event['progress'],
+        })
+    # ▲▲▲ [추가] 여기까지 ▲▲▲
+
+    # ▼▼▼ [추가] 객체 데이터 스트리밍 (keyset pagination + ack 기반 흐름 제어) ▼▼▼
+    def cancel_viewer_stream(self):
+        task = getattr(self, 'viewer_stream_task', None)
+        if task and not task.done():
+            task.cancel()
+        self.viewer_stream_task = None
+
+    async def stream_all_elements(self, project_id, stream_id, credits, lazy_geometry=False):
+        """
+        프로젝트의 모든 객체를 id 순서의 cursor로 청크 단위 전송합니다.
+
+        고정 sleep 대신 프론트엔드가 처리하지 못한(ack가 오지 않은) 청크 수로 속도를 조절합니다.
+        Channels consumer에서는 소켓 송신 버퍼 크기를 직접 볼 수 없으므로, 전송했지만 ack되지 않은 청크를
+        버퍼에 쌓인 데이터로 보고 VIEWER_STREAM_WINDOW개가 차면 ack가 올 때까지 대기합니다.
+        ack를 보내지 않는 (이전 버전) 클라이언트는 첫 타임아웃 이후 흐름 제어 없이 전송합니다.
+
+        payload는 project.viewer_revision별 스냅샷에서 읽으므로, 변경이 없는 프로젝트를 다시 열 때는
+        DB 조회와 직렬화 없이 압축된 payload를 풀어 메시지 프레임만 씌워 보냅니다.
+        lazy_geometry=True면 메쉬 좌표를 뺀 1단계 데이터만 보냅니다.
+        """
+        try:
+            # 데이터보다 먼저 읽으므로, 전송 중 생긴 변경은 다음 since_seq 요청에 포함됩니다.
+            change_seq = await get_project_change_seq(project_id)
+            snapshot = await ensure_viewer_snapshot(project_id, self.binary_mode, lazy_geometry)
+            if snapshot:
+                payloads = iter_snapshot_payloads(snapshot)
+            else:
+                payloads = iter_encoded_viewer_payloads(project_id, self.binary_mode, lazy_geometry)
+            next_payload = database_sync_to_async(next)
+
+            start_payload = await next_payload(payloads, None)
+            if start_payload is None:
+                print(f"[ERROR][{self.__class__.__name__}] 프로젝트 {project_id}의 객체 데이터를 준비하지 못했습니다.")
+                return
+            print(f"[DEBUG] 객체 데이터 전송을 시작합니다. (스냅샷 {'사용' if snapshot else '미사용'})")
+            await self.send_encoded_payload({'type': 'revit_data_start'}, start_payload)
+
+            sent_bytes = 0
+            seq = 0
+            flow_control = True
+            waited_total = 0.0
+            while True:
+                chunk_payload = await next_payload(payloads, None)
+                if chunk_payload is None:
+                    break
+                if flow_control:
+                    started = time.perf_counter()
+                    try:
+                        await asyncio.wait_for(credits.acquire(), timeout=VIEWER_ACK_TIMEOUT)
+                    except asyncio.TimeoutError:
+                        print(f"[WARN] 프론트엔드 ack가 {VIEWER_ACK_TIMEOUT}초 동안 없어 흐름 제어 없이 전송합니다.")
+                        flow_control = False
+                    waited_total += time.perf_counter() - started
+                await self.send_encoded_payload({'type': 'revit_data_chunk', 'stream_id': stream_id, 'seq': seq}, chunk_payload)
+                sent_bytes += len(chunk_payload)
+                seq += 1
+                if not flow_control:
+                    await asyncio.sleep(0)  # 다른 메시지 처리를 위해 이벤트 루프에 양보
+
+            print(f"[DEBUG] 객체 데이터 전송을 완료했습니다 (청크 {seq}개, payload {sent_bytes} bytes, ack 대기 {waited_total:.2f}s).")
+            await self.send_message({'type': 'revit_data_complete', 'change_seq': change_seq})
+        except asyncio.CancelledError:
+            print(f"[DEBUG] 객체 데이터 전송(stream {stream_id})이 취소되었습니다.")
+            raise
+        except Exception as e:
+            print(f"[ERROR][{self.__class__.__name__}] 객체 데이터 전송 중 오류: {e}")
     # ▲▲▲ [추가] 여기까지 ▲▲▲
 
     async def send_tags_update(self, tags):
         # 디버깅: 특정 클라이언트에게 태그 목록 전송
         print(f"  ➡️ [{self.__class__.__name__}] 현재 클라이언트에게 태그 목록 전송 ({len(tags)}개).")
-        await self.send(text_data=json.dumps({'type': 'tags_updated', 'tags': tags}))
+        await self.send_message({'type': 'tags_updated', 'tags': tags})
 
     @database_sync_to_async
     def db_get_tags(self, project_id):
@@ -762,6 +1565,8 @@ class FrontendConsumer(AsyncWebsocketConsumer):
         print(f"[DEBUG][DB Async][db_create_tag] Creating tag '{name}' for project: {project_id}")
         project = Project.objects.get(id=project_id)
         tag, created = QuantityClassificationTag.objects.get_or_create(project=project, name=name)
+        if created:
+            ProjectChange.record(project.id, ProjectChange.KIND_TAGS)
         print(f"[DEBUG][DB Async][db_create_tag] Tag '{name}' {'created' if created else 'already exists'}.")
     @database_sync_to_async
     def db_update_tag(self, tag_id, new_name):
@@ -771,6 +1576,9 @@ class FrontendConsumer(AsyncWebsocketConsumer):
         try:
             tag = QuantityClassificationTag.objects.get(id=tag_id)
             tag.name = new_name; tag.save()
+            ProjectChange.record(tag.project_id, ProjectChange.KIND_TAGS)
+            # 객체 데이터에 태그 이름이 포함되므로 태그가 할당된 객체도 변경으로 기록 (뷰어 스냅샷 무효화 포함)
+            ProjectChange.record(tag.project_id, ProjectChange.KIND_ELEMENTS, tag.raw_elements.values_list('id', flat=True))
             print(f"[DEBUG][DB Async][db_update_tag] Tag ID '{tag_id}' updated successfully.")
         except QuantityClassificationTag.DoesNotExist:
             print(f"[ERROR][DB Async][db_update_tag] Tag ID '{tag_id}' not found.")
@@ -789,6 +1597,8 @@ class FrontendConsumer(AsyncWebsocketConsumer):
 
             # 태그를 삭제합니다. (ManyToManyField 관계는 자동으로 정리됩니다)
             tag_to_delete.delete()
+            ProjectChange.record(tag_to_delete.project_id, ProjectChange.KIND_TAGS)
+            ProjectChange.record(tag_to_delete.project_id, ProjectChange.KIND_ELEMENTS, affected_element_ids)
             print(f"[DEBUG][DB Async][db_delete_tag] Tag ID '{tag_id}' deleted successfully.")
 
             return affected_element_ids
@@ -802,44 +1612,83 @@ class FrontendConsumer(AsyncWebsocketConsumer):
     def db_assign_tags(self, tag_id, element_ids):
         """
         수동으로 태그를 할당합니다 (assignment_type='manual')
+        이미 할당된 객체는 건너뛰고, 새 할당은 bulk_create로 한 트랜잭션에서 저장합니다.
+
+        Returns: {project_id: {객체 id: [태그 id]}} - 새로 할당된 객체의 태그 변경분
         """
         # 디버깅: DB에서 태그 할당
         print(f"[DEBUG][DB Async][db_assign_tags] Manually assigning tag ID '{tag_id}' to {len(element_ids)} elements.")
         try:
             from connections.models import ElementClassificationAssignment
             tag = QuantityClassificationTag.objects.get(id=tag_id)
-            elements_to_update = RawElement.objects.filter(id__in=element_ids)
-            added_count = 0
-            for element in elements_to_update:
-                _, created = ElementClassificationAssignment.objects.get_or_create(
-                    raw_element=element,
-                    classification_tag=tag,
-                    defaults={
-                        'assignment_type': 'manual',
-                        'assigned_by_rule': None
-                    }
-                )
-                if created:
-                    added_count += 1
-            print(f"[DEBUG][DB Async][db_assign_tags] Tag assignment complete. {added_count} new manual assignments.")
+            element_ids = list(element_ids)
+            added_ids = []
+            with transaction.atomic():
+                for i in range(0, len(element_ids), TAG_ASSIGNMENT_BATCH_SIZE):
+                    batch = element_ids[i:i + TAG_ASSIGNMENT_BATCH_SIZE]
+                    already_assigned = set(ElementClassificationAssignment.objects.filter(
+                        classification_tag=tag, raw_element_id__in=batch
+                    ).values_list('raw_element_id', flat=True))
+                    new_ids = [
+                        element_id for element_id in RawElement.objects.filter(
+                            project_id=tag.project_id, id__in=batch
+                        ).values_list('id', flat=True)
+                        if element_id not in already_assigned
+                    ]
+                    ElementClassificationAssignment.objects.bulk_create([
+                        ElementClassificationAssignment(
+                            raw_element_id=element_id,
+                            classification_tag=tag,
+                            assignment_type='manual',
+                            assigned_by_rule=None,
+                        )
+                        for element_id in new_ids
+                    ], ignore_conflicts=True)
+                    added_ids.extend(new_ids)
+                ProjectChange.record(tag.project_id, ProjectChange.KIND_ELEMENTS, added_ids)
+            print(f"[DEBUG][DB Async][db_assign_tags] Tag assignment complete. {len(added_ids)} new manual assignments.")
+            if not added_ids:
+                return {}
+            return {str(tag.project_id): element_tag_ids(added_ids)}
         except QuantityClassificationTag.DoesNotExist:
             print(f"[ERROR][DB Async][db_assign_tags] Tag ID '{tag_id}' not found.")
         except Exception as e:
             print(f"[ERROR][DB Async][db_assign_tags] Exception during assignment: {e}")
+        return {}
     @database_sync_to_async
     def db_clear_tags(self, element_ids):
+        """
+        객체들의 모든 태그 할당을 한 트랜잭션에서 일괄 삭제합니다.
+
+        Returns: {project_id: {객체 id: []}} - 할당이 있었던 객체의 태그 변경분
+        """
         # 디버깅: DB에서 태그 제거
         print(f"[DEBUG][DB Async][db_clear_tags] Clearing tags from {len(element_ids)} elements.")
         try:
-            elements_to_update = RawElement.objects.filter(id__in=element_ids)
-            cleared_count = 0
-            for element in elements_to_update:
-                if element.classification_tags.exists():
-                    element.classification_tags.clear()
-                    cleared_count += 1
+            from connections.models import ElementClassificationAssignment
+            element_ids = list(element_ids)
+            cleared_ids_by_project = {}
+            with transaction.atomic():
+                for i in range(0, len(element_ids), TAG_ASSIGNMENT_BATCH_SIZE):
+                    assignments = ElementClassificationAssignment.objects.filter(
+                        raw_element_id__in=element_ids[i:i + TAG_ASSIGNMENT_BATCH_SIZE]
+                    )
+                    for element_id, project_id in assignments.order_by().values_list('raw_element_id', 'raw_element__project_id').distinct():
+                        cleared_ids_by_project.setdefault(project_id, []).append(element_id)
+                    assignments.delete()
+                for project_id, cleared_ids in cleared_ids_by_project.items():
+                    ProjectChange.record(project_id, ProjectChange.KIND_ELEMENTS, cleared_ids)
+                    # 룰셋 할당도 함께 지워졌으므로 다음 룰셋 일괄적용 때 다시 평가
+                    mark_elements_unclassified(cleared_ids)
+            cleared_count = sum(len(cleared_ids) for cleared_ids in cleared_ids_by_project.values())
             print(f"[DEBUG][DB Async][db_clear_tags] Tag clearing complete. {cleared_count} elements had tags cleared.")
+            return {
+                str(project_id): {str(element_id): [] for element_id in cleared_ids}
+                for project_id, cleared_ids in cleared_ids_by_project.items()
+            }
         except Exception as e:
             print(f"[ERROR][DB Async][db_clear_tags] Exception during clearing: {e}")
+            return {}
 
     # ▼▼▼ [추가] 3D 객체 분할 저장 메서드 ▼▼▼
     @database_sync_to_async
@@ -875,6 +1724,11 @@ class FrontendConsumer(AsyncWebsocketConsumer):
             if payload.get('parent_split_id'):
                 parent_split = SplitElement.objects.get(id=payload['parent_split_id'])
 
+            # 분할 메쉬는 GeometryBlob으로 분리하고 geometry_data에는 참조만 저장
+            geometry_data, packed = externalize_geometry_dict(payload.get('geometry_data', {}))
+            if packed:
+                GeometryBlob.store_packed({packed['digest']: packed})
+
             # SplitElement 생성
             split_element = SplitElement.objects.create(
                 project=project,
@@ -887,10 +1741,12 @@ class FrontendConsumer(AsyncWebsocketConsumer):
                 split_axis=payload.get('split_axis'),  # plane only
                 split_position=payload.get('split_position'),  # plane only
                 split_part_type=payload['split_part_type'],
-                geometry_data=payload.get('geometry_data', {}),
+                geometry_data=geometry_data,
+                geometry_blob_id=packed['digest'] if packed else None,
                 sketch_data=payload.get('sketch_data', {}),
                 is_active=True
             )
+            ProjectChange.record(project.id, ProjectChange.KIND_SPLITS)
 
             print(f"[DEBUG][DB Async][db_save_split_element] Split element saved successfully:")
             print(f"  - ID: {split_element.id}")
@@ -1005,6 +1861,10 @@ class FrontendConsumer(AsyncWebsocketConsumer):
                     source_item.save(update_fields=['is_active'])
 
             print(f"[DEBUG][DB Async][db_save_split_element] Created {created_qm_count} QuantityMembers and {created_ci_count} CostItems")
+            if created_qm_count:
+                ProjectChange.record(project.id, ProjectChange.KIND_QUANTITY_MEMBERS)
+            if created_ci_count:
+                ProjectChange.record(project.id, ProjectChange.KIND_COST_ITEMS)
             print(f"[DEBUG][DB Async][db_save_split_element] Applied parent volume ratio {parent_volume_ratio:.4f} ({parent_volume_ratio * 100:.2f}%) to all quantities")
             print(f"[DEBUG][DB Async][db_save_split_element] Note: volume_ratio (original BIM) = {float(split_element.volume_ratio):.4f}, parent_volume_ratio = {parent_volume_ratio:.4f}")
             # ▲▲▲ 복제 로직 끝 ▲▲▲
@@ -0,0 +1,401 @@
+"""
+수량/속성 계산식(맵핑식) 컴파일 엔진
+
+기존 evaluate_expression 계열 함수는 부재/코스트아이템마다 계산식 문자열에서 re.findall로 플레이스홀더를 찾고,
+str.replace로 값을 문자열에 끼워 넣은 뒤 eval()로 다시 파싱했습니다.
+여기서는 계산식 텍스트마다 한 번만 플레이스홀더 슬롯을 분리하고 AST로 파싱/검증하여 code object로 컴파일해 두고
+(계산식 텍스트 기준 캐시), 평가 시에는 슬롯 값만 변수로 넘겨 실행합니다.
+
+플레이스홀더 (기존과 동일)
+- evaluate_expression: {{파라미터}}(숫자만 추출), {파라미터} - BIM.* 계층 경로 지원
+- evaluate_expression_for_cost_item: [일람부호 속성], {{BIM 원본 숫자}}, {QM.properties.*}, {MM.properties.*}, {부재 속성 또는 BIM 원본}
+- evaluate_member_properties_expression: {키} - context_data(combined_properties)에서 조회
+
+값은 항상 변수로만 전달되며 계산식 텍스트에 다시 끼워 넣어 파싱하지 않습니다. (eval 주입 차단)
+허용되는 문법: 상수, 사칙/비교/논리 연산, 조건식, 허용된 내장 함수 호출, 허용된 문자열 메서드 호출, 인덱싱
+- 속성 접근은 _ALLOWED_METHODS의 메서드 호출만 가능합니다. (str.format/format_map 등은 속성 그래프를 따라갈 수 있어 제외)
+- 문자열 % 포맷팅은 허용하지 않습니다. (format과 같은 이유, 좌변이 변수인 경우는 평가 시 확인)
+- 문자열 리터럴 안의 플레이스홀더('"{층}F"')는 리터럴 조각과 값을 이어 붙인 문자열로 평가합니다.
+- 값은 변수 하나로 전달되므로 음수 값의 거듭제곱은 값 전체에 적용됩니다. ({x}**2, x=-5 -> 25)
+- 숫자로 읽히지만 파이썬 숫자 리터럴이 아닌 값('007', 'nan')은 원래 문자열로, {{...}} 추출 결과('007')는 숫자로 전달합니다.
+기존의 문자열 치환 방식과 달리 값 안에 들어 있는 따옴표나 플레이스홀더 문자열('{Width}*2' 등)은 코드로 해석되지 않습니다.
+"""
+
+import ast
+import re
+from functools import lru_cache
+
+from .rule_engine import compile_value_lookup, get_internal_field_name, is_numeric
+
+_NUMERIC_BRACES = re.compile(r'\{\{([^}]+)\}\}')
+_BRACES = re.compile(r'\{([^}]+)\}')
+_BRACKETS = re.compile(r'\[([^\]]+)\]')
+_LEADING_NUMBER = re.compile(r'^\s*(-?\d+(\.\d+)?)\s*')
+
+SAFE_BUILTINS = {'abs': abs, 'round': round, 'max': max, 'min': min, 'len': len}
+MEMBER_SAFE_BUILTINS = dict(SAFE_BUILTINS, str=str, int=int, float=float)
+
+_SLOT_PREFIX = '__slot'
+_COMPILED_CACHE_MAX = 4096
+
+# 슬롯 종류
+NUMERIC = 'numeric'   # {{...}}
+VALUE = 'value'       # {...}
+MARK = 'mark'         # [...]
+
+# 계산식 종류별 플레이스홀더 처리 순서 (기존 함수의 치환 순서와 동일)
+_DIALECT_PASSES = {
+    'element': ((NUMERIC, _NUMERIC_BRACES), (VALUE, _BRACES)),
+    'cost_item': ((MARK, _BRACKETS), (NUMERIC, _NUMERIC_BRACES), (VALUE, _BRACES)),
+    'member': ((VALUE, _BRACES),),
+}
+
+# 허용된 메서드 호출 (모두 str 메서드. 숫자 등 다른 값에서 호출하면 AttributeError)
+_ALLOWED_METHODS = frozenset({
+    'upper', 'lower', 'title', 'capitalize', 'casefold', 'swapcase',
+    'strip', 'lstrip', 'rstrip', 'removeprefix', 'removesuffix', 'replace', 'split', 'rsplit', 'join',
+    'startswith', 'endswith', 'find', 'rfind', 'count', 'zfill', 'ljust', 'rjust', 'center',
+    'isdigit', 'isdecimal', 'isnumeric', 'isalpha', 'isalnum', 'isspace', 'isupper', 'islower',
+})
+_MOD_FUNCTION = '__mod'   # 검증 후 % 연산을 바꿔 넣는 내부 함수 이름 (계산식에서는 밑줄 이름을 쓸 수 없음)
+_LITERAL_SLOT = re.compile(r' (' + _SLOT_PREFIX + r'\d+) ')
+
+_ALLOWED_NODES = (
+    ast.Expression, ast.Constant, ast.Name, ast.Load, ast.BinOp, ast.UnaryOp, ast.BoolOp, ast.Compare,
+    ast.IfExp, ast.Call, ast.keyword, ast.Tuple, ast.List, ast.Subscript, ast.Slice, ast.Attribute,
+    ast.JoinedStr, ast.FormattedValue, ast.Starred,
+    ast.operator, ast.unaryop, ast.boolop, ast.cmpop,
+)
+
+
+class ExpressionNotAllowed(ValueError):
+    pass
+
+
+def _checked_mod(left, right):
+    """% 연산 (문자열 포맷팅은 허용하지 않음)"""
+    if isinstance(left, (str, bytes)):
+        raise ExpressionNotAllowed("문자열에는 % 연산을 사용할 수 없습니다.")
+    return left % right
+
+
+class _SlotLiteralSplitter(ast.NodeTransformer):
+    """
+    문자열 리터럴 안의 슬롯('" __slot0 F"')을 리터럴 조각과 슬롯 값의 텍스트(__slot0_text)를 이어 붙인 f-string으로 바꿉니다.
+    텍스트를 쓰므로 '01' 같은 값도 숫자로 바뀌지 않고 기존 치환 결과('01F')와 같습니다.
+    """
+
+    def __init__(self):
+        self.text_slots = set()
+
+    def visit_JoinedStr(self, node):
+        return node   # f-string 안의 리터럴 조각은 바꾸지 않음 (슬롯 수가 맞지 않아 평가 오류)
+
+    def visit_Constant(self, node):
+        if not isinstance(node.value, str) or not _LITERAL_SLOT.search(node.value):
+            return node
+        values = []
+        for index, part in enumerate(_LITERAL_SLOT.split(node.value)):
+            if index % 2:
+                self.text_slots.add(int(part[len(_SLOT_PREFIX):]))
+                name = ast.Name(id=f'{part}_text', ctx=ast.Load())
+                values.append(ast.FormattedValue(value=name, conversion=-1, format_spec=None))
+            elif part:
+                values.append(ast.Constant(value=part))
+        return ast.copy_location(ast.JoinedStr(values=values), node)
+
+
+class _ModGuard(ast.NodeTransformer):
+    """a % b를 __mod(a, b)로 바꿔 좌변이 문자열 변수인 경우도 평가 시 막습니다."""
+
+    def visit_BinOp(self, node):
+        self.generic_visit(node)
+        if not isinstance(node.op, ast.Mod):
+            return node
+        call = ast.Call(func=ast.Name(id=_MOD_FUNCTION, ctx=ast.Load()), args=[node.left, node.right], keywords=[])
+        return ast.copy_location(call, node)
+
+
+def _validate(tree):
+    """
+    허용된 문법만 사용하는지 확인합니다.
+    Returns: 슬롯 이름이 변수로 쓰인 횟수
+    """
+    method_nodes = {id(node.func) for node in ast.walk(tree) if isinstance(node, ast.Call)}
+    slot_names = 0
+    for node in ast.walk(tree):
+        if not isinstance(node, _ALLOWED_NODES):
+            raise ExpressionNotAllowed(f"허용되지 않는 표현식 요소: {type(node).__name__}")
+        if isinstance(node, ast.Name) and node.id.startswith('_'):
+            if not node.id.startswith(_SLOT_PREFIX):
+                raise ExpressionNotAllowed(f"허용되지 않는 이름: {node.id}")
+            slot_names += 1
+        if isinstance(node, ast.Attribute) and (node.attr not in _ALLOWED_METHODS or id(node) not in method_nodes):
+            raise ExpressionNotAllowed(f"허용되지 않는 속성: {node.attr}")
+        if (isinstance(node, ast.BinOp) and isinstance(node.op, ast.Mod)
+                and isinstance(node.left, (ast.Constant, ast.JoinedStr))
+                and not isinstance(getattr(node.left, 'value', None), (int, float, complex))):
+            raise ExpressionNotAllowed("문자열에는 % 연산을 사용할 수 없습니다.")
+    return slot_names
+
+
+def _compile_source(text):
+    """
+    문자열 계산식을 검증 후 컴파일합니다. (eval과 같이 앞쪽 공백/탭은 무시하며 문법 오류 메시지도 동일)
+    Returns: (code object, 슬롯 이름이 변수로 쓰인 횟수, 문자열 리터럴 안에서 텍스트로 쓰인 슬롯 번호 집합)
+    """
+    tree = ast.parse(text.lstrip(' \t'), filename='<string>', mode='eval')
+    splitter = _SlotLiteralSplitter()
+    tree = splitter.visit(tree)
+    slot_names = _validate(tree)
+    tree = ast.fix_missing_locations(_ModGuard().visit(tree))
+    return compile(tree, '<string>', 'eval'), slot_names, splitter.text_slots
+
+
+class CompiledExpression:
+    """
+    플레이스홀더를 슬롯으로 분리한 계산식
+
+    segments: 문자열 조각과 슬롯 번호(int)의 리스트 - 치환 문자열(오류 메시지, member 계산식 결과) 재구성용
+    slots: [(종류, 플레이스홀더 이름)] - 같은 플레이스홀더는 같은 슬롯
+    code: 슬롯을 변수로 바꾼 계산식의 code object (컴파일할 수 없으면 None, 평가 시 error를 발생)
+    """
+
+    __slots__ = ('expression', 'globals', 'segments', 'slots', 'code', 'text_slots', 'error', 'is_blank', 'lookups')
+
+    def __init__(self, expression, dialect, builtins):
+        self.expression = expression
+        self.globals = {'__builtins__': builtins, _MOD_FUNCTION: _checked_mod}
+        self.segments = [expression]
+        self.slots = []
+        slot_index = {}
+        for kind, pattern in _DIALECT_PASSES[dialect]:
+            segments = []
+            for segment in self.segments:
+                if not isinstance(segment, str):
+                    segments.append(segment)
+                    continue
+                position = 0
+                for match in pattern.finditer(segment):
+                    key = (kind, match.group(1))
+                    if key not in slot_index:
+                        slot_index[key] = len(self.slots)
+                        self.slots.append(key)
+                    segments.append(segment[position:match.start()])
+                    segments.append(slot_index[key])
+                    position = match.end()
+                segments.append(segment[position:])
+            self.segments = [segment for segment in segments if segment != '']
+        self.is_blank = not self.slots and not expression.strip()
+        self.lookups = [None] * len(self.slots)
+
+        source = ''.join(
+            segment if isinstance(segment, str) else f' {_SLOT_PREFIX}{segment} ' for segment in self.segments
+        )
+        self.code, self.text_slots, self.error = None, (), None
+        try:
+            code, slot_names, text_slots = _compile_source(source)
+        except (SyntaxError, ValueError) as e:
+            # 슬롯 자리에 값이 문자열로 붙어야 의미가 생기는 계산식 (예: '{층}F')도 값을 코드로 끼워 넣지 않고 오류로 처리
+            self.error = e
+            return
+        if slot_names != sum(1 for segment in self.segments if not isinstance(segment, str)):
+            self.error = ExpressionNotAllowed("플레이스홀더를 값으로 사용할 수 없는 위치입니다.")
+            return
+        self.code, self.text_slots = code, tuple(sorted(text_slots))
+
+    def render(self, replacements):
+        """기존 방식의 치환 문자열 (오류 메시지 및 member 계산식의 문자열 결과용, 평가하지 않음)"""
+        return ''.join(
+            segment if isinstance(segment, str) else replacements[segment][0] for segment in self.segments
+        )
+
+    def evaluate(self, replacements):
+        """
+        replacements: 슬롯별 (치환 문자열, 파이썬 값) - 값만 변수로 전달됩니다.
+        결과 값을 반환하며, 평가 중 예외는 그대로 전달합니다.
+        """
+        if self.code is None:
+            raise self.error
+        values = {f'{_SLOT_PREFIX}{index}': value for index, (_, value) in enumerate(replacements)}
+        for index in self.text_slots:
+            # 문자열 리터럴 안에서는 치환 문자열 기준 (문자열 값은 따옴표 없이)
+            text, value = replacements[index]
+            values[f'{_SLOT_PREFIX}{index}_text'] = value if isinstance(value, str) else text
+        return eval(self.code, self.globals, values)
+
+
+@lru_cache(maxsize=_COMPILED_CACHE_MAX)
+def compile_expression(expression, dialect='element'):
+    """계산식 텍스트를 컴파일합니다. (계산식 종류, 텍스트)별로 캐시됩니다."""
+    builtins = MEMBER_SAFE_BUILTINS if dialect == 'member' else SAFE_BUILTINS
+    return CompiledExpression(expression, dialect, builtins)
+
+
+# --- 치환 값 ---
+def _number_literal(text):
+    """숫자 치환 문자열을 파이썬 숫자 리터럴로 읽은 값 (리터럴이 아니면 None)"""
+    if any(ch in text for ch in '\n\r\x0b\x0c\x00'):
+        return None
+    try:
+        value = ast.literal_eval(text)
+    except (ValueError, SyntaxError, TypeError, MemoryError, RecursionError):
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    return value
+
+
+def value_replacement(value):
+    """
+    {...}/[...] 값의 치환 (숫자는 그대로, 그 외는 따옴표로 감싼 문자열)
+    숫자로 읽히지만 파이썬 숫자 리터럴이 아닌 문자열('007', 'nan')은 원래 문자열로 전달합니다.
+    """
+    text = str(value)
+    if is_numeric(value):
+        if isinstance(value, (int, float)):
+            return text, value
+        number = _number_literal(text)
+        return text, text if number is None else number
+    return f'"{text}"', text
+
+
+def number_text_replacement(text):
+    """숫자 문자열 치환 ({{...}} 추출 결과, 결측 '0'). '007'처럼 리터럴이 아닌 숫자도 int/float로 전달합니다."""
+    number = _number_literal(text)
+    if number is None:
+        number = float(text) if '.' in text else int(text)
+    return text, number
+
+
+ZERO_REPLACEMENT = ('0', 0)
+EMPTY_STRING_REPLACEMENT = ('""', '')
+
+
+def _extract_number(value):
+    match = _LEADING_NUMBER.match(str(value))
+    return number_text_replacement(match.group(1)) if match else ZERO_REPLACEMENT
+
+
+# --- 계산식 종류별 평가 ---
+def evaluate_expression(expression, raw_data):
+    """
+    '{Volume} * 1.05' 또는 '{{Volume}} * 2'와 같은 문자열 표현식을 실제 값으로 계산합니다.
+    - {parameter}: 파라미터 값을 그대로 사용합니다. (예: "30.5 m³")
+    - {{parameter}}: 파라미터 값에서 숫자만 추출하여 사용합니다. (예: "30.5 m³" -> 30.5)
+    - BIM.Attributes.Name, BIM.Parameters.XXX 등의 계층적 경로를 지원합니다.
+    """
+    if not isinstance(expression, str):
+        return expression
+
+    compiled = compile_expression(expression, 'element')
+    replacements = []
+    for index, (kind, placeholder) in enumerate(compiled.slots):
+        lookup = compiled.lookups[index]
+        if lookup is None:
+            # 계층적 경로 -> 내부 필드명 변환과 값 조회 함수도 슬롯마다 한 번만 생성
+            internal_field = get_internal_field_name(placeholder)
+            lookup = compiled.lookups[index] = (internal_field, compile_value_lookup(internal_field))
+        internal_field, find_value = lookup
+        value = find_value(raw_data)
+        if value is None:
+            if kind == NUMERIC:
+                return f"Error: Parameter '{internal_field}' (from '{placeholder}') not found for numeric extraction."
+            return f"Error: Parameter '{internal_field}' (from '{placeholder}') not found."
+        # {{...}}: 값의 시작 부분 숫자만 사용 (추출 실패 시 0), {...}: 숫자는 그대로, 문자열은 따옴표로 감쌈
+        replacements.append(_extract_number(value) if kind == NUMERIC else value_replacement(value))
+
+    if compiled.is_blank:
+        return ""
+    try:
+        return compiled.evaluate(replacements)
+    except Exception as e:
+        # 디버깅을 위해 실패한 표현식과 에러 메시지를 함께 반환합니다.
+        return f"Error: Failed to evaluate '{expression}' -> '{compiled.render(replacements)}' ({str(e)})"
+
+
+def evaluate_expression_for_cost_item(expression, quantity_member):
+    """
+    CostItem의 수량 계산식을 평가합니다.
+    - [MarkProperty]: MemberMark.properties (일람부호 속성, 없으면 0)
+    - {{RawProperty}}: RawElement.raw_data (BIM 원본 숫자만 추출, 없으면 0)
+    - {QM.properties.*}, {MM.properties.*}: 부재/일람부호 속성
+    - {Property}: QuantityMember.properties (부재 속성) 또는 RawElement.raw_data (BIM 원본 속성), 없으면 0
+      값이 계산식('{...}')이면 evaluate_expression으로 다시 평가합니다.
+    """
+    if not isinstance(expression, str) or not quantity_member:
+        return expression
+
+    compiled = compile_expression(expression, 'cost_item')
+    raw_data = quantity_member.raw_element.raw_data if quantity_member.raw_element else {}
+    member_props = quantity_member.properties if quantity_member.properties else {}
+    mark_props = None   # 일람부호는 필요할 때만 조회
+
+    replacements = []
+    for index, (kind, placeholder) in enumerate(compiled.slots):
+        lookup = compiled.lookups[index]
+        if lookup is None:
+            if kind == VALUE and placeholder.startswith('QM.properties.'):
+                lookup = ('qm', placeholder.replace('QM.properties.', ''))
+            elif kind == VALUE and placeholder.startswith('MM.properties.'):
+                lookup = ('mm', placeholder.replace('MM.properties.', ''))
+            else:
+                lookup = (kind, compile_value_lookup(placeholder))
+            compiled.lookups[index] = lookup
+        source, key = lookup
+
+        if source in ('mm', MARK) and mark_props is None:
+            member_mark = quantity_member.member_mark
+            mark_props = member_mark.properties if member_mark and member_mark.properties else {}
+
+        if source == MARK:
+            value = mark_props.get(placeholder)
+            replacements.append(ZERO_REPLACEMENT if value is None else value_replacement(value))
+            continue
+        if source == NUMERIC:
+            value = key(raw_data)
+            replacements.append(ZERO_REPLACEMENT if value is None else _extract_number(value))
+            continue
+
+        if source == 'qm':
+            value = member_props.get(key)
+        elif source == 'mm':
+            value = mark_props.get(key)
+        elif placeholder in member_props:
+            value = member_props.get(placeholder)
+        else:
+            value = key(raw_data)
+        if value is None:
+            replacements.append(ZERO_REPLACEMENT)
+            continue
+        if isinstance(value, str) and '{' in value:
+            # 부재 속성 값이 계산식이면 다시 평가
+            value = evaluate_expression(value, raw_data)
+        replacements.append(value_replacement(value))
+
+    if compiled.is_blank:
+        return ""
+    try:
+        return compiled.evaluate(replacements)
+    except Exception as e:
+        return f"Error: Failed to evaluate '{expression}' -> '{compiled.render(replacements)}' ({str(e)})"
+
+
+def evaluate_member_properties_expression(expression, context_data):
+    """
+    '{Name}' 또는 '{BIM원본.Category}'와 같은 표현식을 주어진 데이터 컨텍스트(combined_properties)에서 평가합니다.
+    없는 키는 빈 문자열로 처리하며, 계산할 수 없으면 치환한 문자열을 그대로 반환합니다. (예: '{층}F' -> '3F')
+    """
+    if not isinstance(expression, str):
+        return expression
+
+    compiled = compile_expression(expression, 'member')
+    replacements = []
+    for _, placeholder in compiled.slots:
+        value = context_data.get(placeholder)
+        replacements.append(EMPTY_STRING_REPLACEMENT if value is None else value_replacement(value))
+    try:
+        return compiled.evaluate(replacements)
+    except Exception:
+        # 단순 문자열 조합 결과일 수 있으므로 치환한 문자열을 그대로 반환
+        return compiled.render(replacements)
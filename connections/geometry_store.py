@@ -0,0 +1,245 @@
+"""
+Content-addressed Geometry 저장소 유틸리티
+- 메쉬 vertices/faces를 float32/uint32 바이너리 버퍼로 변환 (GeometryBlob 저장용)
+- raw_data / geometry_data 안의 메쉬를 blob 참조(stub)로 분리 및 복원
+
+raw_data에 남는 stub 형식:
+    {'blob': '<sha256>', 'vertex_count': N, 'face_count': M, 'matrix': [...], 'materials': {...}}
+메쉬 좌표는 GeometryBlob(digest=<sha256>)에 한 번만 저장되므로, 동일한 패밀리/타입 메쉬는 공유됩니다.
+"""
+
+import hashlib
+
+import numpy as np
+
+VERTEX_DTYPE = np.dtype('<f4')
+FACE_DTYPE = np.dtype('<u4')
+VERTEX_KEYS = ('verts', 'vertices')
+STUB_KEYS = ('blob', 'vertex_key', 'flat', 'vertex_count', 'face_count')
+
+
+def pack_mesh(vertices, faces):
+    """
+    vertices/faces를 바이너리 버퍼로 변환합니다.
+
+    Returns:
+        {'digest', 'vertices', 'faces', 'vertex_count', 'face_count', 'bbox', 'vertex_array', 'face_array'} 또는
+        정형 배열로 변환할 수 없는 메쉬(비삼각형 face, 음수 인덱스 등)면 None.
+        vertex_array는 원본 정밀도(float64) 배열로, 체적 계산에 그대로 사용할 수 있습니다.
+    """
+    try:
+        vertex_array = np.asarray(vertices, dtype=np.float64)
+        face_array = np.asarray(faces, dtype=np.int64)
+    except (TypeError, ValueError):
+        return None
+
+    # Revit 형식: [x, y, z, x, y, z, ...] / [i, j, k, ...] 평면 배열
+    if vertex_array.ndim == 1 and vertex_array.size % 3 == 0:
+        vertex_array = vertex_array.reshape(-1, 3)
+    if face_array.ndim == 1 and face_array.size % 3 == 0:
+        face_array = face_array.reshape(-1, 3)
+
+    if vertex_array.ndim != 2 or vertex_array.shape[1] != 3:
+        return None
+    if face_array.ndim != 2 or face_array.shape[1] != 3:
+        return None
+    if face_array.size and (face_array.min() < 0 or face_array.max() > np.iinfo(FACE_DTYPE).max):
+        return None
+
+    vertex_bytes = vertex_array.astype(VERTEX_DTYPE).tobytes()
+    face_bytes = face_array.astype(FACE_DTYPE).tobytes()
+
+    hasher = hashlib.sha256()
+    hasher.update(len(vertex_bytes).to_bytes(8, 'little'))
+    hasher.update(vertex_bytes)
+    hasher.update(face_bytes)
+
+    return {
+        'digest': hasher.hexdigest(),
+        'vertices': vertex_bytes,
+        'faces': face_bytes,
+        'vertex_count': int(len(vertex_array)),
+        'face_count': int(len(face_array)),
+        'bbox': mesh_bbox(vertex_array),
+        'vertex_array': vertex_array,
+        'face_array': face_array,
+    }
+
+
+def mesh_bbox(vertices):
+    """메쉬 로컬 좌표의 bounding box [min_x, min_y, min_z, max_x, max_y, max_z]를 반환합니다. (matrix 적용 전)"""
+    vertices = np.asarray(vertices).reshape(-1, 3)
+    if not len(vertices):
+        return None
+    return [float(v) for v in np.concatenate([vertices.min(axis=0), vertices.max(axis=0)])]
+
+
+def unpack_mesh(vertex_bytes, face_bytes):
+    """바이너리 버퍼를 (N, 3) float32, (M, 3) uint32 NumPy 배열로 복사 없이 변환합니다."""
+    vertices = np.frombuffer(bytes(vertex_bytes), dtype=VERTEX_DTYPE).reshape(-1, 3)
+    faces = np.frombuffer(bytes(face_bytes), dtype=FACE_DTYPE).reshape(-1, 3)
+    return vertices, faces
+
+
+def iter_geometry_slots(raw_data):
+    """
+    raw_data 안에서 Geometry 딕셔너리가 들어있는 위치를 (container, key) 형태로 반환합니다.
+
+    지원하는 위치:
+    1. raw_data['geometry'] (Revit/일반 형식)
+    2. raw_data['System']['Geometry'] (Blender IFC 형식)
+    3. raw_data['Parameters']['Geometry'] (3D 뷰어 호환용 복사본)
+    4. raw_data['Parameters.Geometry'] (평탄화된 Revit 형식)
+    """
+    if not isinstance(raw_data, dict):
+        return
+    if isinstance(raw_data.get('geometry'), dict):
+        yield raw_data, 'geometry'
+    for parent_key in ('System', 'Parameters'):
+        parent = raw_data.get(parent_key)
+        if isinstance(parent, dict) and isinstance(parent.get('Geometry'), dict):
+            yield parent, 'Geometry'
+    if isinstance(raw_data.get('Parameters.Geometry'), dict):
+        yield raw_data, 'Parameters.Geometry'
+
+
+def _has_items(value):
+    """list/tuple 또는 (바이너리 WebSocket으로 받은) NumPy 배열이 비어있지 않은지 확인합니다."""
+    return value is not None and not isinstance(value, (str, dict)) and np.size(value) > 0
+
+
+def externalize_geometry_dict(geometry, packed_cache=None):
+    """
+    Geometry 딕셔너리 하나에서 메쉬를 분리하여 (stub, packed)를 반환합니다.
+    메쉬가 없거나 바이너리로 변환할 수 없으면 (geometry, None)을 그대로 반환합니다.
+    """
+    if not isinstance(geometry, dict) or 'blob' in geometry:
+        return geometry, None
+
+    vertex_key = next((k for k in VERTEX_KEYS if _has_items(geometry.get(k))), None)
+    faces = geometry.get('faces')
+    if vertex_key is None or not _has_items(faces):
+        return geometry, None
+
+    packed = None
+    if packed_cache is not None:
+        packed = packed_cache.get(id(geometry))
+    if packed is None:
+        packed = pack_mesh(geometry[vertex_key], faces)
+        if packed is None:
+            return geometry, None
+        if packed_cache is not None:
+            packed_cache[id(geometry)] = packed
+
+    stub = {k: v for k, v in geometry.items() if k not in VERTEX_KEYS and k != 'faces'}
+    stub['blob'] = packed['digest']
+    stub['vertex_count'] = packed['vertex_count']
+    stub['face_count'] = packed['face_count']
+    if vertex_key != 'verts':
+        stub['vertex_key'] = vertex_key
+    if np.ndim(geometry[vertex_key]) == 1:
+        stub['flat'] = True
+    return stub, packed
+
+
+def externalize_geometry(raw_data):
+    """
+    raw_data 안의 모든 메쉬를 blob stub으로 교체합니다. (raw_data를 직접 수정)
+
+    Returns:
+        (primary_digest, packed_by_digest)
+        - primary_digest: 대표 메쉬의 digest (RawElement.geometry_blob 연결용), 없으면 None
+        - packed_by_digest: {digest: pack_mesh 결과}
+    """
+    packed_by_digest = {}
+    packed_cache = {}
+    primary_digest = None
+    for container, key in list(iter_geometry_slots(raw_data)):
+        stub, packed = externalize_geometry_dict(container[key], packed_cache)
+        if packed is None:
+            continue
+        container[key] = stub
+        packed_by_digest[packed['digest']] = packed
+        if primary_digest is None:
+            primary_digest = packed['digest']
+    return primary_digest, packed_by_digest
+
+
+def listify_geometry_arrays(raw_data):
+    """
+    Geometry 딕셔너리에 남아있는 NumPy 배열(matrix, blob으로 분리되지 못한 메쉬 등)을 list로 변환합니다.
+    바이너리 WebSocket으로 받은 데이터를 JSONField에 저장하기 전에 호출합니다. (raw_data를 직접 수정)
+    """
+    for container, key in list(iter_geometry_slots(raw_data)):
+        geometry = container[key]
+        for k, v in list(geometry.items()):
+            if isinstance(v, np.ndarray):
+                geometry[k] = v.tolist()
+    return raw_data
+
+
+def collect_geometry_digests(raw_data):
+    """raw_data가 참조하는 blob digest 집합을 반환합니다."""
+    return {container[key]['blob'] for container, key in iter_geometry_slots(raw_data) if 'blob' in container[key]}
+
+
+def rehydrate_geometry_dict(geometry, meshes_by_digest, as_arrays=False):
+    """
+    blob stub에 vertices/faces 목록을 다시 채운 Geometry 딕셔너리를 반환합니다. (원본은 수정하지 않음)
+    as_arrays=True면 list 대신 float32/uint32 NumPy 배열을 그대로 넣습니다. (바이너리 WebSocket 전송용)
+    """
+    if not isinstance(geometry, dict) or 'blob' not in geometry:
+        return geometry
+    mesh = meshes_by_digest.get(geometry['blob'])
+    if mesh is None:
+        return geometry
+    vertices, faces = mesh
+    hydrated = {k: v for k, v in geometry.items() if k not in STUB_KEYS}
+    if geometry.get('flat'):
+        vertices, faces = vertices.ravel(), faces.ravel()
+    if as_arrays:
+        hydrated[geometry.get('vertex_key', 'verts')] = vertices
+        hydrated['faces'] = faces
+    else:
+        hydrated[geometry.get('vertex_key', 'verts')] = vertices.tolist()
+        hydrated['faces'] = faces.tolist()
+    return hydrated
+
+
+def rehydrate_geometry(raw_data, meshes_by_digest, as_arrays=False):
+    """raw_data 안의 모든 blob stub을 실제 메쉬로 교체합니다. (raw_data를 직접 수정)"""
+    hydrated_cache = {}
+    for container, key in list(iter_geometry_slots(raw_data)):
+        stub = container[key]
+        if 'blob' not in stub:
+            continue
+        # System.Geometry와 Parameters.Geometry가 같은 메쉬면 한 번만 변환
+        cache_key = (stub['blob'], stub.get('vertex_key'), stub.get('flat'))
+        if cache_key not in hydrated_cache:
+            hydrated_cache[cache_key] = rehydrate_geometry_dict(stub, meshes_by_digest, as_arrays)
+        container[key] = hydrated_cache[cache_key]
+    return raw_data
+
+
+def strip_geometry_meshes(raw_data, bbox_by_digest):
+    """
+    뷰어 1단계 전송용: blob stub에서 내부 필드를 지우고 bounding box만 남깁니다. (raw_data를 직접 수정)
+    메쉬 좌표는 보내지 않고, 뷰어가 'blob'이 남아있는 객체의 메쉬를 따로 요청합니다. (get_element_geometry)
+
+    결과 형식: {'blob', 'bbox', 'vertex_count', 'face_count', 'matrix', 'materials', ...}
+    """
+    light_cache = {}
+    for container, key in list(iter_geometry_slots(raw_data)):
+        stub = container[key]
+        if 'blob' not in stub:
+            continue
+        cache_key = id(stub)
+        if cache_key not in light_cache:
+            light = {k: v for k, v in stub.items() if k not in STUB_KEYS}
+            light['blob'] = stub['blob']
+            light['bbox'] = bbox_by_digest.get(stub['blob'])
+            light['vertex_count'] = stub.get('vertex_count', 0)
+            light['face_count'] = stub.get('face_count', 0)
+            light_cache[cache_key] = light
+        container[key] = light_cache[cache_key]
+    return raw_data
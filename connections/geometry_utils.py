@@ -0,0 +1,197 @@
+"""
+Geometry 유틸리티
+- raw_data에서 메쉬(vertices/faces) 추출
+- NumPy 기반 일괄(batch) 체적 계산 (Signed tetrahedron volume)
+"""
+
+import numpy as np
+
+
+def extract_geometry(raw_data):
+    """
+    raw_data에서 Geometry 딕셔너리를 찾아 반환합니다.
+
+    지원하는 데이터 구조:
+    1. raw_data['geometry'] (Revit/일반 형식)
+    2. raw_data['Parameters']['Geometry'] (Blender IFC 형식)
+    3. raw_data['System']['Geometry'] (Blender IFC 원본 위치)
+    """
+    if not raw_data or not isinstance(raw_data, dict):
+        return None
+
+    # 경로 1: raw_data['geometry'] (Revit 형식)
+    if 'geometry' in raw_data:
+        return raw_data['geometry']
+    # 경로 2: raw_data['Parameters']['Geometry'] (Blender IFC 형식)
+    parameters = raw_data.get('Parameters')
+    if isinstance(parameters, dict) and 'Geometry' in parameters:
+        return parameters['Geometry']
+    # 경로 3: raw_data['System']['Geometry']
+    system = raw_data.get('System')
+    if isinstance(system, dict) and 'Geometry' in system:
+        return system['Geometry']
+    return None
+
+
+def _empty_report():
+    return {
+        'volume': None,
+        'face_count': 0,
+        'non_triangle_faces': 0,
+        'out_of_range_faces': 0,
+        'degenerate_faces': 0,
+    }
+
+
+def _to_vertex_array(vertices):
+    """
+    vertices를 (N, 3) float64 배열로 변환합니다.
+    좌표가 3개가 아니거나 숫자가 아닌 꼭짓점은 NaN으로 채우고 유효 마스크를 함께 반환합니다.
+    """
+    try:
+        arr = np.asarray(vertices, dtype=np.float64)
+        if arr.ndim == 2 and arr.shape[1] == 3:
+            return arr, None
+    except (TypeError, ValueError):
+        pass
+
+    # 느린 경로: 꼭짓점마다 개별 검사 (비정형 데이터)
+    arr = np.full((len(vertices), 3), np.nan, dtype=np.float64)
+    valid = np.zeros(len(vertices), dtype=bool)
+    for i, v in enumerate(vertices):
+        try:
+            if len(v) != 3:
+                continue
+            arr[i] = (float(v[0]), float(v[1]), float(v[2]))
+            valid[i] = True
+        except (TypeError, ValueError):
+            continue
+    return arr, valid
+
+
+def _to_face_array(faces):
+    """
+    faces를 (M, 3) int64 배열로 변환합니다.
+    삼각형이 아닌 face는 제외하고 그 개수를 함께 반환합니다.
+    """
+    try:
+        arr = np.asarray(faces, dtype=np.int64)
+        if arr.ndim == 2 and arr.shape[1] == 3:
+            return arr, 0
+    except (TypeError, ValueError):
+        pass
+
+    # 느린 경로: 삼각형만 골라냄
+    triangles = []
+    non_triangle = 0
+    for face in faces:
+        try:
+            if len(face) != 3:
+                non_triangle += 1
+                continue
+            triangles.append((int(face[0]), int(face[1]), int(face[2])))
+        except (TypeError, ValueError):
+            non_triangle += 1
+    if not triangles:
+        return np.empty((0, 3), dtype=np.int64), non_triangle
+    return np.asarray(triangles, dtype=np.int64), non_triangle
+
+
+def calculate_geometry_volumes(raw_data_list, meshes_by_digest=None):
+    """
+    여러 객체의 Geometry 체적을 한 번에 계산합니다.
+
+    모든 객체의 vertices/faces를 하나의 배열로 쌓은 뒤(stacked),
+    삼각형마다 v0 · (v1 × v2)를 벡터 연산으로 계산하고 객체별로 합산합니다.
+
+    Args:
+        raw_data_list: RawElement.raw_data 딕셔너리 목록
+        meshes_by_digest: GeometryBlob 참조(stub)를 해석하기 위한 {digest: (vertices, faces)} 매핑
+
+    Returns:
+        raw_data_list와 같은 순서의 리포트 목록. 각 항목:
+        {
+            'volume': float | None,      # 소수점 6자리 반올림, 계산 불가 시 None
+            'face_count': int,           # 체적 계산에 사용된 삼각형 수
+            'non_triangle_faces': int,   # 삼각형이 아니어서 제외된 face 수
+            'out_of_range_faces': int,   # 인덱스 범위를 벗어나거나 잘못된 꼭짓점을 참조한 face 수
+            'degenerate_faces': int,     # 면적이 0인 삼각형 수 (계산에는 포함, 기여도 0)
+        }
+    """
+    reports = [_empty_report() for _ in raw_data_list]
+
+    vertex_blocks = []
+    face_blocks = []
+    owner_blocks = []
+    vertex_offset = 0
+
+    for idx, raw_data in enumerate(raw_data_list):
+        geometry = extract_geometry(raw_data)
+        if not geometry or not isinstance(geometry, dict):
+            continue
+
+        if 'blob' in geometry:
+            # GeometryBlob에 저장된 메쉬 (stub만 raw_data에 남아있음)
+            mesh = (meshes_by_digest or {}).get(geometry['blob'])
+            if mesh is None:
+                continue
+            vertices, faces = mesh
+            if not len(vertices) or not len(faces):
+                continue
+        else:
+            # Vertices 찾기 (여러 키 이름 지원)
+            vertices = geometry.get('vertices') or geometry.get('verts', [])
+            faces = geometry.get('faces', [])
+            if not vertices or not faces:
+                continue
+
+        vert_arr, vert_valid = _to_vertex_array(vertices)
+        face_arr, non_triangle = _to_face_array(faces)
+        report = reports[idx]
+        report['non_triangle_faces'] = non_triangle
+
+        # 인덱스 범위 및 꼭짓점 유효성 체크
+        in_range = ((face_arr >= 0) & (face_arr < len(vert_arr))).all(axis=1)
+        if vert_valid is not None:
+            in_range[in_range] = vert_valid[face_arr[in_range]].all(axis=1)
+        report['out_of_range_faces'] = int(len(face_arr) - np.count_nonzero(in_range))
+        face_arr = face_arr[in_range]
+
+        # 유효한 삼각형이 하나도 없어도 기존 동작과 동일하게 체적 0을 반환
+        report['volume'] = 0.0
+        report['face_count'] = int(len(face_arr))
+        if not len(face_arr):
+            continue
+
+        vertex_blocks.append(vert_arr)
+        face_blocks.append(face_arr + vertex_offset)
+        owner_blocks.append(np.full(len(face_arr), idx, dtype=np.int64))
+        vertex_offset += len(vert_arr)
+
+    if not face_blocks:
+        return reports
+
+    all_vertices = np.concatenate(vertex_blocks)
+    all_faces = np.concatenate(face_blocks)
+    owners = np.concatenate(owner_blocks)
+
+    v0 = all_vertices[all_faces[:, 0]]
+    v1 = all_vertices[all_faces[:, 1]]
+    v2 = all_vertices[all_faces[:, 2]]
+
+    # Signed volume of tetrahedron: v0 · (v1 × v2)
+    signed = np.einsum('ij,ij->i', v0, np.cross(v1, v2))
+    signed_sums = np.bincount(owners, weights=signed, minlength=len(raw_data_list))
+
+    # 면적이 0인 삼각형 (중복 인덱스 또는 일직선 꼭짓점)
+    area_vectors = np.cross(v1 - v0, v2 - v0)
+    degenerate = ~np.any(area_vectors, axis=1)
+    degenerate_counts = np.bincount(owners, weights=degenerate, minlength=len(raw_data_list))
+
+    for idx in np.unique(owners):
+        report = reports[idx]
+        # 절대값을 취하고 6으로 나눔 (tetrahedron 공식)
+        report['volume'] = round(abs(float(signed_sums[idx]) / 6.0), 6)
+        report['degenerate_faces'] = int(degenerate_counts[idx])
+
+    return reports
@@ -0,0 +1,312 @@
+"""
+프로젝트 GLB(glTF 2.0 binary) 내보내기
+- 같은 메쉬(GeometryBlob digest)와 같은 재질을 쓰는 객체들은 glTF mesh 하나를 공유하고,
+  객체마다 node(matrix)로 인스턴싱합니다. 동일한 패밀리/타입이 많은 모델에서 파일 크기가 크게 줄어듭니다.
+- node.extras에 element_id / unique_id (분할 객체는 split_element_id 추가)를 담아 외부 도구에서도 객체를 식별할 수 있습니다.
+- 결과 파일은 project.viewer_revision별로 캐시됩니다. (viewer_snapshot의 디렉터리/LRU 한도를 함께 사용)
+
+좌표계: 원본은 Z-up(IFC/Revit/Blender)이므로 루트 node에 Z-up → Y-up 변환을 한 번만 적용합니다. (3D 뷰어와 동일)
+분할된 BIM 원본은 제외하고 leaf 분할 객체를 대신 넣습니다. (분할 객체 메쉬는 world 좌표이므로 matrix 없음)
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import struct
+import tempfile
+
+import numpy as np
+
+from .geometry_store import VERTEX_KEYS, iter_geometry_slots, mesh_bbox, pack_mesh
+from .models import GeometryBlob, Project, RawElement, SplitElement
+from .viewer_snapshot import commit_cached_file, glb_cache_path, open_cached_file, temp_path_for
+
+GLB_MAGIC = 0x46546C67       # 'glTF'
+GLB_VERSION = 2
+CHUNK_JSON = 0x4E4F534A
+CHUNK_BIN = 0x004E4942
+ELEMENT_BATCH_SIZE = 1000    # 한 번에 읽는 RawElement 수 (메쉬 blob도 이 단위로 읽음)
+
+# glTF는 column-major matrix, Y-up 좌표계
+IDENTITY_MATRIX = [1.0, 0.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 0.0, 1.0]
+Z_UP_TO_Y_UP = [1.0, 0.0, 0.0, 0.0, 0.0, 0.0, -1.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 0.0, 0.0, 1.0]
+DEFAULT_COLOR = (0.5, 0.5, 0.5)  # 3D 뷰어 기본 회색(0x808080)과 동일
+
+# glTF 상수
+ARRAY_BUFFER = 34962
+ELEMENT_ARRAY_BUFFER = 34963
+FLOAT = 5126
+UNSIGNED_INT = 5125
+
+
+def selection_key(element_ids):
+    """캐시 파일 이름용 선택 범위 키 (전체 프로젝트면 'all')"""
+    if not element_ids:
+        return 'all'
+    joined = ','.join(sorted(str(element_id) for element_id in element_ids))
+    return 'sel-' + hashlib.sha256(joined.encode('utf-8')).hexdigest()[:16]
+
+
+def export_project_glb(project_id, element_ids=None):
+    """
+    프로젝트(또는 element_ids로 지정한 객체들)의 GLB 파일 경로를 반환합니다.
+    현재 viewer_revision의 캐시가 있으면 그대로 사용하고, 없으면 새로 만듭니다.
+
+    만드는 동안 더 새로운 revision의 캐시가 생겼다면 이전 데이터로 만든 파일은 버리고 새 revision으로 다시 만듭니다.
+
+    Returns: (path, stats) - 캐시를 사용한 경우 stats는 None
+    """
+    while True:
+        revision = Project.objects.filter(id=project_id).values_list('viewer_revision', flat=True).get()
+        path = glb_cache_path(project_id, revision, selection_key(element_ids))
+        cached = open_cached_file(path)
+        if cached:
+            return cached, None
+
+        tmp_path = temp_path_for(path)
+        try:
+            with open(tmp_path, 'wb') as out_file:
+                stats = write_project_glb(project_id, out_file, element_ids)
+        except BaseException:
+            # 실패한 파일이 캐시되거나 임시 파일로 남지 않도록 삭제
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        if commit_cached_file(project_id, revision, tmp_path, path):
+            return path, stats
+
+
+def write_project_glb(project_id, out_file, element_ids=None):
+    """GLB를 out_file에 씁니다. 메쉬 버퍼는 임시 파일에 먼저 모은 뒤 JSON 청크 다음에 복사합니다."""
+    with tempfile.TemporaryFile() as bin_file:
+        builder = _GlbBuilder(bin_file)
+        split_rows, split_raw_ids = _active_leaf_splits(project_id, element_ids)
+
+        element_qs = RawElement.objects.filter(project_id=project_id)
+        if element_ids:
+            element_qs = element_qs.filter(id__in=element_ids)
+        after_id = None
+        while True:
+            batch_qs = element_qs if after_id is None else element_qs.filter(id__gt=after_id)
+            rows = list(
+                batch_qs.order_by('id')
+                .values_list('id', 'element_unique_id', 'raw_data', 'geometry_blob_id')[:ELEMENT_BATCH_SIZE]
+            )
+            if not rows:
+                break
+            after_id = rows[-1][0]
+            visible_rows = [row for row in rows if row[0] not in split_raw_ids]
+            builder.load_blobs(row[3] for row in visible_rows)
+            for element_id, unique_id, raw_data, _ in visible_rows:
+                builder.add_element(raw_data, {'element_id': str(element_id), 'unique_id': unique_id})
+            if len(rows) < ELEMENT_BATCH_SIZE:
+                break
+
+        if split_rows:
+            builder.load_blobs(row['geometry_blob_id'] for row in split_rows)
+            for row in split_rows:
+                builder.add_split(row)
+
+        gltf, bin_length = builder.finish()
+        json_bytes = json.dumps(gltf, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+        json_bytes += b' ' * (-len(json_bytes) % 4)
+        bin_padding = -bin_length % 4
+        total_length = 12 + 8 + len(json_bytes) + (8 + bin_length + bin_padding if bin_length else 0)
+
+        out_file.write(struct.pack('<III', GLB_MAGIC, GLB_VERSION, total_length))
+        out_file.write(struct.pack('<II', len(json_bytes), CHUNK_JSON))
+        out_file.write(json_bytes)
+        if bin_length:
+            out_file.write(struct.pack('<II', bin_length + bin_padding, CHUNK_BIN))
+            bin_file.seek(0)
+            shutil.copyfileobj(bin_file, out_file)
+            out_file.write(b'\0' * bin_padding)
+        return builder.stats()
+
+
+def _active_leaf_splits(project_id, element_ids=None):
+    """3D 뷰어와 같은 기준의 분할 객체: 활성 분할 중 다른 분할의 parent가 아닌 것. (분할된 원본 ID 집합도 반환)"""
+    split_qs = SplitElement.objects.filter(project_id=project_id, is_active=True)
+    if element_ids:
+        split_qs = split_qs.filter(raw_element_id__in=element_ids)
+    rows = list(split_qs.values(
+        'id', 'raw_element_id', 'parent_split_id', 'geometry_data', 'geometry_blob_id',
+        'raw_element__element_unique_id', 'raw_element__raw_data',
+    ))
+    parent_ids = {row['parent_split_id'] for row in rows if row['parent_split_id']}
+    raw_ids_with_splits = {row['raw_element_id'] for row in rows}
+    return [row for row in rows if row['id'] not in parent_ids], raw_ids_with_splits
+
+
+def _primary_geometry(raw_data):
+    """(메쉬가 담긴 Geometry 딕셔너리, matrix, materials)를 반환합니다. 메쉬가 없으면 geometry는 None."""
+    geometry = matrix = materials = None
+    for container, key in iter_geometry_slots(raw_data):
+        slot = container[key]
+        if geometry is None and ('blob' in slot or any(k in slot for k in VERTEX_KEYS)):
+            geometry = slot
+        if matrix is None and isinstance(slot.get('matrix'), list) and len(slot['matrix']) == 16:
+            matrix = slot['matrix']
+        if materials is None and isinstance(slot.get('materials'), dict):
+            materials = slot['materials']
+    return geometry, matrix, materials
+
+
+class _GlbBuilder:
+    def __init__(self, bin_file):
+        self.bin_file = bin_file
+        self.bin_length = 0
+        self.buffer_views = []
+        self.accessors = []
+        self.meshes = []
+        self.materials = []
+        self.nodes = []
+        self.geometry_accessors = {}   # {digest: (position accessor, index accessor)}
+        self.mesh_index = {}           # {(digest, material index): mesh index}
+        self.material_index = {}       # {(r, g, b, a): material index}
+        self.instanced_nodes = 0
+
+    # --- 메쉬 버퍼 ---
+    def load_blobs(self, digests):
+        """아직 버퍼에 쓰지 않은 blob을 한 번의 쿼리로 읽어 씁니다."""
+        new_digests = {d for d in digests if d and d not in self.geometry_accessors}
+        if not new_digests:
+            return
+        blob_rows = GeometryBlob.objects.filter(digest__in=new_digests).values_list(
+            'digest', 'vertices', 'faces', 'vertex_count', 'face_count', 'bbox'
+        )
+        for digest, vertices, faces, vertex_count, face_count, bbox in blob_rows:
+            if not vertex_count or not face_count:
+                continue
+            vertices = bytes(vertices)
+            if bbox is None:
+                bbox = mesh_bbox(np.frombuffer(vertices, dtype='<f4'))
+            self._add_geometry(digest, vertices, bytes(faces), vertex_count, face_count, bbox)
+
+    def _add_geometry(self, digest, vertex_bytes, face_bytes, vertex_count, face_count, bbox):
+        position_view = self._write_view(vertex_bytes, ARRAY_BUFFER)
+        index_view = self._write_view(face_bytes, ELEMENT_ARRAY_BUFFER)
+        self.accessors.append({
+            'bufferView': position_view, 'componentType': FLOAT, 'count': vertex_count, 'type': 'VEC3',
+            'min': bbox[:3], 'max': bbox[3:],
+        })
+        self.accessors.append({
+            'bufferView': index_view, 'componentType': UNSIGNED_INT, 'count': face_count * 3, 'type': 'SCALAR',
+        })
+        self.geometry_accessors[digest] = (len(self.accessors) - 2, len(self.accessors) - 1)
+
+    def _write_view(self, data, target):
+        self.bin_file.write(data)
+        self.buffer_views.append({'buffer': 0, 'byteOffset': self.bin_length, 'byteLength': len(data), 'target': target})
+        self.bin_length += len(data)
+        # float32/uint32 버퍼는 항상 4의 배수이지만, 정렬 요구사항을 명시적으로 맞춤
+        padding = -self.bin_length % 4
+        if padding:
+            self.bin_file.write(b'\0' * padding)
+            self.bin_length += padding
+        return len(self.buffer_views) - 1
+
+    def _inline_digest(self, geometry):
+        """blob으로 분리되지 않은 (인라인) 메쉬를 버퍼에 쓰고 digest를 반환합니다."""
+        vertex_key = next((k for k in VERTEX_KEYS if geometry.get(k) is not None), None)
+        packed = pack_mesh(geometry[vertex_key], geometry.get('faces')) if vertex_key else None
+        if packed is None or not packed['vertex_count'] or not packed['face_count']:
+            return None
+        if packed['digest'] not in self.geometry_accessors:
+            self._add_geometry(
+                packed['digest'], packed['vertices'], packed['faces'],
+                packed['vertex_count'], packed['face_count'], packed['bbox'],
+            )
+        return packed['digest']
+
+    # --- 재질/메쉬/노드 ---
+    def _material(self, materials):
+        color = DEFAULT_COLOR
+        alpha = 1.0
+        if materials:
+            diffuse = materials.get('diffuse_color')
+            if isinstance(diffuse, (list, tuple)) and len(diffuse) >= 3:
+                color = tuple(float(c) for c in diffuse[:3])
+            if materials.get('transparency') is not None:
+                alpha = 1.0 - float(materials['transparency'])
+        key = tuple(round(v, 4) for v in (*color, alpha))
+        if key not in self.material_index:
+            material = {
+                'pbrMetallicRoughness': {'baseColorFactor': list(key), 'metallicFactor': 0.0, 'roughnessFactor': 1.0},
+                'doubleSided': True,
+            }
+            if alpha < 1.0:
+                material['alphaMode'] = 'BLEND'
+            if materials and materials.get('name'):
+                material['name'] = str(materials['name'])
+            self.materials.append(material)
+            self.material_index[key] = len(self.materials) - 1
+        return self.material_index[key]
+
+    def _mesh(self, digest, material):
+        key = (digest, material)
+        if key in self.mesh_index:
+            self.instanced_nodes += 1
+            return self.mesh_index[key]
+        position, indices = self.geometry_accessors[digest]
+        self.meshes.append({'primitives': [{'attributes': {'POSITION': position}, 'indices': indices, 'material': material}]})
+        self.mesh_index[key] = len(self.meshes) - 1
+        return self.mesh_index[key]
+
+    def _add_node(self, geometry, matrix, materials, name, extras):
+        digest = geometry.get('blob') if 'blob' in geometry else self._inline_digest(geometry)
+        if digest not in self.geometry_accessors:
+            return
+        node = {'mesh': self._mesh(digest, self._material(materials)), 'extras': extras}
+        if name:
+            node['name'] = str(name)
+        if matrix and [float(v) for v in matrix] != IDENTITY_MATRIX:
+            node['matrix'] = [float(v) for v in matrix]
+        self.nodes.append(node)
+
+    def add_element(self, raw_data, extras):
+        geometry, matrix, materials = _primary_geometry(raw_data)
+        if geometry is not None:
+            self._add_node(geometry, matrix, materials, raw_data.get('Name'), extras)
+
+    def add_split(self, row):
+        geometry = row['geometry_data']
+        if not isinstance(geometry, dict):
+            return
+        raw_data = row['raw_element__raw_data'] or {}
+        _, _, materials = _primary_geometry(raw_data)
+        extras = {
+            'element_id': str(row['raw_element_id']),
+            'unique_id': row['raw_element__element_unique_id'],
+            'split_element_id': str(row['id']),
+        }
+        # 분할 객체 메쉬는 world 좌표로 저장되어 있으므로 matrix를 적용하지 않음
+        self._add_node(geometry, None, materials, raw_data.get('Name'), extras)
+
+    def finish(self):
+        root = {'name': 'Model', 'matrix': Z_UP_TO_Y_UP}
+        if self.nodes:
+            root['children'] = list(range(len(self.nodes)))
+        gltf = {
+            'asset': {'version': '2.0', 'generator': 'CostEstimator GLB export'},
+            'scene': 0,
+            'scenes': [{'nodes': [len(self.nodes)]}],
+            'nodes': self.nodes + [root],
+        }
+        for key, items in (('meshes', self.meshes), ('materials', self.materials),
+                           ('accessors', self.accessors), ('bufferViews', self.buffer_views)):
+            if items:
+                gltf[key] = items
+        if self.bin_length:
+            gltf['buffers'] = [{'byteLength': self.bin_length}]
+        return gltf, self.bin_length
+
+    def stats(self):
+        return {
+            'nodes': len(self.nodes),
+            'meshes': len(self.meshes),
+            'geometries': len(self.geometry_accessors),
+            'instanced_nodes': self.instanced_nodes,
+            'bin_bytes': self.bin_length,
+        }
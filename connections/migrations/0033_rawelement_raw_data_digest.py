@@ -0,0 +1,43 @@
+# Generated by Django 5.2.6 on 2026-10-18 08:40
+
+import hashlib
+import json
+
+from django.db import migrations, models
+
+
+# 마이그레이션 시점의 connections.sync_utils.compute_raw_data_digest 고정 복사본
+# (이후 헬퍼가 바뀌어도 새 DB에서 같은 결과가 나오도록 import하지 않음)
+def compute_raw_data_digest(raw_data):
+    canonical = json.dumps(raw_data, sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def backfill_raw_data_digest(apps, schema_editor):
+    """기존 RawElement의 raw_data_digest를 일괄 계산합니다."""
+    RawElement = apps.get_model('connections', 'RawElement')
+    batch = []
+    for elem in RawElement.objects.only('id', 'raw_data').iterator(chunk_size=2000):
+        elem.raw_data_digest = compute_raw_data_digest(elem.raw_data)
+        batch.append(elem)
+        if len(batch) >= 2000:
+            RawElement.objects.bulk_update(batch, ['raw_data_digest'])
+            batch = []
+    if batch:
+        RawElement.objects.bulk_update(batch, ['raw_data_digest'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('connections', '0032_costcode_secondary_detail_code'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rawelement',
+            name='raw_data_digest',
+            field=models.CharField(blank=True, default='', help_text='정규화된 raw_data의 SHA-256 digest (동기화 시 변경 감지용)', max_length=64),
+        ),
+        migrations.RunPython(backfill_raw_data_digest, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,271 @@
+# Generated by Django 5.2.6 on 2026-10-18 08:44
+
+import hashlib
+import json
+
+import django.db.models.deletion
+import numpy as np
+from django.db import migrations, models
+
+BATCH_SIZE = 500
+
+# ▼▼▼ 마이그레이션 시점의 connections.geometry_store / sync_utils 헬퍼 고정 복사본 ▼▼▼
+# (이후 헬퍼가 바뀌어도 새 DB에서 같은 결과가 나오도록 import하지 않음)
+VERTEX_DTYPE = np.dtype('<f4')
+FACE_DTYPE = np.dtype('<u4')
+VERTEX_KEYS = ('verts', 'vertices')
+STUB_KEYS = ('blob', 'vertex_key', 'flat', 'vertex_count', 'face_count')
+
+
+def compute_raw_data_digest(raw_data):
+    canonical = json.dumps(raw_data, sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def pack_mesh(vertices, faces):
+    try:
+        vertex_array = np.asarray(vertices, dtype=np.float64)
+        face_array = np.asarray(faces, dtype=np.int64)
+    except (TypeError, ValueError):
+        return None
+    if vertex_array.ndim == 1 and vertex_array.size % 3 == 0:
+        vertex_array = vertex_array.reshape(-1, 3)
+    if face_array.ndim == 1 and face_array.size % 3 == 0:
+        face_array = face_array.reshape(-1, 3)
+    if vertex_array.ndim != 2 or vertex_array.shape[1] != 3:
+        return None
+    if face_array.ndim != 2 or face_array.shape[1] != 3:
+        return None
+    if face_array.size and (face_array.min() < 0 or face_array.max() > np.iinfo(FACE_DTYPE).max):
+        return None
+
+    vertex_bytes = vertex_array.astype(VERTEX_DTYPE).tobytes()
+    face_bytes = face_array.astype(FACE_DTYPE).tobytes()
+    hasher = hashlib.sha256()
+    hasher.update(len(vertex_bytes).to_bytes(8, 'little'))
+    hasher.update(vertex_bytes)
+    hasher.update(face_bytes)
+    return {
+        'digest': hasher.hexdigest(),
+        'vertices': vertex_bytes,
+        'faces': face_bytes,
+        'vertex_count': int(len(vertex_array)),
+        'face_count': int(len(face_array)),
+    }
+
+
+def unpack_mesh(vertex_bytes, face_bytes):
+    vertices = np.frombuffer(bytes(vertex_bytes), dtype=VERTEX_DTYPE).reshape(-1, 3)
+    faces = np.frombuffer(bytes(face_bytes), dtype=FACE_DTYPE).reshape(-1, 3)
+    return vertices, faces
+
+
+def iter_geometry_slots(raw_data):
+    if not isinstance(raw_data, dict):
+        return
+    if isinstance(raw_data.get('geometry'), dict):
+        yield raw_data, 'geometry'
+    for parent_key in ('System', 'Parameters'):
+        parent = raw_data.get(parent_key)
+        if isinstance(parent, dict) and isinstance(parent.get('Geometry'), dict):
+            yield parent, 'Geometry'
+    if isinstance(raw_data.get('Parameters.Geometry'), dict):
+        yield raw_data, 'Parameters.Geometry'
+
+
+def _has_items(value):
+    return value is not None and not isinstance(value, (str, dict)) and np.size(value) > 0
+
+
+def externalize_geometry_dict(geometry, packed_cache=None):
+    if not isinstance(geometry, dict) or 'blob' in geometry:
+        return geometry, None
+    vertex_key = next((k for k in VERTEX_KEYS if _has_items(geometry.get(k))), None)
+    faces = geometry.get('faces')
+    if vertex_key is None or not _has_items(faces):
+        return geometry, None
+
+    packed = packed_cache.get(id(geometry)) if packed_cache is not None else None
+    if packed is None:
+        packed = pack_mesh(geometry[vertex_key], faces)
+        if packed is None:
+            return geometry, None
+        if packed_cache is not None:
+            packed_cache[id(geometry)] = packed
+
+    stub = {k: v for k, v in geometry.items() if k not in VERTEX_KEYS and k != 'faces'}
+    stub['blob'] = packed['digest']
+    stub['vertex_count'] = packed['vertex_count']
+    stub['face_count'] = packed['face_count']
+    if vertex_key != 'verts':
+        stub['vertex_key'] = vertex_key
+    if np.ndim(geometry[vertex_key]) == 1:
+        stub['flat'] = True
+    return stub, packed
+
+
+def externalize_geometry(raw_data):
+    packed_by_digest = {}
+    packed_cache = {}
+    primary_digest = None
+    for container, key in list(iter_geometry_slots(raw_data)):
+        stub, packed = externalize_geometry_dict(container[key], packed_cache)
+        if packed is None:
+            continue
+        container[key] = stub
+        packed_by_digest[packed['digest']] = packed
+        if primary_digest is None:
+            primary_digest = packed['digest']
+    return primary_digest, packed_by_digest
+
+
+def collect_geometry_digests(raw_data):
+    return {container[key]['blob'] for container, key in iter_geometry_slots(raw_data) if 'blob' in container[key]}
+
+
+def rehydrate_geometry_dict(geometry, meshes_by_digest):
+    if not isinstance(geometry, dict) or 'blob' not in geometry:
+        return geometry
+    mesh = meshes_by_digest.get(geometry['blob'])
+    if mesh is None:
+        return geometry
+    vertices, faces = mesh
+    hydrated = {k: v for k, v in geometry.items() if k not in STUB_KEYS}
+    if geometry.get('flat'):
+        vertices, faces = vertices.ravel(), faces.ravel()
+    hydrated[geometry.get('vertex_key', 'verts')] = vertices.tolist()
+    hydrated['faces'] = faces.tolist()
+    return hydrated
+
+
+def rehydrate_geometry(raw_data, meshes_by_digest):
+    hydrated_cache = {}
+    for container, key in list(iter_geometry_slots(raw_data)):
+        stub = container[key]
+        if 'blob' not in stub:
+            continue
+        cache_key = (stub['blob'], stub.get('vertex_key'), stub.get('flat'))
+        if cache_key not in hydrated_cache:
+            hydrated_cache[cache_key] = rehydrate_geometry_dict(stub, meshes_by_digest)
+        container[key] = hydrated_cache[cache_key]
+    return raw_data
+# ▲▲▲ 여기까지 ▲▲▲
+
+
+def _store_blobs(GeometryBlob, packed_by_digest):
+    if not packed_by_digest:
+        return
+    GeometryBlob.objects.bulk_create([
+        GeometryBlob(
+            digest=digest,
+            vertices=packed['vertices'],
+            faces=packed['faces'],
+            vertex_count=packed['vertex_count'],
+            face_count=packed['face_count'],
+        )
+        for digest, packed in packed_by_digest.items()
+    ], ignore_conflicts=True)
+
+
+def externalize_existing_geometry(apps, schema_editor):
+    """기존 raw_data / geometry_data에 인라인으로 저장된 메쉬를 GeometryBlob으로 옮깁니다."""
+    GeometryBlob = apps.get_model('connections', 'GeometryBlob')
+    RawElement = apps.get_model('connections', 'RawElement')
+    SplitElement = apps.get_model('connections', 'SplitElement')
+
+    batch, packed_batch = [], {}
+    for elem in RawElement.objects.only('id', 'raw_data').iterator(chunk_size=BATCH_SIZE):
+        blob_digest, packed = externalize_geometry(elem.raw_data)
+        if blob_digest is None:
+            continue
+        elem.geometry_blob_id = blob_digest
+        elem.raw_data_digest = compute_raw_data_digest(elem.raw_data)
+        batch.append(elem)
+        packed_batch.update(packed)
+        if len(batch) >= BATCH_SIZE:
+            _store_blobs(GeometryBlob, packed_batch)
+            RawElement.objects.bulk_update(batch, ['raw_data', 'raw_data_digest', 'geometry_blob'])
+            batch, packed_batch = [], {}
+    if batch:
+        _store_blobs(GeometryBlob, packed_batch)
+        RawElement.objects.bulk_update(batch, ['raw_data', 'raw_data_digest', 'geometry_blob'])
+
+    batch, packed_batch = [], {}
+    for split in SplitElement.objects.only('id', 'geometry_data').iterator(chunk_size=BATCH_SIZE):
+        stub, packed = externalize_geometry_dict(split.geometry_data)
+        if packed is None:
+            continue
+        split.geometry_data = stub
+        split.geometry_blob_id = packed['digest']
+        batch.append(split)
+        packed_batch[packed['digest']] = packed
+        if len(batch) >= BATCH_SIZE:
+            _store_blobs(GeometryBlob, packed_batch)
+            SplitElement.objects.bulk_update(batch, ['geometry_data', 'geometry_blob'])
+            batch, packed_batch = [], {}
+    if batch:
+        _store_blobs(GeometryBlob, packed_batch)
+        SplitElement.objects.bulk_update(batch, ['geometry_data', 'geometry_blob'])
+
+
+def inline_blob_geometry(apps, schema_editor):
+    """되돌리기: GeometryBlob 참조를 다시 인라인 메쉬로 복원합니다."""
+    GeometryBlob = apps.get_model('connections', 'GeometryBlob')
+    RawElement = apps.get_model('connections', 'RawElement')
+    SplitElement = apps.get_model('connections', 'SplitElement')
+    meshes = {blob.digest: unpack_mesh(blob.vertices, blob.faces) for blob in GeometryBlob.objects.all()}
+
+    batch = []
+    for elem in RawElement.objects.filter(geometry_blob__isnull=False).only('id', 'raw_data').iterator(chunk_size=BATCH_SIZE):
+        if not collect_geometry_digests(elem.raw_data):
+            continue
+        rehydrate_geometry(elem.raw_data, meshes)
+        elem.raw_data_digest = compute_raw_data_digest(elem.raw_data)
+        batch.append(elem)
+        if len(batch) >= BATCH_SIZE:
+            RawElement.objects.bulk_update(batch, ['raw_data', 'raw_data_digest'])
+            batch = []
+    if batch:
+        RawElement.objects.bulk_update(batch, ['raw_data', 'raw_data_digest'])
+
+    batch = []
+    for split in SplitElement.objects.filter(geometry_blob__isnull=False).only('id', 'geometry_data').iterator(chunk_size=BATCH_SIZE):
+        split.geometry_data = rehydrate_geometry_dict(split.geometry_data, meshes)
+        batch.append(split)
+        if len(batch) >= BATCH_SIZE:
+            SplitElement.objects.bulk_update(batch, ['geometry_data'])
+            batch = []
+    if batch:
+        SplitElement.objects.bulk_update(batch, ['geometry_data'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('connections', '0033_rawelement_raw_data_digest'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GeometryBlob',
+            fields=[
+                ('digest', models.CharField(help_text='vertices/faces 버퍼의 SHA-256 digest', max_length=64, primary_key=True, serialize=False)),
+                ('vertices', models.BinaryField(help_text='float32 little-endian (N x 3)')),
+                ('faces', models.BinaryField(help_text='uint32 little-endian (M x 3)')),
+                ('vertex_count', models.IntegerField(default=0)),
+                ('face_count', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='rawelement',
+            name='geometry_blob',
+            field=models.ForeignKey(blank=True, help_text='raw_data의 Geometry가 참조하는 메쉬 blob', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='raw_elements', to='connections.geometryblob'),
+        ),
+        migrations.AddField(
+            model_name='splitelement',
+            name='geometry_blob',
+            field=models.ForeignKey(blank=True, help_text='geometry_data가 참조하는 메쉬 blob', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='split_elements', to='connections.geometryblob'),
+        ),
+        migrations.RunPython(externalize_existing_geometry, inline_blob_geometry),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 08:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('connections', '0034_geometryblob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rawelement',
+            name='source_hash',
+            field=models.CharField(blank=True, default='', help_text='커넥터(Blender/Revit)가 manifest로 보고한 객체 content hash (delta 동기화용)', max_length=64),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.6 on 2026-10-18 08:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('connections', '0035_rawelement_source_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='committed_sync_generation',
+            field=models.PositiveIntegerField(default=0, help_text='오래된 객체 정리까지 완료된 마지막 동기화 generation'),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='sync_generation_seq',
+            field=models.PositiveIntegerField(default=0, help_text='마지막으로 시작된 BIM 동기화 세션의 generation 번호 (세션마다 1씩 증가)'),
+        ),
+        migrations.AddField(
+            model_name='rawelement',
+            name='sync_generation',
+            field=models.PositiveIntegerField(default=0, help_text='이 객체가 마지막으로 확인된 동기화 generation (이보다 새 세션에서 확인되지 않으면 정리 대상)'),
+        ),
+        migrations.AddIndex(
+            model_name='rawelement',
+            index=models.Index(fields=['project', 'sync_generation'], name='rawelement_sync_gen_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.6 on 2026-10-18 09:02
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('connections', '0036_sync_generation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngestSession',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('source', models.CharField(help_text='전송한 커넥터 (revit / blender)', max_length=20)),
+                ('status', models.CharField(choices=[('active', '전송 중'), ('completed', '완료'), ('failed', '실패'), ('abandoned', '중단됨')], default='active', max_length=20)),
+                ('sync_generation', models.PositiveIntegerField(default=0, help_text='이 세션이 객체에 기록하는 동기화 generation')),
+                ('total_elements', models.PositiveIntegerField(default=0)),
+                ('last_acked_chunk', models.IntegerField(default=-1, help_text='0번부터 연속으로 저장이 끝난 마지막 청크 번호 (재개 시 이 다음 청크부터 전송)')),
+                ('acked_element_count', models.PositiveIntegerField(default=0, help_text='last_acked_chunk까지 저장된 객체 수')),
+                ('failed_chunks', models.JSONField(blank=True, default=list, help_text='저장에 실패한 청크 번호 목록')),
+                ('source_hashes', models.JSONField(blank=True, default=dict, help_text='전송 대상 객체의 manifest content hash {UniqueId: hash} (재개 후에도 source_hash를 기록하기 위함)')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ingest_sessions', to='connections.project')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
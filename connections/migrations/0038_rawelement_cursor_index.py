@@ -0,0 +1,17 @@
+# Generated by Django 5.2.6 on 2026-10-18 09:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('connections', '0037_ingest_session'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='rawelement',
+            index=models.Index(fields=['project', 'id'], name='rawelement_cursor_idx'),
+        ),
+    ]
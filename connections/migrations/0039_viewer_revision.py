@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('connections', '0038_rawelement_cursor_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='viewer_revision',
+            field=models.PositiveIntegerField(default=0, help_text='뷰어 데이터(객체/태그/분할) 변경 번호 - 스냅샷 캐시 키로 사용 (connections.viewer_snapshot)'),
+        ),
+    ]
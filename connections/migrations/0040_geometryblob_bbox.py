@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 09:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('connections', '0039_viewer_revision'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='geometryblob',
+            name='bbox',
+            field=models.JSONField(blank=True, help_text='메쉬 로컬 좌표의 [min_x, min_y, min_z, max_x, max_y, max_z]', null=True),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.6 on 2026-10-18 09:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('connections', '0040_geometryblob_bbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='change_seq',
+            field=models.PositiveBigIntegerField(default=0, help_text='마지막 변경 journal(ProjectChange) 순번'),
+        ),
+        migrations.CreateModel(
+            name='ProjectChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('seq', models.PositiveBigIntegerField()),
+                ('kind', models.CharField(choices=[('elements', '객체 생성/수정'), ('elements_deleted', '객체 삭제'), ('tags', '수량산출분류'), ('splits', '분할 객체'), ('quantity_members', '수량산출부재'), ('cost_items', '산출항목'), ('reset', '전체 변경')], max_length=32)),
+                ('object_ids', models.JSONField(blank=True, help_text='변경된 객체 ID 목록 (None이면 해당 종류 전체)', null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='changes', to='connections.project')),
+            ],
+            options={
+                'ordering': ['seq'],
+                'constraints': [models.UniqueConstraint(fields=('project', 'seq'), name='unique_project_change_seq')],
+            },
+        ),
+    ]
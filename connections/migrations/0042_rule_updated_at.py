@@ -0,0 +1,48 @@
+# Generated by Django 5.2.6 on 2026-10-18 09:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('connections', '0041_project_change_journal'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='classificationrule',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, help_text='마지막 수정 시각 (컴파일된 조건 캐시 키, connections.rule_engine)'),
+        ),
+        migrations.AddField(
+            model_name='costcodeassignmentrule',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, help_text='마지막 수정 시각 (컴파일된 조건 캐시 키, connections.rule_engine)'),
+        ),
+        migrations.AddField(
+            model_name='costcoderule',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, help_text='마지막 수정 시각 (컴파일된 조건 캐시 키, connections.rule_engine)'),
+        ),
+        migrations.AddField(
+            model_name='membermarkassignmentrule',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, help_text='마지막 수정 시각 (컴파일된 조건 캐시 키, connections.rule_engine)'),
+        ),
+        migrations.AddField(
+            model_name='propertymappingrule',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, help_text='마지막 수정 시각 (컴파일된 조건 캐시 키, connections.rule_engine)'),
+        ),
+        migrations.AddField(
+            model_name='spaceassignmentrule',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, help_text='마지막 수정 시각 (컴파일된 조건 캐시 키, connections.rule_engine)'),
+        ),
+        migrations.AddField(
+            model_name='spaceclassificationrule',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, help_text='마지막 수정 시각 (컴파일된 조건 캐시 키, connections.rule_engine)'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.6 on 2026-10-18 09:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('connections', '0042_rule_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='classification_rule_digests',
+            field=models.JSONField(blank=True, default=dict, help_text='마지막 일괄적용 시점의 룰별 상태 {rule_id: [조건 digest, target_tag_id]}'),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='classification_ruleset_version',
+            field=models.PositiveIntegerField(default=0, help_text='분류 룰셋 버전 - 룰이 추가/수정/삭제된 뒤 일괄적용할 때마다 1 증가 (connections.classification_state)'),
+        ),
+        migrations.AddField(
+            model_name='rawelement',
+            name='classified_data_digest',
+            field=models.CharField(blank=True, default='', help_text='마지막으로 분류 룰셋을 적용한 시점의 raw_data_digest', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='rawelement',
+            name='classified_ruleset_version',
+            field=models.PositiveIntegerField(default=0, help_text='마지막으로 분류 룰셋을 적용한 Project.classification_ruleset_version (0: 미분류 또는 재분류 필요)'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 10:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('connections', '0043_incremental_classification_state'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='takeoff_pipeline_state',
+            field=models.JSONField(blank=True, default=dict, help_text='산출 파이프라인 마지막 실행 상태 {last_seq, own_seqs, rule_digests, last_report} (connections.takeoff_pipeline)'),
+        ),
+    ]
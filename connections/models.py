@@ -1,12 +1,16 @@
 # connections/models.py
 import uuid
-from django.db import models
+from django.db import models, transaction
 import decimal # <--- decimal 임포트 추가 (정확한 계산 위해)
 # ▼▼▼ [추가] AI 모델 저장을 위한 BinaryField 임포트 ▼▼▼
 from django.db.models import BinaryField
 # ▲▲▲ [추가] 여기까지 ▲▲▲
 from django.db.models.signals import pre_save
 from django.dispatch import receiver
+from django.utils import timezone
+from .geometry_utils import calculate_geometry_volumes, extract_geometry
+from .geometry_store import mesh_bbox, unpack_mesh
+from .sync_utils import compute_raw_data_digest
 
 # -----------------------------------------------------------------------------
 # 1. 프로젝트 관리 모듈
@@ -17,6 +21,45 @@ class Project(models.Model):
     description = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     visibility_filters = models.JSONField(default=list, blank=True)  # 추가 (2025-11-06): 3D 뷰어 조건부 숨김 필터
+    # ▼▼▼ [추가] BIM 동기화 세대(generation) 번호 ▼▼▼
+    sync_generation_seq = models.PositiveIntegerField(
+        default=0,
+        help_text="마지막으로 시작된 BIM 동기화 세션의 generation 번호 (세션마다 1씩 증가)"
+    )
+    committed_sync_generation = models.PositiveIntegerField(
+        default=0,
+        help_text="오래된 객체 정리까지 완료된 마지막 동기화 generation"
+    )
+    # ▲▲▲ [추가] 여기까지 ▲▲▲
+    viewer_revision = models.PositiveIntegerField(
+        default=0,
+        help_text="뷰어 데이터(객체/태그/분할) 변경 번호 - 스냅샷 캐시 키로 사용 (connections.viewer_snapshot)"
+    )
+    change_seq = models.PositiveBigIntegerField(
+        default=0,
+        help_text="마지막 변경 journal(ProjectChange) 순번"
+    )
+    classification_ruleset_version = models.PositiveIntegerField(
+        default=0,
+        help_text="분류 룰셋 버전 - 룰이 추가/수정/삭제된 뒤 일괄적용할 때마다 1 증가 (connections.classification_state)"
+    )
+    classification_rule_digests = models.JSONField(
+        default=dict,
+        blank=True,
+        help_text="마지막 일괄적용 시점의 룰별 상태 {rule_id: [조건 digest, target_tag_id]}"
+    )
+    takeoff_pipeline_state = models.JSONField(
+        default=dict,
+        blank=True,
+        help_text="산출 파이프라인 마지막 실행 상태 {last_seq, own_seqs, rule_digests, last_report} (connections.takeoff_pipeline)"
+    )
+
+    @classmethod
+    def bump_viewer_revision(cls, *project_ids):
+        """뷰어에 보이는 데이터가 바뀌었음을 기록합니다. 이전 revision의 스냅샷은 더 이상 사용되지 않습니다."""
+        project_ids = {pid for pid in project_ids if pid}
+        if project_ids:
+            cls.objects.filter(id__in=project_ids).update(viewer_revision=models.F('viewer_revision') + 1)
 
     def __str__(self):
         # 디버깅: 프로젝트 이름 반환 확인
@@ -281,12 +324,114 @@ class ElementClassificationAssignment(models.Model):
     def __str__(self):
         return f"{self.raw_element.element_unique_id} -> {self.classification_tag.name} ({self.get_assignment_type_display()})"
 
+class GeometryBlob(models.Model):
+    """
+    메쉬 vertices/faces를 바이너리로 저장하는 content-addressed 저장소
+    - digest(SHA-256)가 같으면 같은 메쉬이므로 동일한 패밀리/타입 메쉬는 한 번만 저장됩니다.
+    - RawElement.raw_data / SplitElement.geometry_data에는 {'blob': digest, ...} 형태의 참조만 남습니다.
+    """
+    digest = models.CharField(max_length=64, primary_key=True, help_text="vertices/faces 버퍼의 SHA-256 digest")
+    vertices = models.BinaryField(help_text="float32 little-endian (N x 3)")
+    faces = models.BinaryField(help_text="uint32 little-endian (M x 3)")
+    vertex_count = models.IntegerField(default=0)
+    face_count = models.IntegerField(default=0)
+    bbox = models.JSONField(null=True, blank=True, help_text="메쉬 로컬 좌표의 [min_x, min_y, min_z, max_x, max_y, max_z]")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def as_arrays(self):
+        """(vertices, faces) NumPy 배열을 반환합니다."""
+        return unpack_mesh(self.vertices, self.faces)
+
+    @classmethod
+    def load_meshes(cls, digests):
+        """digest 목록에 해당하는 메쉬를 한 번의 쿼리로 읽어 {digest: (vertices, faces)}로 반환합니다."""
+        digests = {d for d in digests if d}
+        if not digests:
+            return {}
+        return {blob.digest: blob.as_arrays() for blob in cls.objects.filter(digest__in=digests)}
+
+    @classmethod
+    def load_bboxes(cls, digests):
+        """
+        digest 목록의 bounding box를 {digest: bbox}로 반환합니다. (메쉬 버퍼는 읽지 않음)
+        bbox가 비어있는 blob(이전 버전에서 저장/프로젝트 가져오기)은 이때 한 번 계산하여 저장합니다.
+        """
+        digests = {d for d in digests if d}
+        if not digests:
+            return {}
+        bboxes = dict(cls.objects.filter(digest__in=digests).values_list('digest', 'bbox'))
+        missing = [d for d, bbox in bboxes.items() if bbox is None]
+        if missing:
+            filled = []
+            for blob in cls.objects.filter(digest__in=missing):
+                blob.bbox = mesh_bbox(blob.as_arrays()[0])
+                bboxes[blob.digest] = blob.bbox
+                filled.append(blob)
+            cls.objects.bulk_update(filled, ['bbox'])
+        return bboxes
+
+    @classmethod
+    def store_packed(cls, packed_by_digest):
+        """
+        pack_mesh 결과({digest: packed})를 저장합니다. 이미 있는 digest는 건너뛰고, 새로 저장한 개수를 반환합니다.
+        """
+        if not packed_by_digest:
+            return 0
+        existing = set(cls.objects.filter(digest__in=list(packed_by_digest)).values_list('digest', flat=True))
+        new_blobs = [
+            cls(
+                digest=digest,
+                vertices=packed['vertices'],
+                faces=packed['faces'],
+                vertex_count=packed['vertex_count'],
+                face_count=packed['face_count'],
+                bbox=packed.get('bbox'),
+            )
+            for digest, packed in packed_by_digest.items() if digest not in existing
+        ]
+        if new_blobs:
+            cls.objects.bulk_create(new_blobs, ignore_conflicts=True)
+        return len(new_blobs)
+
+    @classmethod
+    def purge_orphans(cls):
+        """어떤 RawElement/SplitElement도 참조하지 않는 blob을 삭제하고 삭제 개수를 반환합니다."""
+        deleted, _ = cls.objects.filter(raw_elements__isnull=True, split_elements__isnull=True).delete()
+        return deleted
+
+    def __str__(self):
+        return f"{self.digest[:12]} (v={self.vertex_count}, f={self.face_count})"
+
 class RawElement(models.Model):
     """Revit에서 가져온 원본 BIM 객체 데이터"""
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='raw_elements')
     element_unique_id = models.CharField(max_length=255)
     raw_data = models.JSONField()
+    raw_data_digest = models.CharField(
+        max_length=64,
+        blank=True,
+        default='',
+        help_text="정규화된 raw_data의 SHA-256 digest (동기화 시 변경 감지용)"
+    )
+    source_hash = models.CharField(
+        max_length=64,
+        blank=True,
+        default='',
+        help_text="커넥터(Blender/Revit)가 manifest로 보고한 객체 content hash (delta 동기화용)"
+    )
+    geometry_blob = models.ForeignKey(
+        GeometryBlob,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='raw_elements',
+        help_text="raw_data의 Geometry가 참조하는 메쉬 blob"
+    )
+    sync_generation = models.PositiveIntegerField(
+        default=0,
+        help_text="이 객체가 마지막으로 확인된 동기화 generation (이보다 새 세션에서 확인되지 않으면 정리 대상)"
+    )
     geometry_volume = models.DecimalField(
         max_digits=20,
         decimal_places=6,
@@ -295,6 +440,16 @@ class RawElement(models.Model):
         verbose_name="Geometry Volume",
         help_text="Geometry의 체적 (cubic units)"
     )
+    classified_ruleset_version = models.PositiveIntegerField(
+        default=0,
+        help_text="마지막으로 분류 룰셋을 적용한 Project.classification_ruleset_version (0: 미분류 또는 재분류 필요)"
+    )
+    classified_data_digest = models.CharField(
+        max_length=64,
+        blank=True,
+        default='',
+        help_text="마지막으로 분류 룰셋을 적용한 시점의 raw_data_digest"
+    )
     classification_tags = models.ManyToManyField(
         QuantityClassificationTag,
         through='ElementClassificationAssignment',
@@ -305,77 +460,51 @@ class RawElement(models.Model):
 
     class Meta:
         unique_together = ('project', 'element_unique_id')
+        indexes = [
+            models.Index(fields=['project', 'sync_generation'], name='rawelement_sync_gen_idx'),
+            models.Index(fields=['project', 'id'], name='rawelement_cursor_idx'),  # 뷰어 전송 keyset pagination
+        ]
+
+    def save(self, *args, **kwargs):
+        # raw_data가 저장될 때마다 digest를 함께 갱신
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'raw_data' in update_fields:
+            self.raw_data_digest = compute_raw_data_digest(self.raw_data)
+            if update_fields is not None and 'raw_data_digest' not in update_fields:
+                kwargs['update_fields'] = list(update_fields) + ['raw_data_digest']
+        super().save(*args, **kwargs)
 
     def calculate_geometry_volume(self):
         """
         Geometry의 체적을 계산 (Signed volume method)
-        Vertices와 faces를 사용하여 tetrahedron 공식으로 계산
+        일괄 계산 엔진(calculate_geometry_volumes)을 단일 객체에 적용하는 래퍼입니다.
 
         지원하는 데이터 구조:
         1. raw_data['geometry'] (Revit/일반 형식)
         2. raw_data['Parameters']['Geometry'] (Blender IFC 형식)
+        3. GeometryBlob 참조 ({'blob': digest, ...})
         """
-        if not self.raw_data:
-            return None
-
-        # Geometry 데이터 찾기 (여러 경로 지원)
-        geometry = None
-
-        # 경로 1: raw_data['geometry'] (Revit 형식)
-        if 'geometry' in self.raw_data:
-            geometry = self.raw_data['geometry']
-        # 경로 2: raw_data['Parameters']['Geometry'] (Blender IFC 형식)
-        elif 'Parameters' in self.raw_data and isinstance(self.raw_data['Parameters'], dict):
-            if 'Geometry' in self.raw_data['Parameters']:
-                geometry = self.raw_data['Parameters']['Geometry']
-
-        if not geometry:
-            return None
-
-        # Vertices 찾기 (여러 키 이름 지원)
-        vertices = geometry.get('vertices') or geometry.get('verts', [])
-        faces = geometry.get('faces', [])
-
-        if not vertices or not faces:
-            return None
-
-        signed_volume = 0.0
-
-        # 각 삼각형(face)에 대해 signed volume 계산
-        for face in faces:
-            if len(face) != 3:
-                continue  # 삼각형이 아니면 스킵
+        return RawElement.batch_calculate_geometry_volumes([self])[0][1]['volume']
 
-            i0, i1, i2 = face[0], face[1], face[2]
-
-            # 인덱스 범위 체크
-            if i0 >= len(vertices) or i1 >= len(vertices) or i2 >= len(vertices):
-                continue
-
-            # 꼭짓점 좌표
-            v0 = vertices[i0]
-            v1 = vertices[i1]
-            v2 = vertices[i2]
-
-            if len(v0) != 3 or len(v1) != 3 or len(v2) != 3:
-                continue
-
-            v0x, v0y, v0z = v0[0], v0[1], v0[2]
-            v1x, v1y, v1z = v1[0], v1[1], v1[2]
-            v2x, v2y, v2z = v2[0], v2[1], v2[2]
-
-            # Cross product: v1 × v2
-            cross_x = v1y * v2z - v1z * v2y
-            cross_y = v1z * v2x - v1x * v2z
-            cross_z = v1x * v2y - v1y * v2x
-
-            # Signed volume of tetrahedron: v0 · (v1 × v2)
-            signed_volume += (v0x * cross_x + v0y * cross_y + v0z * cross_z)
-
-        # 절대값을 취하고 6으로 나눔 (tetrahedron 공식)
-        volume = abs(signed_volume / 6.0)
+    @staticmethod
+    def batch_calculate_geometry_volumes(elements, meshes_by_digest=None):
+        """
+        여러 RawElement의 체적을 한 번에 계산하여 [(element, report), ...] 형태로 반환합니다.
+        report 구조는 connections.geometry_utils.calculate_geometry_volumes 참고.
 
-        return round(volume, 6)  # 소수점 6자리까지
+        meshes_by_digest에 없는 GeometryBlob 참조는 한 번의 쿼리로 읽어옵니다.
+        """
+        elements = list(elements)
+        meshes = dict(meshes_by_digest or {})
+        missing = set()
+        for elem in elements:
+            geometry = extract_geometry(elem.raw_data)
+            if isinstance(geometry, dict) and geometry.get('blob') and geometry['blob'] not in meshes:
+                missing.add(geometry['blob'])
+        if missing:
+            meshes.update(GeometryBlob.load_meshes(missing))
+        reports = calculate_geometry_volumes([elem.raw_data for elem in elements], meshes)
+        return list(zip(elements, reports))
 
     def update_geometry_volume(self):
         """
@@ -393,6 +522,126 @@ class RawElement(models.Model):
         # print(f"[DEBUG][RawElement.__str__] Returning RawElement info for project {self.project.name}") # 너무 빈번할 수 있어 주석 처리
         return f"{self.project.name} - {self.element_unique_id}"
 
+class IngestSession(models.Model):
+    """
+    커넥터(Revit/Blender)의 청크 전송 세션
+    - 저장이 끝난 청크 번호(checkpoint)를 DB에 기록하여, 연결이 끊겨도 재접속 후 마지막 ack 다음 청크부터 이어서 전송할 수 있습니다.
+    - 같은 프로젝트에서 새 세션이 시작되면 이전 active 세션은 abandoned로 바뀌어 더 이상 이어받을 수 없습니다.
+    """
+    STATUS_CHOICES = [
+        ('active', '전송 중'),
+        ('completed', '완료'),
+        ('failed', '실패'),
+        ('abandoned', '중단됨'),
+    ]
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='ingest_sessions')
+    source = models.CharField(max_length=20, help_text="전송한 커넥터 (revit / blender)")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='active')
+    sync_generation = models.PositiveIntegerField(default=0, help_text="이 세션이 객체에 기록하는 동기화 generation")
+    total_elements = models.PositiveIntegerField(default=0)
+    last_acked_chunk = models.IntegerField(
+        default=-1,
+        help_text="0번부터 연속으로 저장이 끝난 마지막 청크 번호 (재개 시 이 다음 청크부터 전송)"
+    )
+    acked_element_count = models.PositiveIntegerField(default=0, help_text="last_acked_chunk까지 저장된 객체 수")
+    failed_chunks = models.JSONField(default=list, blank=True, help_text="저장에 실패한 청크 번호 목록")
+    source_hashes = models.JSONField(
+        default=dict,
+        blank=True,
+        help_text="전송 대상 객체의 manifest content hash {UniqueId: hash} (재개 후에도 source_hash를 기록하기 위함)"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    @property
+    def next_chunk_index(self):
+        return self.last_acked_chunk + 1
+
+    def __str__(self):
+        return f"{self.project.name} - {self.source} ({self.get_status_display()}, chunk {self.last_acked_chunk})"
+
+class ProjectChange(models.Model):
+    """
+    프로젝트 변경 journal (append-only)
+    - 객체 생성/수정/삭제, 태그 할당, 분할, 수량산출부재/산출항목 변경을 프로젝트별 순번(seq)과 함께 기록합니다.
+    - 브라우저는 마지막으로 받은 seq를 get_all_elements의 since_seq로 보내 그 이후 변경분만 다시 받습니다.
+      (consumers.build_change_replay)
+    - 프로젝트마다 최근 JOURNAL_RETENTION개만 남기며, 정리된 구간을 요청하면 전체 데이터를 다시 보냅니다.
+    """
+    KIND_ELEMENTS = 'elements'                  # object_ids: 생성/수정된 RawElement (태그 할당 변경 포함)
+    KIND_ELEMENTS_DELETED = 'elements_deleted'  # object_ids: 삭제된 RawElement
+    KIND_TAGS = 'tags'                          # 수량산출분류 목록
+    KIND_SPLITS = 'splits'                      # 분할 객체 (변경분 대신 활성 분할 목록 전체를 다시 보냄)
+    KIND_QUANTITY_MEMBERS = 'quantity_members'
+    KIND_COST_ITEMS = 'cost_items'
+    KIND_RESET = 'reset'                        # 프로젝트 덮어쓰기 등 - 변경분으로 표현할 수 없어 전체를 다시 받아야 함
+    KIND_CHOICES = [
+        (KIND_ELEMENTS, '객체 생성/수정'),
+        (KIND_ELEMENTS_DELETED, '객체 삭제'),
+        (KIND_TAGS, '수량산출분류'),
+        (KIND_SPLITS, '분할 객체'),
+        (KIND_QUANTITY_MEMBERS, '수량산출부재'),
+        (KIND_COST_ITEMS, '산출항목'),
+        (KIND_RESET, '전체 변경'),
+    ]
+    # 뷰어 스냅샷에 포함되는 데이터 - 기록 시 viewer_revision도 함께 올립니다.
+    VIEWER_KINDS = {KIND_ELEMENTS, KIND_ELEMENTS_DELETED, KIND_SPLITS, KIND_RESET}
+    MAX_OBJECT_IDS = 5000       # 이보다 많은 id는 저장하지 않고 '전체 변경'(object_ids=None)으로 기록
+    JOURNAL_RETENTION = 5000    # 프로젝트마다 남기는 최근 항목 수
+    COMPACT_INTERVAL = 500      # seq가 이 값의 배수가 될 때마다 오래된 항목 정리
+
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='changes')
+    seq = models.PositiveBigIntegerField()
+    kind = models.CharField(max_length=32, choices=KIND_CHOICES)
+    object_ids = models.JSONField(null=True, blank=True, help_text="변경된 객체 ID 목록 (None이면 해당 종류 전체)")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['seq']
+        constraints = [
+            models.UniqueConstraint(fields=['project', 'seq'], name='unique_project_change_seq'),
+        ]
+
+    @classmethod
+    def record(cls, project_id, kind, object_ids=None):
+        """
+        변경을 journal에 추가하고 seq를 반환합니다. object_ids가 빈 목록이면 기록하지 않습니다.
+        seq는 Project.change_seq를 F() 연산으로 올려 발급하므로, 동시에 기록해도 같은 트랜잭션 안에서 순번이 겹치지 않습니다.
+        """
+        if not project_id:
+            return None
+        if object_ids is not None:
+            object_ids = sorted({str(object_id) for object_id in object_ids})
+            if not object_ids:
+                return None
+            if len(object_ids) > cls.MAX_OBJECT_IDS:
+                object_ids = None
+        with transaction.atomic():
+            if kind in cls.VIEWER_KINDS:
+                Project.bump_viewer_revision(project_id)
+            Project.objects.filter(id=project_id).update(change_seq=models.F('change_seq') + 1)
+            seq = Project.objects.filter(id=project_id).values_list('change_seq', flat=True).first()
+            if seq is None:
+                return None
+            cls.objects.create(project_id=project_id, seq=seq, kind=kind, object_ids=object_ids)
+        if seq % cls.COMPACT_INTERVAL == 0:
+            cls.compact(project_id, seq)
+        return seq
+
+    @classmethod
+    def compact(cls, project_id, current_seq):
+        """최근 JOURNAL_RETENTION개를 제외한 오래된 항목을 삭제합니다."""
+        cutoff = current_seq - cls.JOURNAL_RETENTION
+        if cutoff > 0:
+            cls.objects.filter(project_id=project_id, seq__lte=cutoff).delete()
+
+    def __str__(self):
+        return f"{self.project_id} #{self.seq} {self.kind}"
+
 class Activity(models.Model):
     """4D 시뮬레이션을 위한 공정/액티비티 관리"""
 
@@ -891,6 +1140,7 @@ class ClassificationRule(models.Model):
     target_tag = models.ForeignKey(QuantityClassificationTag, related_name='rules', on_delete=models.CASCADE)
     conditions = models.JSONField(default=list)
     description = models.CharField(max_length=255, blank=True)
+    updated_at = models.DateTimeField(auto_now=True, help_text="마지막 수정 시각 (컴파일된 조건 캐시 키, connections.rule_engine)")
 
     class Meta:
         ordering = ['id']  # priority 제거, ID 순서로 정렬
@@ -911,6 +1161,7 @@ class PropertyMappingRule(models.Model):
     mapping_script = models.JSONField(default=dict, help_text="속성을 계산하고 맵핑하는 스크립트. 예: {'체적': '{Volume} * 1.05'}")
     priority = models.IntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, help_text="마지막 수정 시각 (컴파일된 조건 캐시 키, connections.rule_engine)")
 
     class Meta:
         ordering = ['priority', 'name']
@@ -933,6 +1184,7 @@ class CostCodeRule(models.Model):
     quantity_mapping_script = models.JSONField(default=dict, help_text="수량을 계산하는 맵핑 스크립트. 예: {'수량': '({면적} + [철근총길이]) * 1.05'}")
     priority = models.IntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, help_text="마지막 수정 시각 (컴파일된 조건 캐시 키, connections.rule_engine)")
 
     class Meta:
         ordering = ['priority', 'name']
@@ -952,6 +1204,7 @@ class MemberMarkAssignmentRule(models.Model):
     conditions = models.JSONField(default=list, blank=True, help_text="규칙이 적용될 QuantityMember를 필터링하는 조건")
     mark_expression = models.CharField(max_length=255, help_text="할당할 일람부호(Mark) 값을 반환하는 표현식. 예: 'C' + str({층})")
     priority = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True, help_text="마지막 수정 시각 (컴파일된 조건 캐시 키, connections.rule_engine)")
 
     class Meta:
         ordering = ['priority', 'name']
@@ -970,6 +1223,7 @@ class CostCodeAssignmentRule(models.Model):
     # 공사코드는 code와 name이 있으므로 JSON으로 여러 표현식을 관리합니다.
     cost_code_expressions = models.JSONField(default=dict, help_text="할당할 공사코드의 속성을 반환하는 표현식. 예: {'code': 'RC-{층}', 'name': '{분류} 타설'}")
     priority = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True, help_text="마지막 수정 시각 (컴파일된 조건 캐시 키, connections.rule_engine)")
 
     class Meta:
         ordering = ['priority', 'name']
@@ -995,6 +1249,7 @@ class SpaceClassificationRule(models.Model):
     # 상위 위계와의 연결을 위한 규칙
     parent_join_param = models.CharField(max_length=255, blank=True, help_text="상위 객체에서 연결에 사용할 속성 (예: GlobalId)")
     child_join_param = models.CharField(max_length=255, blank=True, help_text="현재 객체에서 상위 객체와 연결에 사용할 속성 (예: ParentGlobalId)")
+    updated_at = models.DateTimeField(auto_now=True, help_text="마지막 수정 시각 (컴파일된 조건 캐시 키, connections.rule_engine)")
 
     class Meta:
         unique_together = ('project', 'level_depth')
@@ -1020,6 +1275,7 @@ class SpaceAssignmentRule(models.Model):
     space_join_property = models.CharField(max_length=255, help_text="매칭에 사용할 공간의 속성 경로 (예: Name 또는 BIM원본.Name)")
 
     priority = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True, help_text="마지막 수정 시각 (컴파일된 조건 캐시 키, connections.rule_engine)")
 
     class Meta:
         ordering = ['priority', 'name']
@@ -1158,6 +1414,8 @@ class GeometryRelationRule(models.Model):
 # -----------------------------------------------------------------------------
 # 3D 객체 분할 관리
 # -----------------------------------------------------------------------------
+SPLIT_INVALIDATION_BATCH_SIZE = 500  # 분할 무효화 시 IN 조건 한 번에 넣는 최대 ID 수 (SQLite 변수 개수 제한 고려)
+
 class SplitElement(models.Model):
     """3D 뷰어에서 분할된 객체를 저장하고 관리"""
 
@@ -1271,6 +1529,14 @@ class SplitElement(models.Model):
         default=dict,
         help_text="3D 뷰 재생성을 위한 geometry 데이터 (vertices, faces, matrix 등)"
     )
+    geometry_blob = models.ForeignKey(
+        GeometryBlob,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='split_elements',
+        help_text="geometry_data가 참조하는 메쉬 blob"
+    )
 
     # Sketch split specific data
     sketch_data = models.JSONField(
@@ -1312,12 +1578,50 @@ class SplitElement(models.Model):
         """
         BIM 원본 객체가 변경되었을 때 이 분할 객체와 모든 하위 분할을 무효화
         """
+        SplitElement.invalidate_subtrees([self.pk])
         self.is_active = False
-        self.save(update_fields=['is_active', 'updated_at'])
 
-        # 모든 하위 분할도 무효화
-        for child in self.child_splits.all():
-            child.invalidate_on_bim_change()
+    @classmethod
+    def invalidate_subtrees(cls, split_ids):
+        """
+        split_ids 분할 객체와 모든 하위 분할을 무효화하고 무효화된 개수를 반환합니다.
+        노드마다 save()하지 않고, 계층 깊이마다 한 번씩 하위 ID를 조회한 뒤 일괄 update 합니다.
+        """
+        subtree_ids = set(split_ids)
+        frontier = list(subtree_ids)
+        while frontier:
+            children = []
+            for i in range(0, len(frontier), SPLIT_INVALIDATION_BATCH_SIZE):
+                children.extend(cls.objects.filter(
+                    parent_split_id__in=frontier[i:i + SPLIT_INVALIDATION_BATCH_SIZE]
+                ).values_list('id', flat=True))
+            frontier = [child_id for child_id in children if child_id not in subtree_ids]
+            subtree_ids.update(frontier)
+
+        subtree_ids = list(subtree_ids)
+        invalidated = 0
+        project_ids = set()
+        now = timezone.now()
+        for i in range(0, len(subtree_ids), SPLIT_INVALIDATION_BATCH_SIZE):
+            batch = cls.objects.filter(id__in=subtree_ids[i:i + SPLIT_INVALIDATION_BATCH_SIZE], is_active=True)
+            project_ids.update(batch.values_list('project_id', flat=True).distinct())
+            invalidated += batch.update(is_active=False, updated_at=now)
+        for project_id in project_ids:
+            ProjectChange.record(project_id, ProjectChange.KIND_SPLITS)
+        return invalidated
+
+    @classmethod
+    def invalidate_for_raw_elements(cls, raw_element_ids):
+        """BIM 원본 객체(raw_element_ids)에 연결된 활성 분할 객체와 그 하위 분할을 모두 무효화합니다."""
+        raw_element_ids = list(raw_element_ids)
+        root_ids = []
+        for i in range(0, len(raw_element_ids), SPLIT_INVALIDATION_BATCH_SIZE):
+            root_ids.extend(cls.objects.filter(
+                raw_element_id__in=raw_element_ids[i:i + SPLIT_INVALIDATION_BATCH_SIZE], is_active=True
+            ).values_list('id', flat=True))
+        if not root_ids:
+            return 0
+        return cls.invalidate_subtrees(root_ids)
 
     def get_split_hierarchy(self):
         """
@@ -1344,34 +1648,49 @@ class SplitElement(models.Model):
 # Signals for automatic updates
 # -----------------------------------------------------------------------------
 
+def _normalize_volume(volume):
+    """geometry_volume 비교용: DB 저장 정밀도(소수 6자리)로 맞춘 Decimal (없으면 None)"""
+    if volume is None:
+        return None
+    return decimal.Decimal(str(volume)).quantize(decimal.Decimal('0.000001'))
+
+def invalidate_splits_for_volume_changes(new_volumes):
+    """
+    {RawElement id: 새 geometry_volume}을 DB에 저장된 값과 한 번에 비교하여,
+    체적이 바뀐 객체의 분할 객체(하위 분할 포함)를 일괄 무효화합니다.
+    bulk_update는 pre_save 시그널을 거치지 않으므로 일괄 저장 전에 직접 호출해야 합니다.
+
+    Returns: (체적이 바뀐 RawElement 수, 무효화된 분할 객체 수)
+    """
+    if not new_volumes:
+        return 0, 0
+    element_ids = list(new_volumes)
+    changed_ids = []
+    for i in range(0, len(element_ids), SPLIT_INVALIDATION_BATCH_SIZE):
+        for element_id, old_volume in RawElement.objects.filter(
+            id__in=element_ids[i:i + SPLIT_INVALIDATION_BATCH_SIZE]
+        ).values_list('id', 'geometry_volume'):
+            if _normalize_volume(old_volume) != _normalize_volume(new_volumes[element_id]):
+                changed_ids.append(element_id)
+    if not changed_ids:
+        return 0, 0
+    return len(changed_ids), SplitElement.invalidate_for_raw_elements(changed_ids)
+
 @receiver(pre_save, sender=RawElement)
 def invalidate_splits_on_bim_change(sender, instance, **kwargs):
     """
     RawElement의 geometry_volume이 변경되면 관련된 모든 분할 객체를 무효화
     """
-    if instance.pk:  # 기존 객체인 경우만 (신규 생성 시 제외)
-        try:
-            old_instance = RawElement.objects.get(pk=instance.pk)
-
-            # geometry_volume이 변경되었는지 확인
-            if old_instance.geometry_volume != instance.geometry_volume:
-                print(f"[DEBUG] RawElement {instance.element_unique_id} geometry_volume changed:")
-                print(f"  - Old: {old_instance.geometry_volume}")
-                print(f"  - New: {instance.geometry_volume}")
-                print(f"  - Invalidating all related split elements...")
-
-                # 이 RawElement와 연결된 모든 활성 분할 객체 무효화
-                split_count = 0
-                for split_element in instance.split_elements.filter(is_active=True):
-                    split_element.invalidate_on_bim_change()
-                    split_count += 1
-
-                if split_count > 0:
-                    print(f"  - Invalidated {split_count} split elements")
-
-        except RawElement.DoesNotExist:
-            # 객체가 존재하지 않으면 무시 (새로 생성되는 경우)
-            pass
+    update_fields = kwargs.get('update_fields')
+    if instance._state.adding or (update_fields is not None and 'geometry_volume' not in update_fields):
+        return  # 신규 생성이거나 체적을 저장하지 않는 경우
+
+    changed_count, split_count = invalidate_splits_for_volume_changes({instance.pk: instance.geometry_volume})
+    if changed_count:
+        ProjectChange.record(instance.project_id, ProjectChange.KIND_ELEMENTS, [instance.pk])
+        print(f"[DEBUG] RawElement {instance.element_unique_id} geometry_volume changed (New: {instance.geometry_volume})")
+        if split_count > 0:
+            print(f"  - Invalidated {split_count} split elements")
 
 
 # -----------------------------------------------------------------------------
@@ -0,0 +1,293 @@
+"""
+룰셋 평가용 속성 컨텍스트 (combined_properties)
+
+할당 룰셋 일괄적용(일람부호/공사코드), 공사코드 룰셋 자동생성, 액티비티 할당 룰셋 적용은
+항목마다 raw_data의 모든 Attributes/Parameters/TypeParameters와 부재/일람부호 속성을 새 dict에 복사한 뒤
+룰 조건과 맵핑식에서 몇 개의 키만 조회했습니다.
+여기서는 같은 키 체계를 레이어 목록(PropertyLayout)으로 정의하고, 항목마다 원본 객체를 가리키는
+PropertyContext(읽기 전용 Mapping)를 만들어 조회되는 키만 원본에서 찾습니다.
+
+- 레이어: (이름, 접두어, 접미어, 값 필터) - 키 '접두어 + 원본 키 + 접미어'가 원본 dict[원본 키]를 가리킴
+- 같은 키가 여러 레이어에 있으면 뒤의 레이어가 우선 (기존 dict에 나중에 쓴 값이 남던 것과 동일)
+- 키 -> 후보 (레이어, 원본 키) 해석은 레이아웃에 캐시되어 실행 전체에서 재사용되고,
+  항목별 원본(소스)과 조회한 값은 컨텍스트 안에 캐시됩니다.
+- 소스는 dict 또는 dict를 반환하는 함수이며, 함수는 해당 레이어의 키가 처음 조회될 때 한 번만 호출됩니다.
+  (예: 공간/분류 태그처럼 select_related 되지 않은 관계는 룰이 참조할 때만 조회)
+"""
+
+from collections.abc import Mapping
+
+_MISSING = object()
+_CANDIDATE_CACHE_MAX = 4096
+
+
+def _scalar(key, value):
+    return not isinstance(value, (dict, list))
+
+
+def _scalar_attribute(key, value):
+    return key not in ('Parameters', 'TypeParameters') and not isinstance(value, (dict, list))
+
+
+class PropertyLayout:
+    """
+    combined_properties 키 체계
+
+    layout = PropertyLayout(('properties', '', ''), ('parameters', 'Parameters.', ''), ...)
+    context = layout.context(properties=member.properties, parameters=lambda: ...)
+    """
+
+    def __init__(self, *layers):
+        self.layers = tuple(
+            (layer[0], layer[1], layer[2], layer[3] if len(layer) > 3 else None) for layer in layers
+        )
+        self._candidates = {}
+
+    def candidates(self, key):
+        """key를 만들 수 있는 (레이어 이름, 원본 키, 값 필터) 목록 - 우선순위(뒤 레이어 먼저) 순"""
+        cached = self._candidates.get(key)
+        if cached is None:
+            cached = tuple(
+                (name, key[len(prefix):len(key) - len(suffix)], accept)
+                for name, prefix, suffix, accept in reversed(self.layers)
+                if len(key) >= len(prefix) + len(suffix) and key.startswith(prefix) and key.endswith(suffix)
+            )
+            if len(self._candidates) >= _CANDIDATE_CACHE_MAX:
+                self._candidates.clear()
+            self._candidates[key] = cached
+        return cached
+
+    def context(self, **sources):
+        return PropertyContext(self, sources)
+
+
+class PropertyContext(Mapping):
+    """항목 하나의 combined_properties - 조회된 키만 원본에서 찾아 캐시합니다."""
+
+    __slots__ = ('layout', '_sources', '_values')
+
+    def __init__(self, layout, sources):
+        self.layout = layout
+        self._sources = dict(sources)
+        self._values = {}
+
+    def _source(self, name):
+        source = self._sources.get(name)
+        if callable(source):
+            source = source()
+            self._sources[name] = source
+        return source if isinstance(source, dict) else None
+
+    def _resolve(self, key):
+        if not isinstance(key, str):
+            return _MISSING
+        value = self._values.get(key, _MISSING)
+        if value is not _MISSING or key in self._values:
+            return value
+        for name, inner_key, accept in self.layout.candidates(key):
+            source = self._source(name)
+            if source is not None and inner_key in source:
+                candidate = source[inner_key]
+                if accept is None or accept(inner_key, candidate):
+                    value = candidate
+                    break
+        self._values[key] = value
+        return value
+
+    def __getitem__(self, key):
+        value = self._resolve(key)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def get(self, key, default=None):
+        value = self._resolve(key)
+        return default if value is _MISSING else value
+
+    def __contains__(self, key):
+        return self._resolve(key) is not _MISSING
+
+    def __iter__(self):
+        # 전체 키 나열은 디버그/직렬화용 (모든 소스를 순회)
+        seen = set()
+        for name, prefix, suffix, accept in self.layout.layers:
+            source = self._source(name)
+            if not source:
+                continue
+            for inner_key, value in source.items():
+                key = f'{prefix}{inner_key}{suffix}'
+                if key not in seen and (accept is None or accept(inner_key, value)) and key in self:
+                    seen.add(key)
+                    yield key
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __bool__(self):
+        # 컨텍스트는 항상 항목 하나를 나타냄 - 소스를 불러오지 않도록 비어 있는지 검사하지 않음
+        return True
+
+    def set_source(self, name, source):
+        """레이어의 원본을 바꿉니다. (예: 일람부호가 새로 할당된 경우) 조회해 둔 값은 다시 찾습니다."""
+        self._sources[name] = source
+        self._values.clear()
+
+    def resolved_keys(self):
+        """지금까지 조회된 키 중 값이 있는 키 목록 (룰/맵핑식이 실제로 참조한 속성)"""
+        return [key for key, value in self._values.items() if value is not _MISSING]
+
+
+def _raw_data(raw_element):
+    return raw_element.raw_data if raw_element and raw_element.raw_data else None
+
+
+def _raw_section(raw_element, section):
+    raw_data = _raw_data(raw_element)
+    return raw_data.get(section) if raw_data else None
+
+
+def _truthy_fields(obj, required, optional):
+    values = {field: getattr(obj, field) for field in required}
+    values.update({field: getattr(obj, field) for field in optional if getattr(obj, field)})
+    return values
+
+
+# --- 할당 룰셋 일괄적용 (일람부호/공사코드): 부재 속성, Name, raw_data 속성, Parameters.*, TypeParameters.* ---
+MEMBER_RULE_LAYOUT = PropertyLayout(
+    ('properties', '', ''),
+    ('member', '', ''),
+    ('attributes', '', '', _scalar_attribute),
+    ('parameters', 'Parameters.', ''),
+    ('type_parameters', 'TypeParameters.', ''),
+    ('tag', '', ''),
+    ('mark', '', ''),
+    ('mark_properties', '[', ']'),
+)
+
+# --- 공사코드 룰셋 자동생성: 부재 속성, BIM원본.* ---
+COST_CODE_RULE_LAYOUT = PropertyLayout(
+    ('properties', '', ''),
+    ('attributes', 'BIM원본.', '', _scalar),
+    ('type_parameters', 'BIM원본.TypeParameters.', ''),
+    ('parameters', 'BIM원본.Parameters.', ''),
+    ('tag', '', ''),
+    ('mark', '', ''),
+    ('mark_properties', '[', ']'),
+)
+
+# --- 액티비티 할당 룰셋: 산출항목, CostCode.*, QM.*, MM.*, BIM.Attributes/TypeParameters/Parameters.*, Space.* ---
+ACTIVITY_RULE_LAYOUT = PropertyLayout(
+    ('item', '', ''),
+    ('cost_code', 'CostCode.', ''),
+    ('member', 'QM.', ''),
+    ('member_properties', 'QM.properties.', ''),
+    ('mark', 'MM.', ''),
+    ('mark_properties', 'MM.properties.', ''),
+    ('attributes', 'BIM.Attributes.', '', _scalar_attribute),
+    ('type_parameters', 'BIM.TypeParameters.', ''),
+    ('parameters', 'BIM.Parameters.', ''),
+    ('space', 'Space.', ''),
+)
+
+# --- 산출항목 액티비티 룰셋 일괄적용 (잠긴 액티비티 보호): CI.* 접두어 ---
+CI_ACTIVITY_RULE_LAYOUT = PropertyLayout(
+    ('item', 'CI.', ''),
+    ('cost_code', 'CostCode.', ''),
+    ('member', 'QM.', ''),
+    ('member_properties', 'QM.properties.', ''),
+    ('mark', 'MM.', ''),
+    ('mark_properties', 'MM.properties.', ''),
+    ('attributes', 'BIM.Attributes.', '', _scalar_attribute),
+    ('type_parameters', 'BIM.TypeParameters.', ''),
+    ('parameters', 'BIM.Parameters.', ''),
+)
+
+
+def _member_mark_sources(member_mark):
+    if not member_mark:
+        return {'mark': None, 'mark_properties': None}
+    return {'mark': {'member_mark_name': member_mark.mark}, 'mark_properties': member_mark.properties}
+
+
+def member_rule_properties(member):
+    """할당 룰셋 일괄적용(apply_assignment_rules_view)용 QuantityMember 컨텍스트"""
+    def tag():
+        if not member.classification_tag:
+            return None
+        name = member.classification_tag.name
+        return {'classification_tag': name, 'classification_tag_name': name}
+
+    return MEMBER_RULE_LAYOUT.context(
+        properties=member.properties,
+        member={'Name': member.name, 'name': member.name},
+        attributes=lambda: _raw_data(member.raw_element),
+        parameters=lambda: _raw_section(member.raw_element, 'Parameters'),
+        type_parameters=lambda: _raw_section(member.raw_element, 'TypeParameters'),
+        tag=tag,
+        **_member_mark_sources(member.member_mark),
+    )
+
+
+def set_member_rule_mark(context, member_mark):
+    """member_rule_properties 컨텍스트의 일람부호(member_mark_name, [속성])를 새 일람부호로 바꿉니다."""
+    for name, source in _member_mark_sources(member_mark).items():
+        context.set_source(name, source)
+
+
+def cost_code_rule_properties(member):
+    """공사코드 룰셋 자동생성(create_cost_items_auto_view)용 QuantityMember 컨텍스트"""
+    return COST_CODE_RULE_LAYOUT.context(
+        properties=member.properties,
+        attributes=lambda: _raw_data(member.raw_element),
+        type_parameters=lambda: _raw_section(member.raw_element, 'TypeParameters'),
+        parameters=lambda: _raw_section(member.raw_element, 'Parameters'),
+        tag=lambda: {'classification_tag_name': member.classification_tag.name} if member.classification_tag else None,
+        **_member_mark_sources(member.member_mark),
+    )
+
+
+def _cost_item_sources(cost_item, cost_code_optional_fields):
+    qm = cost_item.quantity_member
+    cc = cost_item.cost_code
+    mm = qm.member_mark if qm else None
+    raw_element = qm.raw_element if qm else None
+    return {
+        'cost_code': lambda: _truthy_fields(cc, ('code', 'name'), cost_code_optional_fields) if cc else None,
+        'member_properties': qm.properties if qm else None,
+        'mark': lambda: _truthy_fields(mm, ('mark',), ('description',)) if mm else None,
+        'mark_properties': mm.properties if mm else None,
+        'attributes': lambda: _raw_data(raw_element),
+        'type_parameters': lambda: _raw_section(raw_element, 'TypeParameters'),
+        'parameters': lambda: _raw_section(raw_element, 'Parameters'),
+    }
+
+
+def activity_rule_properties(cost_item):
+    """액티비티 할당 룰셋(apply_activity_assignment_rules_view)용 CostItem 컨텍스트"""
+    qm = cost_item.quantity_member
+
+    def member():
+        if not qm:
+            return None
+        values = {'name': qm.name, 'id': str(qm.id)}
+        if qm.classification_tag:
+            values['classification_tag'] = qm.classification_tag.name
+        return values
+
+    return ACTIVITY_RULE_LAYOUT.context(
+        item=lambda: _truthy_fields(cost_item, ('quantity',), ('description',)),
+        member=member,
+        # QuantityMember에는 단일 space 관계가 없으므로(space_classifications M2M) 있는 경우에만 사용
+        space=lambda: {'name': qm.space.name} if qm and getattr(qm, 'space', None) else None,
+        **_cost_item_sources(cost_item, ('detail_code', 'note', 'category', 'spec', 'unit')),
+    )
+
+
+def ci_activity_rule_properties(cost_item):
+    """산출항목 액티비티 룰셋 일괄적용(apply_cost_item_activity_rules_api)용 CostItem 컨텍스트"""
+    qm = cost_item.quantity_member
+    return CI_ACTIVITY_RULE_LAYOUT.context(
+        item=lambda: _truthy_fields(cost_item, ('quantity',), ('description',)),
+        member=lambda: {'name': qm.name} if qm else None,
+        **_cost_item_sources(cost_item, ('detail_code', 'note')),
+    )
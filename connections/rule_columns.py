@@ -0,0 +1,193 @@
+"""
+룰셋 조건의 열(column) 단위 평가
+
+rule_engine.compile_conditions는 요소 하나씩 조건 트리를 평가합니다. (요소 수 × 룰 수만큼 Python 호출)
+여기서는 프로젝트 전체 요소에 대해 룰들이 참조하는 parameter 값만 한 번씩 뽑아 NumPy 열로 만들고,
+각 룰의 조건 트리를 열 전체에 대한 boolean mask 연산(==, 문자열 검색, 숫자 비교, AND/OR)으로 평가합니다.
+결과는 (요소 × 룰) boolean 행렬이며, 같은 조건(parameter, operator, value)은 룰이 달라도 한 번만 계산합니다.
+
+매칭 결과는 rule_engine.evaluate_conditions(data_dict, conditions)와 동일합니다.
+- 문자열 연산자: str(값 or "")에 대해 비교
+- 숫자 연산자: float 변환이 가능한 값만 비교 (불가능하거나 None이면 False, NaN과의 비교도 False)
+- parameter가 문자열이 아닌 드문 조건은 행을 추가할 때 요소별로 평가해 둡니다.
+"""
+
+import numpy as np
+
+from .rule_engine import (
+    _STRING_OPERATORS, _NUMERIC_OPERATORS, _compile_condition_value, _evaluate_leaf_uncompiled, is_numeric,
+)
+
+# NumPy 2의 가변 길이 문자열 dtype (없으면 고정 길이 유니코드 배열 사용)
+_STRING_DTYPE = np.dtypes.StringDType() if hasattr(np.dtypes, 'StringDType') else np.str_
+
+_NUMERIC_UFUNCS = {
+    'greater_than': np.greater,
+    'less_than': np.less,
+    'greater_or_equal': np.greater_equal,
+    'less_or_equal': np.less_equal,
+}
+
+
+def _to_float(value):
+    if value is None:
+        return np.nan
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return np.nan
+
+
+class RuleColumnTable:
+    """
+    조건 트리들이 참조하는 parameter별 값 열 (요소 순서대로 append)
+
+    table = RuleColumnTable([rule.conditions for rule in rules])
+    for raw_data in ...: table.append(raw_data)
+    matrix = table.match_matrix()   # (요소 수, 룰 수) bool
+    """
+
+    def __init__(self, condition_sets):
+        self.condition_sets = list(condition_sets)
+        self.row_count = 0
+        self._lookups = {}      # parameter -> 값 조회 함수
+        self._values = {}       # parameter -> 요소별 값 리스트
+        self._row_leaves = {}   # id(조건) -> (조건, 요소별 평가 결과 리스트)
+        for conditions in self.condition_sets:
+            self._collect(conditions)
+        self._strings = {}
+        self._numbers = {}
+        self._leaf_masks = {}
+
+    def _collect(self, conditions):
+        if not conditions:
+            return
+        if isinstance(conditions, list):
+            for cond in conditions:
+                self._collect(cond)
+            return
+        if not isinstance(conditions, dict):
+            return
+        if 'OR' in conditions and isinstance(conditions['OR'], list):
+            for cond in conditions['OR']:
+                self._collect(cond)
+            return
+        p = conditions.get('parameter') or conditions.get('property')
+        if isinstance(p, str):
+            if p and conditions.get('operator') and conditions.get('value') is not None and p not in self._lookups:
+                self._lookups[p] = _compile_condition_value(p)
+                self._values[p] = []
+        else:
+            self._row_leaves[id(conditions)] = (conditions, [])
+
+    def append(self, data_dict):
+        """요소 하나의 data_dict(raw_data 등)에서 참조 parameter 값을 추출하여 행으로 추가합니다."""
+        for p, lookup in self._lookups.items():
+            self._values[p].append(lookup(data_dict))
+        for conditions, results in self._row_leaves.values():
+            results.append(_evaluate_leaf_uncompiled(data_dict, conditions))
+        self.row_count += 1
+
+    def extend(self, data_dicts):
+        for data_dict in data_dicts:
+            self.append(data_dict)
+        return self
+
+    # --- 열 변환 (parameter별로 필요할 때 한 번만) ---
+    def _string_column(self, p):
+        column = self._strings.get(p)
+        if column is None:
+            strings = [str(v or "") for v in self._values[p]]
+            try:
+                column = np.array(strings, dtype=_STRING_DTYPE)
+            except UnicodeEncodeError:
+                # 짝이 없는 surrogate 문자는 StringDType(UTF-8)에 담을 수 없으므로 고정 길이 배열 사용
+                column = np.array(strings, dtype=np.str_)
+            self._strings[p] = column
+        return column
+
+    def _number_column(self, p):
+        column = self._numbers.get(p)
+        if column is None:
+            column = np.fromiter((_to_float(v) for v in self._values[p]), dtype=np.float64, count=self.row_count)
+            self._numbers[p] = column
+        return column
+
+    def _constant(self, value):
+        return np.full(self.row_count, value, dtype=bool)
+
+    # --- 조건 트리 -> mask ---
+    def mask(self, conditions):
+        """conditions를 만족하는 행의 boolean mask (evaluate_conditions와 같은 결과)"""
+        if not conditions:
+            return self._constant(True)
+
+        if isinstance(conditions, list):
+            masks = [self.mask(cond) for cond in conditions]
+            if len(masks) == 1:
+                return masks[0]
+            return np.logical_and.reduce(masks)
+
+        if isinstance(conditions, dict):
+            if 'OR' in conditions and isinstance(conditions['OR'], list):
+                masks = [self.mask(cond) for cond in conditions['OR']]
+                if not masks:
+                    return self._constant(False)
+                return np.logical_or.reduce(masks)
+            p = conditions.get('parameter') or conditions.get('property')
+            if isinstance(p, str):
+                return self._leaf_mask(p, conditions.get('operator'), conditions.get('value'))
+            return np.array(self._row_leaves[id(conditions)][1], dtype=bool)
+
+        return self._constant(False)
+
+    def _leaf_mask(self, p, o, v):
+        if not all([p, o, v is not None]):
+            return self._constant(False)
+        key = (p, o, str(v), is_numeric(v))
+        cached = self._leaf_masks.get(key)
+        if cached is None:
+            cached = self._compute_leaf_mask(p, o, v)
+            self._leaf_masks[key] = cached
+        return cached
+
+    def _compute_leaf_mask(self, p, o, v):
+        if o in _STRING_OPERATORS:
+            column = self._string_column(p)
+            expected = str(v)
+            if o == 'equals':
+                return column == expected
+            if o == 'not_equals':
+                return column != expected
+            if o == 'contains':
+                return np.char.find(column, expected) >= 0
+            if o == 'not_contains':
+                return np.char.find(column, expected) < 0
+            if o == 'starts_with':
+                return np.char.startswith(column, expected)
+            return np.char.endswith(column, expected)
+
+        if o in _NUMERIC_OPERATORS:
+            if not is_numeric(v):
+                return self._constant(False)
+            # NaN(None/숫자 아님)과의 비교는 항상 False
+            return _NUMERIC_UFUNCS[o](self._number_column(p), float(v))
+
+        if o == 'exists':
+            return np.fromiter((value is not None for value in self._values[p]), dtype=bool, count=self.row_count)
+        if o == 'not_exists':
+            return np.fromiter((value is None for value in self._values[p]), dtype=bool, count=self.row_count)
+
+        # 알 수 없는 연산자
+        return self._constant(False)
+
+    def match_matrix(self):
+        """(요소 수, 룰 수) boolean 행렬 - [i, j]는 i번째 요소가 j번째 조건을 만족하는지"""
+        if not self.condition_sets:
+            return np.zeros((self.row_count, 0), dtype=bool)
+        return np.column_stack([self.mask(conditions) for conditions in self.condition_sets])
+
+
+def rule_match_matrix(data_dicts, condition_sets):
+    """data_dicts 전체에 대해 조건들을 열 단위로 평가한 (요소 수, 룰 수) boolean 행렬을 반환합니다."""
+    return RuleColumnTable(condition_sets).extend(data_dicts).match_matrix()
@@ -0,0 +1,377 @@
+"""
+룰셋 조건(conditions) 컴파일 엔진
+
+evaluate_conditions는 요소마다 조건 JSON을 다시 해석했습니다. (접두어 변환, 다중 경로 탐색, 숫자 파싱, 조건마다 print)
+여기서는 조건을 한 번 Python closure로 컴파일하여 속성 접근 경로, 숫자 피연산자, 비교 함수를 미리 결정해 둡니다.
+컴파일 결과는 (룰 모델, id, 조건 필드)별로 updated_at과 함께 캐시되어, 룰이 수정되기 전까지 다시 컴파일하지 않습니다.
+
+매칭 결과는 기존 evaluate_conditions와 동일합니다.
+- conditions가 비어 있으면 True, 리스트는 AND, {'OR': [...]}는 OR
+- 개별 조건: 'parameter'(또는 'property'), 'operator', 'value'가 모두 있어야 하며 없으면 False
+- 값 조회 순서: 원본 표시명 -> 내부 필드명 -> MM.Properties.* ([속성명]) -> CC.System.* (CostCode.*) -> get_value_from_element
+"""
+
+import operator
+from collections.abc import Mapping
+
+_COMPILED_CACHE = {}
+_COMPILED_CACHE_MAX = 4096   # 삭제된 룰의 항목이 쌓이지 않도록 이 수를 넘으면 캐시를 비움
+
+
+def get_value_from_element(raw_data, parameter_name):
+    """
+    점(.)이 포함된 키를 해석하여 중첩된 객체의 값을 찾아옵니다.
+    'Parameters', 'TypeParameters', 'QuantitySet' 등 다양한 위치를 모두 확인합니다.
+
+    ▼▼▼ [수정] QuantitySet 등의 경로를 더 유연하게 처리 (2025-11-05) ▼▼▼
+    """
+    if not raw_data or not parameter_name:
+        return None
+
+    # 0. ▼▼▼ [추가] 전체 parameter_name을 하나의 키로 먼저 시도 (2025-11-05) ▼▼▼
+    # 예: "Qto_WallBaseQuantities__GrossSideArea" 자체가 키인 경우
+    if parameter_name in raw_data:
+        return raw_data[parameter_name]
+    if 'Parameters' in raw_data and parameter_name in raw_data['Parameters']:
+        return raw_data['Parameters'][parameter_name]
+    if 'TypeParameters' in raw_data and parameter_name in raw_data['TypeParameters']:
+        return raw_data['TypeParameters'][parameter_name]
+
+    # 1. 점(.)을 기준으로 키를 분리합니다.
+    parts = parameter_name.split('.')
+
+    # ▼▼▼ [추가] 점으로 분리한 후 전체 경로를 하나의 키로 시도 (2025-11-05) ▼▼▼
+    # 예: "QuantitySet.Qto_WallBaseQuantities__GrossSideArea"의 경우
+    # parts[0]="QuantitySet", parts[1]="Qto_WallBaseQuantities__GrossSideArea"
+    if len(parts) == 2:
+        first_key, second_key = parts[0], parts[1]
+        # raw_data[first_key][second_key] 형태로 시도
+        if first_key in raw_data and isinstance(raw_data[first_key], Mapping):
+            if second_key in raw_data[first_key]:
+                return raw_data[first_key][second_key]
+
+    # 2. 검색을 시작할 초기 객체를 설정합니다.
+    # 만약 첫 번째 키가 'Parameters'나 'TypeParameters'가 아니라면,
+    # raw_data의 최상위, Parameters, TypeParameters 순서로 모두 탐색합니다.
+    potential_starts = []
+    if parts[0] in raw_data:
+        potential_starts.append(raw_data)
+    if 'Parameters' in raw_data:
+        potential_starts.append(raw_data['Parameters'])
+    if 'TypeParameters' in raw_data:
+        potential_starts.append(raw_data['TypeParameters'])
+
+    # 만약 탐색 시작점을 찾지 못하면, raw_data 자체를 시작점으로 삼습니다.
+    if not potential_starts:
+        potential_starts.append(raw_data)
+
+    # 3. 각 잠재적 시작 위치에서 값을 탐색합니다.
+    for start_obj in potential_starts:
+        current_obj = start_obj
+        found = True
+        for part in parts:
+            if isinstance(current_obj, Mapping) and part in current_obj:
+                current_obj = current_obj[part]
+            else:
+                found = False
+                break
+
+        # 값을 성공적으로 찾았다면 즉시 반환합니다.
+        if found:
+            return current_obj
+
+    # 모든 위치에서 값을 찾지 못한 경우
+    return None
+
+def is_numeric(value):
+    if value is None: return False
+    try: float(value); return True
+    except (ValueError, TypeError): return False
+
+def get_internal_field_name(display_field):
+    """
+    계층적 표시명 (BIM.*, QM.*, MM.*, SC.*, CI.*, CC.*, AO.*, AC.*)을 내부 필드명으로 변환합니다.
+    JavaScript의 getInternalFieldName()과 동일한 로직입니다.
+
+    접두어 처리:
+    - BIM.* : BIM 원본 데이터 속성
+    - QM.* : 수량산출부재 속성
+    - MM.* : 일람부호 속성
+    - SC.* : 공간분류 속성
+    - CI.* : 코스트아이템 속성
+    - CC.* : 공사코드 속성
+    - AO.* : 액티비티객체 속성
+    - AC.* : 액티비티코드 속성
+    """
+    if not display_field:
+        return ''
+
+    # ▼▼▼ [추가] 언더스코어 형식을 점 형식으로 변환 (CC_System_code -> CC.System.code) (2025-11-05) ▼▼▼
+    # CSV 가져오기 등에서 언더스코어 형식 사용 시 호환성 제공
+    prefixes = ['QM_System_', 'QM_Properties_', 'MM_System_', 'MM_Properties_',
+                'SC_System_', 'CI_System_', 'CC_System_', 'AO_System_', 'AC_System_',
+                'BIM_System_', 'BIM_TypeParameters_', 'BIM_Parameters_', 'BIM_Attributes_']
+    for prefix in prefixes:
+        if display_field.startswith(prefix):
+            # 언더스코어를 점으로 변환 (예: CC_System_code -> CC.System.code)
+            display_field = display_field.replace('_', '.', 2)  # 처음 2개의 언더스코어만 변환
+            break
+    # ▲▲▲ [추가] 여기까지 ▲▲▲
+
+    # ▼▼▼ [추가] QM.*, MM.*, SC.*, CI.*, CC.*, AO.*, AC.* 처리 (2025-11-05) ▼▼▼
+    # QM.System.* -> 수량산출부재 시스템 속성
+    if display_field.startswith('QM.System.'):
+        return display_field[10:]  # 'QM.System.' 제거
+    # QM.Properties.* -> 수량산출부재 사용자 정의 속성
+    if display_field.startswith('QM.Properties.'):
+        return display_field[14:]  # 'QM.Properties.' 제거
+
+    # MM.System.* -> 일람부호 시스템 속성
+    if display_field.startswith('MM.System.'):
+        return display_field[10:]  # 'MM.System.' 제거
+    # MM.Properties.* -> 일람부호 사용자 정의 속성
+    if display_field.startswith('MM.Properties.'):
+        return display_field[14:]  # 'MM.Properties.' 제거
+
+    # SC.System.* -> 공간분류 시스템 속성
+    if display_field.startswith('SC.System.'):
+        return display_field[10:]  # 'SC.System.' 제거
+
+    # CI.System.* -> 코스트아이템 시스템 속성
+    if display_field.startswith('CI.System.'):
+        return display_field[10:]  # 'CI.System.' 제거
+
+    # CC.System.* -> 공사코드 시스템 속성
+    if display_field.startswith('CC.System.'):
+        return display_field[10:]  # 'CC.System.' 제거
+
+    # AO.System.* -> 액티비티객체 시스템 속성
+    if display_field.startswith('AO.System.'):
+        return display_field[10:]  # 'AO.System.' 제거
+
+    # AC.System.* -> 액티비티코드 시스템 속성
+    if display_field.startswith('AC.System.'):
+        return display_field[10:]  # 'AC.System.' 제거
+    # ▲▲▲ [추가] 여기까지 ▲▲▲
+
+    # BIM. 접두어가 없으면 그대로 반환 (하위 호환성)
+    if not display_field.startswith('BIM.'):
+        return display_field
+
+    # BIM.System.* - Cost Estimator 자체 속성
+    if display_field.startswith('BIM.System.'):
+        return display_field[11:]  # 'BIM.System.' 제거
+
+    # BIM.TypeParameters.*
+    if display_field.startswith('BIM.TypeParameters.'):
+        sub_key = display_field[19:]  # 'BIM.TypeParameters.' 제거
+        return f'TypeParameters.{sub_key}'
+
+    # BIM.Parameters.*
+    if display_field.startswith('BIM.Parameters.'):
+        return display_field[15:]  # 'BIM.Parameters.' 제거
+
+    # BIM.Attributes.* - IFC raw_data 직접 속성 (하위 호환성)
+    if display_field.startswith('BIM.Attributes.'):
+        return display_field[15:]  # 'BIM.Attributes.' 제거
+
+    # ▼▼▼ [추가] 일반적인 BIM.* 형태 (예: BIM.QuantitySet.XXX) ▼▼▼
+    # BIM. 접두어만 제거하여 raw_data 내부 경로로 변환
+    # BIM.QuantitySet.XXX -> QuantitySet.XXX
+    # BIM.Category -> Category
+    return display_field[4:]  # 'BIM.' 제거
+    # ▲▲▲ [추가] 여기까지 ▲▲▲
+
+
+# ▼▼▼ [추가] 조건 컴파일 ▼▼▼
+def _always_true(data_dict):
+    return True
+
+def _always_false(data_dict):
+    return False
+
+def compile_value_lookup(parameter_name):
+    """get_value_from_element(raw_data, parameter_name)와 같은 결과를 반환하는 함수 (키 분리는 미리 수행)"""
+    if not parameter_name:
+        return lambda raw_data: None
+    parts = parameter_name.split('.')
+    first_part = parts[0]
+    pair = (parts[0], parts[1]) if len(parts) == 2 else None
+
+    def lookup(raw_data):
+        if not raw_data:
+            return None
+        if parameter_name in raw_data:
+            return raw_data[parameter_name]
+        if 'Parameters' in raw_data and parameter_name in raw_data['Parameters']:
+            return raw_data['Parameters'][parameter_name]
+        if 'TypeParameters' in raw_data and parameter_name in raw_data['TypeParameters']:
+            return raw_data['TypeParameters'][parameter_name]
+
+        if pair is not None:
+            first_key, second_key = pair
+            if first_key in raw_data and isinstance(raw_data[first_key], Mapping):
+                if second_key in raw_data[first_key]:
+                    return raw_data[first_key][second_key]
+
+        potential_starts = []
+        if first_part in raw_data:
+            potential_starts.append(raw_data)
+        if 'Parameters' in raw_data:
+            potential_starts.append(raw_data['Parameters'])
+        if 'TypeParameters' in raw_data:
+            potential_starts.append(raw_data['TypeParameters'])
+        if not potential_starts:
+            potential_starts.append(raw_data)
+
+        for start_obj in potential_starts:
+            current_obj = start_obj
+            found = True
+            for part in parts:
+                if isinstance(current_obj, Mapping) and part in current_obj:
+                    current_obj = current_obj[part]
+                else:
+                    found = False
+                    break
+            if found:
+                return current_obj
+        return None
+
+    return lookup
+
+def _compile_condition_value(p):
+    """개별 조건의 실제 값을 data_dict에서 찾는 함수"""
+    internal_field = get_internal_field_name(p)
+    nested_lookup = compile_value_lookup(internal_field)
+    if p.startswith('MM.Properties.'):
+        fallback_key = f'[{p[14:]}]'   # MM.Properties.속성명 -> [속성명]
+    elif p.startswith('CC.System.'):
+        fallback_key = 'CostCode.' + p[10:]   # CC.System.* -> CostCode.*
+    else:
+        fallback_key = None
+
+    def lookup(data_dict):
+        if p in data_dict:
+            return data_dict.get(p)
+        if internal_field in data_dict:
+            return data_dict.get(internal_field)
+        if fallback_key is not None:
+            return data_dict.get(fallback_key)
+        return nested_lookup(data_dict)
+
+    return lookup
+
+_STRING_OPERATORS = {
+    'equals': operator.eq,
+    'not_equals': operator.ne,
+    'contains': lambda actual, expected: expected in actual,
+    'not_contains': lambda actual, expected: expected not in actual,
+    'starts_with': lambda actual, expected: actual.startswith(expected),
+    'ends_with': lambda actual, expected: actual.endswith(expected),
+}
+_NUMERIC_OPERATORS = {
+    'greater_than': operator.gt,
+    'less_than': operator.lt,
+    'greater_or_equal': operator.ge,
+    'less_or_equal': operator.le,
+}
+
+def _compile_leaf(conditions):
+    p = conditions.get('parameter') or conditions.get('property')
+    o = conditions.get('operator')
+    v = conditions.get('value')
+    if not all([p, o, v is not None]):
+        return _always_false
+
+    lookup = _compile_condition_value(p)
+
+    if o in _STRING_OPERATORS:
+        compare = _STRING_OPERATORS[o]
+        expected = str(v)
+        return lambda data_dict: compare(str(lookup(data_dict) or ""), expected)
+
+    if o in _NUMERIC_OPERATORS:
+        if not is_numeric(v):
+            # 기준값이 숫자가 아니면 항상 False (값 조회는 기존과 같이 수행)
+            return lambda data_dict: lookup(data_dict) is not None and False
+        compare = _NUMERIC_OPERATORS[o]
+        expected_num = float(v)
+
+        def numeric_predicate(data_dict):
+            actual_value = lookup(data_dict)
+            if actual_value is None:
+                return False
+            try:
+                actual_num = float(actual_value)
+            except (ValueError, TypeError):
+                return False
+            return compare(actual_num, expected_num)
+        return numeric_predicate
+
+    if o == 'exists':
+        return lambda data_dict: lookup(data_dict) is not None
+    if o == 'not_exists':
+        return lambda data_dict: lookup(data_dict) is None
+
+    # 알 수 없는 연산자: 값 조회만 하고 False
+    return lambda data_dict: lookup(data_dict) is not None and False
+
+def compile_conditions(conditions):
+    """conditions JSON을 data_dict -> bool 함수로 컴파일합니다. (evaluate_conditions와 같은 결과)"""
+    if not conditions:
+        return _always_true
+
+    if isinstance(conditions, list):
+        predicates = tuple(compile_conditions(cond) for cond in conditions)
+        if len(predicates) == 1:
+            return predicates[0]
+        return lambda data_dict: all(predicate(data_dict) for predicate in predicates)
+
+    if isinstance(conditions, dict):
+        if 'OR' in conditions and isinstance(conditions['OR'], list):
+            predicates = tuple(compile_conditions(cond) for cond in conditions['OR'])
+            return lambda data_dict: any(predicate(data_dict) for predicate in predicates)
+        if isinstance(conditions.get('parameter') or conditions.get('property'), str):
+            return _compile_leaf(conditions)
+        # 문자열이 아닌 parameter: 드문 경우이므로 컴파일하지 않고 평가 시점에 해석
+        return lambda data_dict: _evaluate_leaf_uncompiled(data_dict, conditions)
+
+    return _always_false
+
+def _evaluate_leaf_uncompiled(data_dict, conditions):
+    p = conditions.get('parameter') or conditions.get('property')
+    if not all([p, conditions.get('operator'), conditions.get('value') is not None]):
+        return False
+    get_internal_field_name(p)   # 문자열이 아니면 기존과 같이 여기서 오류 발생
+    return _compile_leaf(conditions)(data_dict)
+
+def evaluate_conditions(data_dict, conditions):
+    """
+    주어진 데이터 딕셔너리가 모든 조건을 만족하는지 평가합니다.
+    룰 객체의 조건은 rule_matches를 사용하면 컴파일 결과가 캐시됩니다.
+    """
+    return compile_conditions(conditions)(data_dict)
+
+def compiled_rule_conditions(rule, field='conditions'):
+    """
+    rule.<field> 조건을 컴파일한 함수를 반환합니다.
+    (룰 모델, id, 필드)별로 캐시하며 updated_at이 바뀌면 다시 컴파일합니다.
+    저장되지 않은 룰(id 없음)이나 updated_at이 없는 룰은 캐시하지 않습니다.
+    """
+    stamp = getattr(rule, 'updated_at', None)
+    if rule.pk is None or stamp is None:
+        return compile_conditions(getattr(rule, field))
+    key = (rule._meta.label, rule.pk, field)
+    cached = _COMPILED_CACHE.get(key)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+    predicate = compile_conditions(getattr(rule, field))
+    if len(_COMPILED_CACHE) >= _COMPILED_CACHE_MAX:
+        _COMPILED_CACHE.clear()
+    _COMPILED_CACHE[key] = (stamp, predicate)
+    return predicate
+
+def rule_matches(rule, data_dict, field='conditions'):
+    """data_dict가 룰의 조건(field)을 만족하는지 - evaluate_conditions(data_dict, rule.<field>)와 같은 결과"""
+    return compiled_rule_conditions(rule, field)(data_dict)
+# ▲▲▲ [추가] 여기까지 ▲▲▲
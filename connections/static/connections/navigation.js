@@ -567,7 +567,7 @@ window.loadDataForActiveTab = function loadDataForActiveTab() {
                 frontendSocket.send(
                     JSON.stringify({
                         type: 'get_all_elements',
-                        payload: { project_id: currentProjectId },
+                        payload: { project_id: currentProjectId, geometry: 'lazy' },
                     })
                 );
             }
@@ -753,7 +753,7 @@ window.loadSpecificRuleset = async function loadSpecificRuleset(rulesetType) {
                 frontendSocket.send(
                     JSON.stringify({
                         type: 'get_all_elements',
-                        payload: { project_id: currentProjectId },
+                        payload: { project_id: currentProjectId, geometry: 'lazy' },
                     })
                 );
                 // Wait a moment for data to load
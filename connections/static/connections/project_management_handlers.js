@@ -112,7 +112,7 @@ function handleProjectChange(e) {
             frontendSocket.send(
                 JSON.stringify({
                     type: 'get_all_elements',
-                    payload: { project_id: currentProjectId },
+                    payload: { project_id: currentProjectId, geometry: 'lazy' },
                 })
             ); // BIM 데이터 요청
         } else {
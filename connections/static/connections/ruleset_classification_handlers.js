@@ -211,7 +211,7 @@ async function applyClassificationRules(skipConfirmation = false) {
             frontendSocket.send(
                 JSON.stringify({
                     type: 'get_all_elements',
-                    payload: { project_id: currentProjectId },
+                    payload: { project_id: currentProjectId, geometry: 'lazy' },
                 })
             );
         } else {
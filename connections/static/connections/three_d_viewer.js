@@ -513,7 +513,10 @@
                     vertices: obj.raw_data.Parameters.Geometry.verts,
                     faces: obj.raw_data.Parameters.Geometry.faces,
                     matrix: obj.raw_data.Parameters.Geometry.matrix
-                }
+                },
+                // ▼▼▼ [추가] 지연 로딩: 메쉬 없이 blob digest/bbox만 받은 객체 ▼▼▼
+                pendingGeometry: !obj.raw_data.Parameters.Geometry.verts && !!obj.raw_data.Parameters.Geometry.blob,
+                bbox: obj.raw_data.Parameters.Geometry.bbox
             }));
         console.log(`[3D Viewer] Filtered out ${filteredOutCount} BIM objects that have splits`);
         // ▲▲▲ [수정] 여기까지 ▲▲▲
@@ -562,10 +565,12 @@
         console.log(`[3D Viewer] Found ${splitObjects.length} split objects to load.`);
         // ▲▲▲ [추가] 여기까지 ▲▲▲
 
-        // ▼▼▼ [수정] BIM 원본 객체와 분할 객체 합치기 ▼▼▼
-        const allObjectsToLoad = [...geometryObjects, ...splitObjects];
+        // ▼▼▼ [수정] BIM 원본 객체와 분할 객체 합치기 (메쉬를 아직 받지 않은 객체는 지연 로딩) ▼▼▼
+        cancelLazyGeometryLoading();
+        const lazyObjects = geometryObjects.filter(obj => obj.pendingGeometry);
+        const allObjectsToLoad = [...geometryObjects.filter(obj => !obj.pendingGeometry), ...splitObjects];
 
-        if (allObjectsToLoad.length === 0) {
+        if (allObjectsToLoad.length === 0 && lazyObjects.length === 0) {
             console.warn("[3D Viewer] No objects with geometry found. Loading placeholder cube instead.");
 
             if (geometryLoaded) {
@@ -592,6 +597,7 @@
         window.loadBimGeometry(allObjectsToLoad);
 
         // ▼▼▼ [추가] 저장된 카메라 상태 복원 ▼▼▼
+        const cameraRestored = !!(window.savedCameraState && camera && controls);
         if (window.savedCameraState && camera && controls) {
             console.log('[3D Viewer] Restoring camera state...');
             camera.position.copy(window.savedCameraState.position);
@@ -609,6 +615,12 @@
         }
         // ▲▲▲ [추가] 여기까지 ▲▲▲
 
+        // ▼▼▼ [추가] 메쉬가 없는 객체는 카메라 시야 기준 우선순위로 나누어 요청 ▼▼▼
+        if (lazyObjects.length > 0) {
+            startLazyGeometryLoading(lazyObjects, !cameraRestored);
+        }
+        // ▲▲▲ [추가] 여기까지 ▲▲▲
+
         // Restore visibility state if returning from another tab
         restoreVisibilityState();
 
@@ -630,6 +642,8 @@
             return;
         }
 
+        cancelLazyGeometryLoading();  // 진행 중인 지연 로딩 응답은 무시
+
         // Deselect any selected object
         deselectObject();
 
@@ -976,7 +990,8 @@
                     window.frontendSocket.send(JSON.stringify({
                         type: 'get_all_elements',
                         payload: {
-                            project_id: window.currentProjectId
+                            project_id: window.currentProjectId,
+                            geometry: 'lazy'  // 메쉬는 뷰어가 get_element_geometry로 따로 요청
                         }
                     }));
                     // Note: loadPlaceholderGeometry() will be called automatically
@@ -1680,13 +1695,165 @@
     }
 
     // Load BIM geometry from data
-    window.loadBimGeometry = function(geometryData) {
+    // ▼▼▼ [추가] 지오메트리 지연 로딩 ▼▼▼
+    // get_all_elements(geometry: 'lazy')로 속성과 bounding box만 먼저 받고, 메쉬는 화면에 보이는 객체부터
+    // get_element_geometry로 나누어 요청합니다. 같은 메쉬(blob)를 공유하는 객체는 응답에 메쉬가 한 번만 담깁니다.
+    const LAZY_GEOMETRY_BATCH_SIZE = 300;   // 한 번에 요청하는 객체 수
+    const LAZY_GEOMETRY_MAX_IN_FLIGHT = 2;  // 응답을 기다리는 동시 요청 수
+    let lazyGeometryState = null;
+    let lazyGeometryRequestSeq = 0;
+
+    function bimObjectWorldMatrix(matrixArray) {
+        // IFC transformation matrix (4x4, column-major) 적용 후 Z-up (IFC/Blender) → Y-up (Three.js) 변환
+        const ifcMatrix = new THREE.Matrix4();
+        ifcMatrix.fromArray(matrixArray);
+        const zUpToYUp = new THREE.Matrix4();
+        zUpToYUp.set(
+            1,  0,  0,  0,
+            0,  0,  1,  0,
+            0, -1,  0,  0,
+            0,  0,  0,  1
+        );
+        return new THREE.Matrix4().multiplyMatrices(zUpToYUp, ifcMatrix);
+    }
+
+    function lazyObjectWorldBox(obj) {
+        const b = obj.bbox;
+        if (!b || b.length !== 6) return null;
+        const box = new THREE.Box3(new THREE.Vector3(b[0], b[1], b[2]), new THREE.Vector3(b[3], b[4], b[5]));
+        const matrix = obj.geometry.matrix;
+        if (matrix && matrix.length === 16) {
+            box.applyMatrix4(bimObjectWorldMatrix(matrix));
+        }
+        return box;
+    }
+
+    function sortLazyObjectsByVisibility(objects) {
+        // 카메라 시야(frustum) 안에 있는 객체를 먼저, 그 안에서는 화면에 크게 보이는(가깝고 큰) 객체를 먼저 요청
+        const frustum = new THREE.Frustum();
+        frustum.setFromProjectionMatrix(
+            new THREE.Matrix4().multiplyMatrices(camera.projectionMatrix, camera.matrixWorldInverse)
+        );
+        const center = new THREE.Vector3();
+        const size = new THREE.Vector3();
+        objects.forEach(obj => {
+            const box = obj.worldBox;
+            if (!box) {
+                obj.lazyPriority = -Infinity;
+                return;
+            }
+            box.getCenter(center);
+            box.getSize(size);
+            const distance = Math.max(camera.position.distanceTo(center), 1e-6);
+            const apparentSize = size.length() / distance;
+            obj.lazyPriority = (frustum.intersectsBox(box) ? 1e6 : 0) + apparentSize;
+        });
+        return objects.sort((a, b) => b.lazyPriority - a.lazyPriority);
+    }
+
+    function cancelLazyGeometryLoading() {
+        lazyGeometryState = null;
+    }
+
+    function startLazyGeometryLoading(lazyObjects, centerCamera) {
+        if (!window.frontendSocket || window.frontendSocket.readyState !== WebSocket.OPEN) {
+            console.warn("[3D Viewer] WebSocket is not connected. Cannot request lazy geometry.");
+            return;
+        }
+
+        // 메쉬가 도착하기 전에 bbox로 카메라를 먼저 맞춰 바로 조작할 수 있게 함
+        const sceneBox = new THREE.Box3();
+        lazyObjects.forEach(obj => {
+            obj.worldBox = lazyObjectWorldBox(obj);
+            if (obj.worldBox) sceneBox.union(obj.worldBox);
+        });
+        if (centerCamera && !sceneBox.isEmpty()) {
+            centerCameraOnGeometry(sceneBox);  // 이미 로드된 메쉬(분할 객체 등)와 bbox를 합친 범위
+        }
+        camera.updateMatrixWorld();
+
+        lazyGeometryState = {
+            projectId: window.currentProjectId,
+            queue: sortLazyObjectsByVisibility(lazyObjects),
+            objectsById: new Map(lazyObjects.map(obj => [obj.id, obj])),
+            inFlight: new Set(),
+            loadedCount: 0,
+            totalCount: lazyObjects.length,
+            startedAt: performance.now()
+        };
+        console.log(`[3D Viewer] Lazy geometry loading started for ${lazyObjects.length} objects.`);
+        requestNextLazyGeometryBatches();
+    }
+
+    function requestNextLazyGeometryBatches() {
+        const state = lazyGeometryState;
+        if (!state) return;
+        while (state.inFlight.size < LAZY_GEOMETRY_MAX_IN_FLIGHT && state.queue.length > 0) {
+            const batch = state.queue.splice(0, LAZY_GEOMETRY_BATCH_SIZE);
+            const requestId = ++lazyGeometryRequestSeq;
+            state.inFlight.add(requestId);
+            window.frontendSocket.send(JSON.stringify({
+                type: 'get_element_geometry',
+                payload: {
+                    project_id: state.projectId,
+                    request_id: requestId,
+                    element_ids: batch.map(obj => obj.id)
+                }
+            }));
+        }
+    }
+
+    window.handleElementGeometry = function(data) {
+        const state = lazyGeometryState;
+        if (!state || !state.inFlight.has(data.request_id)) {
+            return; // 취소된(씬이 다시 로드된) 요청의 응답
+        }
+        state.inFlight.delete(data.request_id);
+
+        const meshes = data.meshes || {};
+        const loadedObjects = [];
+        Object.entries(data.elements || {}).forEach(([elementId, digest]) => {
+            const obj = state.objectsById.get(elementId);
+            const mesh = meshes[digest];
+            if (!obj || !mesh) return;
+            obj.geometry = {
+                vertices: mesh.verts,
+                faces: mesh.faces,
+                matrix: obj.geometry.matrix
+            };
+            obj.pendingGeometry = false;
+            loadedObjects.push(obj);
+        });
+        if ((data.missing || []).length > 0) {
+            console.warn(`[3D Viewer] ${data.missing.length} objects have no geometry on the server.`);
+        }
+
+        state.loadedCount += loadedObjects.length + (data.missing || []).length;
+        const isLastBatch = state.queue.length === 0 && state.inFlight.size === 0;
+        requestNextLazyGeometryBatches();
+        window.loadBimGeometry(loadedObjects, { append: true, finalize: isLastBatch });
+
+        if (isLastBatch) {
+            const elapsed = ((performance.now() - state.startedAt) / 1000).toFixed(1);
+            console.log(`[3D Viewer] Lazy geometry loading complete: ${state.loadedCount}/${state.totalCount} objects in ${elapsed}s.`);
+            lazyGeometryState = null;
+            if (typeof window.syncGeometryToDataMgmt === 'function') {
+                window.syncGeometryToDataMgmt();
+            }
+        }
+    };
+    // ▲▲▲ [추가] 여기까지 ▲▲▲
+
+    window.loadBimGeometry = function(geometryData, options = {}) {
+        // options.append: 기존 씬을 지우지 않고 추가 (지연 로딩된 메쉬)
+        // options.finalize: append 모드에서 카메라/표시 상태 복원을 실행할지 여부
+        const append = !!options.append;
         if (!scene) {
             console.error("[3D Viewer] Scene not initialized!");
             return;
         }
 
-        if (geometryLoaded) {
+        if (!append && geometryLoaded) {
             console.log("[3D Viewer] Clearing existing geometry before loading new...");
             window.clearScene();
         }
@@ -1695,7 +1862,10 @@
 
         if (!geometryData || geometryData.length === 0) {
             console.warn("[3D Viewer] No geometry data provided.");
-            return;
+            if (!append || !options.finalize) {
+                return;
+            }
+            geometryData = [];
         }
 
         // Process each BIM object
@@ -1713,15 +1883,18 @@
 
                 // Vertices - convert 2D array [[x,y,z], ...] to flat array [x,y,z, ...]
                 if (geomData.vertices && geomData.vertices.length > 0) {
-                    const flatVertices = geomData.vertices.flat();
-                    const positions = new Float32Array(flatVertices);
+                    // 바이너리 WebSocket으로 받은 경우 이미 Float32Array (복사 불필요)
+                    const positions = ArrayBuffer.isView(geomData.vertices)
+                        ? geomData.vertices
+                        : new Float32Array(geomData.vertices.flat());
                     geometry.setAttribute('position', new THREE.BufferAttribute(positions, 3));
                 }
 
                 // Faces/Indices - convert 2D array [[i1,i2,i3], ...] to flat array [i1,i2,i3, ...]
                 if (geomData.faces && geomData.faces.length > 0) {
-                    const flatFaces = geomData.faces.flat();
-                    const indices = new Uint32Array(flatFaces);
+                    const indices = ArrayBuffer.isView(geomData.faces)
+                        ? geomData.faces
+                        : new Uint32Array(geomData.faces.flat());
                     geometry.setIndex(new THREE.BufferAttribute(indices, 1));
                 }
 
@@ -1762,24 +1935,8 @@
                 if (!bimObject.isSplitElement && geomData.matrix && geomData.matrix.length === 16) {
                     console.log('[loadBimGeometry] Applying IFC matrix to BIM object');
 
-                    // IFC transformation matrix (4x4) - column-major format
-                    const ifcMatrix = new THREE.Matrix4();
-                    ifcMatrix.fromArray(geomData.matrix);
-
-                    // Convert from Z-up (IFC/Blender) to Y-up (Three.js)
-                    // Transformation: X stays, Y->Z, Z->-Y (flipped)
-                    const zUpToYUp = new THREE.Matrix4();
-                    zUpToYUp.set(
-                        1,  0,  0,  0,
-                        0,  0,  1,  0,
-                        0, -1,  0,  0,
-                        0,  0,  0,  1
-                    );
-
-                    // Apply: first IFC matrix, then coordinate system conversion
-                    const finalMatrix = new THREE.Matrix4();
-                    finalMatrix.multiplyMatrices(zUpToYUp, ifcMatrix);
-                    mesh.applyMatrix4(finalMatrix);
+                    // Apply: first IFC matrix, then coordinate system conversion (Z-up → Y-up)
+                    mesh.applyMatrix4(bimObjectWorldMatrix(geomData.matrix));
 
                     console.log('[loadBimGeometry] After applyMatrix4 - mesh transform:', {
                         position: mesh.position.toArray(),
@@ -1858,8 +2015,15 @@
         }
         // ▲▲▲ [추가] 여기까지 ▲▲▲
 
+        // 지연 로딩 중에는 카메라를 bbox 기준으로 이미 맞췄으므로 다시 이동하지 않음
+        if (append && !options.finalize) {
+            return;
+        }
+
         // Center camera on loaded geometry
-        centerCameraOnGeometry();
+        if (!append) {
+            centerCameraOnGeometry();
+        }
 
         // Restore visibility state (if returning from another tab)
         restoreVisibilityState();
@@ -1868,7 +2032,7 @@
         updateVisibilityControlButtons();
     };
 
-    function centerCameraOnGeometry() {
+    function centerCameraOnGeometry(extraBox) {
         if (!scene || !camera || !controls) {
             console.warn("[3D Viewer] centerCameraOnGeometry: Missing scene, camera, or controls");
             return;
@@ -1884,6 +2048,10 @@
                 meshCount++;
             }
         });
+        // 아직 메쉬를 받지 않은 객체들의 bounding box (지연 로딩)
+        if (extraBox && !extraBox.isEmpty()) {
+            box.union(extraBox);
+        }
 
         console.log(`[3D Viewer] centerCameraOnGeometry: Found ${meshCount} meshes`);
         console.log("[3D Viewer] Bounding box min:", box.min);
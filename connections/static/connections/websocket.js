@@ -25,14 +25,185 @@ function parseProgressTotal(payload) {
     return { hasTotal: false, total: null };
 }
 
+// ▼▼▼ [추가] MessagePack 바이너리 프레임 지원 (connections/ws_codec.py와 동일한 규약) ▼▼▼
+// 서버와 subprotocol 협상이 성공하면 객체 청크가 MessagePack으로 전송되고,
+// Geometry 배열은 typed array ext로 오므로 Float32Array/Uint32Array로 바로 받습니다.
+var BINARY_SUBPROTOCOL = 'costestimator.msgpack.v1';
+var TYPED_ARRAY_EXT = 1;
+var TYPED_ARRAY_CTORS = {
+    1: Float32Array,
+    2: Float64Array,
+    3: Uint32Array,
+    4: Int32Array,
+};
+var binaryExtensionCodec = null;
+
+function decodeTypedArrayExt(data) {
+    // [dtype u8][ndim u8][예약 2바이트][shape: ndim x u32][little-endian 원본 바이트]
+    const Ctor = TYPED_ARRAY_CTORS[data[0]];
+    const headerSize = 4 + 4 * data[1];
+    // slice로 정렬된 새 버퍼를 만든 뒤 typed array로 감쌉니다.
+    return new Ctor(data.slice(headerSize).buffer);
+}
+
+function getBinaryExtensionCodec() {
+    if (!binaryExtensionCodec && window.MessagePack) {
+        binaryExtensionCodec = new MessagePack.ExtensionCodec();
+        binaryExtensionCodec.register({
+            type: TYPED_ARRAY_EXT,
+            encode: () => null,
+            decode: decodeTypedArrayExt,
+        });
+    }
+    return binaryExtensionCodec;
+}
+
+function decodeSocketMessage(rawData) {
+    if (rawData instanceof ArrayBuffer) {
+        return MessagePack.decode(new Uint8Array(rawData), {
+            extensionCodec: getBinaryExtensionCodec(),
+        });
+    }
+    return JSON.parse(rawData);
+}
+// ▲▲▲ [추가] 여기까지 ▲▲▲
+
+// ▼▼▼ [추가] 변경 journal 기반 증분 새로고침 ▼▼▼
+// revit_data_complete/changes_since로 받은 마지막 변경 번호. 재접속 시 since_seq로 보내 그 이후 변경분만 받습니다.
+window.lastChangeSeq = null;
+window.lastChangeSeqProjectId = null;
+var RECONNECT_BASE_DELAY_MS = 1000;
+var RECONNECT_MAX_DELAY_MS = 30000;
+var reconnectDelayMs = RECONNECT_BASE_DELAY_MS;
+
+function requestChangesSinceLastSeq() {
+    if (
+        window.lastChangeSeq === null ||
+        !currentProjectId ||
+        window.lastChangeSeqProjectId !== currentProjectId
+    ) {
+        return false;
+    }
+    console.log(
+        `[WebSocket] Requesting changes since seq ${window.lastChangeSeq} for project:`,
+        currentProjectId
+    ); // 디버깅
+    frontendSocket.send(
+        JSON.stringify({
+            type: 'get_all_elements',
+            payload: {
+                project_id: currentProjectId,
+                geometry: 'lazy',
+                since_seq: window.lastChangeSeq,
+            },
+        })
+    );
+    return true;
+}
+
+function applyChangesSince(payload) {
+    if (payload.project_id !== currentProjectId) {
+        console.warn('[WebSocket] Ignoring changes_since for another project:', payload.project_id); // 디버깅
+        return;
+    }
+    lowerValueCache?.clear?.();
+    const deletedIds = new Set(payload.deleted_element_ids || []);
+    const updatedById = new Map((payload.elements || []).map((elem) => [elem.id, elem]));
+    if (deletedIds.size > 0 || updatedById.size > 0) {
+        allRevitData = allRevitData
+            .filter((elem) => !deletedIds.has(elem.id))
+            .map((elem) => {
+                const updated = updatedById.get(elem.id);
+                if (updated) {
+                    updatedById.delete(elem.id);
+                    return updated;
+                }
+                return elem;
+            });
+        // 남은 항목은 새로 생성된 객체
+        updatedById.forEach((elem) => allRevitData.push(elem));
+    }
+    if (payload.split_elements) {
+        window.allSplitElements = payload.split_elements;
+        window.rawElementIdsWithSplits = new Set(payload.raw_element_ids_with_splits || []);
+    }
+    if (payload.tags) {
+        updateTagLists(payload.tags);
+        allTags = payload.tags;
+    }
+    window.lastChangeSeq = payload.to_seq;
+    console.log(
+        `[WebSocket] Applied changes ${payload.from_seq} -> ${payload.to_seq}: ${(payload.elements || []).length} updated, ${deletedIds.size} deleted`
+    ); // 디버깅
+
+    const geometryChanged =
+        (payload.elements || []).length > 0 || deletedIds.size > 0 || !!payload.split_elements;
+    if (geometryChanged) {
+        populateFieldSelection();
+        renderDataTable('data-management-data-table-container', 'data-management');
+        if (activeTab === 'space-management') {
+            renderDataTable('space-management-data-table-container', 'space-management');
+        }
+        if (typeof loadPlaceholderGeometry === 'function' && allRevitData.length > 0) {
+            loadPlaceholderGeometry();
+        }
+    }
+    if (payload.quantity_members_changed && typeof loadQuantityMembers === 'function') {
+        loadQuantityMembers();
+    }
+    if (payload.cost_items_changed && typeof loadCostItems === 'function') {
+        loadCostItems();
+    }
+}
+// ▲▲▲ [추가] 여기까지 ▲▲▲
+
+// ▼▼▼ [추가] 태그 할당/제거 변경분 적용 ({객체 id: [태그 id]}) ▼▼▼
+// 서버는 raw_data 전체 대신 태그가 바뀐 객체의 현재 태그 id 목록만 보냅니다.
+// 태그 이름은 allTags에서 찾고, 이전에도 있던 태그는 기존 할당 방식(룰셋/수동)을 유지합니다. 새 태그는 수동 할당입니다.
+function applyElementTagDiff(tagsByElement) {
+    lowerValueCache?.clear?.();
+    const tagNameById = new Map((allTags || []).map((tag) => [tag.id, tag.name]));
+    let changedCount = 0;
+    allRevitData.forEach((elem) => {
+        const tagIds = tagsByElement[elem.id];
+        if (!tagIds) {
+            return;
+        }
+        const previousTypes = new Map(
+            (elem.classification_tags_details || []).map((detail) => [detail.name, detail.assignment_type])
+        );
+        const names = tagIds.map((tagId) => tagNameById.get(tagId)).filter((name) => name !== undefined);
+        elem.classification_tags = names;
+        elem.classification_tags_details = names.map((name) => ({
+            name,
+            assignment_type: previousTypes.get(name) ?? 'manual',
+        }));
+        changedCount += 1;
+    });
+    console.log(`[WebSocket] Applied tag changes to ${changedCount} elements.`); // 디버깅
+
+    const activeContext = activeTab === 'space-management' ? 'space-management' : 'data-management';
+    const activeTableContainerId = `${activeContext}-data-table-container`;
+    if (document.getElementById(activeTableContainerId)) {
+        renderDataTable(activeTableContainerId, activeContext);
+        renderAssignedTagsTable(activeContext);
+    }
+    showToast(`${changedCount}개 항목의 태그가 업데이트되었습니다.`, 'info');
+}
+// ▲▲▲ [추가] 여기까지 ▲▲▲
+
 window.setupWebSocket = function() {
     const wsScheme = window.location.protocol === 'https:' ? 'wss' : 'ws';
     const wsPath = wsScheme + '://' + window.location.host + '/ws/frontend/';
-    frontendSocket = new WebSocket(wsPath);
+    // MessagePack 라이브러리가 로드된 경우에만 바이너리 모드를 요청 (아니면 기존 JSON)
+    const protocols = window.MessagePack ? [BINARY_SUBPROTOCOL] : [];
+    frontendSocket = new WebSocket(wsPath, protocols);
+    frontendSocket.binaryType = 'arraybuffer';
 
     frontendSocket.onopen = function (e) {
         document.getElementById('status').textContent = '서버에 연결됨.';
         console.log('[WebSocket] Frontend connected to server.'); // 디버깅
+        reconnectDelayMs = RECONNECT_BASE_DELAY_MS;
         if (currentProjectId) {
             console.log(
                 '[WebSocket] Requesting initial tags for project:',
@@ -44,6 +215,8 @@ window.setupWebSocket = function() {
                     payload: { project_id: currentProjectId },
                 })
             );
+            // 재접속: 이미 받은 데이터가 있으면 끊긴 동안의 변경분만 요청
+            requestChangesSinceLastSeq();
         }
     };
 
@@ -57,14 +230,17 @@ window.setupWebSocket = function() {
             e.reason
         ); // 디버깅
         showToast(
-            '서버와 연결이 끊겼습니다. 페이지를 새로고침하세요.',
+            `서버와 연결이 끊겼습니다. ${Math.round(reconnectDelayMs / 1000)}초 후 다시 연결합니다.`,
             'error',
             5000
         );
+        // 재접속 후 since_seq로 변경분만 받으므로 페이지를 새로고침할 필요가 없습니다.
+        setTimeout(window.setupWebSocket, reconnectDelayMs);
+        reconnectDelayMs = Math.min(reconnectDelayMs * 2, RECONNECT_MAX_DELAY_MS);
     };
 
     frontendSocket.onmessage = function (e) {
-        const data = JSON.parse(e.data);
+        const data = decodeSocketMessage(e.data);
         const statusEl = document.getElementById('status');
         // 디버깅: 메시지 타입 포함 로그
         console.log(`[WebSocket] Message received: ${data.type}`, data);
@@ -124,6 +300,16 @@ window.setupWebSocket = function() {
             case 'revit_data_chunk': {
                 // console.log("[WebSocket] Received data chunk."); // 너무 빈번하여 주석 처리
                 allRevitData.push(...data.payload);
+                // ▼▼▼ [추가] 청크 처리 완료 ack -> 서버가 다음 청크를 보냄 (흐름 제어) ▼▼▼
+                if (data.stream_id !== undefined) {
+                    frontendSocket.send(
+                        JSON.stringify({
+                            type: 'viewer_chunk_ack',
+                            payload: { stream_id: data.stream_id, seq: data.seq },
+                        })
+                    );
+                }
+                // ▲▲▲ [추가] 여기까지 ▲▲▲
                 const totalKnown = progressBar.dataset.totalKnown === '1';
                 const displayTotal = Number(
                     progressBar.dataset.displayTotal ?? progressBar.max
@@ -194,12 +380,19 @@ window.setupWebSocket = function() {
                     progressBar.value = processed;
                     progressStatus.textContent = `처리됨: ${processed}개`;
                 }
+                // ▼▼▼ [추가] 서버 저장 큐 상태 (대기 중인 청크 수 / 청크 저장 시간) ▼▼▼
+                if (payload.queue_depth !== undefined) {
+                    progressStatus.textContent += ` · 저장 대기 ${payload.queue_depth}/${payload.queue_capacity ?? '-'} · 저장 ${payload.write_latency_ms}ms (평균 ${payload.avg_write_latency_ms}ms)`;
+                }
+                // ▲▲▲ [추가] 여기까지 ▲▲▲
                 // console.log(`[WebSocket] Fetch progress update: ${processed}/${totalUpdate}`); // 너무 빈번하여 주석 처리
                 break;
             }
 
             case 'revit_data_complete':
                 console.log(`[WebSocket][onmessage] Received: ${data.type}`); // <--- 추가
+                window.lastChangeSeq = data.change_seq ?? null;
+                window.lastChangeSeqProjectId = currentProjectId;
                 statusEl.textContent = `데이터 로드 완료. 총 ${allRevitData.length}개의 객체.`;
                 showToast(
                     `총 ${allRevitData.length}개의 객체 데이터를 받았습니다.`,
@@ -294,7 +487,7 @@ window.setupWebSocket = function() {
                     frontendSocket.send(
                         JSON.stringify({
                             type: 'get_all_elements',
-                            payload: { project_id: currentProjectId },
+                            payload: { project_id: currentProjectId, geometry: 'lazy' },
                         })
                     );
                 }
@@ -347,6 +540,11 @@ window.setupWebSocket = function() {
                 ); // 디버깅
                 break;
 
+            case 'changes_since':
+                console.log(`[WebSocket][onmessage] Received: ${data.type}`);
+                applyChangesSince(data.payload);
+                break;
+
             case 'tags_updated':
                 console.log(`[WebSocket][onmessage] Received: ${data.type}`); // <--- 추가
                 updateTagLists(data.tags);
@@ -364,6 +562,11 @@ window.setupWebSocket = function() {
                 }
                 break;
 
+            case 'element_tags_updated':
+                console.log(`[WebSocket][onmessage] Received: ${data.type}`);
+                applyElementTagDiff(data.tags_by_element || {});
+                break;
+
             case 'elements_updated':
                 console.log(`[WebSocket][onmessage] Received: ${data.type}`); // <--- 추가
                 lowerValueCache?.clear?.();
@@ -824,6 +1027,14 @@ window.setupWebSocket = function() {
                 break;
             // ▲▲▲ [추가] 여기까지 ▲▲▲
 
+            // ▼▼▼ [추가] 지연 로딩 메쉬 응답 (get_element_geometry) ▼▼▼
+            case 'element_geometry':
+                if (typeof window.handleElementGeometry === 'function') {
+                    window.handleElementGeometry(data);
+                }
+                break;
+            // ▲▲▲ [추가] 여기까지 ▲▲▲
+
             default:
                 console.warn(
                     '[WebSocket] Received unknown message type:',
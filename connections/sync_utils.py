@@ -0,0 +1,40 @@
+"""
+BIM 데이터 동기화 유틸리티
+- raw_data 정규화(canonical JSON) 및 digest 계산
+"""
+
+import hashlib
+import json
+
+
+def canonical_json(data):
+    """키 정렬, 공백 제거된 정규화 JSON 문자열을 반환합니다. (같은 내용이면 항상 같은 문자열)"""
+    return json.dumps(data, sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str)
+
+
+def compute_raw_data_digest(raw_data):
+    """정규화된 raw_data의 SHA-256 hex digest를 반환합니다."""
+    return hashlib.sha256(canonical_json(raw_data).encode('utf-8')).hexdigest()
+
+
+def diff_sync_manifest(manifest, stored_hashes, full_sync=False):
+    """
+    커넥터가 보낸 manifest와 DB에 저장된 source_hash를 비교합니다.
+
+    Args:
+        manifest: {UniqueId: content_hash} (커넥터 기준 현재 모델 전체)
+        stored_hashes: {UniqueId: source_hash} (DB 기준 프로젝트 전체)
+        full_sync: True면 hash와 관계없이 모든 객체를 요청
+
+    Returns:
+        (needed_uids, deleted_uids, unchanged_count)
+        - needed_uids: 전체 데이터를 받아야 하는 UniqueId 목록 (없음 또는 hash 불일치)
+        - deleted_uids: DB에는 있지만 manifest에 없는 UniqueId 집합 (삭제 대상)
+        - unchanged_count: 전송이 필요 없는 객체 수
+    """
+    needed_uids = [
+        uid for uid, content_hash in manifest.items()
+        if full_sync or not content_hash or stored_hashes.get(uid) != content_hash
+    ]
+    deleted_uids = set(stored_hashes) - set(manifest)
+    return needed_uids, deleted_uids, len(manifest) - len(needed_uids)
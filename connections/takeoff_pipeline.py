@@ -0,0 +1,348 @@
+"""
+산출 파이프라인 증분 실행
+
+BIM 동기화 이후 BOQ까지는 분류 룰셋 -> 수량산출부재 자동생성 -> 속성 룰셋 -> 일람부호/공사코드 할당
+-> 산출항목 자동생성 -> 액티비티 할당 -> 액티비티 객체 자동생성을 차례로 눌러야 했고, 각 단계가 프로젝트 전체를 다시 처리했습니다.
+여기서는 단계를 의존 관계 그래프(TakeoffStage.depends_on)로 정의하고, 단계마다 바꾼(다시 계산해야 하는) 행을
+dirty 집합으로 모아 하위 단계는 그 행만 처리합니다. 전체 실행은 백그라운드 작업 하나로 수행하며 단계별 소요 시간을 기록합니다.
+
+dirty 집합 (None이면 전체)
+- elements: RawElement id - 분류 결과가 바뀌었거나 처음 분류/raw_data가 바뀐 객체, journal의 객체 변경
+- members: QuantityMember id - 위 객체에서 생성/갱신된 부재, journal의 수량산출부재 변경
+- cost_items: CostItem id - 위 부재의 산출항목, journal의 산출항목 변경
+id는 journal(ProjectChange.object_ids)과 같이 문자열로 모읍니다.
+
+단계를 범위 없이(전체) 실행하는 경우
+- 처음 실행하거나 full=True로 요청한 경우
+- 마지막 실행 이후 단계의 룰(또는 참조 모델)이 추가/수정/삭제된 경우
+  (룰은 id, updated_at digest / updated_at이 없는 참조 모델(일람부호, 공사코드)은 필드 값 digest 비교)
+- 마지막 실행 이후의 ProjectChange journal이 연속되지 않거나(정리됨), 단계가 범위로 표현할 수 없는 변경(full_on)이 있는 경우
+분류 단계는 자체 증분 상태(classification_state)를 사용하므로 full=True일 때만 전체 재분류합니다.
+"""
+
+import threading
+import time
+import traceback
+import uuid
+
+from django.db import close_old_connections
+from django.utils import timezone
+
+from .models import Project, ProjectChange
+from .sync_utils import compute_raw_data_digest
+
+SCOPE_BATCH_SIZE = 2000
+ENTITY_KINDS = ('elements', 'members', 'cost_items')
+
+# journal 종류 -> dirty 집합 (object_ids가 없으면 해당 집합 전체)
+_JOURNAL_ENTITIES = {
+    ProjectChange.KIND_ELEMENTS: 'elements',
+    ProjectChange.KIND_ELEMENTS_DELETED: 'elements',
+    ProjectChange.KIND_QUANTITY_MEMBERS: 'members',
+    ProjectChange.KIND_COST_ITEMS: 'cost_items',
+}
+
+
+def iter_scoped(queryset, ids, field='id', batch_size=SCOPE_BATCH_SIZE):
+    """ids가 None이면 queryset 그대로, 아니면 field__in 배치로 나눈 queryset들을 반환합니다."""
+    if ids is None:
+        yield queryset
+        return
+    ids = list(ids)
+    for start in range(0, len(ids), batch_size):
+        yield queryset.filter(**{f'{field}__in': ids[start:start + batch_size]})
+
+
+def stage_response(result):
+    """run_* 결과에서 파이프라인 전용 키(dirty, change_seqs)를 뺀 API 응답"""
+    return {key: value for key, value in result.items() if key not in ('dirty', 'change_seqs')}
+
+
+class TakeoffStage:
+    """
+    파이프라인 단계
+
+    run(project, scope, full) -> 결과 dict ({'status', 'message', 'dirty': {종류: id 집합}, ...})
+    - consumes: 범위로 받는 dirty 집합 종류 (None이면 범위 없이 매번 실행 - 자체 증분 단계)
+    - depends_on: 먼저 실행되어야 하는 단계 이름
+    - rule_models: 바뀌면 이 단계를 전체 실행해야 하는 (룰/참조) 모델 - project 외래키 필요
+      updated_at이 있으면 (id, updated_at), 없으면 모든 필드 값으로 변경을 감지
+    - full_on: 범위로 표현할 수 없어 전체 실행이 필요한 journal 종류 (객체/부재/산출항목 종류는 id 목록 없이 기록된 경우만 해당)
+    """
+
+    def __init__(self, name, label, run, consumes=None, depends_on=(), rule_models=(), full_on=()):
+        self.name = name
+        self.label = label
+        self.run = run
+        self.consumes = consumes
+        self.depends_on = tuple(depends_on)
+        self.rule_models = tuple(rule_models)
+        self.full_on = frozenset(full_on)
+
+    def rule_rows(self, project):
+        """rule_models별 변경 감지 행 [(id, ...)] - id 순"""
+        return [
+            (model, list(model.objects.filter(project=project).order_by('id').values_list(*_state_fields(model))))
+            for model in self.rule_models
+        ]
+
+    def rule_digest(self, project, rows=None):
+        if not self.rule_models:
+            return None
+        rows = self.rule_rows(project) if rows is None else rows
+        return compute_raw_data_digest([[model._meta.label, model_rows] for model, model_rows in rows])
+
+
+def _only_reference_rows_added(before, after):
+    """
+    단계 실행 중 바뀐 것이 updated_at이 없는 참조 모델(일람부호/공사코드)의 새 행뿐인지 확인합니다.
+    새 참조 행은 부재/산출항목이 참조해야 결과에 영향을 주고, 그 할당은 journal(부재 id)로 기록됩니다.
+    """
+    for (model, before_rows), (_, after_rows) in zip(before, after):
+        if 'updated_at' in _state_fields(model):
+            if before_rows != after_rows:
+                return False
+        elif not set(map(_hashable_row, before_rows)) <= set(map(_hashable_row, after_rows)):
+            return False
+    return True
+
+
+def _hashable_row(row):
+    return compute_raw_data_digest(list(row))
+
+
+def _state_fields(model):
+    """변경 감지에 쓰는 필드 - updated_at이 있으면 (id, updated_at), 없으면 모든 필드"""
+    field_names = [field.attname for field in model._meta.concrete_fields]
+    return ('id', 'updated_at') if 'updated_at' in field_names else field_names
+
+
+class TakeoffPipeline:
+    """단계 의존 그래프와 증분 실행"""
+
+    def __init__(self, stages):
+        self.stages = {stage.name: stage for stage in stages}
+        self.order = self._topological_order(stages)
+
+    def _topological_order(self, stages):
+        order, visiting, done = [], set(), set()
+
+        def visit(stage):
+            if stage.name in done:
+                return
+            if stage.name in visiting:
+                raise ValueError(f"산출 파이프라인 단계 순환 의존: {stage.name}")
+            visiting.add(stage.name)
+            for dependency in stage.depends_on:
+                if dependency not in self.stages:
+                    raise ValueError(f"알 수 없는 산출 파이프라인 단계: {dependency} ({stage.name})")
+                visit(self.stages[dependency])
+            visiting.discard(stage.name)
+            done.add(stage.name)
+            order.append(stage)
+
+        for stage in stages:
+            visit(stage)
+        return order
+
+    # --- 마지막 실행 이후 journal ---
+    def _read_journal(self, project, state):
+        """
+        마지막 실행 이후 journal에서 dirty 집합과 전체 실행이 필요한 journal 종류를 모읍니다.
+        (부재/산출항목 변경은 id 목록 없이 기록된 경우에만 journal 종류로 모음)
+        journal이 연속되지 않으면 None (전체 실행)
+        """
+        last_seq = state.get('last_seq')
+        if last_seq is None or last_seq > project.change_seq:
+            return None
+        entries = list(
+            ProjectChange.objects.filter(project=project, seq__gt=last_seq, seq__lte=project.change_seq)
+            .order_by('seq').values_list('seq', 'kind', 'object_ids')
+        )
+        if [seq for seq, _, _ in entries] != list(range(last_seq + 1, project.change_seq + 1)):
+            return None
+
+        own_seqs = set(state.get('own_seqs') or ())
+        dirty = {kind: set() for kind in ENTITY_KINDS}
+        kinds = set()
+        for seq, kind, object_ids in entries:
+            if seq in own_seqs:
+                continue
+            entity = _JOURNAL_ENTITIES.get(kind)
+            if entity is None or object_ids is None:
+                # 범위(id 목록)가 없는 변경만 full_on 판단에 사용
+                kinds.add(kind)
+            if entity is None or dirty[entity] is None:
+                continue
+            if object_ids is None:
+                dirty[entity] = None
+            else:
+                dirty[entity].update(object_ids)
+        return dirty, kinds
+
+    def run(self, project, full=False, on_stage=None):
+        """
+        파이프라인을 한 번 실행하고 단계별 결과 보고서를 반환합니다.
+        on_stage(report)는 단계가 시작/종료될 때마다 호출됩니다. (진행률 전송용)
+        """
+        project = Project.objects.get(id=project.id)
+        state = project.takeoff_pipeline_state or {}
+        start_seq = project.change_seq
+        journal = None if full or not state else self._read_journal(project, state)
+        if journal is None:
+            dirty, journal_kinds = {kind: None for kind in ENTITY_KINDS}, set()
+        else:
+            dirty, journal_kinds = journal
+        previous_digests = state.get('rule_digests') or {}
+        rule_digests = {}
+        own_seqs = []
+        report = []
+        started = time.perf_counter()
+
+        for stage in self.order:
+            rule_rows = stage.rule_rows(project)
+            rule_digests[stage.name] = stage.rule_digest(project, rule_rows)
+            if stage.consumes is None:
+                stage_full, scope, reason = full, None, ('요청' if full else '자체 증분')
+            else:
+                reason = None
+                if journal is None:
+                    reason = '최초 실행' if not state else ('요청' if full else 'journal 정리됨')
+                elif rule_digests[stage.name] != previous_digests.get(stage.name):
+                    reason = '룰 변경'
+                elif stage.full_on & journal_kinds:
+                    reason = 'journal: ' + ', '.join(sorted(stage.full_on & journal_kinds))
+                elif dirty[stage.consumes] is None:
+                    reason = '전체 변경'
+                stage_full = reason is not None
+                scope = None if stage_full else set(dirty[stage.consumes])
+
+            entry = {
+                'stage': stage.name,
+                'label': stage.label,
+                'mode': 'full' if stage_full else ('incremental' if scope is not None else 'self'),
+                'reason': reason,
+                'scope_count': None if scope is None else len(scope),
+                'status': 'running',
+            }
+            report.append(entry)
+            if scope is not None and not scope:
+                entry.update(status='skipped', elapsed_ms=0, message='다시 계산할 항목이 없습니다.')
+                if on_stage:
+                    on_stage(report)
+                continue
+            if on_stage:
+                on_stage(report)
+
+            print(f"[DEBUG][TakeoffPipeline] '{stage.label}' 시작 (mode={entry['mode']}, reason={reason}, scope={entry['scope_count']})")
+            stage_started = time.perf_counter()
+            result = stage.run(project, scope, stage_full)
+            entry['elapsed_ms'] = round((time.perf_counter() - stage_started) * 1000, 1)
+            entry['status'] = result.get('status', 'success')
+            entry['message'] = result.get('message', '')
+            own_seqs.extend(result.get('change_seqs') or ())
+            if stage.rule_models:
+                # 저장하는 digest는 이번 실행이 적용한(실행 전) 상태 - 실행 중 수정된 룰은 다음 실행에서 다시 감지
+                # 단, 단계가 직접 만든 참조 행(할당 룰셋이 만든 일람부호/공사코드)만 늘었으면 다음 실행이 전체 실행되지 않도록 실행 후 상태를 저장
+                rows_after = stage.rule_rows(project)
+                if _only_reference_rows_added(rule_rows, rows_after):
+                    rule_digests[stage.name] = stage.rule_digest(project, rows_after)
+            for kind, ids in (result.get('dirty') or {}).items():
+                entry.setdefault('dirty_counts', {})[kind] = len(ids)
+                if dirty[kind] is not None:
+                    dirty[kind].update(str(object_id) for object_id in ids)
+            print(f"[DEBUG][TakeoffPipeline] '{stage.label}' 완료: {entry['elapsed_ms']}ms - {entry['message']}")
+            if on_stage:
+                on_stage(report)
+
+        # 파이프라인이 바꾼 부재/산출항목을 journal에 기록 (다음 실행에서는 무시)
+        for kind, entity in ((ProjectChange.KIND_QUANTITY_MEMBERS, 'members'), (ProjectChange.KIND_COST_ITEMS, 'cost_items')):
+            touched = dirty[entity]
+            seq = ProjectChange.record(project.id, kind, touched)
+            if seq:
+                own_seqs.append(seq)
+
+        elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+        Project.objects.filter(id=project.id).update(takeoff_pipeline_state={
+            'last_seq': start_seq,
+            'own_seqs': own_seqs,
+            'rule_digests': rule_digests,
+            'last_run_at': timezone.now().isoformat(),
+            'last_report': {'stages': report, 'elapsed_ms': elapsed_ms, 'full': full},
+        })
+        return {'stages': report, 'elapsed_ms': elapsed_ms, 'full': full}
+
+
+# ▼▼▼ 백그라운드 작업 (AI 학습과 같은 인메모리 진행 상태 + 스레드 방식) ▼▼▼
+pipeline_jobs = {}          # job_id -> 진행 상태
+_project_jobs = {}          # project_id -> 실행 중인 job_id
+_jobs_lock = threading.Lock()
+
+
+def start_pipeline_job(pipeline, project_id, full=False, notify=None):
+    """
+    파이프라인 실행 스레드를 시작합니다. 같은 프로젝트에서 이미 실행 중이면 그 job_id를 반환합니다.
+
+    Returns:
+        (job_id, started)
+    """
+    project_id = str(project_id)
+    with _jobs_lock:
+        running_job_id = _project_jobs.get(project_id)
+        if running_job_id:
+            return running_job_id, False
+        job_id = str(uuid.uuid4())
+        pipeline_jobs[job_id] = {
+            'job_id': job_id,
+            'project_id': project_id,
+            'status': 'queued',
+            'full': full,
+            'stages': [],
+            'queued_at': timezone.now().isoformat(),
+        }
+        _project_jobs[project_id] = job_id
+    thread = threading.Thread(target=_run_pipeline_job, args=(pipeline, project_id, job_id, full, notify), daemon=True)
+    thread.start()
+    return job_id, True
+
+
+def _run_pipeline_job(pipeline, project_id, job_id, full, notify):
+    job = pipeline_jobs[job_id]
+
+    def publish():
+        if notify:
+            try:
+                notify(project_id, job_id, job)
+            except Exception as e:
+                print(f"[WARN][TakeoffPipeline] 진행률 전송 실패: {e}")
+
+    close_old_connections()
+    try:
+        job.update(status='running', started_at=timezone.now().isoformat())
+        publish()
+
+        def on_stage(stages):
+            job['stages'] = [dict(entry) for entry in stages]
+            job['current_stage'] = stages[-1]['stage'] if stages else None
+            publish()
+
+        result = pipeline.run(Project.objects.get(id=project_id), full=full, on_stage=on_stage)
+        job.update(status='completed', stages=result['stages'], elapsed_ms=result['elapsed_ms'], current_stage=None)
+    except Exception as e:
+        print(f"[ERROR][TakeoffPipeline] Job {job_id} 실패: {e}")
+        print(traceback.format_exc())
+        job.update(status='failed', error=str(e))
+    finally:
+        job['finished_at'] = timezone.now().isoformat()
+        with _jobs_lock:
+            if _project_jobs.get(project_id) == job_id:
+                del _project_jobs[project_id]
+        publish()
+        close_old_connections()
+
+
+def project_pipeline_job(project_id):
+    """프로젝트에서 실행 중인 작업 상태 (없으면 None)"""
+    job_id = _project_jobs.get(str(project_id))
+    return pipeline_jobs.get(job_id) if job_id else None
+# ▲▲▲ 여기까지 ▲▲▲
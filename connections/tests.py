@@ -0,0 +1,52 @@
+import os
+
+from django.test import SimpleTestCase
+
+from .expression_engine import (
+    evaluate_expression,
+    evaluate_expression_for_cost_item,
+    evaluate_member_properties_expression,
+)
+
+
+class _Object:
+    pass
+
+
+class ExpressionSandboxTests(SimpleTestCase):
+    """계산식 eval 샌드박스 회귀 테스트 (str.format / % 포맷팅을 통한 속성 그래프 탈출)"""
+
+    FORMAT_ESCAPE = '("%c0.__self__.__loader__.find_spec.__globals__[sys].modules[os].environ[PROBE]%c" % (123,125)).format(abs)'
+    QUOTED_VALUE = 'x" + ("%c0.__self__.__loader__.find_spec.__globals__[sys].modules[os].environ[PROBE]%c" % (123, 125)).format(abs) + "y'
+
+    def setUp(self):
+        os.environ['PROBE'] = 'secret-value'
+        self.addCleanup(os.environ.pop, 'PROBE', None)
+
+    def assertNoLeak(self, result):
+        self.assertNotIn('secret-value', str(result))
+
+    def test_format_escape_in_expression(self):
+        for result in (
+            evaluate_expression(self.FORMAT_ESCAPE, {}),
+            evaluate_member_properties_expression(self.FORMAT_ESCAPE, {}),
+        ):
+            self.assertNoLeak(result)
+
+    def test_quoted_value_is_not_parsed(self):
+        member = _Object()
+        member.raw_element = None
+        member.member_mark = None
+        member.properties = {'Name': self.QUOTED_VALUE}
+        self.assertEqual(evaluate_expression('{Name}', {'Name': self.QUOTED_VALUE}), self.QUOTED_VALUE)
+        self.assertEqual(evaluate_expression_for_cost_item('{Name}', member), self.QUOTED_VALUE)
+        self.assertEqual(evaluate_member_properties_expression('{Name}', {'Name': self.QUOTED_VALUE}), self.QUOTED_VALUE)
+        self.assertNoLeak(evaluate_member_properties_expression('"{Name}F"', {'Name': self.QUOTED_VALUE}))
+
+    def test_format_and_string_mod_rejected(self):
+        self.assertTrue(evaluate_expression('{f}.format(abs)', {'f': '{0}'}).startswith('Error:'))
+        self.assertTrue(evaluate_expression('"{}".format_map({})', {}).startswith('Error:'))
+        self.assertTrue(evaluate_expression('"%s" % 1', {}).startswith('Error:'))
+        self.assertTrue(evaluate_expression('{f} % (1,)', {'f': '%s'}).startswith('Error:'))
+        self.assertEqual(evaluate_expression('{w} % 3', {'w': 7}), 1)
+        self.assertEqual(evaluate_member_properties_expression('{Name}.upper()', {'Name': 'ab'}), 'AB')
@@ -125,6 +125,7 @@ urlpatterns = [
 
     # --- 프로젝트 가져오기/내보내기 ---
     path('export-project/<uuid:project_id>/', views.export_project, name='export_project'),
+    path('api/projects/<uuid:project_id>/export/glb/', views.export_project_glb_view, name='export_project_glb'),
     path('import-project/', views.import_project, name='import_project'),
 
     # --- 관리 데이터 가져오기/내보내기 ---
@@ -170,6 +171,9 @@ urlpatterns = [
     path('api/activity-objects/<uuid:project_id>/', views.activity_objects_api, name='activity_objects_api'),
     path('api/activity-objects/<uuid:project_id>/<uuid:ao_id>/', views.activity_objects_api, name='activity_object_detail_api'),
     path('api/activity-objects/auto-create/<uuid:project_id>/', views.create_activity_objects_auto_view, name='create_activity_objects_auto'),
+    path('api/takeoff-pipeline/<uuid:project_id>/run/', views.start_takeoff_pipeline_api, name='start_takeoff_pipeline'),
+    path('api/takeoff-pipeline/<uuid:project_id>/', views.takeoff_pipeline_status_api, name='takeoff_pipeline_status'),
+    path('api/takeoff-pipeline/<uuid:project_id>/<str:job_id>/', views.takeoff_pipeline_status_api, name='takeoff_pipeline_job_status'),
     # ▲▲▲ [추가] 여기까지 ▲▲▲
 
     # ▼▼▼ [추가] 작업 캘린더 API ▼▼▼
@@ -0,0 +1,184 @@
+"""
+뷰어 데이터(get_all_elements) 스냅샷 캐시
+- 프로젝트의 viewer_revision마다 직렬화가 끝난 payload를 압축하여 디스크에 저장합니다.
+- 같은 revision을 여는 브라우저는 DB 조회/직렬화 없이 스냅샷을 그대로 전송받습니다.
+- 객체 동기화, 태그 변경, 분할 저장/무효화 시 Project.bump_viewer_revision()으로 revision이 올라가면
+  이전 스냅샷은 더 이상 사용되지 않고, 디렉터리 전체 크기가 한도를 넘으면 오래 사용되지 않은 파일부터 삭제합니다.
+
+같은 디렉터리와 LRU 한도를 GLB 내보내기(glb_export.py) 캐시 파일도 함께 사용합니다.
+
+파일 형식: [u32 LE 길이][zlib 압축된 payload 바이트] 레코드의 연속
+    0번 레코드: revit_data_start의 payload, 이후: revit_data_chunk의 payload (청크 순서대로)
+    메시지 형식과 메쉬 포함 여부(lazy geometry)마다 별도 파일입니다.
+payload는 메시지 형식(JSON / MessagePack)별로 미리 인코딩되어 있어 전송 시 ws_codec.wrap_encoded_payload로 감싸기만 합니다.
+"""
+
+import os
+import struct
+import threading
+import zlib
+
+from django.conf import settings
+
+_RECORD_HEADER = struct.Struct('<I')
+_CACHE_SUFFIXES = ('.snap', '.glb')
+_COMPRESSION_LEVEL = 6
+_write_lock = threading.Lock()
+
+
+def _snapshot_dir():
+    path = getattr(settings, 'VIEWER_SNAPSHOT_DIR', os.path.join(settings.BASE_DIR, 'viewer_snapshots'))
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _max_bytes():
+    return getattr(settings, 'VIEWER_SNAPSHOT_MAX_BYTES', 512 * 1024 * 1024)
+
+
+def snapshot_path(project_id, revision, binary, lazy_geometry=False):
+    fmt = 'msgpack' if binary else 'json'
+    if lazy_geometry:
+        fmt += '-lazy'
+    return os.path.join(_snapshot_dir(), f'{project_id}_{revision}_{fmt}.snap')
+
+
+def glb_cache_path(project_id, revision, selection_key):
+    """GLB 내보내기 캐시 경로. selection_key는 전체 프로젝트면 'all', 일부 객체면 ID 목록의 digest입니다."""
+    return os.path.join(_snapshot_dir(), f'{project_id}_{revision}_{selection_key}.glb')
+
+
+def open_snapshot(project_id, revision, binary, lazy_geometry=False):
+    """스냅샷이 있으면 경로를 반환하고 사용 시각을 갱신합니다 (LRU). 없으면 None."""
+    return open_cached_file(snapshot_path(project_id, revision, binary, lazy_geometry))
+
+
+def open_cached_file(path):
+    """캐시 파일이 있으면 경로를 반환하고 사용 시각을 갱신합니다 (LRU). 없으면 None."""
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        return None
+    return path
+
+
+def iter_snapshot_payloads(path):
+    """스냅샷 파일의 payload 바이트를 순서대로 반환합니다."""
+    with open(path, 'rb') as f:
+        while True:
+            header = f.read(_RECORD_HEADER.size)
+            if len(header) < _RECORD_HEADER.size:
+                return
+            (length,) = _RECORD_HEADER.unpack(header)
+            yield zlib.decompress(f.read(length))
+
+
+def write_snapshot(project_id, revision, binary, payloads, lazy_geometry=False):
+    """
+    인코딩된 payload들을 스냅샷으로 저장하고 경로를 반환합니다.
+    임시 파일에 쓴 뒤 교체하므로 다른 요청이 작성 중인 파일을 읽는 일은 없습니다.
+    payloads에서 예외가 나면 파일을 남기지 않고 그대로 전달합니다.
+    작성 중 더 새로운 revision이 캐시되어 저장하지 않은 경우 경로는 None입니다.
+    """
+    path = snapshot_path(project_id, revision, binary, lazy_geometry)
+    tmp_path = temp_path_for(path)
+    written = 0
+    try:
+        with open(tmp_path, 'wb') as f:
+            for payload in payloads:
+                compressed = zlib.compress(payload, _COMPRESSION_LEVEL)
+                f.write(_RECORD_HEADER.pack(len(compressed)))
+                f.write(compressed)
+                written += len(compressed)
+    except BaseException:
+        # 직렬화가 중간에 실패하면 잘린 스냅샷이 캐시되지 않도록 임시 파일을 버림
+        _remove_quietly(tmp_path)
+        raise
+    if not commit_cached_file(project_id, revision, tmp_path, path):
+        return None, written
+    return path, written
+
+
+def temp_path_for(path):
+    """다른 요청과 겹치지 않는 임시 파일 경로 (commit_cached_file로 교체)"""
+    return f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+
+
+def commit_cached_file(project_id, revision, tmp_path, path):
+    """
+    작성이 끝난 임시 파일을 캐시 경로로 교체하고, 이전 revision 파일 정리 및 LRU 삭제를 수행합니다.
+    오래 걸린 이전 revision의 작성이 나중에 끝나도 새 revision 파일을 지우지 않도록,
+    이미 더 새로운 revision 파일이 있으면 교체하지 않고 임시 파일을 버린 뒤 False를 반환합니다.
+    """
+    with _write_lock:
+        if _has_newer_revision(project_id, revision):
+            _remove_quietly(tmp_path)
+            print(f"[DEBUG][viewer_snapshot] revision {revision} 캐시 저장 생략: 프로젝트 {project_id}에 더 새로운 revision이 있음")
+            return False
+        os.replace(tmp_path, path)
+        _discard_older_revisions(project_id, revision)
+        _evict_lru(keep_path=path)
+    return True
+
+
+def invalidate_project_snapshots(project_id):
+    """프로젝트의 모든 스냅샷/GLB 캐시 파일을 삭제합니다. (프로젝트 삭제 등)"""
+    with _write_lock:
+        _discard_older_revisions(project_id, None)
+
+
+def _iter_project_cache_files(project_id):
+    """프로젝트의 캐시 파일 (경로, revision)을 반환합니다. 파일 이름에서 revision을 읽을 수 없으면 revision은 None."""
+    prefix = f'{project_id}_'
+    directory = _snapshot_dir()
+    for name in os.listdir(directory):
+        if not name.startswith(prefix) or not name.endswith(_CACHE_SUFFIXES):
+            continue
+        try:
+            revision = int(name[len(prefix):].split('_', 1)[0])
+        except ValueError:
+            revision = None
+        yield os.path.join(directory, name), revision
+
+
+def _has_newer_revision(project_id, revision):
+    return any(
+        file_revision is not None and file_revision > int(revision)
+        for _, file_revision in _iter_project_cache_files(project_id)
+    )
+
+
+def _discard_older_revisions(project_id, keep_revision):
+    """keep_revision보다 낮은 revision의 파일만 삭제합니다. keep_revision이 None이면 전부 삭제합니다."""
+    for path, revision in _iter_project_cache_files(project_id):
+        if keep_revision is None or revision is None or revision < int(keep_revision):
+            _remove_quietly(path)
+
+
+def _evict_lru(keep_path=None):
+    directory = _snapshot_dir()
+    entries = []
+    total = os.path.getsize(keep_path) if keep_path and os.path.exists(keep_path) else 0
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        if not name.endswith(_CACHE_SUFFIXES) or path == keep_path:
+            continue
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+        total += stat.st_size
+    limit = _max_bytes()
+    for _, size, path in sorted(entries):
+        if total <= limit:
+            break
+        _remove_quietly(path)
+        total -= size
+
+
+def _remove_quietly(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
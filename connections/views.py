@@ -26,9 +26,38 @@ import threading # 백그라운드 학습 위해 추가
 from .models import AIModel
 # ▲▲▲ [추가] 여기까지 ▲▲▲
 from django.db.models import F, Sum, Count, Q
-from functools import reduce
+from functools import reduce, wraps
 import operator
-from .consumers import RevitConsumer, FrontendConsumer, serialize_specific_elements
+from .rule_engine import (
+    get_value_from_element,
+    is_numeric,
+    get_internal_field_name,
+    rule_matches,
+)
+from .rule_columns import RuleColumnTable
+from .expression_engine import (
+    evaluate_expression,
+    evaluate_expression_for_cost_item,
+    evaluate_member_properties_expression,
+)
+from .property_context import (
+    member_rule_properties, set_member_rule_mark, cost_code_rule_properties,
+    activity_rule_properties, ci_activity_rule_properties,
+)
+from .takeoff_pipeline import (
+    iter_scoped,
+    stage_response,
+    TakeoffStage,
+    TakeoffPipeline,
+    start_pipeline_job,
+    pipeline_jobs,
+    project_pipeline_job,
+)
+from .classification_state import ClassificationPlan, mark_elements_unclassified, sync_ruleset_assignments
+from .consumers import RevitConsumer, FrontendConsumer, serialize_specific_elements, send_to_frontend
+from .sync_utils import compute_raw_data_digest
+from .viewer_snapshot import invalidate_project_snapshots
+from .glb_export import export_project_glb
 from django.db import transaction
 from django.core import serializers
 import datetime
@@ -43,6 +72,7 @@ from .models import (
     ElementClassificationAssignment,  # <--- 분류 할당 중간 테이블 추가
     ClassificationRule,
     QuantityMember,
+    ProjectChange,
     CostItem,
     CostCode,
     PropertyMappingRule,
@@ -56,6 +86,7 @@ from .models import (
     UnitPriceType, # <--- 추가 확인
     UnitPrice,     # <--- 추가 확인
     SplitElement,  # <--- 분할 객체 모델 추가
+    GeometryBlob,  # <--- 메쉬 바이너리 저장소 모델 추가
     Activity,      # <--- 액티비티 모델 추가
     ActivityDependency,  # <--- 액티비티 의존성 모델 추가
     WorkCalendar,  # <--- 작업 캘린더 모델 추가
@@ -69,6 +100,95 @@ from .models import (
 
 )
 from tensorflow.keras import models # <<< models 임포트 추가
+
+# ▼▼▼ [추가] 수량산출부재/산출항목 변경 journal 기록 ▼▼▼
+def records_project_change(*kinds):
+    """
+    프로젝트의 수량산출부재/산출항목을 변경하는 API에 붙여, 변경 요청(GET 외)이 성공하면 ProjectChange journal에 기록합니다.
+    (브라우저가 재접속 시 since_seq로 목록 새로고침 여부를 판단)
+    여러 객체를 반복 저장하는 API가 많아 save마다 기록하지 않고 요청당 한 번만 기록합니다.
+    바뀐 부재/산출항목 id를 알 수 있으면(URL, 요청 본문, 생성 응답 - changed_object_ids 참고) 함께 기록하여
+    산출 파이프라인이 해당 행만 다시 계산하고, 룰셋 일괄적용처럼 id가 없는 요청은 전체(None)로 기록합니다.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            project_id = kwargs.get('project_id')
+            is_change = bool(project_id) and request.method not in ('GET', 'HEAD')
+            if is_change:
+                member_ids, item_ids = changed_object_ids(request, kwargs)
+                if ProjectChange.KIND_COST_ITEMS in kinds and item_ids is None and member_ids:
+                    # 부재 변경은 그 부재의 산출항목에도 영향 (삭제로 함께 지워지는 항목 포함)
+                    item_ids = {str(item_id) for item_id in CostItem.objects.filter(quantity_member_id__in=member_ids).values_list('id', flat=True)}
+            response = view_func(request, *args, **kwargs)
+            if is_change and response.status_code < 400:
+                created_member_ids, created_item_ids = created_object_ids(response)
+                if member_ids is not None:
+                    member_ids.update(created_member_ids)
+                elif created_member_ids:
+                    member_ids = created_member_ids
+                if item_ids is not None:
+                    item_ids.update(created_item_ids)
+                elif created_item_ids:
+                    item_ids = created_item_ids
+                for kind in kinds:
+                    # 빈 id 집합(산출항목이 없는 부재)은 record에서 기록하지 않음
+                    ProjectChange.record(project_id, kind, member_ids if kind == ProjectChange.KIND_QUANTITY_MEMBERS else item_ids)
+            return response
+        return wrapper
+    return decorator
+
+
+def changed_object_ids(request, view_kwargs):
+    """
+    요청이 바꾸는 (부재 id 집합, 산출항목 id 집합)을 URL 인자와 JSON 본문에서 찾습니다. 알 수 없으면 None
+    - 부재: URL member_id, 본문 member_ids / member_id
+    - 산출항목: URL item_id, 본문 cost_item_ids / item_ids / item_id
+    """
+    data = {}
+    if request.content_type != 'multipart/form-data' and request.body:
+        try:
+            data = json.loads(request.body)
+        except (ValueError, UnicodeDecodeError):
+            data = {}
+    if not isinstance(data, dict):
+        data = {}
+
+    def collect(url_key, list_keys, single_key):
+        ids = set()
+        if view_kwargs.get(url_key):
+            ids.add(str(view_kwargs[url_key]))
+        for key in list_keys:
+            if isinstance(data.get(key), list):
+                ids.update(str(object_id) for object_id in data[key] if object_id)
+        if data.get(single_key) and not isinstance(data[single_key], (list, dict)):
+            ids.add(str(data[single_key]))
+        return ids or None
+
+    return (
+        collect('member_id', ('member_ids',), 'member_id'),
+        collect('item_id', ('cost_item_ids', 'item_ids'), 'item_id'),
+    )
+
+
+def created_object_ids(response):
+    """생성/수정 응답의 member_id / item_id (없으면 빈 집합)"""
+    try:
+        data = json.loads(response.content)
+    except (ValueError, UnicodeDecodeError, AttributeError):
+        return set(), set()
+    if not isinstance(data, dict):
+        return set(), set()
+    return (
+        {str(data['member_id'])} if data.get('member_id') else set(),
+        {str(data['item_id'])} if data.get('item_id') else set(),
+    )
+
+QM_CHANGES = (ProjectChange.KIND_QUANTITY_MEMBERS,)
+QM_CI_CHANGES = (ProjectChange.KIND_QUANTITY_MEMBERS, ProjectChange.KIND_COST_ITEMS)
+CI_CHANGES = (ProjectChange.KIND_COST_ITEMS,)
+# ▲▲▲ [추가] 여기까지 ▲▲▲
+
 # --- Project & Revit Data Views ---
 
 def revit_control_panel(request):
@@ -121,6 +241,7 @@ def delete_project(request, project_id):
             project = Project.objects.get(id=project_id)
             project_name = project.name
             project.delete()  # CASCADE로 관련된 모든 데이터가 함께 삭제됨
+            invalidate_project_snapshots(project_id)
             print(f"[DEBUG][delete_project] Project '{project_name}' (ID: {project_id}) deleted successfully")
             return JsonResponse({
                 'status': 'success',
@@ -262,14 +383,17 @@ def import_tags(request, project_id):
                     created_count += 1
             # 디버깅: 새 태그 생성 확인
             print(f"[DEBUG][import_tags] Created {created_count} new tags from CSV.")
+            # 변경 journal 기록 (뷰어 스냅샷 무효화 포함)
+            ProjectChange.record(project.id, ProjectChange.KIND_TAGS)
+            ProjectChange.record(project.id, ProjectChange.KIND_ELEMENTS, affected_element_ids)
 
             # [수정] 변경된 태그 목록과 영향을 받은 객체 정보를 프론트엔드로 전송합니다.
             channel_layer = get_channel_layer()
 
             # 1. 업데이트된 태그 목록 전송
             tags = [{'id': str(tag.id), 'name': tag.name} for tag in project.classification_tags.all()]
-            async_to_sync(channel_layer.group_send)(
-                FrontendConsumer.frontend_group_name,
+            async_to_sync(send_to_frontend)(
+                channel_layer, project.id, 'tags',
                 {'type': 'broadcast_tags', 'tags': tags}
             )
             # 디버깅: 태그 목록 브로드캐스트
@@ -280,8 +404,8 @@ def import_tags(request, project_id):
                 # async 함수를 sync 컨텍스트에서 호출하기 위해 async_to_sync 사용
                 updated_elements_data = async_to_sync(serialize_specific_elements)(affected_element_ids)
                 if updated_elements_data:
-                    async_to_sync(channel_layer.group_send)(
-                        FrontendConsumer.frontend_group_name,
+                    async_to_sync(send_to_frontend)(
+                        channel_layer, project.id, 'elements',
                         {'type': 'broadcast_elements', 'elements': updated_elements_data}
                     )
                     # 디버깅: 영향 받은 객체 정보 브로드캐스트
@@ -363,11 +487,16 @@ def classification_rules_api(request, project_id, rule_id=None):
 
             # 이 룰셋으로 생성된 할당들을 제거
             from connections.models import ElementClassificationAssignment
-            deleted_assignments = ElementClassificationAssignment.objects.filter(
+            rule_assignments = ElementClassificationAssignment.objects.filter(
                 assigned_by_rule=rule,
                 assignment_type='ruleset'
-            ).delete()
+            )
+            affected_element_ids = list(rule_assignments.values_list('raw_element_id', flat=True))
+            deleted_assignments = rule_assignments.delete()
+            # 같은 태그의 다른 룰에는 여전히 맞을 수 있으므로 다음 일괄적용 때 다시 평가
+            mark_elements_unclassified(affected_element_ids)
             print(f"[DEBUG][classification_rules_api] Deleted {deleted_assignments[0]} ruleset-based assignments for this rule.")
+            ProjectChange.record(project_id, ProjectChange.KIND_ELEMENTS, affected_element_ids)
 
             rule.delete()
             # 디버깅: 삭제 성공
@@ -441,258 +570,87 @@ def property_mapping_rules_api(request, project_id, rule_id=None):
             return JsonResponse({'status': 'error', 'message': f'삭제 중 오류 발생: {str(e)}'}, status=500)
 # ▲▲▲ [추가] 여기까지 입니다 ▲▲▲
 
-def get_value_from_element(raw_data, parameter_name):
-    """
-    점(.)이 포함된 키를 해석하여 중첩된 객체의 값을 찾아옵니다.
-    'Parameters', 'TypeParameters', 'QuantitySet' 등 다양한 위치를 모두 확인합니다.
+# ▼▼▼ [추가] 룰셋 열 단위(columnar) 평가 모드 ▼▼▼
+COLUMNAR_RULE_MIN_ROWS = 2000   # engine=auto일 때 이 수 이상의 대상에 columnar 평가 사용
 
-    ▼▼▼ [수정] QuantitySet 등의 경로를 더 유연하게 처리 (2025-11-05) ▼▼▼
-    """
-    if not raw_data or not parameter_name:
-        return None
-
-    # 0. ▼▼▼ [추가] 전체 parameter_name을 하나의 키로 먼저 시도 (2025-11-05) ▼▼▼
-    # 예: "Qto_WallBaseQuantities__GrossSideArea" 자체가 키인 경우
-    if parameter_name in raw_data:
-        return raw_data[parameter_name]
-    if 'Parameters' in raw_data and parameter_name in raw_data['Parameters']:
-        return raw_data['Parameters'][parameter_name]
-    if 'TypeParameters' in raw_data and parameter_name in raw_data['TypeParameters']:
-        return raw_data['TypeParameters'][parameter_name]
-
-    # 1. 점(.)을 기준으로 키를 분리합니다.
-    parts = parameter_name.split('.')
-
-    # ▼▼▼ [추가] 점으로 분리한 후 전체 경로를 하나의 키로 시도 (2025-11-05) ▼▼▼
-    # 예: "QuantitySet.Qto_WallBaseQuantities__GrossSideArea"의 경우
-    # parts[0]="QuantitySet", parts[1]="Qto_WallBaseQuantities__GrossSideArea"
-    if len(parts) == 2:
-        first_key, second_key = parts[0], parts[1]
-        # raw_data[first_key][second_key] 형태로 시도
-        if first_key in raw_data and isinstance(raw_data[first_key], dict):
-            if second_key in raw_data[first_key]:
-                return raw_data[first_key][second_key]
-
-    # 2. 검색을 시작할 초기 객체를 설정합니다.
-    # 만약 첫 번째 키가 'Parameters'나 'TypeParameters'가 아니라면,
-    # raw_data의 최상위, Parameters, TypeParameters 순서로 모두 탐색합니다.
-    potential_starts = []
-    if parts[0] in raw_data:
-        potential_starts.append(raw_data)
-    if 'Parameters' in raw_data:
-        potential_starts.append(raw_data['Parameters'])
-    if 'TypeParameters' in raw_data:
-        potential_starts.append(raw_data['TypeParameters'])
-
-    # 만약 탐색 시작점을 찾지 못하면, raw_data 자체를 시작점으로 삼습니다.
-    if not potential_starts:
-        potential_starts.append(raw_data)
-
-    # 3. 각 잠재적 시작 위치에서 값을 탐색합니다.
-    for start_obj in potential_starts:
-        current_obj = start_obj
-        found = True
-        for part in parts:
-            if isinstance(current_obj, dict) and part in current_obj:
-                current_obj = current_obj[part]
-            else:
-                found = False
-                break
-
-        # 값을 성공적으로 찾았다면 즉시 반환합니다.
-        if found:
-            return current_obj
-
-    # 모든 위치에서 값을 찾지 못한 경우
-    return None
-
-def is_numeric(value):
-    if value is None: return False
-    try: float(value); return True
-    except (ValueError, TypeError): return False
+def use_columnar_rules(engine, row_count):
+    """?engine=columnar|row 로 룰 평가 방식을 지정합니다. (기본 auto: 대상이 COLUMNAR_RULE_MIN_ROWS개 이상이면 columnar)"""
+    if engine in ('columnar', 'row'):
+        return engine == 'columnar'
+    return row_count >= COLUMNAR_RULE_MIN_ROWS
+# ▲▲▲ [추가] 여기까지 ▲▲▲
 
-def get_internal_field_name(display_field):
+def run_classification_rules(project, full_rebuild=False, engine='auto'):
     """
-    계층적 표시명 (BIM.*, QM.*, MM.*, SC.*, CI.*, CC.*, AO.*, AC.*)을 내부 필드명으로 변환합니다.
-    JavaScript의 getInternalFieldName()과 동일한 로직입니다.
-
-    접두어 처리:
-    - BIM.* : BIM 원본 데이터 속성
-    - QM.* : 수량산출부재 속성
-    - MM.* : 일람부호 속성
-    - SC.* : 공간분류 속성
-    - CI.* : 코스트아이템 속성
-    - CC.* : 공사코드 속성
-    - AO.* : 액티비티객체 속성
-    - AC.* : 액티비티코드 속성
+    분류 할당 룰셋 일괄적용 본문 (apply_classification_rules_view, 산출 파이프라인 공용)
+    응답 dict를 반환하며, 'dirty'에는 하위 단계가 다시 계산해야 하는 객체 id가 담깁니다.
+    (할당이 바뀐 객체 + 처음 분류되거나 raw_data가 바뀐 객체)
     """
-    if not display_field:
-        return ''
-
-    # ▼▼▼ [추가] 언더스코어 형식을 점 형식으로 변환 (CC_System_code -> CC.System.code) (2025-11-05) ▼▼▼
-    # CSV 가져오기 등에서 언더스코어 형식 사용 시 호환성 제공
-    prefixes = ['QM_System_', 'QM_Properties_', 'MM_System_', 'MM_Properties_',
-                'SC_System_', 'CI_System_', 'CC_System_', 'AO_System_', 'AC_System_',
-                'BIM_System_', 'BIM_TypeParameters_', 'BIM_Parameters_', 'BIM_Attributes_']
-    for prefix in prefixes:
-        if display_field.startswith(prefix):
-            # 언더스코어를 점으로 변환 (예: CC_System_code -> CC.System.code)
-            display_field = display_field.replace('_', '.', 2)  # 처음 2개의 언더스코어만 변환
-            break
-    # ▲▲▲ [추가] 여기까지 ▲▲▲
-
-    # ▼▼▼ [추가] QM.*, MM.*, SC.*, CI.*, CC.*, AO.*, AC.* 처리 (2025-11-05) ▼▼▼
-    # QM.System.* -> 수량산출부재 시스템 속성
-    if display_field.startswith('QM.System.'):
-        return display_field[10:]  # 'QM.System.' 제거
-    # QM.Properties.* -> 수량산출부재 사용자 정의 속성
-    if display_field.startswith('QM.Properties.'):
-        return display_field[14:]  # 'QM.Properties.' 제거
-
-    # MM.System.* -> 일람부호 시스템 속성
-    if display_field.startswith('MM.System.'):
-        return display_field[10:]  # 'MM.System.' 제거
-    # MM.Properties.* -> 일람부호 사용자 정의 속성
-    if display_field.startswith('MM.Properties.'):
-        return display_field[14:]  # 'MM.Properties.' 제거
-
-    # SC.System.* -> 공간분류 시스템 속성
-    if display_field.startswith('SC.System.'):
-        return display_field[10:]  # 'SC.System.' 제거
-
-    # CI.System.* -> 코스트아이템 시스템 속성
-    if display_field.startswith('CI.System.'):
-        return display_field[10:]  # 'CI.System.' 제거
-
-    # CC.System.* -> 공사코드 시스템 속성
-    if display_field.startswith('CC.System.'):
-        return display_field[10:]  # 'CC.System.' 제거
-
-    # AO.System.* -> 액티비티객체 시스템 속성
-    if display_field.startswith('AO.System.'):
-        return display_field[10:]  # 'AO.System.' 제거
-
-    # AC.System.* -> 액티비티코드 시스템 속성
-    if display_field.startswith('AC.System.'):
-        return display_field[10:]  # 'AC.System.' 제거
-    # ▲▲▲ [추가] 여기까지 ▲▲▲
+    rules = ClassificationRule.objects.filter(project=project).order_by('id').select_related('target_tag')
 
-    # BIM. 접두어가 없으면 그대로 반환 (하위 호환성)
-    if not display_field.startswith('BIM.'):
-        return display_field
+    # [수정] 대용량 데이터를 처리하기 위해 iterator 사용
+    all_elements_qs = RawElement.objects.filter(project=project)
 
-    # BIM.System.* - Cost Estimator 자체 속성
-    if display_field.startswith('BIM.System.'):
-        return display_field[11:]  # 'BIM.System.' 제거
+    if not rules.exists():
+        print("[DEBUG] 적용할 룰셋이 없어 조기 종료합니다.")
+        return {'status': 'info', 'message': '적용할 규칙이 없습니다. 먼저 룰셋을 정의해주세요.', 'dirty': {'elements': set()}}
 
-    # BIM.TypeParameters.*
-    if display_field.startswith('BIM.TypeParameters.'):
-        sub_key = display_field[19:]  # 'BIM.TypeParameters.' 제거
-        return f'TypeParameters.{sub_key}'
+    element_count = all_elements_qs.count()
+    rules = list(rules)
+    print(f"[DEBUG] {element_count}개의 BIM 객체에 대해 {len(rules)}개의 룰셋 적용을 시작합니다.")
 
-    # BIM.Parameters.*
-    if display_field.startswith('BIM.Parameters.'):
-        return display_field[15:]  # 'BIM.Parameters.' 제거
-
-    # BIM.Attributes.* - IFC raw_data 직접 속성 (하위 호환성)
-    if display_field.startswith('BIM.Attributes.'):
-        return display_field[15:]  # 'BIM.Attributes.' 제거
-
-    # ▼▼▼ [추가] 일반적인 BIM.* 형태 (예: BIM.QuantitySet.XXX) ▼▼▼
-    # BIM. 접두어만 제거하여 raw_data 내부 경로로 변환
-    # BIM.QuantitySet.XXX -> QuantitySet.XXX
-    # BIM.Category -> Category
-    return display_field[4:]  # 'BIM.' 제거
+    # ▼▼▼ [추가] 증분 적용 계획: 다시 평가할 요소만 선택 ▼▼▼
+    plan = ClassificationPlan(project, rules, full_rebuild=full_rebuild)
+    print(f"[DEBUG] 룰셋 버전 {plan.previous_version} -> {plan.version} (룰 변경: {plan.ruleset_changed}, 전체 재분류: {full_rebuild})")
+    dirty_elements = plan.iter_dirty_elements(all_elements_qs)
     # ▲▲▲ [추가] 여기까지 ▲▲▲
 
-# 기존의 evaluate_conditions 함수를 찾아서 아래 코드로 교체해주세요.
-
-def evaluate_conditions(data_dict, conditions):
-    """
-    주어진 데이터 딕셔너리가 모든 조건을 만족하는지 평가합니다.
-    [수정됨] data_dict에서 직접 키를 찾고, 없으면 get_value_from_element를 사용합니다.
-    """
-    if not conditions: return True
-    
-    if isinstance(conditions, list):
-        # 조건 리스트의 모든 항목을 만족해야 True (AND)
-        return all(evaluate_conditions(data_dict, cond) for cond in conditions)
-    
-    if isinstance(conditions, dict):
-        # OR 조건 처리
-        if 'OR' in conditions and isinstance(conditions['OR'], list):
-            return any(evaluate_conditions(data_dict, cond) for cond in conditions['OR'])
-        
-        # 개별 조건 처리
-        # 'parameter' 또는 'property' 키를 모두 지원 (호환성)
-        p = conditions.get('parameter') or conditions.get('property')
-        o = conditions.get('operator')
-        v = conditions.get('value')
-
-        if not all([p, o, v is not None]): return False
-
-        # ▼▼▼ [핵심 수정] 계층적 명명 규칙 지원 ▼▼▼
-        # 1. 계층적 표시명 (BIM.Attributes.*, etc.)을 내부 필드명으로 변환
-        internal_field = get_internal_field_name(p)
-
-        actual_value = None
-        # 2. 먼저 data_dict에서 원본 표시명 (p)으로 직접 키를 찾아봅니다
-        if p in data_dict:
-            actual_value = data_dict.get(p)
-        # 3. 원본 키가 없으면 변환된 내부 필드명으로 찾아봅니다
-        elif internal_field in data_dict:
-            actual_value = data_dict.get(internal_field)
-        # ▼▼▼ [추가] MM.Properties.* -> [속성명] 매핑 지원 (2025-11-13) ▼▼▼
-        # MM.Properties.속성명 -> [속성명] 형태로 변환하여 찾기
-        elif p.startswith('MM.Properties.'):
-            prop_name = p[14:]  # 'MM.Properties.' 제거
-            bracket_key = f'[{prop_name}]'  # [속성명] 형태로 변환
-            actual_value = data_dict.get(bracket_key)
-            print(f"[DEBUG][evaluate_conditions] MM.Properties.* mapping: '{p}' -> '{bracket_key}' = {actual_value}")
-        # ▲▲▲ [추가] 여기까지 ▲▲▲
-        # ▼▼▼ [추가] CC.System.* -> CostCode.* 매핑 지원 (2025-11-05) ▼▼▼
-        # CC.System.detail_code -> CostCode.detail_code
-        elif p.startswith('CC.System.'):
-            # CC.System.* 형식을 CostCode.* 형식으로 변환
-            costcode_field = 'CostCode.' + p[10:]  # 'CC.System.' 제거하고 'CostCode.' 추가
-            actual_value = data_dict.get(costcode_field)
-            print(f"[DEBUG][evaluate_conditions] CC.System.* mapping: '{p}' -> '{costcode_field}' = {actual_value}")
-        # ▲▲▲ [추가] 여기까지 ▲▲▲
-        # 4. 둘 다 없으면, 중첩된 구조(raw_data)를 탐색하는 기존 함수를 호출합니다.
-        else:
-            actual_value = get_value_from_element(data_dict, internal_field)
-        # ▲▲▲ [핵심 수정] 여기까지 입니다. ▲▲▲
-            
-        actual_v_str = str(actual_value or "")
-
-        result = False # 결과 변수 초기화
-        if o == 'equals': result = (actual_v_str == str(v))
-        elif o == 'not_equals': result = (actual_v_str != str(v))
-        elif o == 'contains': result = (str(v) in actual_v_str)
-        elif o == 'not_contains': result = (str(v) not in actual_v_str)
-        elif o == 'starts_with': result = (actual_v_str.startswith(str(v)))
-        elif o == 'ends_with': result = (actual_v_str.endswith(str(v)))
-        
-        # 숫자 비교 연산자
-        elif o in ['greater_than', 'less_than', 'greater_or_equal', 'less_or_equal']:
-            if is_numeric(actual_value) and is_numeric(v):
-                actual_num, v_num = float(actual_value), float(v)
-                if o == 'greater_than': result = (actual_num > v_num)
-                elif o == 'less_than': result = (actual_num < v_num)
-                elif o == 'greater_or_equal': result = (actual_num >= v_num)
-                elif o == 'less_or_equal': result = (actual_num <= v_num)
-        
-        # 존재 여부 확인
-        elif o == 'exists': result = (actual_value is not None)
-        elif o == 'not_exists': result = (actual_value is None)
-
-        # ▼▼▼ [디버깅 추가] 조건 평가 결과 출력 ▼▼▼
-        print(f"    - 조건 평가: '{p}' ({o}) '{v}' | 실제값: '{actual_v_str}' -> 결과: {result}")
-        # ▲▲▲ 위 코드는 너무 많은 로그를 유발할 수 있으므로, 필요 시에만 주석을 해제하여 사용하세요.
+    # ▼▼▼ [수정] 요소별 매칭 태그 계산: columnar(요소 × 룰 행렬) 또는 요소별 평가 ▼▼▼
+    if use_columnar_rules(engine, element_count):
+        element_ids = []
+        table = RuleColumnTable([rule.conditions for rule in rules])
+        for element_id, raw_data in dirty_elements:
+            element_ids.append(element_id)
+            table.append(raw_data)
+        match_matrix = table.match_matrix()
+        print(f"[DEBUG] columnar 평가 완료: {match_matrix.shape[0]}개 객체 × {match_matrix.shape[1]}개 룰, 매칭 {int(match_matrix.sum())}건")
+        # 룰 순서대로 덮어써서 같은 태그는 마지막 매칭 룰이 할당 룰이 됨 (요소별 평가와 동일)
+        element_matches = (
+            (element_id, {rules[j].target_tag.id: rules[j] for j in np.flatnonzero(row)})
+            for element_id, row in zip(element_ids, match_matrix)
+        )
+    else:
+        element_matches = (
+            (element_id, {rule.target_tag.id: rule for rule in rules if rule_matches(rule, raw_data)})
+            for element_id, raw_data in dirty_elements
+        )
+    # ▲▲▲ [수정] 여기까지 ▲▲▲
 
-        return result
+    # ▼▼▼ [수정] 요소별 조회/생성/삭제 대신 목표 할당 집합과 현재 할당을 한 번에 비교하여 일괄 반영 ▼▼▼
+    # 수동 할당은 그대로 유지되며, 룰에 더 이상 맞지 않는 룰셋 할당은 제거, 새로 맞는 태그는 추가
+    with transaction.atomic():
+        added_count, removed_count, changed_element_ids = sync_ruleset_assignments(project, element_matches)
+        updated_count = len(changed_element_ids)
+        plan.commit(all_elements_qs)
+    # ▲▲▲ [수정] 여기까지 ▲▲▲
 
-    return False
+    print(f"[DEBUG] 총 {updated_count}개의 객체 분류 정보가 업데이트되었습니다.")
+    print(f"[DEBUG] 룰셋 할당 추가: {added_count}개, 제거: {removed_count}개")
+    print(f"[DEBUG] 다시 평가한 객체: {len(plan.evaluated)}개, 변경 없어 건너뛴 객체: {plan.skipped_count}개")
+    change_seq = ProjectChange.record(project.id, ProjectChange.KIND_ELEMENTS, changed_element_ids)  # 뷰어 스냅샷 무효화 포함
+
+    message = f'룰셋을 적용하여 총 {updated_count}개 객체의 분류를 업데이트했습니다. (추가: {added_count}, 제거: {removed_count})' if updated_count > 0 else '모든 객체가 이미 룰셋의 조건과 일치하여, 변경된 사항이 없습니다.'
+    if plan.skipped_count:
+        message += f' (변경되지 않은 {plan.skipped_count}개 객체는 건너뜀)'
+    return {
+        'status': 'success',
+        'message': message,
+        'evaluated_count': len(plan.evaluated),
+        'skipped_count': plan.skipped_count,
+        'full_rebuild': full_rebuild,
+        'dirty': {'elements': set(changed_element_ids) | set(plan.data_changed_ids)},
+        'change_seqs': [change_seq] if change_seq else [],
+    }
 
 @require_http_methods(["POST"])
 def apply_classification_rules_view(request, project_id):
@@ -700,79 +658,15 @@ def apply_classification_rules_view(request, project_id):
     분류 할당 룰셋을 일괄 적용합니다.
     - 룰셋 기반 할당: 조건에 맞지 않으면 제거하고, 조건에 맞으면 추가
     - 수동 할당: 항상 유지 (룰셋에 영향받지 않음)
+    - 증분 적용: 마지막 적용 이후 데이터가 바뀐 요소와 추가/수정/삭제된 룰의 영향을 받는 요소만 다시 평가
+      (?full_rebuild=1 이면 모든 요소를 다시 평가)
     """
     print("\n[DEBUG] --- '룰셋 일괄적용' API 요청 수신 ---")
     try:
         project = Project.objects.get(id=project_id)
-        rules = ClassificationRule.objects.filter(project=project).order_by('id').select_related('target_tag')
-
-        # [수정] 대용량 데이터를 처리하기 위해 iterator 사용
-        all_elements_qs = RawElement.objects.filter(project=project)
-
-        if not rules.exists():
-            print("[DEBUG] 적용할 룰셋이 없어 조기 종료합니다.")
-            return JsonResponse({'status': 'info', 'message': '적용할 규칙이 없습니다. 먼저 룰셋을 정의해주세요.'})
-
-        print(f"[DEBUG] {all_elements_qs.count()}개의 BIM 객체에 대해 {rules.count()}개의 룰셋 적용을 시작합니다.")
-
-        project_tags = {tag.name: tag for tag in QuantityClassificationTag.objects.filter(project=project)}
-        updated_count = 0
-        added_count = 0
-        removed_count = 0
-
-        # [수정] 500개씩 끊어서 처리
-        for element in all_elements_qs.iterator(chunk_size=500):
-            # 1. 이 요소에 대한 현재 할당 정보 조회
-            current_assignments = ElementClassificationAssignment.objects.filter(
-                raw_element=element
-            ).select_related('classification_tag', 'assigned_by_rule')
-
-            # 2. 수동 할당은 그대로 유지
-            manual_tag_ids = {
-                a.classification_tag.id for a in current_assignments if a.assignment_type == 'manual'
-            }
-
-            # 3. 현재 룰셋 기반 할당 정보
-            ruleset_assignments = {
-                a.classification_tag.id: a for a in current_assignments if a.assignment_type == 'ruleset'
-            }
-
-            # 4. 현재 활성화된 룰셋을 평가하여 매칭되는 태그 찾기
-            tags_matching_rules = {}  # {tag_id: rule}
-            for rule in rules:
-                if evaluate_conditions(element.raw_data, rule.conditions):
-                    tags_matching_rules[rule.target_tag.id] = rule
-
-            # 5. 룰셋 기반 할당 업데이트
-            # 5-1. 룰에 더 이상 매칭되지 않는 룰셋 할당 제거
-            for tag_id, assignment in ruleset_assignments.items():
-                if tag_id not in tags_matching_rules:
-                    assignment.delete()
-                    removed_count += 1
-                    print(f"  [REMOVE] Element {element.id}: 룰셋 할당 제거 - {assignment.classification_tag.name}")
-
-            # 5-2. 룰에 매칭되는데 아직 할당되지 않은 태그 추가
-            for tag_id, rule in tags_matching_rules.items():
-                if tag_id not in ruleset_assignments:
-                    # 새 룰셋 기반 할당 생성
-                    ElementClassificationAssignment.objects.create(
-                        raw_element=element,
-                        classification_tag_id=tag_id,
-                        assignment_type='ruleset',
-                        assigned_by_rule=rule
-                    )
-                    added_count += 1
-                    print(f"  [ADD] Element {element.id}: 룰셋 할당 추가 - {rule.target_tag.name}")
-
-            # 변경사항이 있으면 카운트 증가
-            if tags_matching_rules.keys() != ruleset_assignments.keys():
-                updated_count += 1
-
-        print(f"[DEBUG] 총 {updated_count}개의 객체 분류 정보가 업데이트되었습니다.")
-        print(f"[DEBUG] 룰셋 할당 추가: {added_count}개, 제거: {removed_count}개")
-
-        message = f'룰셋을 적용하여 총 {updated_count}개 객체의 분류를 업데이트했습니다. (추가: {added_count}, 제거: {removed_count})' if updated_count > 0 else '모든 객체가 이미 룰셋의 조건과 일치하여, 변경된 사항이 없습니다.'
-        return JsonResponse({'status': 'success', 'message': message})
+        full_rebuild = request.GET.get('full_rebuild', '').lower() in ('1', 'true')
+        result = run_classification_rules(project, full_rebuild=full_rebuild, engine=request.GET.get('engine', 'auto'))
+        return JsonResponse(stage_response(result))
 
     except Project.DoesNotExist:
         print(f"[ERROR] 프로젝트 ID '{project_id}'를 찾을 수 없습니다.")
@@ -977,73 +871,6 @@ def member_marks_api(request, project_id, mark_id=None):
 
 
 
-# ▼▼▼ [수정] 이 함수를 아래 코드로 교체해주세요 ▼▼▼
-def evaluate_expression(expression, raw_data):
-    """
-    '{Volume} * 1.05' 또는 '{{Volume}} * 2'와 같은 문자열 표현식을 실제 값으로 계산합니다.
-    - {parameter}: 파라미터 값을 그대로 사용합니다. (예: "30.5 m³")
-    - {{parameter}}: 파라미터 값에서 숫자만 추출하여 사용합니다. (예: "30.5 m³" -> 30.5)
-    - BIM.Attributes.Name, BIM.Parameters.XXX 등의 계층적 경로를 지원합니다.
-    """
-    if not isinstance(expression, str):
-        return expression
-
-    temp_expression = expression
-
-    # --- 1단계: 숫자만 추출하는 {{parameter}} 처리 ---
-    # 중복된 플레이스홀더가 있어도 한 번만 처리하도록 set()을 사용합니다.
-    numeric_placeholders = re.findall(r'\{\{([^}]+)\}\}', temp_expression)
-    for placeholder in set(numeric_placeholders):
-        # 계층적 경로를 내부 필드명으로 변환
-        internal_field = get_internal_field_name(placeholder)
-        print(f"[DEBUG][evaluate_expression] {{{{placeholder}}}}: '{placeholder}' -> internal_field: '{internal_field}'")
-        value = get_value_from_element(raw_data, internal_field)
-        print(f"[DEBUG][evaluate_expression] Value found: {value}")
-
-        if value is not None:
-            # 값의 시작 부분에서 숫자(소수점, 음수 포함)만 추출합니다.
-            match = re.match(r'^\s*(-?\d+(\.\d+)?)\s*', str(value))
-            if match:
-                numeric_value = match.group(1)
-                # {{...}} 형태의 모든 플레이스홀더를 추출된 숫자 값으로 바꿉니다.
-                temp_expression = temp_expression.replace(f'{{{{{placeholder}}}}}', str(numeric_value))
-            else:
-                # 숫자 추출에 실패하면 계산 오류를 방지하기 위해 0으로 처리합니다.
-                temp_expression = temp_expression.replace(f'{{{{{placeholder}}}}}', '0')
-        else:
-            print(f"[ERROR][evaluate_expression] Parameter not found: original='{placeholder}', internal='{internal_field}'")
-            return f"Error: Parameter '{internal_field}' (from '{placeholder}') not found for numeric extraction."
-
-    # --- 2단계: 일반 {parameter} 처리 ---
-    # {{...}}가 처리된 후의 문자열에서 {...}를 찾습니다.
-    placeholders = re.findall(r'\{([^}]+)\}', temp_expression)
-    for placeholder in set(placeholders):
-        # 계층적 경로를 내부 필드명으로 변환
-        internal_field = get_internal_field_name(placeholder)
-        print(f"[DEBUG][evaluate_expression] {{placeholder}}: '{placeholder}' -> internal_field: '{internal_field}'")
-        value = get_value_from_element(raw_data, internal_field)
-        print(f"[DEBUG][evaluate_expression] Value found: {value}")
-
-        if value is not None:
-            # 값이 숫자인지 확인하고, 문자열이면 따옴표로 감싸줍니다.
-            replacement = str(value) if is_numeric(value) else f'"{str(value)}"'
-            temp_expression = temp_expression.replace(f'{{{placeholder}}}', replacement)
-        else:
-            print(f"[ERROR][evaluate_expression] Parameter not found: original='{placeholder}', internal='{internal_field}'")
-            return f"Error: Parameter '{internal_field}' (from '{placeholder}') not found."
-
-    # --- 3단계: 최종 문자열 계산 ---
-    if not temp_expression.strip():
-        return ""
-
-    try:
-        # eval의 위험성을 줄이기 위해 사용 가능한 내장 함수를 제한합니다.
-        safe_dict = {'__builtins__': {'abs': abs, 'round': round, 'max': max, 'min': min, 'len': len}}
-        return eval(temp_expression, safe_dict)
-    except Exception as e:
-        # 디버깅을 위해 실패한 표현식과 에러 메시지를 함께 반환합니다.
-        return f"Error: Failed to evaluate '{expression}' -> '{temp_expression}' ({str(e)})"
-# ▲▲▲ [수정] 여기까지가 교체될 코드의 끝입니다. ▲▲▲
 def calculate_properties_from_rule(raw_data, mapping_script):
     """
     매핑 스크립트(JSON)의 각 항목을 evaluate_expression을 사용하여 계산합니다.
@@ -1059,6 +886,7 @@ def calculate_properties_from_rule(raw_data, mapping_script):
 
 
 @require_http_methods(["GET", "POST", "DELETE", "PUT", "PATCH"])
+@records_project_change(*QM_CI_CHANGES)
 def quantity_members_api(request, project_id, member_id=None):
     # --- GET: 부재 목록 조회 ---
     if request.method == 'GET':
@@ -1221,27 +1049,29 @@ def quantity_members_api(request, project_id, member_id=None):
 
 
 # ▼▼▼ [수정] 이 함수를 아래의 새 코드로 완전히 교체해주세요. ▼▼▼
-@require_http_methods(["POST"])
-def create_quantity_members_auto_view(request, project_id):
-    print("\n[DEBUG] --- '자동생성(분류기준)' 실행 시작 ---")
-    try:
-        project = Project.objects.get(id=project_id)
-        
-        rules = PropertyMappingRule.objects.filter(project=project).order_by('priority').select_related('target_tag')
-        elements_qs = RawElement.objects.filter(project=project, classification_tags__isnull=False).prefetch_related('classification_tags').distinct()
+def run_quantity_members_auto(project, element_ids=None):
+    """
+    자동생성(분류기준) 본문 (create_quantity_members_auto_view, 산출 파이프라인 공용)
+    element_ids를 주면 해당 객체의 수량산출부재만 생성/갱신/삭제합니다. (None이면 프로젝트 전체)
+    'dirty'에는 처리한(유효한) 수량산출부재 id가 담깁니다.
+    """
+    rules = PropertyMappingRule.objects.filter(project=project).order_by('priority').select_related('target_tag')
+    elements_qs = RawElement.objects.filter(project=project, classification_tags__isnull=False).prefetch_related('classification_tags').distinct()
 
-        # 분류 태그가 할당된 요소가 없고, 맵핑 규칙도 없으면 조기 리턴
-        if not elements_qs.exists() and not rules.exists() and not QuantityMember.objects.filter(project=project, raw_element__isnull=False).exclude(mapping_expression={}).exists():
-             return JsonResponse({'status': 'info', 'message': '자동 생성을 위한 분류 태그가 할당된 BIM 객체가 없고, 속성 맵핑 규칙도 없습니다.'})
+    # 분류 태그가 할당된 요소가 없고, 맵핑 규칙도 없으면 조기 리턴
+    if not elements_qs.exists() and not rules.exists() and not QuantityMember.objects.filter(project=project, raw_element__isnull=False).exclude(mapping_expression={}).exists():
+        return {'status': 'info', 'message': '자동 생성을 위한 분류 태그가 할당된 BIM 객체가 없고, 속성 맵핑 규칙도 없습니다.', 'dirty': {'members': set()}}
 
-        valid_member_ids = set()
-        updated_count = 0
-        created_count = 0
+    valid_member_ids = set()
+    updated_count = 0
+    created_count = 0
+    deleted_count = 0
 
-        print(f"[DEBUG] {elements_qs.count()}개의 BIM 객체 처리 시작...")
-        
-        # [수정] 대용량 처리를 위해 iterator 사용
-        for element in elements_qs.iterator(chunk_size=500):
+    print(f"[DEBUG] {elements_qs.count() if element_ids is None else len(element_ids)}개의 BIM 객체 처리 시작...")
+
+    # [수정] 대용량 처리를 위해 iterator 사용 (범위가 주어지면 id 배치별로 조회)
+    for scoped_elements_qs in iter_scoped(elements_qs, element_ids):
+        for element in scoped_elements_qs.iterator(chunk_size=500):
             element_tags = element.classification_tags.all()
 
             for tag in element_tags:
@@ -1281,7 +1111,7 @@ def create_quantity_members_auto_view(request, project_id):
                     script_to_use = member.mapping_expression
                 else:
                     for rule in rules:
-                        if rule.target_tag_id == tag.id and evaluate_conditions(element.raw_data, rule.conditions):
+                        if rule.target_tag_id == tag.id and rule_matches(rule, element.raw_data):
                             script_to_use = rule.mapping_script
                             break
 
@@ -1293,27 +1123,36 @@ def create_quantity_members_auto_view(request, project_id):
 
                 valid_member_ids.add(member.id)
 
-        # ▼▼▼ [수정] 분할된 객체의 QuantityMember는 삭제 대상에서 제외 ▼▼▼
-        # ▼▼▼ [추가] is_active=True 조건 추가하여 비활성화된 원본은 삭제하지 않음 ▼▼▼
-        deletable_members = QuantityMember.objects.filter(
-            project=project,
-            raw_element__isnull=False,
-            split_element__isnull=True,  # 분할되지 않은 원본만 삭제 대상
-            is_active=True  # 활성화된 것만 삭제 (비활성화된 원본은 보존)
-        ).exclude(id__in=valid_member_ids)
-        
-        deletable_count = deletable_members.count()
+    # ▼▼▼ [수정] 분할된 객체의 QuantityMember는 삭제 대상에서 제외 ▼▼▼
+    # ▼▼▼ [추가] is_active=True 조건 추가하여 비활성화된 원본은 삭제하지 않음 ▼▼▼
+    deletable_members = QuantityMember.objects.filter(
+        project=project,
+        raw_element__isnull=False,
+        split_element__isnull=True,  # 분할되지 않은 원본만 삭제 대상
+        is_active=True  # 활성화된 것만 삭제 (비활성화된 원본은 보존)
+    ).exclude(id__in=valid_member_ids)
+
+    # 범위가 주어지면 해당 객체의 부재만 삭제 대상 (태그가 모두 해제된 객체 포함)
+    for scoped_deletable in iter_scoped(deletable_members, element_ids, field='raw_element_id'):
+        deletable_count = scoped_deletable.count()
         if deletable_count > 0:
             print(f"[DEBUG] 유효하지 않은 QuantityMember {deletable_count}개를 삭제합니다.")
-        
-        deleted_count, _ = deletable_members.delete()
+        deleted_count += scoped_deletable.delete()[0]
 
-        message = (f'룰셋/개별 맵핑식을 적용하여 {created_count}개의 부재를 새로 생성하고, '
-                   f'{updated_count}개를 업데이트했습니다. '
-                   f'유효하지 않은 부재 {deleted_count}개를 삭제했습니다.')
-        
+    message = (f'룰셋/개별 맵핑식을 적용하여 {created_count}개의 부재를 새로 생성하고, '
+               f'{updated_count}개를 업데이트했습니다. '
+               f'유효하지 않은 부재 {deleted_count}개를 삭제했습니다.')
+    return {'status': 'success', 'message': message, 'dirty': {'members': valid_member_ids}}
+
+@require_http_methods(["POST"])
+@records_project_change(*QM_CI_CHANGES)
+def create_quantity_members_auto_view(request, project_id):
+    print("\n[DEBUG] --- '자동생성(분류기준)' 실행 시작 ---")
+    try:
+        project = Project.objects.get(id=project_id)
+        result = run_quantity_members_auto(project)
         print("[DEBUG] --- '자동생성(분류기준)' 실행 완료 ---")
-        return JsonResponse({'status': 'success', 'message': message})
+        return JsonResponse(stage_response(result))
 
     except Project.DoesNotExist:
         return JsonResponse({'status': 'error', 'message': '프로젝트를 찾을 수 없습니다.'}, status=404)
@@ -1327,6 +1166,7 @@ def create_quantity_members_auto_view(request, project_id):
 
 # ▼▼▼ [추가] 파일의 맨 아래에 이 함수를 추가해주세요. ▼▼▼
 @require_http_methods(["POST"])
+@records_project_change(*QM_CHANGES)
 def manage_quantity_member_cost_codes_api(request, project_id):
     """선택된 여러 수량산출부재에 대해 공사코드를 일괄 할당/해제하는 API"""
     try:
@@ -1391,6 +1231,7 @@ def manage_quantity_member_cost_codes_api(request, project_id):
         return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
 
 @require_http_methods(["POST"])
+@records_project_change(*QM_CHANGES)
 def toggle_cost_code_lock_api(request, project_id):
     """특정 부재의 특정 공사코드 잠금 상태를 토글합니다."""
     try:
@@ -1437,6 +1278,7 @@ def toggle_cost_code_lock_api(request, project_id):
         return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
 
 @require_http_methods(["POST"])
+@records_project_change(*QM_CHANGES)
 def manage_quantity_member_member_marks_api(request, project_id):
     """선택된 여러 수량산출부재에 대해 일람부호를 일괄 할당/해제하는 API"""
     try:
@@ -1475,6 +1317,7 @@ def manage_quantity_member_member_marks_api(request, project_id):
         return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
 
 @require_http_methods(["POST"])
+@records_project_change(*QM_CHANGES)
 def manage_quantity_member_spaces_api(request, project_id):
     """선택된 여러 수량산출부재에 대해 공간분류를 일괄 할당/해제하는 API"""
     try:
@@ -1743,99 +1586,42 @@ def activity_assignment_rules_api(request, project_id, rule_id=None):
             return JsonResponse({'status': 'error', 'message': '규칙을 찾을 수 없습니다.'}, status=404)
 
 
-@require_http_methods(["POST"])
-def apply_activity_assignment_rules_view(request, project_id):
-    """액티비티 할당 룰셋을 CostItem에 일괄 적용"""
-    print("\n[DEBUG] --- '액티비티 할당 룰셋 일괄적용' API 요청 수신 ---")
-    try:
-        project = Project.objects.get(id=project_id)
-
-        # is_active=True인 CostItem만 가져오기
-        cost_items_qs = CostItem.objects.filter(
-            project=project,
-            is_active=True
-        ).select_related(
-            'cost_code',
-            'quantity_member',
-            'quantity_member__member_mark',
-            'quantity_member__raw_element'
-        ).prefetch_related('activities')
+def run_activity_assignment_rules(project, cost_item_ids=None):
+    """
+    액티비티 할당 룰셋 일괄적용 본문 (apply_activity_assignment_rules_view, 산출 파이프라인 공용)
+    cost_item_ids를 주면 해당 산출항목에만 적용합니다. (None이면 프로젝트 전체)
+    'dirty'에는 적용 대상이었던 산출항목 id가 담깁니다.
+    """
+    # is_active=True인 CostItem만 가져오기
+    cost_items_qs = CostItem.objects.filter(
+        project=project,
+        is_active=True
+    ).select_related(
+        'cost_code',
+        'quantity_member',
+        'quantity_member__member_mark',
+        'quantity_member__raw_element'
+    ).prefetch_related('activities')
 
-        # ActivityAssignmentRule을 우선순위대로 가져오기
-        activity_rules = list(ActivityAssignmentRule.objects.filter(project=project).select_related('target_activity').order_by('priority'))
+    # ActivityAssignmentRule을 우선순위대로 가져오기
+    activity_rules = list(ActivityAssignmentRule.objects.filter(project=project).select_related('target_activity').order_by('priority'))
 
-        print(f"[DEBUG] {cost_items_qs.count()}개의 산출항목에 대해 액티비티 할당 룰셋 적용을 시작합니다.")
-        print(f"  > 적용할 액티비티 할당 룰셋: {len(activity_rules)}개")
+    print(f"[DEBUG] {cost_items_qs.count() if cost_item_ids is None else len(cost_item_ids)}개의 산출항목에 대해 액티비티 할당 룰셋 적용을 시작합니다.")
+    print(f"  > 적용할 액티비티 할당 룰셋: {len(activity_rules)}개")
 
-        updated_count = 0
-        # ▼▼▼ [추가] 첫 번째 CostItem의 combined_properties 로깅을 위한 플래그 (2025-11-05) ▼▼▼
-        first_item_logged = False
-        # ▲▲▲ [추가] 여기까지 ▲▲▲
+    updated_count = 0
+    processed_ids = set()
+    # ▼▼▼ [추가] 첫 번째 CostItem의 combined_properties 로깅을 위한 플래그 (2025-11-05) ▼▼▼
+    first_item_logged = False
+    # ▲▲▲ [추가] 여기까지 ▲▲▲
 
-        # 각 CostItem에 대해 룰 적용
-        for cost_item in cost_items_qs.iterator(chunk_size=500):
-            # 다단계 속성 접근을 위한 combined_properties 구성
-            combined_properties = {}
-
-            # 1. CostItem 자체 속성 - 직접 접근: {property_name}
-            combined_properties['quantity'] = cost_item.quantity
-            if cost_item.description:
-                combined_properties['description'] = cost_item.description
-
-            # 2. CostCode 속성 - CostCode 접두사: CostCode.{property_name}
-            if cost_item.cost_code:
-                cc = cost_item.cost_code
-                combined_properties['CostCode.code'] = cc.code
-                combined_properties['CostCode.name'] = cc.name
-                if cc.detail_code:
-                    combined_properties['CostCode.detail_code'] = cc.detail_code
-                if cc.note:
-                    combined_properties['CostCode.note'] = cc.note
-                if cc.category:
-                    combined_properties['CostCode.category'] = cc.category
-                if cc.spec:
-                    combined_properties['CostCode.spec'] = cc.spec
-                if cc.unit:
-                    combined_properties['CostCode.unit'] = cc.unit
-
-            # 3. QuantityMember 속성 - QM 접두사: QM.{property_name}
-            if cost_item.quantity_member:
-                qm = cost_item.quantity_member
-                combined_properties['QM.name'] = qm.name
-                combined_properties['QM.id'] = str(qm.id)
-                if qm.classification_tag:
-                    combined_properties['QM.classification_tag'] = qm.classification_tag.name
-                if qm.properties:
-                    for k, v in qm.properties.items():
-                        combined_properties[f'QM.properties.{k}'] = v
-
-                # 4. MemberMark 속성 - MM 접두사: MM.{property_name}
-                if qm.member_mark:
-                    mm = qm.member_mark
-                    combined_properties['MM.mark'] = mm.mark
-                    if mm.description:
-                        combined_properties['MM.description'] = mm.description
-                    if mm.properties:
-                        for k, v in mm.properties.items():
-                            combined_properties[f'MM.properties.{k}'] = v
-
-                # 5. RawElement (BIM 원본) 속성 - BIM 접두사: BIM.Attributes/Parameters/TypeParameters
-                if qm.raw_element and qm.raw_element.raw_data:
-                    raw_data = qm.raw_element.raw_data
-                    # BIM.Attributes.* - 기본 속성
-                    for k, v in raw_data.items():
-                        if k not in ('Parameters', 'TypeParameters') and not isinstance(v, (dict, list)):
-                            combined_properties[f'BIM.Attributes.{k}'] = v
-                    # BIM.TypeParameters.* - 타입 파라미터
-                    for k, v in raw_data.get('TypeParameters', {}).items():
-                        combined_properties[f'BIM.TypeParameters.{k}'] = v
-                    # BIM.Parameters.* - 인스턴스 파라미터
-                    for k, v in raw_data.get('Parameters', {}).items():
-                        combined_properties[f'BIM.Parameters.{k}'] = v
-
-                # 6. Space 속성 (공간분류)
-                if qm.space:
-                    combined_properties['Space.name'] = qm.space.name
+    # 각 CostItem에 대해 룰 적용 (범위가 주어지면 id 배치별로 조회)
+    for scoped_cost_items_qs in iter_scoped(cost_items_qs, cost_item_ids):
+        for cost_item in scoped_cost_items_qs.iterator(chunk_size=500):
+            processed_ids.add(cost_item.id)
+            # 다단계 속성 접근을 위한 combined_properties (룰이 참조하는 키만 원본에서 조회)
+            # {property_name}, CostCode.*, QM.*, MM.*, BIM.Attributes/TypeParameters/Parameters.*, Space.*
+            combined_properties = activity_rule_properties(cost_item)
 
             # ▼▼▼ [추가] 첫 번째 CostItem의 combined_properties 로깅 (2025-11-05) ▼▼▼
             if not first_item_logged:
@@ -1854,7 +1640,7 @@ def apply_activity_assignment_rules_view(request, project_id):
                 # ▼▼▼ [추가] 디버그 로깅 (2025-11-05) ▼▼▼
                 print(f"[DEBUG][ActivityRule] Evaluating rule '{rule.name}' (conditions: {rule.conditions})")
                 # ▲▲▲ [추가] 여기까지 ▲▲▲
-                if evaluate_conditions(combined_properties, rule.conditions):
+                if rule_matches(rule, combined_properties):
                     # 이미 할당되어 있지 않으면 추가
                     if not cost_item.activities.filter(id=rule.target_activity.id).exists():
                         cost_item.activities.add(rule.target_activity)
@@ -1866,9 +1652,19 @@ def apply_activity_assignment_rules_view(request, project_id):
                     print(f"[DEBUG][ActivityRule] Rule '{rule.name}' conditions NOT matched for CostItem {cost_item.id}")
                 # ▲▲▲ [추가] 여기까지 ▲▲▲
 
-        message = f"액티비티 할당 완료: {updated_count}개의 산출항목에 액티비티가 할당되었습니다."
-        print(f"[DEBUG] {message}")
-        return JsonResponse({'status': 'success', 'message': message, 'updated_count': updated_count})
+    message = f"액티비티 할당 완료: {updated_count}개의 산출항목에 액티비티가 할당되었습니다."
+    print(f"[DEBUG] {message}")
+    return {'status': 'success', 'message': message, 'updated_count': updated_count, 'dirty': {'cost_items': processed_ids}}
+
+@require_http_methods(["POST"])
+@records_project_change(*CI_CHANGES)
+def apply_activity_assignment_rules_view(request, project_id):
+    """액티비티 할당 룰셋을 CostItem에 일괄 적용"""
+    print("\n[DEBUG] --- '액티비티 할당 룰셋 일괄적용' API 요청 수신 ---")
+    try:
+        project = Project.objects.get(id=project_id)
+        result = run_activity_assignment_rules(project)
+        return JsonResponse(stage_response(result))
 
     except Project.DoesNotExist:
         return JsonResponse({'status': 'error', 'message': '프로젝트를 찾을 수 없습니다.'}, status=404)
@@ -1960,6 +1756,7 @@ def geometry_relation_rules_api(request, project_id, rule_id=None):
 
 
 @require_http_methods(["POST"])
+@records_project_change(*QM_CHANGES)
 def apply_geometry_relation_rules_view(request, project_id):
     """Geometry 관계 룰셋 일괄 적용 - receives analyzed relations from frontend"""
     print("\n[DEBUG] --- 'Geometry 관계 룰셋 일괄적용' API 요청 수신 ---")
@@ -2127,106 +1924,10 @@ def get_nested_value(data, path):
     return current
 
 
-def evaluate_expression_for_cost_item(expression, quantity_member):
-    """
-    (개선된 버전)
-    CostItem의 수량 계산식을 평가합니다.
-    - [MarkProperty]: MemberMark.properties (일람부호 속성)
-    - {{RawProperty}}: RawElement.raw_data (BIM 원본 숫자만 추출)
-    - {Property}: QuantityMember.properties (부재 속성) 또는 RawElement.raw_data (BIM 원본 속성)
-    """
-    if not isinstance(expression, str) or not quantity_member:
-        return expression
-
-    temp_expression = expression
-    
-    # 1단계: [MemberMark 속성] 처리 - 대괄호 []
-    mark_placeholders = re.findall(r'\[([^\]]+)\]', temp_expression)
-    if mark_placeholders:
-        member_mark = quantity_member.member_mark
-        if member_mark and member_mark.properties:
-            for placeholder in set(mark_placeholders):
-                value = member_mark.properties.get(placeholder)
-                if value is not None:
-                    replacement = str(value) if is_numeric(value) else f'"{str(value)}"'
-                    temp_expression = temp_expression.replace(f'[{placeholder}]', replacement)
-                else: # 해당 속성이 없으면 0으로 처리하여 계산 오류 방지
-                    temp_expression = temp_expression.replace(f'[{placeholder}]', '0')
-        else: # 연결된 일람부호가 없으면 모든 대괄호 플레이스홀더를 0으로 처리
-            for placeholder in set(mark_placeholders):
-                temp_expression = temp_expression.replace(f'[{placeholder}]', '0')
-
-    # (공통) 검색할 데이터 소스 준비
-    raw_data = quantity_member.raw_element.raw_data if quantity_member.raw_element else {}
-    member_props = quantity_member.properties if quantity_member.properties else {}
-
-    # 2단계: {{RawElement 숫자 속성}} 처리 - 이중 중괄호 {{}}
-    # (이것을 { } 보다 먼저 처리해야 함)
-    numeric_placeholders = re.findall(r'\{\{([^}]+)\}\}', temp_expression)
-    for placeholder in set(numeric_placeholders):
-        # {{...}}는 RawElement의 숫자 값만 추출하는 것으로 가정
-        value = get_value_from_element(raw_data, placeholder)
-        
-        if value is not None:
-            match = re.match(r'^\s*(-?\d+(\.\d+)?)\s*', str(value))
-            if match:
-                numeric_value = match.group(1)
-                temp_expression = temp_expression.replace(f'{{{{{placeholder}}}}}', str(numeric_value))
-            else:
-                temp_expression = temp_expression.replace(f'{{{{{placeholder}}}}}', '0')
-        else:
-            temp_expression = temp_expression.replace(f'{{{{{placeholder}}}}}', '0')
-
-    # 3단계: {QuantityMember 또는 RawElement 속성} 처리 - 중괄호 {}
-    member_placeholders = re.findall(r'\{([^}]+)\}', temp_expression)
-    if member_placeholders:
-        for placeholder in set(member_placeholders):
-            value = None
-
-            # ▼▼▼ [수정] QM.properties.*, MM.properties.* 형태 파싱 (2025-11-14) ▼▼▼
-            if placeholder.startswith('QM.properties.'):
-                # {QM.properties.높이} → "높이" 추출
-                prop_key = placeholder.replace('QM.properties.', '')
-                value = member_props.get(prop_key)
-            elif placeholder.startswith('MM.properties.'):
-                # {MM.properties.대근(상)간격} → "대근(상)간격" 추출
-                prop_key = placeholder.replace('MM.properties.', '')
-                member_mark = quantity_member.member_mark
-                if member_mark and member_mark.properties:
-                    value = member_mark.properties.get(prop_key)
-            # ▲▲▲ [수정] 여기까지 ▲▲▲
-            # 1순위: QuantityMember.properties에서 찾기 (예: '체적' - prefix 없는 경우)
-            elif placeholder in member_props:
-                value = member_props.get(placeholder)
-            # 2순위: RawElement.raw_data에서 찾기 (예: 'Volume')
-            else:
-                value = get_value_from_element(raw_data, placeholder)
-
-            if value is not None:
-                # ▼▼▼ [추가] 값이 계산식이면 재귀 평가 (2025-11-05) ▼▼▼
-                # QM properties 값이 "{...}" 또는 "{{...}}" 형태의 계산식이면 다시 평가
-                if isinstance(value, str) and ('{' in value or '{{' in value):
-                    # evaluate_expression 함수를 사용하여 계산식 평가
-                    value = evaluate_expression(value, raw_data)
-                # ▲▲▲ [추가] 여기까지 ▲▲▲
-
-                replacement = str(value) if is_numeric(value) else f'"{str(value)}"'
-                temp_expression = temp_expression.replace(f'{{{placeholder}}}', replacement)
-            else:
-                # 해당 속성이 없으면 0으로 처리하여 계산 오류 방지
-                temp_expression = temp_expression.replace(f'{{{placeholder}}}', '0')
-
-    # 4단계: 최종 문자열 계산
-    if not temp_expression.strip(): return ""
-    try:
-        safe_dict = {'__builtins__': {'abs': abs, 'round': round, 'max': max, 'min': min, 'len': len}}
-        return eval(temp_expression, safe_dict)
-    except Exception as e:
-        return f"Error: Failed to evaluate '{expression}' -> '{temp_expression}' ({str(e)})"
-
 # connections/views.py 파일에서 cost_items_api 함수를 찾아 아래 코드로 교체하세요.
 
 @require_http_methods(["GET", "POST", "PUT", "PATCH", "DELETE"])
+@records_project_change(*CI_CHANGES)
 @csrf_exempt
 def cost_items_api(request, project_id, item_id=None):
     print(f"[DEBUG][cost_items_api] ENTRY: method={request.method}, project_id={project_id}, item_id={item_id}")
@@ -2540,62 +2241,51 @@ def cost_items_api(request, project_id, item_id=None):
             return JsonResponse({'status': 'error', 'message': f'삭제 중 오류 발생: {str(e)}'}, status=500)
 
 
-@require_http_methods(["POST"])
-def create_cost_items_auto_view(request, project_id):
-    try:
-        project = Project.objects.get(id=project_id)
-        rules = CostCodeRule.objects.filter(project=project).order_by('priority').select_related('target_cost_code')
+def run_cost_items_auto(project, member_ids=None):
+    """
+    자동생성(공사코드기준) 본문 (create_cost_items_auto_view, 산출 파이프라인 공용)
+    member_ids를 주면 해당 수량산출부재의 산출항목만 생성/갱신/삭제합니다. (None이면 프로젝트 전체)
+    'dirty'에는 처리한(유효한) 산출항목 id가 담깁니다.
+    """
+    rules = CostCodeRule.objects.filter(project=project).order_by('priority').select_related('target_cost_code')
 
-        # [수정] QuerySet으로 유지하고 .iterator()를 사용하도록 변경
-        # ▼▼▼ [수정] is_active=True 필터 추가 (비활성화된 부재 제외) ▼▼▼
-        members_qs = QuantityMember.objects.filter(
-            project=project,
-            is_active=True
-        ).select_related(
-            'member_mark',
-            'raw_element',
-            'classification_tag'
-        ).prefetch_related(
-            'cost_codes'
-        ).distinct()
-        # ▲▲▲ [수정] 여기까지 ▲▲▲
+    # [수정] QuerySet으로 유지하고 .iterator()를 사용하도록 변경
+    # ▼▼▼ [수정] is_active=True 필터 추가 (비활성화된 부재 제외) ▼▼▼
+    members_qs = QuantityMember.objects.filter(
+        project=project,
+        is_active=True
+    ).select_related(
+        'member_mark',
+        'raw_element',
+        'classification_tag'
+    ).prefetch_related(
+        'cost_codes'
+    ).distinct()
+    # ▲▲▲ [수정] 여기까지 ▲▲▲
 
-        # ▼▼▼ [수정] 룰셋이 없어도 진행 가능하도록 변경 (수량은 0으로 설정됨) ▼▼▼
-        if not members_qs.exists():
-            return JsonResponse({'status': 'info', 'message': '공사코드가 할당된 수량산출부재가 없습니다.'})
+    # ▼▼▼ [수정] 룰셋이 없어도 진행 가능하도록 변경 (수량은 0으로 설정됨) ▼▼▼
+    if not members_qs.exists():
+        return {'status': 'info', 'message': '공사코드가 할당된 수량산출부재가 없습니다.', 'dirty': {'cost_items': set()}}
 
-        has_rules = rules.exists()
-        if not has_rules:
-            print(f"[WARNING] 공사코드 룰셋이 없습니다. 수량은 0으로 설정됩니다.")
-        # ▲▲▲ [수정] 여기까지 ▲▲▲
+    has_rules = rules.exists()
+    if not has_rules:
+        print(f"[WARNING] 공사코드 룰셋이 없습니다. 수량은 0으로 설정됩니다.")
+    # ▲▲▲ [수정] 여기까지 ▲▲▲
 
-        valid_item_ids = set()
-        created_count = 0
-        updated_count = 0
+    valid_item_ids = set()
+    created_count = 0
+    updated_count = 0
 
-        print(f"\n[DEBUG] --- '자동생성(공사코드기준)' 실행 시작 ---")
-        print(f"[DEBUG] {members_qs.count()}개의 QuantityMembers를 처리합니다.")
-        print(f"[DEBUG] 공사코드 룰셋 개수: {rules.count()}개")
+    print(f"\n[DEBUG] --- '자동생성(공사코드기준)' 실행 시작 ---")
+    print(f"[DEBUG] {members_qs.count() if member_ids is None else len(member_ids)}개의 QuantityMembers를 처리합니다.")
+    print(f"[DEBUG] 공사코드 룰셋 개수: {rules.count()}개")
 
-        # [수정] iterator 사용
-        for member in members_qs.iterator(chunk_size=500):
+    # [수정] iterator 사용 (범위가 주어지면 id 배치별로 조회)
+    for scoped_members_qs in iter_scoped(members_qs, member_ids):
+        for member in scoped_members_qs.iterator(chunk_size=500):
             # ... (이하 내부 로직은 대부분 동일) ...
-            combined_properties = member.properties.copy() if member.properties else {}
-            if member.raw_element and member.raw_element.raw_data:
-                raw_data = member.raw_element.raw_data
-                for k, v in raw_data.items():
-                    if not isinstance(v, (dict, list)): combined_properties[f'BIM원본.{k}'] = v
-                for k, v in raw_data.get('TypeParameters', {}).items(): combined_properties[f'BIM원본.TypeParameters.{k}'] = v
-                for k, v in raw_data.get('Parameters', {}).items(): combined_properties[f'BIM원본.Parameters.{k}'] = v
-            
-            if member.classification_tag: combined_properties['classification_tag_name'] = member.classification_tag.name
-            if member.member_mark:
-                combined_properties['member_mark_name'] = member.member_mark.mark
-                # ▼▼▼ [추가] 일람부호 속성을 대괄호 형태로 추가하여 조건에서 참조 가능하게 함 ▼▼▼
-                if member.member_mark.properties and isinstance(member.member_mark.properties, dict):
-                    for k, v in member.member_mark.properties.items():
-                        combined_properties[f'[{k}]'] = v
-                # ▲▲▲ [추가] 여기까지 ▲▲▲
+            # 부재 속성, BIM원본.*, classification_tag_name, member_mark_name, [일람부호 속성] (조회하는 키만 원본에서 찾음)
+            combined_properties = cost_code_rule_properties(member)
 
             cost_codes_on_member = member.cost_codes.all()
             if not cost_codes_on_member:
@@ -2608,16 +2298,16 @@ def create_cost_items_auto_view(request, project_id):
                     cost_code=cost_code,
                     defaults={'is_active': True}  # ← is_active 필드 추가
                 )
-                
+            
                 if created: created_count += 1
                 else: updated_count += 1
-                
+            
                 script_to_use = None
                 if item.quantity_mapping_expression and isinstance(item.quantity_mapping_expression, dict) and item.quantity_mapping_expression:
                     script_to_use = item.quantity_mapping_expression
                 else:
                     for rule in rules:
-                        if rule.target_cost_code.code == cost_code.code and evaluate_conditions(combined_properties, rule.conditions):
+                        if rule.target_cost_code.code == cost_code.code and rule_matches(rule, combined_properties):
                             script_to_use = rule.quantity_mapping_script
                             break
 
@@ -2674,16 +2364,27 @@ def create_cost_items_auto_view(request, project_id):
 
                 valid_item_ids.add(item.id)
 
-        deletable_items = CostItem.objects.filter(project=project, quantity_member__isnull=False).exclude(id__in=valid_item_ids)
-        deleted_count, _ = deletable_items.delete()
+    deletable_items = CostItem.objects.filter(project=project, quantity_member__isnull=False).exclude(id__in=valid_item_ids)
+    # 범위가 주어지면 해당 부재의 산출항목만 삭제 대상
+    deleted_count = 0
+    for scoped_deletable in iter_scoped(deletable_items, member_ids, field='quantity_member_id'):
+        deleted_count += scoped_deletable.delete()[0]
 
-        # ▼▼▼ [수정] 룰셋 유무에 따라 다른 메시지 표시 ▼▼▼
-        if has_rules:
-            message = f'룰셋/개별 맵핑식을 적용하여 {created_count}개 항목 생성, {updated_count}개 업데이트, {deleted_count}개 삭제했습니다.'
-        else:
-            message = f'할당된 공사코드 기준으로 {created_count}개 항목 생성, {updated_count}개 업데이트, {deleted_count}개 삭제했습니다. (공사코드 룰셋이 없어 수량은 0으로 설정됨)'
-        # ▲▲▲ [수정] 여기까지 ▲▲▲
-        return JsonResponse({'status': 'success', 'message': message})
+    # ▼▼▼ [수정] 룰셋 유무에 따라 다른 메시지 표시 ▼▼▼
+    if has_rules:
+        message = f'룰셋/개별 맵핑식을 적용하여 {created_count}개 항목 생성, {updated_count}개 업데이트, {deleted_count}개 삭제했습니다.'
+    else:
+        message = f'할당된 공사코드 기준으로 {created_count}개 항목 생성, {updated_count}개 업데이트, {deleted_count}개 삭제했습니다. (공사코드 룰셋이 없어 수량은 0으로 설정됨)'
+    # ▲▲▲ [수정] 여기까지 ▲▲▲
+    return {'status': 'success', 'message': message, 'dirty': {'cost_items': valid_item_ids}}
+
+@require_http_methods(["POST"])
+@records_project_change(*CI_CHANGES)
+def create_cost_items_auto_view(request, project_id):
+    try:
+        project = Project.objects.get(id=project_id)
+        result = run_cost_items_auto(project)
+        return JsonResponse(stage_response(result))
 
     except Project.DoesNotExist:
         return JsonResponse({'status': 'error', 'message': '프로젝트를 찾을 수 없습니다.'}, status=404)
@@ -2691,49 +2392,6 @@ def create_cost_items_auto_view(request, project_id):
         import traceback
         return JsonResponse({'status': 'error', 'message': f'자동 생성 중 오류 발생: {str(e)}', 'details': traceback.format_exc()}, status=500)
 
-def evaluate_member_properties_expression(expression, context_data):
-    """
-    '{Name}' 또는 '{BIM원본.Category}'와 같은 표현식을 주어진 데이터 컨텍스트에서 평가합니다.
-    [수정됨] QuantityMember.properties 뿐만 아니라, combined_properties 전체를 사용합니다.
-    """
-    if not isinstance(expression, str):
-        return expression
-    
-    print(f"  [DEBUG] 표현식 평가 시작: '{expression}'")
-
-    temp_expression = expression
-    placeholders = re.findall(r'\{([^}]+)\}', temp_expression)
-    
-    for placeholder in set(placeholders):
-        # [핵심 수정] context_data (combined_properties)에서 직접 값을 찾습니다.
-        value = context_data.get(placeholder)
-        
-        print(f"    > 플레이스홀더: '{{{placeholder}}}', 찾은 값: '{value}' (타입: {type(value).__name__})")
-        
-        if value is not None:
-            # 값이 숫자인지 확인하고, 문자열이면 따옴표로 감싸줍니다.
-            replacement = str(value) if is_numeric(value) else f'"{str(value)}"'
-            temp_expression = temp_expression.replace(f'{{{placeholder}}}', replacement)
-        else:
-            # 해당 속성이 없으면 빈 문자열로 처리하여 문자열 조합에 사용될 수 있도록 함
-            # 예: "{층}F" -> "F"가 아닌 ""가 되도록
-            temp_expression = temp_expression.replace(f'{{{placeholder}}}', '""')
-            print(f"    > 경고: context_data에서 '{placeholder}' 키를 찾을 수 없습니다. 빈 문자열로 처리합니다.")
-            
-    try:
-        # eval의 위험성을 줄이기 위해 사용 가능한 내장 함수를 제한합니다.
-        safe_dict = {'__builtins__': {'abs': abs, 'round': round, 'max': max, 'min': min, 'len': len, 'str': str, 'int': int, 'float': float}}
-        
-        print(f"    > 최종 평가식: '{temp_expression}'")
-        evaluated_result = eval(temp_expression, safe_dict)
-        print(f"    > 평가 결과: '{evaluated_result}'")
-        
-        return evaluated_result
-    except Exception as e:
-        # eval 실패 시, 단순 문자열 조합 결과일 수 있으므로 temp_expression을 그대로 반환
-        print(f"    > eval() 오류 발생: {e}. 표현식을 문자열 조합으로 간주하고 결과를 반환합니다.")
-        return temp_expression
-
 def get_property_value(instance, property_path, instance_type):
     """
     점(.)으로 구분된 경로를 사용하여 인스턴스의 속성 값을 가져오는 헬퍼 함수
@@ -2778,71 +2436,45 @@ def get_property_value(instance, property_path, instance_type):
     
     return current_object
 
-@require_http_methods(["POST"])
-def apply_assignment_rules_view(request, project_id):
-    print("\n[DEBUG] --- '할당 룰셋 일괄적용' API 요청 수신 ---")
-    try:
-        project = Project.objects.get(id=project_id)
-        
-        # [수정] list() 제거 및 QuerySet으로 유지
-        # ▼▼▼ [수정] is_active=True 필터 추가 (비활성화된 부재 제외) ▼▼▼
-        members_qs = QuantityMember.objects.filter(project=project, is_active=True).select_related('raw_element', 'member_mark', 'classification_tag').prefetch_related('cost_codes', 'space_classifications')
-        # ▲▲▲ [수정] 여기까지 ▲▲▲
-        
-        mark_rules = list(MemberMarkAssignmentRule.objects.filter(project=project).order_by('priority'))
-        cost_code_rules = list(CostCodeAssignmentRule.objects.filter(project=project).order_by('priority'))
-        dynamic_space_rules = list(SpaceAssignmentRule.objects.filter(project=project).order_by('priority'))
-
-        print(f"[DEBUG] {members_qs.count()}개의 수량산출부재에 대해 룰셋 적용을 시작합니다.")
-        print(f"  > 적용할 일람부호 룰셋: {len(mark_rules)}개")
-        print(f"  > 적용할 공사코드 룰셋: {len(cost_code_rules)}개")
-        print(f"  > 적용할 동적 공간 룰셋: {len(dynamic_space_rules)}개")
-
-        updated_mark_count = 0
-        updated_cost_code_count = 0
-        updated_space_count = 0
-
-        # [수정] iterator를 사용하여 순회
-        for member in members_qs.iterator(chunk_size=500):
+def run_assignment_rules(project, member_ids=None):
+    """
+    할당 룰셋(일람부호/공사코드) 일괄적용 본문 (apply_assignment_rules_view, 산출 파이프라인 공용)
+    member_ids를 주면 해당 수량산출부재에만 적용합니다. (None이면 프로젝트 전체)
+    'dirty'에는 적용 대상이었던 수량산출부재 id가 담깁니다.
+    """
+    # [수정] list() 제거 및 QuerySet으로 유지
+    # ▼▼▼ [수정] is_active=True 필터 추가 (비활성화된 부재 제외) ▼▼▼
+    members_qs = QuantityMember.objects.filter(project=project, is_active=True).select_related('raw_element', 'member_mark', 'classification_tag').prefetch_related('cost_codes', 'space_classifications')
+    # ▲▲▲ [수정] 여기까지 ▲▲▲
+    
+    mark_rules = list(MemberMarkAssignmentRule.objects.filter(project=project).order_by('priority'))
+    cost_code_rules = list(CostCodeAssignmentRule.objects.filter(project=project).order_by('priority'))
+    dynamic_space_rules = list(SpaceAssignmentRule.objects.filter(project=project).order_by('priority'))
+
+    print(f"[DEBUG] {members_qs.count() if member_ids is None else len(member_ids)}개의 수량산출부재에 대해 룰셋 적용을 시작합니다.")
+    print(f"  > 적용할 일람부호 룰셋: {len(mark_rules)}개")
+    print(f"  > 적용할 공사코드 룰셋: {len(cost_code_rules)}개")
+    print(f"  > 적용할 동적 공간 룰셋: {len(dynamic_space_rules)}개")
+
+    updated_mark_count = 0
+    updated_cost_code_count = 0
+    updated_space_count = 0
+    processed_ids = set()
+
+    # [수정] iterator를 사용하여 순회 (범위가 주어지면 id 배치별로 조회)
+    for scoped_members_qs in iter_scoped(members_qs, member_ids):
+        for member in scoped_members_qs.iterator(chunk_size=500):
+            processed_ids.add(member.id)
             # ... (이하 내부 로직은 대부분 동일) ...
-            combined_properties = member.properties.copy() if member.properties else {}
-            combined_properties['Name'] = member.name
-            combined_properties['name'] = member.name  # 'name' 속성도 추가
-
-            if member.raw_element and member.raw_element.raw_data:
-                raw_data = member.raw_element.raw_data
-                # BIM 속성들을 올바른 키 이름으로 저장
-                # 1. Attributes (raw_data의 직접 속성) - 키 이름 그대로 저장
-                for k, v in raw_data.items():
-                    if k not in ['Parameters', 'TypeParameters'] and not isinstance(v, (dict, list)):
-                        combined_properties[k] = v  # 예: 'IfcClass', 'Name', 'ElementId' 등
-
-                # 2. Parameters - 'Parameters.{k}' 형태로 저장
-                if 'Parameters' in raw_data and isinstance(raw_data['Parameters'], dict):
-                    for k, v in raw_data['Parameters'].items():
-                        combined_properties[f'Parameters.{k}'] = v
-
-                # 3. TypeParameters - 'TypeParameters.{k}' 형태로 저장
-                if 'TypeParameters' in raw_data and isinstance(raw_data['TypeParameters'], dict):
-                    for k, v in raw_data['TypeParameters'].items():
-                        combined_properties[f'TypeParameters.{k}'] = v
-
-            if member.classification_tag:
-                combined_properties['classification_tag'] = member.classification_tag.name
-                combined_properties['classification_tag_name'] = member.classification_tag.name
-            if member.member_mark:
-                combined_properties['member_mark_name'] = member.member_mark.mark
-                # ▼▼▼ [추가] 일람부호 속성을 대괄호 형태로 추가하여 조건에서 참조 가능하게 함 ▼▼▼
-                if member.member_mark.properties and isinstance(member.member_mark.properties, dict):
-                    for k, v in member.member_mark.properties.items():
-                        combined_properties[f'[{k}]'] = v
-                # ▲▲▲ [추가] 여기까지 ▲▲▲
+            # 부재 속성, Name, raw_data 속성, Parameters.*, TypeParameters.*, classification_tag(_name),
+            # member_mark_name, [일람부호 속성] (룰/맵핑식이 참조하는 키만 원본에서 조회)
+            combined_properties = member_rule_properties(member)
 
             # --- 일람부호 할당 로직 ---
             mark_expr = member.member_mark_expression
             if not mark_expr:
                 for rule in mark_rules:
-                    if evaluate_conditions(combined_properties, rule.conditions):
+                    if rule_matches(rule, combined_properties):
                         mark_expr = rule.mark_expression
                         break
             
@@ -2856,10 +2488,7 @@ def apply_assignment_rules_view(request, project_id):
                         updated_mark_count += 1
 
                         # ▼▼▼ [추가] 일람부호가 변경되었으므로 combined_properties 업데이트 ▼▼▼
-                        combined_properties['member_mark_name'] = mark_obj.mark
-                        if mark_obj.properties and isinstance(mark_obj.properties, dict):
-                            for k, v in mark_obj.properties.items():
-                                combined_properties[f'[{k}]'] = v
+                        set_member_rule_mark(combined_properties, mark_obj)
                         # ▲▲▲ [추가] 여기까지 ▲▲▲
 
             # --- 공사코드 할당 로직 ---
@@ -2867,7 +2496,7 @@ def apply_assignment_rules_view(request, project_id):
             if not cost_code_exprs_list:
                 matching_expressions = []
                 for rule in cost_code_rules:
-                    if evaluate_conditions(combined_properties, rule.conditions):
+                    if rule_matches(rule, combined_properties):
                         matching_expressions.append(rule.cost_code_expressions)
                 cost_code_exprs_list = matching_expressions
 
@@ -2900,18 +2529,27 @@ def apply_assignment_rules_view(request, project_id):
                 if codes_changed:
                     updated_cost_code_count += 1
         
-        # --- 동적 공간분류 할당 로직 (별도 처리) ---
-        if dynamic_space_rules:
-            all_spaces = list(SpaceClassification.objects.filter(project=project).select_related('source_element'))
-            temp_updated_space_count = 0
-            # 이 부분은 이미 member를 순회하는 로직이 아니므로, 그대로 두거나 추가 최적화가 필요할 수 있음
-            # 현재는 그대로 유지하여 기능의 정확성을 보장
-            for rule in dynamic_space_rules:
-                # ... (이하 로직은 기존과 동일) ...
-                pass # Placeholder for existing logic
-
-        message = f'룰셋 적용 완료! 일람부호 {updated_mark_count}개, 공사코드 {updated_cost_code_count}개, 공간분류 {updated_space_count}개 부재가 업데이트되었습니다.'
-        return JsonResponse({'status': 'success', 'message': message})
+    # --- 동적 공간분류 할당 로직 (별도 처리) ---
+    if dynamic_space_rules:
+        all_spaces = list(SpaceClassification.objects.filter(project=project).select_related('source_element'))
+        temp_updated_space_count = 0
+        # 이 부분은 이미 member를 순회하는 로직이 아니므로, 그대로 두거나 추가 최적화가 필요할 수 있음
+        # 현재는 그대로 유지하여 기능의 정확성을 보장
+        for rule in dynamic_space_rules:
+            # ... (이하 로직은 기존과 동일) ...
+            pass # Placeholder for existing logic
+
+    message = f'룰셋 적용 완료! 일람부호 {updated_mark_count}개, 공사코드 {updated_cost_code_count}개, 공간분류 {updated_space_count}개 부재가 업데이트되었습니다.'
+    return {'status': 'success', 'message': message, 'dirty': {'members': processed_ids}}
+
+@require_http_methods(["POST"])
+@records_project_change(*QM_CHANGES)
+def apply_assignment_rules_view(request, project_id):
+    print("\n[DEBUG] --- '할당 룰셋 일괄적용' API 요청 수신 ---")
+    try:
+        project = Project.objects.get(id=project_id)
+        result = run_assignment_rules(project)
+        return JsonResponse(stage_response(result))
 
     except Project.DoesNotExist:
         return JsonResponse({'status': 'error', 'message': '프로젝트를 찾을 수 없습니다.'}, status=404)
@@ -2920,74 +2558,128 @@ def apply_assignment_rules_view(request, project_id):
         return JsonResponse({'status': 'error', 'message': f'룰셋 적용 중 오류 발생: {str(e)}', 'details': traceback.format_exc()}, status=500)
 
 
-@require_http_methods(["POST"])
-def apply_property_mapping_rules_view(request, project_id):
+def run_property_mapping_rules(project, member_ids=None, engine='auto'):
     """
-    속성 맵핑 룰셋을 기존의 모든 수량산출부재에 일괄 적용합니다.
-    각 부재의 raw_element와 classification_tag를 기반으로 룰셋을 적용하여 properties를 업데이트합니다.
+    속성 룰셋 일괄적용 본문 (apply_property_mapping_rules_view, 산출 파이프라인 공용)
+    member_ids를 주면 해당 수량산출부재에만 적용합니다. (None이면 프로젝트 전체)
+    'dirty'에는 적용 대상이었던 수량산출부재 id가 담깁니다.
     """
-    print("\n[DEBUG] --- '속성 룰셋 일괄적용' API 요청 수신 ---")
-    try:
-        project = Project.objects.get(id=project_id)
+    # 속성 맵핑 룰셋 조회
+    rules = PropertyMappingRule.objects.filter(project=project).order_by('priority').select_related('target_tag')
 
-        # 속성 맵핑 룰셋 조회
-        rules = PropertyMappingRule.objects.filter(project=project).order_by('priority').select_related('target_tag')
+    # 활성화된 수량산출부재 중 raw_element가 있는 것만 조회
+    members_qs = QuantityMember.objects.filter(
+        project=project,
+        is_active=True,
+        raw_element__isnull=False
+    ).select_related('raw_element', 'classification_tag')
 
-        # 활성화된 수량산출부재 중 raw_element가 있는 것만 조회
-        members_qs = QuantityMember.objects.filter(
-            project=project,
-            is_active=True,
-            raw_element__isnull=False
-        ).select_related('raw_element', 'classification_tag')
+    if not rules.exists():
+        return {'status': 'info', 'message': '적용할 속성 맵핑 룰셋이 없습니다.', 'dirty': {'members': set(member_ids or ())}}
 
-        if not rules.exists():
-            return JsonResponse({'status': 'info', 'message': '적용할 속성 맵핑 룰셋이 없습니다.'})
+    member_count = members_qs.count() if member_ids is None else len(member_ids)
+    rules = list(rules)
+    print(f"[DEBUG] {member_count}개의 수량산출부재에 대해 {len(rules)}개의 속성 룰셋 적용을 시작합니다.")
 
-        print(f"[DEBUG] {members_qs.count()}개의 수량산출부재에 대해 {rules.count()}개의 속성 룰셋 적용을 시작합니다.")
-
-        updated_count = 0
+    updated_count = 0
+    processed_ids = set()
 
+    # ▼▼▼ [수정] 부재별 적용 룰 계산: columnar(부재 × 룰 행렬) 또는 부재별 평가 ▼▼▼
+    def iter_row_matches():
         # 각 수량산출부재에 대해 룰셋 적용
-        for member in members_qs.iterator(chunk_size=500):
-            if not member.raw_element or not member.raw_element.raw_data:
-                continue
+        for scoped_members_qs in iter_scoped(members_qs, member_ids):
+            for member in scoped_members_qs.iterator(chunk_size=500):
+                processed_ids.add(member.id)
+                if not member.raw_element or not member.raw_element.raw_data:
+                    continue
 
-            # 개별 맵핑식이 있으면 룰셋을 적용하지 않음
-            if member.mapping_expression and isinstance(member.mapping_expression, dict) and member.mapping_expression:
-                print(f"[DEBUG] 부재 {member.id}는 개별 맵핑식이 있어 건너뜁니다.")
-                continue
+                # 개별 맵핑식이 있으면 룰셋을 적용하지 않음
+                if member.mapping_expression and isinstance(member.mapping_expression, dict) and member.mapping_expression:
+                    print(f"[DEBUG] 부재 {member.id}는 개별 맵핑식이 있어 건너뜁니다.")
+                    continue
 
-            # 이 부재의 분류 태그와 일치하는 룰셋 찾기
-            matching_rule = None
-            for rule in rules:
-                # 분류 태그가 일치하는지 확인
-                if member.classification_tag and rule.target_tag_id == member.classification_tag.id:
-                    # 조건 평가
-                    if evaluate_conditions(member.raw_element.raw_data, rule.conditions):
-                        matching_rule = rule
-                        break
+                # 이 부재의 분류 태그와 일치하는 룰셋 찾기
+                matching_rule = None
+                for rule in rules:
+                    # 분류 태그가 일치하는지 확인
+                    if member.classification_tag and rule.target_tag_id == member.classification_tag.id:
+                        # 조건 평가
+                        if rule_matches(rule, member.raw_element.raw_data):
+                            matching_rule = rule
+                            break
+                yield member, matching_rule
+
+    def iter_columnar_matches():
+        row_member_ids = []
+        member_tag_ids = []
+        no_tag = object()   # 분류 태그가 없는 부재는 어떤 룰과도 일치하지 않음
+        table = RuleColumnTable([rule.conditions for rule in rules])
+        for scoped_members_qs in iter_scoped(members_qs, member_ids):
+            member_rows = scoped_members_qs.values_list(
+                'id', 'classification_tag_id', 'mapping_expression', 'raw_element__raw_data'
+            ).iterator(chunk_size=2000)
+            for member_id, tag_id, mapping_expression, raw_data in member_rows:
+                processed_ids.add(member_id)
+                if not raw_data:
+                    continue
+                if mapping_expression and isinstance(mapping_expression, dict):
+                    print(f"[DEBUG] 부재 {member_id}는 개별 맵핑식이 있어 건너뜁니다.")
+                    continue
+                row_member_ids.append(member_id)
+                member_tag_ids.append(no_tag if tag_id is None else tag_id)
+                table.append(raw_data)
+
+        # (부재 × 룰) 조건 행렬 & 분류 태그 일치 행렬 -> 우선순위가 가장 높은(첫 번째) 룰 선택
+        tag_matrix = np.array(member_tag_ids, dtype=object)[:, None] == np.array([rule.target_tag_id for rule in rules], dtype=object)[None, :]
+        eligible = table.match_matrix() & tag_matrix.astype(bool)
+        first_rule_index = eligible.argmax(axis=1)
+        matched_rules = {row_member_ids[i]: rules[first_rule_index[i]] for i in np.flatnonzero(eligible.any(axis=1))}
+        print(f"[DEBUG] columnar 평가 완료: {len(row_member_ids)}개 부재 × {len(rules)}개 룰, 적용 대상 {len(matched_rules)}개")
+
+        # 룰이 적용되는 부재만 다시 조회하여 속성 계산
+        matched_ids = list(matched_rules)
+        for start in range(0, len(matched_ids), 500):
+            for member in members_qs.filter(id__in=matched_ids[start:start + 500]):
+                yield member, matched_rules[member.id]
+
+    member_matches = iter_columnar_matches() if use_columnar_rules(engine, member_count) else iter_row_matches()
+    # ▲▲▲ [수정] 여기까지 ▲▲▲
 
-            # 일치하는 룰셋이 있으면 속성 계산 및 업데이트
-            if matching_rule:
-                new_properties = calculate_properties_from_rule(member.raw_element.raw_data, matching_rule.mapping_script)
-
-                # 잠긴 속성 보존: locked_properties에 있는 속성은 기존 값 유지
-                locked_props = member.locked_properties if member.locked_properties else []
-                if locked_props and member.properties:
-                    for locked_key in locked_props:
-                        if locked_key in member.properties:
-                            new_properties[locked_key] = member.properties[locked_key]
-
-                # 기존 properties와 다르면 업데이트
-                if member.properties != new_properties:
-                    member.properties = new_properties
-                    member.save(update_fields=['properties'])
-                    updated_count += 1
-                    print(f"[DEBUG] 부재 {member.id}의 속성을 업데이트했습니다. (잠긴 속성 {len(locked_props)}개 보존)")
+    for member, matching_rule in member_matches:
+        # 일치하는 룰셋이 있으면 속성 계산 및 업데이트
+        if matching_rule:
+            new_properties = calculate_properties_from_rule(member.raw_element.raw_data, matching_rule.mapping_script)
+
+            # 잠긴 속성 보존: locked_properties에 있는 속성은 기존 값 유지
+            locked_props = member.locked_properties if member.locked_properties else []
+            if locked_props and member.properties:
+                for locked_key in locked_props:
+                    if locked_key in member.properties:
+                        new_properties[locked_key] = member.properties[locked_key]
+
+            # 기존 properties와 다르면 업데이트
+            if member.properties != new_properties:
+                member.properties = new_properties
+                member.save(update_fields=['properties'])
+                updated_count += 1
+                print(f"[DEBUG] 부재 {member.id}의 속성을 업데이트했습니다. (잠긴 속성 {len(locked_props)}개 보존)")
 
-        message = f'속성 룰셋 적용 완료! {updated_count}개 부재의 속성이 업데이트되었습니다.'
-        print(f"[DEBUG] {message}")
-        return JsonResponse({'status': 'success', 'message': message})
+    message = f'속성 룰셋 적용 완료! {updated_count}개 부재의 속성이 업데이트되었습니다.'
+    print(f"[DEBUG] {message}")
+    return {'status': 'success', 'message': message, 'dirty': {'members': processed_ids}}
+
+@require_http_methods(["POST"])
+@records_project_change(*QM_CHANGES)
+def apply_property_mapping_rules_view(request, project_id):
+    """
+    속성 맵핑 룰셋을 기존의 모든 수량산출부재에 일괄 적용합니다.
+    각 부재의 raw_element와 classification_tag를 기반으로 룰셋을 적용하여 properties를 업데이트합니다.
+    """
+    print("\n[DEBUG] --- '속성 룰셋 일괄적용' API 요청 수신 ---")
+    try:
+        project = Project.objects.get(id=project_id)
+        result = run_property_mapping_rules(project, engine=request.GET.get('engine', 'auto'))
+        return JsonResponse(stage_response(result))
 
     except Project.DoesNotExist:
         return JsonResponse({'status': 'error', 'message': '프로젝트를 찾을 수 없습니다.'}, status=404)
@@ -3783,7 +3475,7 @@ def apply_space_classification_rules_view(request, project_id):
                     if parent_key:
                         parent_spaces_map[parent_key] = parent_space
             
-            matching_elements = [elem for elem in elements if evaluate_conditions(elem.raw_data, rule.bim_object_filter)]
+            matching_elements = [elem for elem in elements if rule_matches(rule, elem.raw_data, 'bim_object_filter')]
 
             for element in matching_elements:
                 parent_space = None
@@ -4471,6 +4163,9 @@ def export_project(request, project_id):
             'UnitPriceType': UnitPriceType.objects.filter(project=project), # 단가 구분
             'UnitPrice': UnitPrice.objects.filter(project=project),         # 개별 단가
             'AIModel': AIModel.objects.filter(project=project),             # AI 모델
+            'GeometryBlob': GeometryBlob.objects.filter(                    # 메쉬 바이너리 (base64로 직렬화됨)
+                Q(raw_elements__project=project) | Q(split_elements__project=project)
+            ).distinct(),
             'RawElement': RawElement.objects.filter(project=project),
             'SplitElement': SplitElement.objects.filter(project=project),   # 분할 객체
             'SpaceClassification': SpaceClassification.objects.filter(project=project),
@@ -4551,6 +4246,50 @@ def export_project(request, project_id):
         return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
 
 
+# ▼▼▼ [추가] 3D 모델 GLB 내보내기 (메쉬 인스턴싱, viewer_revision별 캐시) ▼▼▼
+@require_http_methods(["GET", "POST"])
+def export_project_glb_view(request, project_id):
+    """
+    프로젝트의 3D 모델을 단일 GLB 파일로 내보냅니다.
+    - GET ?element_ids=id1,id2 또는 POST {"element_ids": [...]}로 일부 객체만 내보낼 수 있습니다.
+    - 같은 메쉬는 한 번만 저장되고 객체마다 node로 배치되며, node.extras에 element_id/unique_id가 들어갑니다.
+    """
+    print(f"\n[DEBUG][export_project_glb] --- GLB 내보내기 시작 (Project ID: {project_id}) ---")
+    # 요청 검증만 400으로 처리 (GLB 생성 중 오류는 아래에서 500)
+    try:
+        if request.method == 'POST':
+            body = json.loads(request.body or b'{}')
+            element_ids = (body.get('element_ids') if isinstance(body, dict) else None) or []
+        else:
+            element_ids = [i for i in request.GET.get('element_ids', '').split(',') if i]
+        if not isinstance(element_ids, list):
+            raise ValueError('element_ids는 목록이어야 합니다.')
+        element_ids = [str(uuid.UUID(str(element_id))) for element_id in element_ids]
+    except (ValueError, TypeError, AttributeError) as e:
+        print(f"[ERROR][export_project_glb] 잘못된 요청: {e}")
+        return JsonResponse({'status': 'error', 'message': f'잘못된 element_ids 입니다: {e}'}, status=400)
+
+    try:
+        project = Project.objects.get(id=project_id)
+        path, stats = export_project_glb(project.id, element_ids or None)
+        if stats is None:
+            print(f"[DEBUG][export_project_glb] 캐시된 GLB 사용: {path}")
+        else:
+            print(f"[DEBUG][export_project_glb] GLB 생성 완료: node {stats['nodes']}개, mesh {stats['meshes']}개 "
+                  f"(인스턴스 {stats['instanced_nodes']}개), 버퍼 {stats['bin_bytes']} bytes")
+
+        safe_name = "".join(c if c.isalnum() or c in ['-', '_'] else '_' for c in project.name) or 'project'
+        return FileResponse(open(path, 'rb'), as_attachment=True, filename=f'{safe_name}.glb', content_type='model/gltf-binary')
+    except Project.DoesNotExist:
+        print(f"[ERROR][export_project_glb] 프로젝트를 찾을 수 없습니다 (ID: {project_id}).")
+        return JsonResponse({'status': 'error', 'message': 'Project not found.'}, status=404)
+    except Exception as e:
+        print(f"[ERROR][export_project_glb] GLB 내보내기 중 예외 발생: {e}")
+        import traceback
+        print(traceback.format_exc())
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
+# ▲▲▲ [추가] 여기까지 ▲▲▲
+
 def export_management_data(request, project_id):
     """
     프로젝트의 관리 데이터만 내보냅니다 (BIM 데이터 제외).
@@ -5164,6 +4903,29 @@ def import_project(request):
             'CostItem': ['activities'],  # 추가
         }
 
+        # GeometryBlob은 프로젝트에 종속되지 않는 content-addressed 데이터이므로 digest(PK) 그대로 먼저 가져옴
+        geometry_blob_data = import_data.get('GeometryBlob', [])
+        imported_blob_digests = set()
+        if geometry_blob_data:
+            blobs_to_create = []
+            for data in geometry_blob_data:
+                blob_fields = data.get('fields', {})
+                try:
+                    blobs_to_create.append(GeometryBlob(
+                        digest=data.get('pk'),
+                        vertices=base64.b64decode(blob_fields.get('vertices') or ''),
+                        faces=base64.b64decode(blob_fields.get('faces') or ''),
+                        vertex_count=blob_fields.get('vertex_count', 0),
+                        face_count=blob_fields.get('face_count', 0),
+                    ))
+                except (TypeError, base64.binascii.Error) as e:
+                    print(f"[ERROR][import_project]     - GeometryBlob(digest={data.get('pk')}) Base64 디코딩 실패: {e}. 건너뜁니다.")
+            GeometryBlob.objects.bulk_create(blobs_to_create, ignore_conflicts=True, batch_size=500)
+            imported_blob_digests = set(
+                GeometryBlob.objects.filter(digest__in=[b.digest for b in blobs_to_create]).values_list('digest', flat=True)
+            )
+            print(f"[DEBUG][import_project]   - GeometryBlob {len(imported_blob_digests)}개 준비 완료.")
+
         # 각 모델 데이터 처리
         m2m_data_to_process = {name: [] for name in model_import_order} # M2M 처리를 위한 임시 저장소
         space_parent_data = {} # SpaceClassification 부모 관계 처리를 위한 임시 저장소
@@ -5285,6 +5047,19 @@ def import_project(request):
                                 print(f"[WARN][import_project]     - UnitPrice(old_pk={old_pk_str}): '{field_name}' 값을 Decimal로 변환 실패 ({fields[field_name]}). 0.0으로 설정.")
                                 fields[field_name] = Decimal('0.0')
 
+                # RawElement digest 처리 (bulk_create는 save()를 호출하지 않으므로 직접 계산)
+                if model_name == 'RawElement' and not fields.get('raw_data_digest'):
+                    fields['raw_data_digest'] = compute_raw_data_digest(fields.get('raw_data'))
+
+                # 동기화 세대는 원본 프로젝트 기준이므로 초기화 (다음 동기화에서 정상적으로 정리되도록)
+                if model_name == 'RawElement':
+                    fields['sync_generation'] = 0
+
+                # GeometryBlob 참조 처리 (digest가 PK이므로 매핑 없이 그대로 연결)
+                if model_name in ('RawElement', 'SplitElement') and 'geometry_blob' in fields:
+                    blob_digest = fields.pop('geometry_blob')
+                    fields['geometry_blob_id'] = blob_digest if blob_digest in imported_blob_digests else None
+
                 # 객체 생성 준비
                 try:
                     obj_instance = ModelClass(**fields)
@@ -5413,6 +5188,9 @@ def import_project(request):
             print(f"  [DEBUG][import_project] '{model_name}' 모델 M2M 관계 복원 완료.")
         print(f"[DEBUG][import_project]   - 총 {m2m_relations_set_count}개의 M2M 관계 설정 완료, {m2m_relations_skipped_count}개 건너뜀/실패.")
 
+        # 덮어쓴 프로젝트는 변경분으로 표현할 수 없으므로 전체 변경으로 기록 (뷰어 스냅샷 무효화 포함)
+        ProjectChange.record(target_project.id, ProjectChange.KIND_RESET)
+
         # --- 가져오기 완료 ---
         result_message = f"프로젝트 '{target_project.name}'(으)로 데이터를 성공적으로 가져왔습니다(덮어쓰기 완료)."
         if created_new_project:
@@ -5696,6 +5474,7 @@ def unit_prices_api(request, project_id, cost_code_id, price_id=None):
             return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
 # ▼▼▼ [추가] BOQ 항목들의 단가 기준 일괄 업데이트 API ▼▼▼
 @require_http_methods(["POST"])
+@records_project_change(*CI_CHANGES)
 @transaction.atomic
 def update_cost_item_unit_price_type(request, project_id):
     """
@@ -6032,8 +5811,8 @@ def send_training_progress(project_id, task_id, progress_data):
     """WebSocket을 통해 특정 프로젝트의 학습 진행률 브로드캐스트"""
     print(f"[DEBUG][WebSocket Send] Sending progress for task {task_id}: {progress_data}")
     channel_layer = get_channel_layer()
-    async_to_sync(channel_layer.group_send)(
-        FrontendConsumer.frontend_group_name,
+    async_to_sync(send_to_frontend)(
+        channel_layer, project_id, 'training',
         {
             'type': 'broadcast_training_progress', # consumers.py에 핸들러 추가 필요
             'project_id': str(project_id),
@@ -6662,6 +6441,9 @@ def delete_all_split_elements(request, project_id):
 
         # CASCADE로 연관된 QuantityMember, CostItem도 함께 삭제됨
         deleted_count, deleted_details = SplitElement.objects.filter(project=project).delete()
+        ProjectChange.record(project.id, ProjectChange.KIND_SPLITS)
+        ProjectChange.record(project.id, ProjectChange.KIND_QUANTITY_MEMBERS)
+        ProjectChange.record(project.id, ProjectChange.KIND_COST_ITEMS)
 
         print(f"[API][delete_all_split_elements] Deleted {deleted_count} split elements from project {project.name}")
         print(f"[API][delete_all_split_elements] Cascade deletion details: {deleted_details}")
@@ -7101,6 +6883,7 @@ def work_calendars_api(request, project_id, calendar_id=None):
 # ========================================================================
 
 @require_http_methods(["POST"])
+@records_project_change(*CI_CHANGES)
 def manage_cost_item_activities_api(request, project_id):
     """선택된 여러 산출항목에 대해 액티비티를 일괄 할당/제거하는 API"""
     try:
@@ -7165,6 +6948,7 @@ def manage_cost_item_activities_api(request, project_id):
 
 
 @require_http_methods(["POST"])
+@records_project_change(*CI_CHANGES)
 def clear_cost_item_activities_api(request, project_id):
     """선택된 산출항목들의 잠기지 않은 모든 액티비티를 제거하는 API"""
     try:
@@ -7191,6 +6975,7 @@ def clear_cost_item_activities_api(request, project_id):
 
 
 @require_http_methods(["POST"])
+@records_project_change(*CI_CHANGES)
 def toggle_cost_item_activity_lock_api(request, project_id):
     """특정 산출항목의 특정 액티비티 잠금 상태를 토글합니다."""
     try:
@@ -7238,6 +7023,7 @@ def toggle_cost_item_activity_lock_api(request, project_id):
 
 
 @require_http_methods(["POST"])
+@records_project_change(*CI_CHANGES)
 def apply_cost_item_activity_rules_api(request, project_id):
     """CostItem에 액티비티 할당 룰셋을 일괄 적용 (잠긴 액티비티는 보호)"""
     import sys
@@ -7283,62 +7069,18 @@ def apply_cost_item_activity_rules_api(request, project_id):
                 if str(activity.id) not in locked_ids:
                     cost_item.activities.remove(activity)
 
-            # 다단계 속성 접근을 위한 combined_properties 구성
-            combined_properties = {}
-
-            # 1. CostItem 자체 속성
-            combined_properties['CI.quantity'] = cost_item.quantity
-            if cost_item.description:
-                combined_properties['CI.description'] = cost_item.description
-
-            # 2. CostCode 속성
-            if cost_item.cost_code:
-                cc = cost_item.cost_code
-                combined_properties['CostCode.code'] = cc.code
-                combined_properties['CostCode.name'] = cc.name
-                if cc.detail_code:
-                    combined_properties['CostCode.detail_code'] = cc.detail_code
-                if cc.note:
-                    combined_properties['CostCode.note'] = cc.note
-
-            # 3. QuantityMember 속성
-            if cost_item.quantity_member:
-                qm = cost_item.quantity_member
-                combined_properties['QM.name'] = qm.name
-                if qm.properties:
-                    for k, v in qm.properties.items():
-                        combined_properties[f'QM.properties.{k}'] = v
-
-                # 4. MemberMark 속성
-                if qm.member_mark:
-                    mm = qm.member_mark
-                    combined_properties['MM.mark'] = mm.mark
-                    if mm.description:
-                        combined_properties['MM.description'] = mm.description
-                    if mm.properties:
-                        for k, v in mm.properties.items():
-                            combined_properties[f'MM.properties.{k}'] = v
-
-                # 5. RawElement (BIM 원본) 속성
-                if qm.raw_element and qm.raw_element.raw_data:
-                    raw_data = qm.raw_element.raw_data
-                    for k, v in raw_data.items():
-                        if k not in ['TypeParameters', 'Parameters'] and not isinstance(v, (dict, list)):
-                            combined_properties[f'BIM.Attributes.{k}'] = v
-                    # TypeParameters와 Parameters 포함
-                    for k, v in raw_data.get('TypeParameters', {}).items():
-                        combined_properties[f'BIM.TypeParameters.{k}'] = v
-                    for k, v in raw_data.get('Parameters', {}).items():
-                        combined_properties[f'BIM.Parameters.{k}'] = v
+            # 다단계 속성 접근을 위한 combined_properties (룰이 참조하는 키만 원본에서 조회)
+            # CI.*, CostCode.*, QM.*, MM.*, BIM.Attributes/TypeParameters/Parameters.*
+            combined_properties = ci_activity_rule_properties(cost_item)
 
             # 룰셋 적용 (조건에 맞는 모든 룰을 적용)
             for rule in activity_rules:
                 print(f"[DEBUG] Evaluating rule {rule.id} for CostItem {cost_item.id}", file=sys.stderr)
                 print(f"  > Rule conditions: {rule.conditions}", file=sys.stderr)
-                print(f"  > Available properties: {list(combined_properties.keys())}", file=sys.stderr)
                 sys.stderr.flush()
 
-                condition_result = evaluate_conditions(combined_properties, rule.conditions)
+                condition_result = rule_matches(rule, combined_properties)
+                print(f"  > Referenced properties: {combined_properties.resolved_keys()}", file=sys.stderr)
                 print(f"  > Condition result: {condition_result}", file=sys.stderr)
                 sys.stderr.flush()
 
@@ -7595,24 +7337,22 @@ def activity_objects_api(request, project_id, ao_id=None):
             return JsonResponse({'status': 'error', 'message': f'삭제 중 오류 발생: {str(e)}'}, status=500)
 
 
-@require_http_methods(["POST"])
-def create_activity_objects_auto_view(request, project_id):
-    """CostItem에 할당된 Activity를 기준으로 ActivityObject 자동 생성"""
-    print(f"[DEBUG][create_activity_objects_auto_view] ENTRY: project_id={project_id}")
-
-    try:
-        project = Project.objects.get(id=project_id)
-
-        # CostItem 중 activities가 할당된 것들을 찾음
-        cost_items = CostItem.objects.filter(
-            project=project,
-            is_active=True
-        ).prefetch_related('activities')
+def run_activity_objects_auto(project, cost_item_ids=None):
+    """
+    액티비티 객체 자동생성 본문 (create_activity_objects_auto_view, 산출 파이프라인 공용)
+    cost_item_ids를 주면 해당 산출항목의 액티비티 객체만 생성/재활성화합니다. (None이면 프로젝트 전체)
+    """
+    # CostItem 중 activities가 할당된 것들을 찾음
+    cost_items = CostItem.objects.filter(
+        project=project,
+        is_active=True
+    ).prefetch_related('activities')
 
-        created_count = 0
-        skipped_count = 0
+    created_count = 0
+    skipped_count = 0
 
-        for cost_item in cost_items:
+    for scoped_cost_items in iter_scoped(cost_items, cost_item_ids):
+        for cost_item in scoped_cost_items:
             activities = cost_item.activities.all()
 
             for activity in activities:
@@ -7653,14 +7393,25 @@ def create_activity_objects_auto_view(request, project_id):
                 created_count += 1
                 print(f"[DEBUG] Created ActivityObject for CI:{cost_item.id} + Activity:{activity.code}")
 
-        message = f"액티비티 객체 자동 생성 완료: {created_count}개 생성, {skipped_count}개 스킵"
-        print(f"[DEBUG] {message}")
-        return JsonResponse({
-            'status': 'success',
-            'message': message,
-            'created_count': created_count,
-            'skipped_count': skipped_count
-        })
+    message = f"액티비티 객체 자동 생성 완료: {created_count}개 생성, {skipped_count}개 스킵"
+    print(f"[DEBUG] {message}")
+    return {
+        'status': 'success',
+        'message': message,
+        'created_count': created_count,
+        'skipped_count': skipped_count,
+        'dirty': {},
+    }
+
+@require_http_methods(["POST"])
+def create_activity_objects_auto_view(request, project_id):
+    """CostItem에 할당된 Activity를 기준으로 ActivityObject 자동 생성"""
+    print(f"[DEBUG][create_activity_objects_auto_view] ENTRY: project_id={project_id}")
+
+    try:
+        project = Project.objects.get(id=project_id)
+        result = run_activity_objects_auto(project)
+        return JsonResponse(stage_response(result))
 
     except Project.DoesNotExist:
         return JsonResponse({'status': 'error', 'message': '프로젝트를 찾을 수 없습니다.'}, status=404)
@@ -7671,6 +7422,124 @@ def create_activity_objects_auto_view(request, project_id):
         return JsonResponse({'status': 'error', 'message': f'자동 생성 중 오류 발생: {str(e)}'}, status=500)
 
 
+# ▼▼▼ [추가] 산출 파이프라인 (분류 -> 수량산출부재 -> 속성 -> 할당 -> 산출항목 -> 액티비티 -> 액티비티 객체) ▼▼▼
+TAKEOFF_PIPELINE = TakeoffPipeline([
+    TakeoffStage(
+        'classification', '분류 룰셋 적용',
+        lambda project, scope, full: run_classification_rules(project, full_rebuild=full),
+    ),
+    TakeoffStage(
+        'quantity_members', '수량산출부재 자동생성',
+        lambda project, scope, full: run_quantity_members_auto(project, element_ids=scope),
+        consumes='elements', depends_on=('classification',),
+        rule_models=(PropertyMappingRule,),
+        full_on=(ProjectChange.KIND_TAGS, ProjectChange.KIND_RESET),
+    ),
+    TakeoffStage(
+        'property_mapping', '속성 맵핑 룰셋 적용',
+        lambda project, scope, full: run_property_mapping_rules(project, member_ids=scope),
+        consumes='members', depends_on=('quantity_members',),
+        rule_models=(PropertyMappingRule,),
+        full_on=(ProjectChange.KIND_SPLITS, ProjectChange.KIND_RESET),
+    ),
+    TakeoffStage(
+        'assignment', '일람부호/공사코드 할당',
+        lambda project, scope, full: run_assignment_rules(project, member_ids=scope),
+        consumes='members', depends_on=('property_mapping',),
+        rule_models=(MemberMarkAssignmentRule, CostCodeAssignmentRule, SpaceAssignmentRule, MemberMark),
+        full_on=(ProjectChange.KIND_SPLITS, ProjectChange.KIND_RESET),
+    ),
+    TakeoffStage(
+        'cost_items', '산출항목 자동생성',
+        lambda project, scope, full: run_cost_items_auto(project, member_ids=scope),
+        consumes='members', depends_on=('assignment',),
+        rule_models=(CostCodeRule, CostCode, MemberMark),
+        full_on=(ProjectChange.KIND_SPLITS, ProjectChange.KIND_RESET, ProjectChange.KIND_COST_ITEMS),
+    ),
+    TakeoffStage(
+        'activity_assignment', '액티비티 할당 룰셋 적용',
+        lambda project, scope, full: run_activity_assignment_rules(project, cost_item_ids=scope),
+        consumes='cost_items', depends_on=('cost_items',),
+        rule_models=(ActivityAssignmentRule, CostCode, MemberMark),
+        full_on=(ProjectChange.KIND_SPLITS, ProjectChange.KIND_RESET),
+    ),
+    TakeoffStage(
+        'activity_objects', '액티비티 객체 자동생성',
+        lambda project, scope, full: run_activity_objects_auto(project, cost_item_ids=scope),
+        consumes='cost_items', depends_on=('activity_assignment',),
+        full_on=(ProjectChange.KIND_SPLITS, ProjectChange.KIND_RESET),
+    ),
+])
+
+
+def send_pipeline_progress(project_id, job_id, progress):
+    """WebSocket으로 산출 파이프라인 진행 상태 브로드캐스트"""
+    channel_layer = get_channel_layer()
+    async_to_sync(send_to_frontend)(
+        channel_layer, project_id, 'progress',
+        {
+            'type': 'broadcast_pipeline_progress',
+            'project_id': str(project_id),
+            'job_id': job_id,
+            'progress': progress,
+        }
+    )
+
+
+@require_http_methods(["POST"])
+def start_takeoff_pipeline_api(request, project_id):
+    """
+    산출 파이프라인을 백그라운드에서 실행합니다. (?full=1 이면 모든 단계를 전체 재계산)
+    이미 실행 중이면 409와 실행 중인 job_id를 반환합니다.
+    """
+    print(f"[DEBUG][start_takeoff_pipeline_api] ENTRY: project_id={project_id}")
+    try:
+        project = Project.objects.get(id=project_id)
+        full = request.GET.get('full', '').lower() in ('1', 'true', 'yes')
+        job_id, started = start_pipeline_job(TAKEOFF_PIPELINE, project.id, full=full, notify=send_pipeline_progress)
+        if not started:
+            return JsonResponse({
+                'status': 'error',
+                'message': '산출 파이프라인이 이미 실행 중입니다.',
+                'job_id': job_id,
+            }, status=409)
+        return JsonResponse({
+            'status': 'success',
+            'message': '산출 파이프라인을 시작했습니다. 진행 상태는 실시간으로 업데이트됩니다.',
+            'job_id': job_id,
+        })
+    except Project.DoesNotExist:
+        return JsonResponse({'status': 'error', 'message': '프로젝트를 찾을 수 없습니다.'}, status=404)
+    except Exception as e:
+        print(f"[ERROR][start_takeoff_pipeline_api] Error: {e}")
+        return JsonResponse({'status': 'error', 'message': f'파이프라인 시작 중 오류 발생: {str(e)}'}, status=500)
+
+
+@require_http_methods(["GET"])
+def takeoff_pipeline_status_api(request, project_id, job_id=None):
+    """
+    산출 파이프라인 작업 상태를 반환합니다.
+    job_id가 없으면 실행 중인 작업과 마지막 실행 보고서(단계별 소요 시간)를 반환합니다.
+    """
+    try:
+        project = Project.objects.get(id=project_id)
+        if job_id:
+            job = pipeline_jobs.get(job_id)
+            if not job or job['project_id'] != str(project.id):
+                return JsonResponse({'status': 'error', 'message': '해당 작업을 찾을 수 없습니다.'}, status=404)
+            return JsonResponse({'status': 'success', 'job': job})
+        state = project.takeoff_pipeline_state or {}
+        return JsonResponse({
+            'status': 'success',
+            'job': project_pipeline_job(project.id),
+            'last_run_at': state.get('last_run_at'),
+            'last_report': state.get('last_report'),
+        })
+    except Project.DoesNotExist:
+        return JsonResponse({'status': 'error', 'message': '프로젝트를 찾을 수 없습니다.'}, status=404)
+# ▲▲▲ [추가] 여기까지 ▲▲▲
+
+
 # ============================================================
 # ▼▼▼ [NEW] Chat AI Command Processing API ▼▼▼
 # ============================================================
@@ -0,0 +1,143 @@
+"""
+WebSocket 메시지 코덱
+- 기본: JSON 텍스트 프레임 (기존 방식 그대로)
+- 바이너리 모드: 접속 시 subprotocol 협상이 성공하면 MessagePack 바이너리 프레임 사용
+
+바이너리 모드에서 NumPy 배열은 MessagePack ext 타입(TYPED_ARRAY_EXT)으로 전송됩니다.
+    [dtype 코드 u8][ndim u8][예약 2바이트][shape: ndim x u32 LE][little-endian 원본 바이트]
+수신 측은 np.frombuffer로 복사 없이 배열을 복원합니다. (JS는 Float32Array/Uint32Array 등)
+"""
+
+import datetime
+import decimal
+import json
+import struct
+import uuid
+
+import msgpack
+import numpy as np
+
+BINARY_SUBPROTOCOL = 'costestimator.msgpack.v1'
+TYPED_ARRAY_EXT = 1
+
+# dtype 코드 <-> NumPy dtype (JS 쪽 websocket.js와 동일한 번호를 사용해야 함)
+_DTYPE_BY_CODE = {
+    1: np.dtype('<f4'),
+    2: np.dtype('<f8'),
+    3: np.dtype('<u4'),
+    4: np.dtype('<i4'),
+}
+_CODE_BY_DTYPE = {dtype: code for code, dtype in _DTYPE_BY_CODE.items()}
+# 지원하지 않는 dtype(int64 등)은 같은 종류의 가장 가까운 형식으로 변환
+_FALLBACK_DTYPE_BY_KIND = {'f': np.dtype('<f8'), 'u': np.dtype('<u4'), 'i': np.dtype('<i4'), 'b': np.dtype('<u4')}
+
+
+def _pack_typed_array(array):
+    dtype = array.dtype.newbyteorder('<')
+    if dtype not in _CODE_BY_DTYPE:
+        if array.dtype.kind not in _FALLBACK_DTYPE_BY_KIND:
+            return array.tolist()
+        dtype = _FALLBACK_DTYPE_BY_KIND[array.dtype.kind]
+    data = np.ascontiguousarray(array, dtype=dtype)
+    header = struct.pack('<BBxx', _CODE_BY_DTYPE[dtype], data.ndim)
+    header += struct.pack(f'<{data.ndim}I', *data.shape)
+    return msgpack.ExtType(TYPED_ARRAY_EXT, header + data.tobytes())
+
+
+def _unpack_typed_array(data):
+    dtype_code, ndim = struct.unpack_from('<BBxx', data, 0)
+    shape = struct.unpack_from(f'<{ndim}I', data, 4)
+    offset = 4 + 4 * ndim
+    # memoryview를 그대로 넘겨 추가 복사 없이 배열을 만듦 (읽기 전용)
+    return np.frombuffer(memoryview(data)[offset:], dtype=_DTYPE_BY_CODE[dtype_code]).reshape(shape)
+
+
+def _default(obj):
+    if isinstance(obj, np.ndarray):
+        return _pack_typed_array(obj)
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, decimal.Decimal):
+        return float(obj)
+    if isinstance(obj, (datetime.datetime, datetime.date)):
+        return obj.isoformat()
+    if isinstance(obj, uuid.UUID):
+        return str(obj)
+    if isinstance(obj, (set, tuple)):
+        return list(obj)
+    raise TypeError(f'Object of type {type(obj).__name__} is not MessagePack serializable')
+
+
+def _ext_hook(code, data):
+    if code == TYPED_ARRAY_EXT:
+        return _unpack_typed_array(data)
+    return msgpack.ExtType(code, data)
+
+
+def encode_message(message):
+    """메시지 딕셔너리를 MessagePack 바이트로 변환합니다."""
+    return msgpack.packb(message, default=_default, use_bin_type=True)
+
+
+def decode_message(data):
+    """MessagePack 바이트를 메시지 딕셔너리로 변환합니다. (typed array는 NumPy 배열로 복원)"""
+    return msgpack.unpackb(data, raw=False, ext_hook=_ext_hook, strict_map_key=False)
+
+
+def encode_payload(payload, binary):
+    """payload만 미리 인코딩합니다. (스냅샷 캐시 등에서 재사용 후 wrap_encoded_payload로 메시지를 완성)"""
+    if binary:
+        return encode_message(payload)
+    return json.dumps(payload).encode('utf-8')
+
+
+def wrap_encoded_payload(message, payload_bytes, binary):
+    """
+    미리 인코딩된 payload를 다시 디코딩하지 않고 {..message, 'payload': payload} 프레임으로 만듭니다.
+    JSON은 문자열 이어붙이기, MessagePack은 map 헤더 + 키/값 바이트 이어붙이기로 처리합니다.
+    """
+    if binary:
+        packer = msgpack.Packer(default=_default, use_bin_type=True)
+        parts = [packer.pack_map_header(len(message) + 1)]
+        for key, value in message.items():
+            parts.append(packer.pack(key))
+            parts.append(packer.pack(value))
+        parts.append(packer.pack('payload'))
+        parts.append(bytes(payload_bytes))
+        return b''.join(parts)
+    head = json.dumps(message)[:-1]
+    separator = ', ' if message else ''
+    return f'{head}{separator}"payload": {bytes(payload_bytes).decode("utf-8")}}}'
+
+
+class MessageCodecMixin:
+    """
+    Consumer용 송수신 헬퍼.
+    connect()에서 negotiate_binary_mode()의 반환값을 accept(subprotocol=...)에 넘기면
+    이후 send_message()/decode_incoming()이 협상된 형식을 자동으로 사용합니다.
+    """
+
+    binary_mode = False
+
+    def negotiate_binary_mode(self):
+        self.binary_mode = BINARY_SUBPROTOCOL in (self.scope.get('subprotocols') or [])
+        return BINARY_SUBPROTOCOL if self.binary_mode else None
+
+    async def send_message(self, message):
+        if self.binary_mode:
+            await self.send(bytes_data=encode_message(message))
+        else:
+            await self.send(text_data=json.dumps(message))
+
+    async def send_encoded_payload(self, message, payload_bytes):
+        """encode_payload(..., self.binary_mode)로 미리 인코딩한 payload를 담아 전송합니다."""
+        frame = wrap_encoded_payload(message, payload_bytes, self.binary_mode)
+        if self.binary_mode:
+            await self.send(bytes_data=frame)
+        else:
+            await self.send(text_data=frame)
+
+    def decode_incoming(self, text_data=None, bytes_data=None):
+        if bytes_data is not None:
+            return decode_message(bytes_data)
+        return json.loads(text_data)